@@ -0,0 +1,65 @@
+"""
+Ambiente das migrações Alembic.
+
+O URL vem das settings da aplicação e o metadata dos modelos serve de
+referência ao ``alembic revision --autogenerate``. Quando chamado pela
+aplicação (``app.db.migrations``) recebe a ligação em
+``config.attributes["connection"]``.
+"""
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import engine_from_config, pool
+
+from app.core.config import settings
+from app.db.pesquisa import incluir_no_autogenerate
+from app.models import Base
+
+config = context.config
+target_metadata = Base.metadata
+
+
+def _opcoes_contexto(url_ou_dialeto: str) -> dict:
+    # SQLite não suporta a maior parte dos ALTER TABLE: usa o modo batch
+    return {
+        "target_metadata": target_metadata,
+        "render_as_batch": url_ou_dialeto.startswith("sqlite"),
+        "compare_type": True,
+        # Os objetos de pesquisa de texto não estão declarados nos modelos
+        "include_name": incluir_no_autogenerate,
+    }
+
+
+def run_migrations_offline() -> None:
+    """Gera o SQL das migrações sem ligação à base (``alembic upgrade --sql``)"""
+    url = config.get_main_option("sqlalchemy.url") or settings.database_url
+    context.configure(url=url, literal_binds=True, dialect_opts={"paramstyle": "named"}, **_opcoes_contexto(url))
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _executar(connection) -> None:
+    context.configure(connection=connection, **_opcoes_contexto(connection.dialect.name))
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _executar(connection)
+        return
+
+    if config.config_file_name is not None:
+        fileConfig(config.config_file_name)
+    secao = config.get_section(config.config_ini_section, {})
+    secao.setdefault("sqlalchemy.url", settings.database_url)
+    connectable = engine_from_config(secao, prefix="sqlalchemy.", poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        _executar(connection)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,170 @@
+"""schema inicial
+
+Tabelas tal como eram criadas por ``Base.metadata.create_all`` antes das
+migrações, sem nada acrescentado depois. Bases de dados criadas antes das
+migrações são marcadas com esta revisão (``alembic stamp 0001``) em vez de a
+executar, pelo que tudo o que é novo tem de vir em revisões seguintes.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 22:22:12.755806
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+ENUMS = (
+    "userrole", "acaoaudit", "tipoprojeto", "fontefinanciamento", "estadoprojeto",
+    "periodo5w2h", "trimestre", "statuslicenciamento", "entidaderesponsavel",
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'provincias',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nome', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_provincias_id', 'provincias', ['id'], unique=False)
+    op.create_index('ix_provincias_nome', 'provincias', ['nome'], unique=True)
+
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('hashed_password', sa.String(), nullable=False),
+        sa.Column('full_name', sa.String(), nullable=False),
+        sa.Column('role', sa.Enum('ROOT', 'GESTAO_DADOS', 'VISUALIZACAO', name='userrole'), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_login', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    op.create_index('ix_users_id', 'users', ['id'], unique=False)
+
+    op.create_table(
+        'audit_logs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('papel', sa.String(), nullable=True),
+        sa.Column('acao', sa.Enum('LOGIN', 'LOGOUT', 'CREATE', 'UPDATE', 'DELETE', 'IMPORT', 'EXPORT', 'STATUS_CHANGE', name='acaoaudit'), nullable=False),
+        sa.Column('entidade', sa.String(), nullable=True),
+        sa.Column('entidade_id', sa.Integer(), nullable=True),
+        sa.Column('ip', sa.String(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('detalhes', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_audit_logs_id', 'audit_logs', ['id'], unique=False)
+
+    op.create_table(
+        'projetos',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nome', sa.String(), nullable=False),
+        sa.Column('provincia_id', sa.Integer(), nullable=False),
+        sa.Column('tipo', sa.Enum('COMUNITARIO', 'EMPRESARIAL', name='tipoprojeto'), nullable=False),
+        sa.Column('fonte_financiamento', sa.Enum('AFAP_2', 'FADEPA', 'FACRA', 'PRIVADO', name='fontefinanciamento'), nullable=False),
+        sa.Column('estado', sa.Enum('PLANEADO', 'EM_EXECUCAO', 'CONCLUIDO', 'SUSPENSO', name='estadoprojeto'), nullable=False),
+        sa.Column('responsavel', sa.String(), nullable=False),
+        sa.Column('orcamento_previsto_kz', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('orcamento_executado_kz', sa.Numeric(precision=15, scale=2), nullable=True),
+        sa.Column('data_inicio_prevista', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('data_fim_prevista', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('descricao', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['provincia_id'], ['provincias.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_projetos_id', 'projetos', ['id'], unique=False)
+    op.create_index('ix_projetos_nome', 'projetos', ['nome'], unique=False)
+
+    op.create_table(
+        'eixos_5w2h',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('projeto_id', sa.Integer(), nullable=False),
+        sa.Column('what', sa.Text(), nullable=False),
+        sa.Column('why', sa.Text(), nullable=False),
+        sa.Column('where', sa.Text(), nullable=False),
+        sa.Column('when', sa.Text(), nullable=False),
+        sa.Column('who', sa.Text(), nullable=False),
+        sa.Column('how', sa.Text(), nullable=False),
+        sa.Column('how_much_kz', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('marcos', sa.JSON(), nullable=True),
+        sa.Column('periodo', sa.Enum('PERIODO_0_6', 'PERIODO_7_12', 'PERIODO_13_18', name='periodo5w2h'), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['projeto_id'], ['projetos.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_eixos_5w2h_id', 'eixos_5w2h', ['id'], unique=False)
+
+    op.create_table(
+        'indicadores',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('projeto_id', sa.Integer(), nullable=False),
+        sa.Column('nome', sa.String(), nullable=False),
+        sa.Column('unidade', sa.String(), nullable=False),
+        sa.Column('meta', sa.Numeric(precision=15, scale=2), nullable=False),
+        sa.Column('valor_actual', sa.Numeric(precision=15, scale=2), nullable=True),
+        sa.Column('periodo_referencia', sa.Enum('T1', 'T2', 'T3', 'T4', name='trimestre'), nullable=False),
+        sa.Column('fonte_dados', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['projeto_id'], ['projetos.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_indicadores_id', 'indicadores', ['id'], unique=False)
+
+    op.create_table(
+        'licenciamentos',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('projeto_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.Enum('PENDENTE', 'EM_ANALISE', 'APROVADO', 'NEGADO', name='statuslicenciamento'), nullable=False),
+        sa.Column('entidade_responsavel', sa.Enum('IPA', 'DNA', 'DNRM', name='entidaderesponsavel'), nullable=False),
+        sa.Column('data_submissao', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('data_decisao', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('observacoes', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['projeto_id'], ['projetos.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_licenciamentos_id', 'licenciamentos', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_licenciamentos_id', table_name='licenciamentos')
+    op.drop_table('licenciamentos')
+    op.drop_index('ix_indicadores_id', table_name='indicadores')
+    op.drop_table('indicadores')
+    op.drop_index('ix_eixos_5w2h_id', table_name='eixos_5w2h')
+    op.drop_table('eixos_5w2h')
+    op.drop_index('ix_projetos_nome', table_name='projetos')
+    op.drop_index('ix_projetos_id', table_name='projetos')
+    op.drop_table('projetos')
+    op.drop_index('ix_audit_logs_id', table_name='audit_logs')
+    op.drop_table('audit_logs')
+    op.drop_index('ix_users_id', table_name='users')
+    op.drop_index('ix_users_email', table_name='users')
+    op.drop_table('users')
+    op.drop_index('ix_provincias_nome', table_name='provincias')
+    op.drop_index('ix_provincias_id', table_name='provincias')
+    op.drop_table('provincias')
+
+    # No PostgreSQL os tipos ENUM sobrevivem ao DROP TABLE
+    if op.get_bind().dialect.name == "postgresql":
+        for tipo in ENUMS:
+            op.execute(f"DROP TYPE IF EXISTS {tipo}")
@@ -0,0 +1,46 @@
+"""indices de filtros
+
+Índices para as chaves estrangeiras e para os filtros das listagens de
+projetos, indicadores, licenciamentos e auditoria. Os índices compostos da
+auditoria terminam em (timestamp, id), a ordenação das listagens.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 22:22:37.151509
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+# (nome, tabela, colunas)
+INDICES = (
+    ('ix_projetos_provincia_id', 'projetos', ['provincia_id']),
+    ('ix_projetos_tipo', 'projetos', ['tipo']),
+    ('ix_projetos_fonte_financiamento', 'projetos', ['fonte_financiamento']),
+    ('ix_projetos_estado', 'projetos', ['estado']),
+    ('ix_eixos_5w2h_projeto_id', 'eixos_5w2h', ['projeto_id']),
+    ('ix_indicadores_projeto_id_periodo_referencia', 'indicadores', ['projeto_id', 'periodo_referencia']),
+    ('ix_indicadores_periodo_referencia', 'indicadores', ['periodo_referencia']),
+    ('ix_licenciamentos_projeto_id', 'licenciamentos', ['projeto_id']),
+    ('ix_licenciamentos_status', 'licenciamentos', ['status']),
+    ('ix_licenciamentos_entidade_responsavel', 'licenciamentos', ['entidade_responsavel']),
+    ('ix_audit_logs_user_id_timestamp', 'audit_logs', ['user_id', 'timestamp', 'id']),
+    ('ix_audit_logs_acao_timestamp', 'audit_logs', ['acao', 'timestamp', 'id']),
+    ('ix_audit_logs_entidade_timestamp', 'audit_logs', ['entidade', 'timestamp', 'id']),
+)
+
+
+def upgrade() -> None:
+    for nome, tabela, colunas in INDICES:
+        op.create_index(nome, tabela, colunas, unique=False)
+
+
+def downgrade() -> None:
+    for nome, tabela, _ in reversed(INDICES):
+        op.drop_index(nome, table_name=tabela)
@@ -0,0 +1,31 @@
+"""indices de pesquisa
+
+Pesquisa de texto (``app.db.pesquisa``): no PostgreSQL colunas geradas
+``search_vector`` com índice GIN e configuração ``portuguese_unaccent`` (cria
+a extensão ``unaccent``); no SQLite tabelas FTS5 sincronizadas por triggers.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 23:05:12.418233
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.pesquisa import instrucoes_criacao, instrucoes_remocao
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    for instrucao in instrucoes_criacao(op.get_context().dialect.name):
+        op.execute(instrucao)
+
+
+def downgrade() -> None:
+    for instrucao in instrucoes_remocao(op.get_context().dialect.name):
+        op.execute(instrucao)
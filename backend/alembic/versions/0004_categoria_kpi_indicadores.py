@@ -0,0 +1,38 @@
+"""categoria kpi dos indicadores
+
+Coluna ``indicadores.categoria_kpi`` (indexada) com a categoria de KPI de
+cada indicador, preenchida para os indicadores existentes pelo classificador
+de ``app.core.kpi_classifier``. Com ``--sql`` a coluna fica com ``OUTRO`` e o
+preenchimento é feito depois com ``python -m app.db.maintenance reclassify-kpis``.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 09:41:27.603118
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+from app.core.kpi_classifier import reclassificar
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+categoria_kpi = sa.Enum('FAMILIAS_BENEFICIADAS', 'EMPREGOS_CRIADOS', 'OUTRO', name='categoriakpi')
+
+
+def upgrade() -> None:
+    categoria_kpi.create(op.get_bind(), checkfirst=True)
+    op.add_column('indicadores', sa.Column('categoria_kpi', categoria_kpi, server_default='OUTRO', nullable=False))
+    op.create_index('ix_indicadores_categoria_kpi', 'indicadores', ['categoria_kpi'], unique=False)
+    if not context.is_offline_mode():
+        reclassificar(op.get_bind())
+
+
+def downgrade() -> None:
+    op.drop_index('ix_indicadores_categoria_kpi', table_name='indicadores')
+    op.drop_column('indicadores', 'categoria_kpi')
+    categoria_kpi.drop(op.get_bind(), checkfirst=True)
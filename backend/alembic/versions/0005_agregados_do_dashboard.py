@@ -0,0 +1,52 @@
+"""agregados do dashboard
+
+Tabelas ``producao_resumo`` (província, trimestre, categoria de KPI) e
+``projetos_resumo`` (fonte, estado), mantidas por ``app.db.rollups`` e
+preenchidas aqui a partir dos dados existentes. Com ``--sql`` ficam vazias
+e são preenchidas depois com ``python -m app.db.maintenance rebuild-rollups``.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 11:02:45.287341
+"""
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from app.db.rollups import reconstruir
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'producao_resumo',
+        sa.Column('provincia_id', sa.Integer(), nullable=False),
+        sa.Column('periodo_referencia', sa.String(), nullable=False),
+        sa.Column('categoria_kpi', sa.String(), nullable=False),
+        sa.Column('total_indicadores', sa.Integer(), nullable=False),
+        sa.Column('valor_actual', sa.Numeric(precision=18, scale=2), nullable=False),
+        sa.Column('meta', sa.Numeric(precision=18, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint('provincia_id', 'periodo_referencia', 'categoria_kpi')
+    )
+    op.create_table(
+        'projetos_resumo',
+        sa.Column('fonte_financiamento', sa.String(), nullable=False),
+        sa.Column('estado', sa.String(), nullable=False),
+        sa.Column('total_projetos', sa.Integer(), nullable=False),
+        sa.Column('orcamento_previsto_kz', sa.Numeric(precision=18, scale=2), nullable=False),
+        sa.Column('orcamento_executado_kz', sa.Numeric(precision=18, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint('fonte_financiamento', 'estado')
+    )
+    if not context.is_offline_mode():
+        reconstruir(Session(bind=op.get_bind()))
+
+
+def downgrade() -> None:
+    op.drop_table('projetos_resumo')
+    op.drop_table('producao_resumo')
@@ -0,0 +1,70 @@
+"""resumo da auditoria
+
+Tabela ``audit_summary`` (contadores por ação, entidade e utilizador),
+preenchida aqui a partir de ``audit_logs``, e índice ``(timestamp, id)`` da
+paginação por cursor da auditoria. Bases marcadas com a revisão 0001 não os
+têm; bases criadas com uma versão anterior da 0001 já os têm e ficam como
+estão. A coluna ``papel`` é acrescentada apenas se faltar. Com ``--sql`` o
+script assume uma base marcada com a 0001.
+
+Antecede o índice único dos indicadores: uma base parada na 0005 por causa
+de indicadores repetidos precisa da auditoria para ``dedupe-indicators``.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 13:58:21.604117
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+# Contadores iniciais, com as chaves de AuditService.rebuild_audit_summary
+PREENCHER_RESUMO = (
+    "INSERT INTO audit_summary (dimensao, chave, total) "
+    "SELECT 'acao', CAST(acao AS VARCHAR), COUNT(*) FROM audit_logs GROUP BY acao",
+    "INSERT INTO audit_summary (dimensao, chave, total) "
+    "SELECT 'entidade', entidade, COUNT(*) FROM audit_logs WHERE entidade IS NOT NULL GROUP BY entidade",
+    "INSERT INTO audit_summary (dimensao, chave, total) "
+    "SELECT 'user', CAST(user_id AS VARCHAR), COUNT(*) FROM audit_logs WHERE user_id IS NOT NULL GROUP BY user_id",
+)
+
+
+def _criar_resumo() -> None:
+    op.create_table(
+        'audit_summary',
+        sa.Column('dimensao', sa.String(), nullable=False),
+        sa.Column('chave', sa.String(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('dimensao', 'chave'),
+    )
+    for instrucao in PREENCHER_RESUMO:
+        op.execute(instrucao)
+
+
+def upgrade() -> None:
+    if context.is_offline_mode():
+        op.create_index('ix_audit_logs_timestamp_id', 'audit_logs', ['timestamp', 'id'], unique=False)
+        _criar_resumo()
+        return
+
+    inspector = sa.inspect(op.get_bind())
+    if 'papel' not in {c['name'] for c in inspector.get_columns('audit_logs')}:
+        op.add_column('audit_logs', sa.Column('papel', sa.String(), nullable=True))
+
+    if 'ix_audit_logs_timestamp_id' not in {i['name'] for i in inspector.get_indexes('audit_logs')}:
+        op.create_index('ix_audit_logs_timestamp_id', 'audit_logs', ['timestamp', 'id'], unique=False)
+
+    if not inspector.has_table('audit_summary'):
+        _criar_resumo()
+
+
+def downgrade() -> None:
+    # papel faz parte do schema inicial e fica
+    op.drop_index('ix_audit_logs_timestamp_id', table_name='audit_logs')
+    op.drop_table('audit_summary')
@@ -0,0 +1,63 @@
+"""indicador unico por periodo
+
+Índice único ``indicadores (projeto_id, nome, periodo_referencia)``, a chave
+do upsert em lote dos valores trimestrais.
+
+Se já existirem indicadores repetidos a migração é interrompida com a lista
+das chaves em causa, sem alterar dados. Os repetidos são revistos com
+``python -m app.db.maintenance list-duplicate-indicators`` e removidos com
+``python -m app.db.maintenance dedupe-indicators`` (mantém o mais recente de
+cada chave) antes de repetir a migração. Com ``--sql`` não há verificação: o
+``CREATE UNIQUE INDEX`` falha se houver repetidos.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 14:26:09.518730
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+# Chaves repetidas mostradas na mensagem de erro
+MAX_DUPLICADOS_LISTADOS = 50
+
+
+def _verificar_duplicados() -> None:
+    duplicados = op.get_bind().execute(sa.text(
+        "SELECT projeto_id, nome, periodo_referencia, COUNT(*) AS total FROM indicadores "
+        "GROUP BY projeto_id, nome, periodo_referencia HAVING COUNT(*) > 1 "
+        "ORDER BY projeto_id, nome, periodo_referencia"
+    )).all()
+    if not duplicados:
+        return
+    linhas = [
+        f"  projeto {d.projeto_id}, '{d.nome}', {d.periodo_referencia}: {d.total} indicadores"
+        for d in duplicados[:MAX_DUPLICADOS_LISTADOS]
+    ]
+    if len(duplicados) > MAX_DUPLICADOS_LISTADOS:
+        linhas.append(f"  ... e mais {len(duplicados) - MAX_DUPLICADOS_LISTADOS} chaves")
+    raise RuntimeError(
+        f"Existem {len(duplicados)} chaves (projeto_id, nome, periodo_referencia) com indicadores "
+        "repetidos; o índice único não pode ser criado:\n" + "\n".join(linhas) + "\n"
+        "Reveja-os com 'python -m app.db.maintenance list-duplicate-indicators' e remova-os com "
+        "'python -m app.db.maintenance dedupe-indicators' antes de repetir a migração."
+    )
+
+
+def upgrade() -> None:
+    if not context.is_offline_mode():
+        _verificar_duplicados()
+    op.create_index(
+        'uq_indicadores_projeto_id_nome_periodo_referencia', 'indicadores',
+        ['projeto_id', 'nome', 'periodo_referencia'], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_indicadores_projeto_id_nome_periodo_referencia', table_name='indicadores')
@@ -2,15 +2,16 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import FileResponse, JSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import text, inspect
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import json
 import os
 import tempfile
 from datetime import datetime
 from app.db.database import get_db, engine
+from app.db.engine import metricas_pool
 from app.core.deps import require_root
 from app.models.user import User
-from app.core.rate_limiter import login_attempts
+from app.core.rate_limiter import rate_limiter, rate_limit_status
 import subprocess
 import shutil
 
@@ -94,7 +95,7 @@ def export_database_as_json(db: Session) -> Dict[str, Any]:
         "audit_logs"
     ]
     
-    inspector = inspect(engine)
+    inspector = inspect(db.connection())
     
     for table_name in tables_to_export:
         if table_name in inspector.get_table_names():
@@ -106,6 +107,8 @@ def export_database_as_json(db: Session) -> Dict[str, Any]:
             rows = []
             for row in result:
                 row_dict = dict(zip(columns, row))
+                # Coluna gerada de pesquisa (PostgreSQL), recalculada na importação
+                row_dict.pop("search_vector", None)
                 # Converter tipos especiais para string
                 for key, value in row_dict.items():
                     if isinstance(value, (datetime,)):
@@ -392,20 +395,44 @@ def get_database_stats(
         )
 
 
+@router.get("/db/pool")
+def get_database_pool_stats(
+    current_user: User = Depends(require_root)
+):
+    """
+    Retorna o estado e as métricas do pool de ligações (apenas ROOT).
+
+    ``wait_*_ms`` mede o tempo à espera de uma ligação livre e ``timeouts``
+    os pedidos que desistiram ao fim de ``DB_POOL_TIMEOUT``: valores altos
+    indicam que há mais workers/threads do que ligações disponíveis.
+    """
+    return {
+        "database_info": {
+            "engine": engine.dialect.name,
+            "timestamp": datetime.now().isoformat()
+        },
+        "pool": metricas_pool(engine)
+    }
+
+
 @router.post("/rate-limit/clear")
 def clear_rate_limits(
+    ip: Optional[str] = None,
     current_user = Depends(require_root),
     db: Session = Depends(get_db)
 ):
-    """Limpa todos os rate limits de login (apenas ROOT)"""
+    """Limpa os rate limits de login de um IP ou de todos (apenas ROOT)"""
     try:
-        # Limpar o dicionário de tentativas de login
-        login_attempts.clear()
+        # Com Redis a limpeza aplica-se a todos os workers
+        if ip:
+            total = 1 if rate_limiter.limpar(ip) else 0
+        else:
+            total = rate_limiter.limpar_tudo()
         
         return {
             "message": "Rate limits limpos com sucesso",
             "cleared_at": datetime.utcnow().isoformat(),
-            "total_cleared": len(login_attempts)
+            "total_cleared": total
         }
         
     except Exception as e:
@@ -422,11 +449,7 @@ def get_rate_limit_status(
 ):
     """Obtém status dos rate limits (apenas ROOT)"""
     try:
-        return {
-            "total_ips_blocked": len(login_attempts),
-            "blocked_ips": list(login_attempts.keys()),
-            "details": login_attempts
-        }
+        return rate_limit_status()
         
     except Exception as e:
         raise HTTPException(
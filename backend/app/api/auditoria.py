@@ -21,12 +21,42 @@ def read_audit_logs(
     data_inicio: Optional[datetime] = None,
     data_fim: Optional[datetime] = None,
     search: Optional[str] = None,
+    cursor: Optional[str] = None,
     current_user = Depends(require_root),
     db: Session = Depends(get_db)
 ):
-    """Lista logs de auditoria com filtros e estatísticas (apenas ROOT)"""
+    """
+    Lista logs de auditoria com filtros e estatísticas (apenas ROOT).
+    
+    Com o parâmetro ``cursor`` (vazio para a primeira página) usa paginação
+    keyset: a resposta traz ``next_cursor`` e o custo de cada página não
+    cresce com a profundidade. Sem ele mantém-se a paginação por ``page``.
+    """
     audit_service = AuditService(db)
     
+    if cursor is not None:
+        try:
+            logs, next_cursor = audit_service.get_audit_logs_cursor(
+                cursor=cursor or None,
+                limit=limit,
+                user_id=user_id,
+                acao=acao,
+                entidade=entidade,
+                data_inicio=data_inicio,
+                data_fim=data_fim,
+                search=search
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        
+        return {
+            "logs": logs,
+            "stats": audit_service.get_audit_stats(),
+            "limit": limit,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
+        }
+    
     # Calcular skip baseado na página
     skip = (page - 1) * limit
     
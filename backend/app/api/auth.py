@@ -1,11 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.db.database import get_db
+from app.db.database import get_db, get_async_db
 from app.schemas.user import UserLogin, Token, User
 from app.services.user_service import UserService
-from app.core.security import create_access_token, create_refresh_token, verify_token
-from app.core.rate_limiter import check_login_rate_limit, record_login_attempt
-from app.core.deps import get_current_active_user
+from app.core.security import (
+    create_access_token, create_refresh_token, verify_token, verify_and_update_password_async
+)
+from app.core.rate_limiter import check_login_rate_limit_async, record_login_attempt_async
+from app.core.deps import get_current_active_user, get_current_active_user_async
 from app.models.audit_log import AcaoAudit
 from datetime import timedelta
 from app.core.config import settings
@@ -17,51 +20,42 @@ router = APIRouter()
 async def login(
     user_credentials: UserLogin,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Autentica utilizador e retorna tokens"""
-    # Verifica rate limiting
+    # Verifica rate limiting (com Redis, numa thread fora do event loop)
     client_ip = request.client.host
-    if not check_login_rate_limit(client_ip):
+    if not await check_login_rate_limit_async(client_ip):
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail="Too many login attempts. Please try again later."
         )
     
-    # Autentica utilizador
-    user_service = UserService(db)
-    user = user_service.authenticate_user(user_credentials.email, user_credentials.password)
+    # Autentica utilizador (o bcrypt corre no executor de senhas, fora do event loop)
+    user = await db.run_sync(lambda sessao: UserService(sessao).get_user_by_email(user_credentials.email))
+    valida, novo_hash = await verify_and_update_password_async(
+        user_credentials.password, user.hashed_password if user else None
+    )
     
-    if not user:
-        record_login_attempt(client_ip, False)
+    if not valida:
+        await record_login_attempt_async(client_ip, False)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
     
     if not user.is_active:
-        record_login_attempt(client_ip, False)
+        await record_login_attempt_async(client_ip, False)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Inactive user"
         )
     
     # Regista sucesso
-    record_login_attempt(client_ip, True)
-    
-    # Atualiza último login
-    from datetime import datetime
-    user.last_login = datetime.utcnow()
-    db.commit()
+    await record_login_attempt_async(client_ip, True)
     
-    # Regista auditoria
-    audit_service = UserService(db).audit_service
-    audit_service.log_action(
-        user_id=user.id,
-        action=AcaoAudit.LOGIN,
-        ip=client_ip,
-        details=f"User {user.email} logged in"
-    )
+    # Atualiza último login (e o hash, se usava um custo antigo) e regista auditoria
+    await db.run_sync(lambda sessao: UserService(sessao).registar_login(user, client_ip, novo_hash))
     
     # Cria tokens
     access_token_expires = timedelta(minutes=settings.jwt_access_token_expire_minutes)
@@ -81,8 +75,9 @@ async def login(
     }
 
 
+# refresh/logout usam a sessão síncrona: são "def" para correrem na threadpool
 @router.post("/refresh", response_model=Token)
-async def refresh_token(
+def refresh_token(
     refresh_token: str,
     db: Session = Depends(get_db)
 ):
@@ -119,7 +114,7 @@ async def refresh_token(
 
 
 @router.post("/logout")
-async def logout(
+def logout(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -136,6 +131,6 @@ async def logout(
 
 
 @router.get("/me", response_model=User)
-async def read_users_me(current_user: User = Depends(get_current_active_user)):
+async def read_users_me(current_user: User = Depends(get_current_active_user_async)):
     """Obtém dados do utilizador atual"""
     return current_user
@@ -1,81 +1,50 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Dict, Any
-from app.db.database import get_db
-from app.core.deps import get_current_active_user
+from app.db.database import get_db, get_async_db
+from app.core.deps import get_current_active_user, get_current_active_user_async
 from app.services.projeto_service import ProjetoService
-from app.services.indicador_service import IndicadorService
-from app.services.licenciamento_service import LicenciamentoService
-from app.services.provincia_service import ProvinciaService
-from app.services.audit_service import AuditService
+from app.services.dashboard_service import DashboardService
+from app.core.cache import dashboard_cache
+from app.core.http_cache import ETagPorVersao
 from app.models.user import User
 
 router = APIRouter()
 
+# Tabelas de que dependem os agregados do dashboard
+ENTIDADES_DASHBOARD = ("projetos", "indicadores", "licenciamentos", "provincias")
+# Os gráficos leem também os agregados, que podem ser reconstruídos à parte
+ENTIDADES_GRAFICOS = ENTIDADES_DASHBOARD + ("producao_resumo", "projetos_resumo")
 
-@router.get("/stats")
-def get_dashboard_stats(
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+# Um pedido repetido sem alterações é respondido 304 sem consultar a base
+etag_stats = ETagPorVersao(*ENTIDADES_DASHBOARD, entidades_por_papel={"ROOT": ("audit_logs",)})
+etag_kpis = ETagPorVersao(*ENTIDADES_DASHBOARD)
+etag_graficos = ETagPorVersao(*ENTIDADES_GRAFICOS)
+
+
+@router.get("/stats", dependencies=[Depends(etag_stats)])
+async def get_dashboard_stats(
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """
     Endpoint central que agrega todas as estatísticas do dashboard.
     Acessível por todos os utilizadores autenticados.
     """
     try:
-        # Inicializar serviços
-        projeto_service = ProjetoService(db)
-        indicador_service = IndicadorService(db)
-        licenciamento_service = LicenciamentoService(db)
-        provincia_service = ProvinciaService(db)
-        audit_service = AuditService(db)
-
-        # Obter estatísticas de cada módulo
-        projetos_stats = projeto_service.get_dashboard_stats()
-        indicadores_stats = indicador_service.get_indicadores_stats()
-        licenciamentos_stats = licenciamento_service.get_licenciamentos_stats()
-        mapa_data = provincia_service.get_mapa_provincias()
-        
-        # Estatísticas de auditoria apenas para ROOT
-        audit_stats = None
+        # O bloco de auditoria só existe para ROOT, pelo que o cache é separado por papel
+        entidades = list(ENTIDADES_DASHBOARD)
         if current_user.role == "ROOT":
-            audit_stats = audit_service.get_audit_stats()
-
-        # Agregar todas as estatísticas
-        dashboard_data = {
-            "projetos": projetos_stats,
-            "indicadores": indicadores_stats,
-            "licenciamentos": licenciamentos_stats,
-            "mapa": mapa_data,
-            "auditoria": audit_stats,
-            "resumo": {
-                "total_projetos": projetos_stats.get("total_projetos", 0),
-                "projetos_ativos": projetos_stats.get("projetos_por_estado", {}).get("EM_EXECUCAO", 0),
-                "total_provincias_cobertas": len([p for p in mapa_data if p.get("total_projetos", 0) > 0]),
-                "total_indicadores": indicadores_stats.get("total_indicadores", 0),
-                "licencas_aprovadas": licenciamentos_stats.get("por_status", {}).get("APROVADO", 0),
-                "licencas_pendentes": licenciamentos_stats.get("por_status", {}).get("PENDENTE", 0),
-            },
-            "kpis_18_meses": {
-                "producao_total_toneladas": 0,  # TODO: Implementar cálculo específico
-                "familias_beneficiadas": 0,     # TODO: Implementar cálculo específico
-                "empregos_criados": 0,          # TODO: Implementar cálculo específico
-                "execucao_orcamental_percentual": indicadores_stats.get("execucao_media_percentual", 0),
-                "licencas_fast_track": licenciamentos_stats.get("total_licenciamentos", 0)
-            },
-            "distribuicao_fontes": projetos_stats.get("por_fonte_financiamento", {}),
-            "distribuicao_tipos": projetos_stats.get("por_tipo", {}),
-            "distribuicao_estados": projetos_stats.get("por_estado", {}),
-            "evolucao_trimestral": indicadores_stats.get("por_trimestre", {}),
-            "meta_data": {
-                "ultima_atualizacao": "2025-01-01T00:00:00Z",
-                "periodo_referencia": "18 meses (2024-2025)",
-                "total_provincias": 21,
-                "user_role": current_user.role
-            }
-        }
-
-        return dashboard_data
+            entidades.append("audit_logs")
+
+        # Todas as agregações num número fixo de queries GROUP BY
+        return await dashboard_cache.obter_async(
+            "stats",
+            entidades,
+            lambda: db.run_sync(lambda sessao: DashboardService(sessao).get_dashboard_stats(current_user.role)),
+            escopo=current_user.role.value
+        )
 
     except Exception as e:
         raise HTTPException(
@@ -84,47 +53,21 @@ def get_dashboard_stats(
         )
 
 
-@router.get("/kpis")
-def get_dashboard_kpis(
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+@router.get("/kpis", dependencies=[Depends(etag_kpis)])
+async def get_dashboard_kpis(
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """
     Endpoint específico para KPIs principais do dashboard.
     Otimizado para carregamento rápido.
     """
     try:
-        projeto_service = ProjetoService(db)
-        indicador_service = IndicadorService(db)
-        licenciamento_service = LicenciamentoService(db)
-
-        # KPIs essenciais
-        kpis = {
-            "projetos": {
-                "total": projeto_service.get_total_projetos(),
-                "ativos": projeto_service.get_projetos_ativos(),
-                "concluidos": projeto_service.get_projetos_concluidos(),
-                "orcamento_total": projeto_service.get_orcamento_total(),
-                "orcamento_executado": projeto_service.get_orcamento_executado()
-            },
-            "indicadores": {
-                "producao_total": indicador_service.get_producao_total(),
-                "familias_beneficiadas": indicador_service.get_familias_beneficiadas(),
-                "empregos_criados": indicador_service.get_empregos_criados()
-            },
-            "licenciamentos": {
-                "total": licenciamento_service.get_total_licenciamentos(),
-                "aprovados": licenciamento_service.get_licenciamentos_aprovados(),
-                "pendentes": licenciamento_service.get_licenciamentos_pendentes(),
-                "tempo_medio_aprovacao": licenciamento_service.get_tempo_medio_aprovacao()
-            },
-            "cobertura": {
-                "provincias_cobertas": projeto_service.get_provincias_cobertas(),
-                "percentual_cobertura": (projeto_service.get_provincias_cobertas() / 21) * 100
-            }
-        }
-
-        return kpis
+        return await dashboard_cache.obter_async(
+            "kpis",
+            ENTIDADES_DASHBOARD,
+            lambda: db.run_sync(lambda sessao: DashboardService(sessao).get_kpis())
+        )
 
     except Exception as e:
         raise HTTPException(
@@ -133,29 +76,21 @@ def get_dashboard_kpis(
         )
 
 
-@router.get("/charts")
-def get_dashboard_charts(
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+@router.get("/charts", dependencies=[Depends(etag_graficos)])
+async def get_dashboard_charts(
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """
     Endpoint específico para dados de gráficos do dashboard.
+    Lê as tabelas de agregados, sem percorrer indicadores nem projetos.
     """
     try:
-        projeto_service = ProjetoService(db)
-        indicador_service = IndicadorService(db)
-        provincia_service = ProvinciaService(db)
-
-        charts_data = {
-            "producao_por_provincia": indicador_service.get_producao_por_provincia(),
-            "producao_por_trimestre": indicador_service.get_producao_por_trimestre(),
-            "distribuicao_fontes": projeto_service.get_distribuicao_fontes(),
-            "evolucao_projetos": projeto_service.get_evolucao_projetos(),
-            "status_licenciamentos": licenciamento_service.get_status_distribution(),
-            "mapa_provincias": provincia_service.get_mapa_provincias_chart_data()
-        }
-
-        return charts_data
+        return await dashboard_cache.obter_async(
+            "charts",
+            ENTIDADES_GRAFICOS,
+            lambda: db.run_sync(lambda sessao: DashboardService(sessao).get_charts())
+        )
 
     except Exception as e:
         raise HTTPException(
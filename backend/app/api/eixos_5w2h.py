@@ -1,14 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.db.database import get_db
-from app.schemas.eixo_5w2h import Eixo5W2H, Eixo5W2HCreate, Eixo5W2HUpdate, Eixo5W2HResponse
+from app.db.database import get_db, get_async_db
+from app.schemas.eixo_5w2h import Eixo5W2H, Eixo5W2HCreate, Eixo5W2HUpdate, Eixo5W2HResponse, Eixo5W2HResumo
+from app.schemas.leitura import VistaListagem
 from app.services.eixo_5w2h_service import Eixo5W2HService
-from app.core.deps import get_current_active_user, require_root_or_gestao
+from app.core.deps import get_current_active_user, get_current_active_user_async, require_root_or_gestao
+from app.core.http_cache import ETagPorVersao
+from app.core.responses import ORJSONResponse
 from app.models.eixo_5w2h import Periodo5W2H
 
 router = APIRouter()
 
+# ETag das leituras a partir das versões das tabelas que devolvem
+etag_eixos = ETagPorVersao("eixos_5w2h", "projetos")
+
 
 @router.post("/", response_model=Eixo5W2H)
 def create_eixo_5w2h(
@@ -21,36 +28,57 @@ def create_eixo_5w2h(
     return eixo_service.create_eixo_5w2h(eixo_data, current_user.id)
 
 
-@router.get("/", response_model=List[Eixo5W2HResponse])
-def read_eixos_5w2h(
+@router.get("/", response_model=List[Eixo5W2HResponse], dependencies=[Depends(etag_eixos)])
+async def read_eixos_5w2h(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     projeto_id: Optional[int] = None,
     periodo: Optional[Periodo5W2H] = None,
     search: Optional[str] = None,
-    current_user = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    view: VistaListagem = VistaListagem.COMPLETA,
+    current_user = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Lista eixos 5W2H com filtros (todos os utilizadores)"""
-    eixo_service = Eixo5W2HService(db)
-    return eixo_service.get_eixos_5w2h(
-        skip=skip,
-        limit=limit,
-        projeto_id=projeto_id,
-        periodo=periodo,
-        search=search
-    )
+    """
+    Lista eixos 5W2H com filtros (todos os utilizadores).
+
+    Com ``view=resumo`` devolve só as colunas de ``Eixo5W2HResumo``, para as
+    tabelas do frontend.
+    """
+    resumo = Eixo5W2HResumo if view == VistaListagem.RESUMO else None
+
+    def listar(sessao: Session):
+        eixos = Eixo5W2HService(sessao).get_eixos_5w2h(
+            skip=skip,
+            limit=limit,
+            projeto_id=projeto_id,
+            periodo=periodo,
+            search=search,
+            resumo=resumo
+        )
+        if resumo:
+            return eixos
+        return [Eixo5W2HResponse.model_validate(eixo) for eixo in eixos]
 
+    eixos = await db.run_sync(listar)
+    if resumo:
+        return ORJSONResponse(eixos, headers=response.headers)
+    return eixos
 
-@router.get("/{eixo_id}", response_model=Eixo5W2HResponse)
-def read_eixo_5w2h(
+
+@router.get("/{eixo_id}", response_model=Eixo5W2HResponse, dependencies=[Depends(etag_eixos)])
+async def read_eixo_5w2h(
     eixo_id: int,
-    current_user = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtém eixo 5W2H por ID (todos os utilizadores)"""
-    eixo_service = Eixo5W2HService(db)
-    eixo = eixo_service.get_eixo_5w2h_by_id(eixo_id)
+    def obter(sessao: Session):
+        eixo = Eixo5W2HService(sessao).get_eixo_5w2h_by_id(eixo_id)
+        return Eixo5W2HResponse.model_validate(eixo) if eixo else None
+
+    eixo = await db.run_sync(obter)
     if not eixo:
         raise HTTPException(status_code=404, detail="Eixo 5W2H not found")
     return eixo
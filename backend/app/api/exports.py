@@ -0,0 +1,103 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from typing import Dict, Any
+from app.db.database import get_db
+from app.core.deps import get_current_active_user
+from app.models.user import UserRole
+from app.models.audit_log import AcaoAudit
+from app.schemas.export_job import ExportJob, ExportJobCreate, TipoExport, EstadoExportJob
+from app.services.audit_service import AuditService
+from app.services.export_jobs import export_jobs, validar_parametros, FORMATOS_POR_TIPO
+
+router = APIRouter()
+
+# Exportações reservadas ao ROOT; as restantes estão disponíveis a todos os utilizadores
+TIPOS_APENAS_ROOT = {TipoExport.AUDITORIA_CSV, TipoExport.DATABASE_JSON}
+
+
+def _verificar_permissao(tipo: TipoExport, current_user) -> None:
+    if tipo in TIPOS_APENAS_ROOT and current_user.role != UserRole.ROOT:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+
+
+def _job_response(job: Dict[str, Any]) -> ExportJob:
+    download_url = None
+    if job["status"] == EstadoExportJob.CONCLUIDO.value:
+        download_url = f"/api/exports/{job['id']}/download"
+    return ExportJob(**{k: v for k, v in job.items() if k != "user_id"}, download_url=download_url)
+
+
+@router.post("/", response_model=ExportJob, status_code=status.HTTP_202_ACCEPTED)
+def create_export_job(
+    job_data: ExportJobCreate,
+    current_user = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Submete um job de exportação e devolve-o de imediato.
+
+    O relatório é gerado num processo separado; consultar o estado em
+    ``GET /api/exports/{id}`` e descarregar em ``/download`` quando concluído.
+    Pedidos idênticos sobre os mesmos dados devolvem o mesmo job.
+    """
+    _verificar_permissao(job_data.tipo, current_user)
+
+    try:
+        parametros = validar_parametros(job_data.tipo, job_data.parametros)
+    except ValidationError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=e.errors(include_url=False))
+
+    job = export_jobs.submit(job_data.tipo, parametros, current_user.id)
+
+    AuditService(db).log_action(
+        user_id=current_user.id,
+        action=AcaoAudit.EXPORT,
+        entity="ExportJob",
+        details=f"Exportação {job_data.tipo.value} pedida (job {job['id']})"
+    )
+
+    return _job_response(job)
+
+
+@router.get("/{job_id}", response_model=ExportJob)
+def read_export_job(
+    job_id: str,
+    current_user = Depends(get_current_active_user)
+):
+    """Obtém o estado de um job de exportação"""
+    job = export_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    _verificar_permissao(TipoExport(job["tipo"]), current_user)
+    return _job_response(job)
+
+
+@router.get("/{job_id}/download")
+def download_export_job(
+    job_id: str,
+    current_user = Depends(get_current_active_user)
+):
+    """Descarrega o artefacto de um job de exportação concluído"""
+    job = export_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    tipo = TipoExport(job["tipo"])
+    _verificar_permissao(tipo, current_user)
+
+    if job["status"] != EstadoExportJob.CONCLUIDO.value:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Export job is {job['status']}"
+        )
+
+    extensao, media_type = FORMATOS_POR_TIPO[tipo]
+    return FileResponse(
+        export_jobs.caminho_artefacto(job),
+        media_type=media_type,
+        filename=f"{tipo.value}_{job['criado_em'][:10]}.{extensao}"
+    )
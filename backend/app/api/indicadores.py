@@ -1,14 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status, UploadFile, File
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.db.database import get_db
-from app.schemas.indicador import Indicador, IndicadorCreate, IndicadorUpdate, IndicadorResponse
+from app.db.database import get_db, get_async_db
+from app.schemas.indicador import Indicador, IndicadorCreate, IndicadorUpdate, IndicadorResponse, IndicadorResumo, IndicadorValoresLote, ResultadoValoresLote
+from app.schemas.leitura import VistaListagem
 from app.services.indicador_service import IndicadorService
-from app.core.deps import get_current_active_user, require_root_or_gestao
+from app.core.deps import get_current_active_user, get_current_active_user_async, require_root_or_gestao
+from app.core.http_cache import ETagPorVersao
+from app.core.responses import ORJSONResponse
+from app.services.export_service import ExportService
 from app.models.indicador import Trimestre
+from fastapi.responses import StreamingResponse, FileResponse
+from starlette.background import BackgroundTask
+import csv
+import io
+import os
+import tempfile
 
 router = APIRouter()
 
+# ETag das leituras a partir das versões das tabelas que devolvem
+etag_indicadores = ETagPorVersao("indicadores", "projetos")
+
 
 @router.post("/", response_model=Indicador)
 def create_indicador(
@@ -21,36 +35,73 @@ def create_indicador(
     return indicador_service.create_indicador(indicador_data, current_user.id)
 
 
-@router.get("/", response_model=List[IndicadorResponse])
-def read_indicadores(
+@router.post("/lote", response_model=ResultadoValoresLote)
+def upsert_indicadores_lote(
+    lote: IndicadorValoresLote,
+    current_user = Depends(require_root_or_gestao),
+    db: Session = Depends(get_db)
+):
+    """
+    Cria ou atualiza valores de indicadores em lote (ROOT ou GESTAO_DADOS).
+
+    Cada valor é identificado por (projeto_id, nome, periodo_referencia): os
+    que já existem são atualizados e os iguais aos atuais não são escritos.
+    Pensado para o carregamento trimestral, com milhares de valores por pedido.
+    """
+    return IndicadorService(db).upsert_indicadores_lote(lote, current_user.id)
+
+
+@router.get("/", response_model=List[IndicadorResponse], dependencies=[Depends(etag_indicadores)])
+async def read_indicadores(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     projeto_id: Optional[int] = None,
     periodo_referencia: Optional[Trimestre] = None,
     search: Optional[str] = None,
-    current_user = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    view: VistaListagem = VistaListagem.COMPLETA,
+    current_user = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Lista indicadores com filtros (todos os utilizadores)"""
-    indicador_service = IndicadorService(db)
-    return indicador_service.get_indicadores(
-        skip=skip,
-        limit=limit,
-        projeto_id=projeto_id,
-        periodo_referencia=periodo_referencia,
-        search=search
-    )
-
-
-@router.get("/{indicador_id}", response_model=IndicadorResponse)
-def read_indicador(
+    """
+    Lista indicadores com filtros (todos os utilizadores).
+
+    Com ``view=resumo`` devolve só as colunas de ``IndicadorResumo``, para as
+    tabelas do frontend.
+    """
+    resumo = IndicadorResumo if view == VistaListagem.RESUMO else None
+
+    def listar(sessao: Session):
+        indicadores = IndicadorService(sessao).get_indicadores(
+            skip=skip,
+            limit=limit,
+            projeto_id=projeto_id,
+            periodo_referencia=periodo_referencia,
+            search=search,
+            resumo=resumo
+        )
+        if resumo:
+            return indicadores
+        return [IndicadorResponse.model_validate(indicador) for indicador in indicadores]
+
+    indicadores = await db.run_sync(listar)
+    if resumo:
+        return ORJSONResponse(indicadores, headers=response.headers)
+    return indicadores
+
+
+@router.get("/{indicador_id}", response_model=IndicadorResponse, dependencies=[Depends(etag_indicadores)])
+async def read_indicador(
     indicador_id: int,
-    current_user = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtém indicador por ID (todos os utilizadores)"""
-    indicador_service = IndicadorService(db)
-    indicador = indicador_service.get_indicador_by_id(indicador_id)
+    def obter(sessao: Session):
+        indicador = IndicadorService(sessao).get_indicador_by_id(indicador_id)
+        return IndicadorResponse.model_validate(indicador) if indicador else None
+
+    indicador = await db.run_sync(obter)
     if not indicador:
         raise HTTPException(status_code=404, detail="Indicador not found")
     return indicador
@@ -106,6 +157,29 @@ def import_indicadores(
     return indicador_service.import_indicadores_csv(file_content, current_user.id)
 
 
+@router.post("/import/csv")
+def import_indicadores_ficheiro(
+    file: UploadFile = File(...),
+    current_user = Depends(require_root_or_gestao),
+    db: Session = Depends(get_db)
+):
+    """
+    Importa indicadores a partir de um ficheiro CSV enviado (ROOT ou GESTAO_DADOS).
+    
+    O ficheiro é lido linha a linha e inserido em blocos, pelo que pode ter
+    centenas de MB sem ser carregado em memória.
+    """
+    indicador_service = IndicadorService(db)
+    linhas = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        return indicador_service.import_indicadores_stream(linhas, current_user.id)
+    except (UnicodeDecodeError, csv.Error) as e:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Ficheiro CSV inválido: {e}")
+    finally:
+        linhas.detach()
+
+
 @router.get("/export/csv")
 def export_indicadores_csv(
     projeto_id: Optional[int] = None,
@@ -113,14 +187,16 @@ def export_indicadores_csv(
     current_user = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Exporta indicadores para CSV (todos os utilizadores)"""
-    indicador_service = IndicadorService(db)
-    csv_content = indicador_service.export_indicadores_csv(projeto_id, periodo_referencia)
+    """
+    Exporta indicadores para CSV (todos os utilizadores).
     
-    from fastapi.responses import Response
-    return Response(
-        content=csv_content,
-        media_type="text/csv",
+    O ficheiro é enviado por partes à medida que as linhas são lidas.
+    """
+    export_service = ExportService(db)
+    
+    return StreamingResponse(
+        export_service.iter_indicadores_csv(projeto_id, periodo_referencia),
+        media_type="text/csv; charset=utf-8",
         headers={"Content-Disposition": "attachment; filename=indicadores.csv"}
     )
 
@@ -132,15 +208,31 @@ def export_indicadores_excel(
     current_user = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Exporta indicadores para Excel (todos os utilizadores)"""
-    indicador_service = IndicadorService(db)
-    excel_content = indicador_service.export_indicadores_excel(projeto_id, periodo_referencia)
+    """
+    Exporta indicadores para Excel (todos os utilizadores).
     
-    from fastapi.responses import Response
-    return Response(
-        content=excel_content,
+    O workbook é escrito em modo ``write_only`` para um ficheiro temporário,
+    que é enviado por partes e apagado no fim.
+    """
+    export_service = ExportService(db)
+    fd, caminho = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    
+    try:
+        total = export_service.write_indicadores_excel(caminho, projeto_id, periodo_referencia)
+    except Exception:
+        os.remove(caminho)
+        raise
+    
+    if not total:
+        os.remove(caminho)
+        raise HTTPException(status_code=404, detail="Nenhum indicador encontrado para exportação")
+    
+    return FileResponse(
+        caminho,
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=indicadores.xlsx"}
+        filename="indicadores.xlsx",
+        background=BackgroundTask(os.remove, caminho)
     )
 
 
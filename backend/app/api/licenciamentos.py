@@ -1,14 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.db.database import get_db
-from app.schemas.licenciamento import Licenciamento, LicenciamentoCreate, LicenciamentoUpdate, LicenciamentoResponse
+from app.db.database import get_db, get_async_db
+from app.schemas.licenciamento import Licenciamento, LicenciamentoCreate, LicenciamentoUpdate, LicenciamentoResponse, LicenciamentoResumo, LicenciamentoStatusLote
+from app.schemas.leitura import VistaListagem
+from app.schemas.lote import ResultadoLote
 from app.services.licenciamento_service import LicenciamentoService
-from app.core.deps import get_current_active_user, require_root_or_gestao
+from app.core.deps import get_current_active_user, get_current_active_user_async, require_root_or_gestao
+from app.core.http_cache import ETagPorVersao
+from app.core.responses import ORJSONResponse
 from app.models.licenciamento import StatusLicenciamento, EntidadeResponsavel
 
 router = APIRouter()
 
+# ETag das leituras a partir das versões das tabelas que devolvem
+etag_licenciamentos = ETagPorVersao("licenciamentos", "projetos")
+
 
 @router.post("/", response_model=Licenciamento)
 def create_licenciamento(
@@ -21,38 +29,59 @@ def create_licenciamento(
     return licenciamento_service.create_licenciamento(licenciamento_data, current_user.id)
 
 
-@router.get("/", response_model=List[LicenciamentoResponse])
-def read_licenciamentos(
+@router.get("/", response_model=List[LicenciamentoResponse], dependencies=[Depends(etag_licenciamentos)])
+async def read_licenciamentos(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     projeto_id: Optional[int] = None,
     status: Optional[StatusLicenciamento] = None,
     entidade_responsavel: Optional[EntidadeResponsavel] = None,
     search: Optional[str] = None,
-    current_user = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    view: VistaListagem = VistaListagem.COMPLETA,
+    current_user = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Lista licenciamentos com filtros (todos os utilizadores)"""
-    licenciamento_service = LicenciamentoService(db)
-    return licenciamento_service.get_licenciamentos(
-        skip=skip,
-        limit=limit,
-        projeto_id=projeto_id,
-        status=status,
-        entidade_responsavel=entidade_responsavel,
-        search=search
-    )
+    """
+    Lista licenciamentos com filtros (todos os utilizadores).
 
+    Com ``view=resumo`` devolve só as colunas de ``LicenciamentoResumo``, para as
+    tabelas do frontend.
+    """
+    resumo = LicenciamentoResumo if view == VistaListagem.RESUMO else None
 
-@router.get("/{licenciamento_id}", response_model=LicenciamentoResponse)
-def read_licenciamento(
+    def listar(sessao: Session):
+        licenciamentos = LicenciamentoService(sessao).get_licenciamentos(
+            skip=skip,
+            limit=limit,
+            projeto_id=projeto_id,
+            status=status,
+            entidade_responsavel=entidade_responsavel,
+            search=search,
+            resumo=resumo
+        )
+        if resumo:
+            return licenciamentos
+        return [LicenciamentoResponse.model_validate(licenciamento) for licenciamento in licenciamentos]
+
+    licenciamentos = await db.run_sync(listar)
+    if resumo:
+        return ORJSONResponse(licenciamentos, headers=response.headers)
+    return licenciamentos
+
+
+@router.get("/{licenciamento_id}", response_model=LicenciamentoResponse, dependencies=[Depends(etag_licenciamentos)])
+async def read_licenciamento(
     licenciamento_id: int,
-    current_user = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtém licenciamento por ID (todos os utilizadores)"""
-    licenciamento_service = LicenciamentoService(db)
-    licenciamento = licenciamento_service.get_licenciamento_by_id(licenciamento_id)
+    def obter(sessao: Session):
+        licenciamento = LicenciamentoService(sessao).get_licenciamento_by_id(licenciamento_id)
+        return LicenciamentoResponse.model_validate(licenciamento) if licenciamento else None
+
+    licenciamento = await db.run_sync(obter)
     if not licenciamento:
         raise HTTPException(status_code=404, detail="Licenciamento not found")
     return licenciamento
@@ -105,6 +134,20 @@ def update_licenciamento_status(
     return {"message": "Status updated successfully"}
 
 
+@router.post("/status/lote", response_model=ResultadoLote)
+def update_licenciamentos_status_lote(
+    lote: LicenciamentoStatusLote,
+    current_user = Depends(require_root_or_gestao),
+    db: Session = Depends(get_db)
+):
+    """
+    Atualiza o status de vários licenciamentos num só pedido, por exemplo
+    quando a entidade responsável decide um conjunto de processos
+    (ROOT ou GESTAO_DADOS). Devolve o resultado de cada id.
+    """
+    return LicenciamentoService(db).update_licenciamentos_status_lote(lote, current_user.id)
+
+
 @router.get("/dashboard/stats")
 def get_licenciamentos_stats(
     current_user = Depends(get_current_active_user),
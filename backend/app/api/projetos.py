@@ -1,14 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.db.database import get_db
-from app.schemas.projeto import Projeto, ProjetoCreate, ProjetoUpdate, ProjetoResponse
+from app.db.database import get_db, get_async_db
+from app.schemas.projeto import Projeto, ProjetoCreate, ProjetoUpdate, ProjetoResponse, ProjetoResumo, ProjetoEstadoLote
+from app.schemas.leitura import VistaListagem
+from app.schemas.lote import ResultadoLote
 from app.services.projeto_service import ProjetoService
-from app.core.deps import get_current_active_user, require_root_or_gestao
+from app.core.deps import get_current_active_user, get_current_active_user_async, require_root_or_gestao
+from app.core.http_cache import ETagPorVersao
+from app.core.responses import ORJSONResponse
+from app.core.cache import dashboard_cache
 from app.models.projeto import TipoProjeto, FonteFinanciamento, EstadoProjeto
 
 router = APIRouter()
 
+# ETag das leituras a partir das versões das tabelas que devolvem
+etag_projetos = ETagPorVersao("projetos", "provincias")
+
 
 @router.post("/", response_model=Projeto)
 def create_projeto(
@@ -21,8 +30,9 @@ def create_projeto(
     return projeto_service.create_projeto(projeto_data, current_user.id)
 
 
-@router.get("/", response_model=List[ProjetoResponse])
-def read_projetos(
+@router.get("/", response_model=List[ProjetoResponse], dependencies=[Depends(etag_projetos)])
+async def read_projetos(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     provincia_id: Optional[int] = None,
@@ -30,31 +40,52 @@ def read_projetos(
     fonte_financiamento: Optional[FonteFinanciamento] = None,
     estado: Optional[EstadoProjeto] = None,
     search: Optional[str] = None,
-    current_user = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    view: VistaListagem = VistaListagem.COMPLETA,
+    current_user = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Lista projetos com filtros (todos os utilizadores)"""
-    projeto_service = ProjetoService(db)
-    return projeto_service.get_projetos(
-        skip=skip,
-        limit=limit,
-        provincia_id=provincia_id,
-        tipo=tipo,
-        fonte_financiamento=fonte_financiamento,
-        estado=estado,
-        search=search
-    )
-
-
-@router.get("/{projeto_id}", response_model=ProjetoResponse)
-def read_projeto(
+    """
+    Lista projetos com filtros (todos os utilizadores).
+
+    Com ``view=resumo`` devolve só as colunas de ``ProjetoResumo``, para as
+    tabelas do frontend.
+    """
+    resumo = ProjetoResumo if view == VistaListagem.RESUMO else None
+
+    def listar(sessao: Session):
+        projetos = ProjetoService(sessao).get_projetos(
+            skip=skip,
+            limit=limit,
+            provincia_id=provincia_id,
+            tipo=tipo,
+            fonte_financiamento=fonte_financiamento,
+            estado=estado,
+            search=search,
+            resumo=resumo
+        )
+        if resumo:
+            return projetos
+        return [ProjetoResponse.model_validate(projeto) for projeto in projetos]
+
+    projetos = await db.run_sync(listar)
+    if resumo:
+        # Linhas já no formato da resposta: dispensa a validação do response_model
+        return ORJSONResponse(projetos, headers=response.headers)
+    return projetos
+
+
+@router.get("/{projeto_id}", response_model=ProjetoResponse, dependencies=[Depends(etag_projetos)])
+async def read_projeto(
     projeto_id: int,
-    current_user = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtém projeto por ID (todos os utilizadores)"""
-    projeto_service = ProjetoService(db)
-    projeto = projeto_service.get_projeto_by_id(projeto_id)
+    def obter(sessao: Session):
+        projeto = ProjetoService(sessao).get_projeto_by_id(projeto_id)
+        return ProjetoResponse.model_validate(projeto) if projeto else None
+
+    projeto = await db.run_sync(obter)
     if not projeto:
         raise HTTPException(status_code=404, detail="Projeto not found")
     return projeto
@@ -105,6 +136,19 @@ def update_projeto_status(
     return projeto
 
 
+@router.post("/status/lote", response_model=ResultadoLote)
+def update_projetos_status_lote(
+    lote: ProjetoEstadoLote,
+    current_user = Depends(require_root_or_gestao),
+    db: Session = Depends(get_db)
+):
+    """
+    Atualiza o estado de vários projetos num só pedido (ROOT ou GESTAO_DADOS).
+    Devolve o resultado de cada id; ids inexistentes não fazem falhar o lote.
+    """
+    return ProjetoService(db).update_projetos_estado_lote(lote, current_user.id)
+
+
 @router.put("/{projeto_id}/orcamento-executado")
 def update_orcamento_executado(
     projeto_id: int,
@@ -165,4 +209,8 @@ def get_dashboard_stats(
 ):
     """Obtém estatísticas para dashboard (todos os utilizadores)"""
     projeto_service = ProjetoService(db)
-    return projeto_service.get_dashboard_stats()
+    return dashboard_cache.obter(
+        "projetos_stats",
+        ("projetos", "indicadores", "licenciamentos"),
+        projeto_service.get_dashboard_stats
+    )
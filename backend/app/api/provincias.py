@@ -1,43 +1,53 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
-from app.db.database import get_db
+from app.db.database import get_async_db
 from app.schemas.provincia import Provincia, ProvinciaResponse
 from app.services.provincia_service import ProvinciaService
-from app.core.deps import get_current_active_user
+from app.core.deps import get_current_active_user_async
+from app.core.http_cache import ETagPorVersao
 
 router = APIRouter()
 
+# ETag das leituras a partir das versões das tabelas que devolvem
+etag_provincias = ETagPorVersao("provincias", "projetos")
 
-@router.get("/", response_model=List[ProvinciaResponse])
-def read_provincias(
-    current_user = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+
+@router.get("/", response_model=List[ProvinciaResponse], dependencies=[Depends(etag_provincias)])
+async def read_provincias(
+    current_user = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Lista todas as províncias (todos os utilizadores)"""
-    provincia_service = ProvinciaService(db)
-    return provincia_service.get_provincias()
+    def listar(sessao: Session):
+        provincias = ProvinciaService(sessao).get_provincias()
+        return [ProvinciaResponse.model_validate(provincia) for provincia in provincias]
+
+    return await db.run_sync(listar)
 
 
-@router.get("/{provincia_id}", response_model=ProvinciaResponse)
-def read_provincia(
+@router.get("/{provincia_id}", response_model=ProvinciaResponse, dependencies=[Depends(etag_provincias)])
+async def read_provincia(
     provincia_id: int,
-    current_user = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtém província por ID (todos os utilizadores)"""
-    provincia_service = ProvinciaService(db)
-    provincia = provincia_service.get_provincia_by_id(provincia_id)
+    def obter(sessao: Session):
+        provincia = ProvinciaService(sessao).get_provincia_by_id(provincia_id)
+        return ProvinciaResponse.model_validate(provincia) if provincia else None
+
+    provincia = await db.run_sync(obter)
     if not provincia:
         raise HTTPException(status_code=404, detail="Província not found")
     return provincia
 
 
-@router.get("/dashboard/mapa")
-def get_mapa_provincias(
-    current_user = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+@router.get("/dashboard/mapa", dependencies=[Depends(etag_provincias)])
+async def get_mapa_provincias(
+    current_user = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtém dados para mapa das províncias com distribuição de projetos (todos os utilizadores)"""
-    provincia_service = ProvinciaService(db)
-    return provincia_service.get_mapa_provincias()
+    return await db.run_sync(lambda sessao: ProvinciaService(sessao).get_mapa_provincias())
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from app.db.database import get_async_db
+from app.schemas.search import EntidadePesquisa, SearchResponse, SearchResult
+from app.services.search_service import SearchService
+from app.core.deps import get_current_active_user_async
+from app.models.user import UserRole
+
+router = APIRouter()
+
+
+@router.get("/", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=2, max_length=200),
+    entidades: Optional[List[EntidadePesquisa]] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    current_user = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Pesquisa de texto em projetos, indicadores, licenciamentos e auditoria,
+    com os resultados ordenados por relevância (todos os utilizadores; a
+    auditoria apenas para ROOT).
+
+    Acentos são ignorados e cada palavra é pesquisada como prefixo.
+    """
+    selecionadas = [e.value for e in (entidades or EntidadePesquisa)]
+    if current_user.role != UserRole.ROOT:
+        selecionadas = [e for e in selecionadas if e != EntidadePesquisa.AUDIT_LOGS.value]
+
+    def pesquisar(sessao: Session):
+        resultados = SearchService(sessao).pesquisar(q, selecionadas, limit) if selecionadas else []
+        return SearchResponse(
+            query=q,
+            total=len(resultados),
+            resultados=[SearchResult(**r) for r in resultados]
+        )
+
+    return await db.run_sync(pesquisar)
@@ -0,0 +1,346 @@
+"""
+Cache de agregados com invalidação guiada pelas escritas.
+
+Cada tabela tem uma versão de dados que é incrementada sempre que uma sessão
+faz commit de alterações a essa tabela. As chaves de cache incluem as versões
+das tabelas de que o valor depende, pelo que um agregado só é recalculado
+quando os dados subjacentes mudam.
+
+Existem dois níveis: um LRU local ao processo e, opcionalmente, Redis
+(``CACHE_BACKEND=redis``), partilhado entre workers e contentores. Quando o
+Redis está ativo as versões também vivem lá, para que uma escrita num worker
+invalide o cache de todos os outros. Sem Redis cada worker só vê as suas
+escritas; as entradas locais expiram ao fim de ``CACHE_TTL_SECONDS`` para
+limitar o tempo em que servem dados alterados noutro worker.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_SEM_VALOR = object()
+
+
+class LRUCache:
+    """Cache LRU limitado e thread-safe"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._dados: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave: str, default: Any = None) -> Any:
+        with self._lock:
+            if chave not in self._dados:
+                return default
+            self._dados.move_to_end(chave)
+            return self._dados[chave]
+
+    def set(self, chave: str, valor: Any) -> None:
+        with self._lock:
+            self._dados[chave] = valor
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.max_entries:
+                self._dados.popitem(last=False)
+
+    def delete(self, chave: str) -> None:
+        with self._lock:
+            self._dados.pop(chave, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._dados.clear()
+
+    def __len__(self) -> int:
+        return len(self._dados)
+
+
+def get_redis_client():
+    """Cria cliente Redis a partir de ``settings.redis_url``"""
+    import redis
+
+    return redis.Redis.from_url(
+        settings.redis_url,
+        socket_timeout=settings.redis_socket_timeout_seconds,
+        socket_connect_timeout=settings.redis_socket_timeout_seconds
+    )
+
+
+class DataVersions:
+    """Versões de dados por tabela, locais ou partilhadas via Redis"""
+
+    REDIS_KEY = "aquicultura:versoes"
+
+    def __init__(self, redis_client=None):
+        self.redis = redis_client
+        self._locais: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def partilhadas(self) -> bool:
+        """Se as versões são partilhadas entre processos (Redis)"""
+        return self.redis is not None
+
+    def get(self, entidades: Iterable[str]) -> Dict[str, int]:
+        entidades = sorted(set(entidades))
+        if self.redis is not None:
+            try:
+                valores = self.redis.hmget(self.REDIS_KEY, entidades)
+                return {e: int(v or 0) for e, v in zip(entidades, valores)}
+            except Exception as e:
+                logger.warning("Falha ao ler versões no Redis, a usar versões locais: %s", e)
+        with self._lock:
+            return {e: self._locais.get(e, 0) for e in entidades}
+
+    def bump(self, entidades: Iterable[str]) -> None:
+        entidades = set(entidades)
+        if not entidades:
+            return
+        with self._lock:
+            for entidade in entidades:
+                self._locais[entidade] = self._locais.get(entidade, 0) + 1
+        if self.redis is not None:
+            try:
+                pipe = self.redis.pipeline()
+                for entidade in entidades:
+                    pipe.hincrby(self.REDIS_KEY, entidade, 1)
+                pipe.execute()
+            except Exception as e:
+                logger.warning("Falha ao incrementar versões no Redis: %s", e)
+
+
+class VersionedCache:
+    """
+    Cache de dois níveis (LRU local + Redis opcional) com chaves versionadas.
+
+    Os valores guardados no Redis são serializados em JSON, pelo que só devem
+    ser cacheados payloads compostos por tipos JSON.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        versions: DataVersions,
+        redis_client=None,
+        max_entries: int = 256,
+        ttl_seconds: int = 300
+    ):
+        self.namespace = namespace
+        self.versions = versions
+        self.redis = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.local = LRUCache(max_entries)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        # Cálculos em curso de ``obter_async``, usados apenas no event loop
+        self._pendentes: Dict[str, asyncio.Future] = {}
+
+    def _chave(self, chave: str, entidades: Iterable[str], escopo: Optional[str]) -> str:
+        return self._compor_chave(chave, self.versions.get(entidades), escopo)
+
+    async def _chave_async(self, chave: str, entidades: Iterable[str], escopo: Optional[str]) -> str:
+        if not self.versions.partilhadas:
+            return self._chave(chave, entidades, escopo)
+        versoes = await asyncio.to_thread(self.versions.get, entidades)
+        return self._compor_chave(chave, versoes, escopo)
+
+    def _compor_chave(self, chave: str, versoes: Dict[str, int], escopo: Optional[str]) -> str:
+        partes = [self.namespace, chave, escopo or "*"]
+        partes.extend(f"{e}={v}" for e, v in versoes.items())
+        return ":".join(partes)
+
+    def _lock_para(self, chave: str) -> threading.Lock:
+        with self._locks_lock:
+            if len(self._locks) > self.local.max_entries * 4:
+                self._locks.clear()
+            return self._locks.setdefault(chave, threading.Lock())
+
+    def _ler_local(self, chave: str) -> Any:
+        entrada = self.local.get(chave)
+        if entrada is None:
+            return _SEM_VALOR
+        expira_em, valor = entrada
+        if expira_em <= time.monotonic():
+            self.local.delete(chave)
+            return _SEM_VALOR
+        return valor
+
+    def _guardar_local(self, chave: str, valor: Any) -> None:
+        self.local.set(chave, (time.monotonic() + self.ttl_seconds, valor))
+
+    def _ler_redis(self, chave: str) -> Any:
+        if self.redis is None:
+            return _SEM_VALOR
+        try:
+            bruto = self.redis.get(chave)
+        except Exception as e:
+            logger.warning("Falha ao ler cache no Redis: %s", e)
+            return _SEM_VALOR
+        return _SEM_VALOR if bruto is None else json.loads(bruto)
+
+    def _escrever_redis(self, chave: str, valor: Any) -> None:
+        if self.redis is None:
+            return
+        try:
+            self.redis.set(chave, json.dumps(valor, default=str), ex=self.ttl_seconds)
+        except Exception as e:
+            logger.warning("Falha ao escrever cache no Redis: %s", e)
+
+    def obter(
+        self,
+        chave: str,
+        entidades: Iterable[str],
+        calcular: Callable[[], Any],
+        escopo: Optional[str] = None
+    ) -> Any:
+        """
+        Devolve o valor cacheado para as versões atuais de ``entidades`` ou
+        calcula-o uma única vez (pedidos concorrentes no mesmo processo
+        esperam pelo primeiro cálculo).
+
+        ``escopo`` separa variantes do mesmo payload, por exemplo por papel
+        do utilizador.
+        """
+        chave_versionada = self._chave(chave, entidades, escopo)
+
+        valor = self._ler_local(chave_versionada)
+        if valor is not _SEM_VALOR:
+            return valor
+
+        with self._lock_para(chave_versionada):
+            valor = self._ler_local(chave_versionada)
+            if valor is not _SEM_VALOR:
+                return valor
+
+            valor = self._ler_redis(chave_versionada)
+            if valor is _SEM_VALOR:
+                valor = calcular()
+                self._escrever_redis(chave_versionada, valor)
+
+            self._guardar_local(chave_versionada, valor)
+            return valor
+
+    async def obter_async(
+        self,
+        chave: str,
+        entidades: Iterable[str],
+        calcular: Callable[[], Awaitable[Any]],
+        escopo: Optional[str] = None
+    ) -> Any:
+        """
+        Versão de ``obter`` para rotas assíncronas, em que ``calcular`` devolve
+        um awaitable (ex.: ``db.run_sync(...)``).
+
+        O cálculo corre no event loop, pelo que os pedidos concorrentes não
+        podem esperar num lock de thread (bloqueariam o loop e o próprio
+        cálculo): aguardam o futuro do primeiro pedido. Os acessos ao Redis,
+        incluindo as versões, correm numa thread.
+        """
+        chave_versionada = await self._chave_async(chave, entidades, escopo)
+
+        valor = self._ler_local(chave_versionada)
+        if valor is not _SEM_VALOR:
+            return valor
+
+        pendente = self._pendentes.get(chave_versionada)
+        if pendente is not None:
+            return await asyncio.shield(pendente)
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._pendentes[chave_versionada] = futuro
+        try:
+            valor = _SEM_VALOR
+            if self.redis is not None:
+                valor = await asyncio.to_thread(self._ler_redis, chave_versionada)
+            if valor is _SEM_VALOR:
+                valor = await calcular()
+                if self.redis is not None:
+                    await asyncio.to_thread(self._escrever_redis, chave_versionada, valor)
+            self._guardar_local(chave_versionada, valor)
+            futuro.set_result(valor)
+            return valor
+        except asyncio.CancelledError:
+            futuro.cancel()
+            raise
+        except Exception as e:
+            futuro.set_exception(e)
+            # Marca a exceção como lida quando não há outros pedidos à espera
+            futuro.exception()
+            raise
+        finally:
+            self._pendentes.pop(chave_versionada, None)
+
+    def clear(self) -> None:
+        self.local.clear()
+
+
+def _criar_redis_client():
+    if settings.cache_backend != "redis":
+        return None
+    try:
+        client = get_redis_client()
+        client.ping()
+        return client
+    except Exception as e:
+        logger.warning("Redis indisponível (%s); cache apenas local", e)
+        return None
+
+
+_redis_client = _criar_redis_client()
+data_versions = DataVersions(_redis_client)
+dashboard_cache = VersionedCache(
+    "dashboard",
+    data_versions,
+    redis_client=_redis_client,
+    max_entries=settings.cache_local_max_entries,
+    ttl_seconds=settings.cache_ttl_seconds
+)
+
+
+# --- Invalidação guiada pelas escritas ---------------------------------------
+
+_INFO_KEY = "entidades_alteradas"
+
+
+def marcar_alteracao(session: Session, *entidades: str) -> None:
+    """
+    Regista tabelas alteradas fora do ORM (ex.: ``UPDATE``/``INSERT`` em lote)
+    para que as suas versões sejam incrementadas no próximo commit.
+    """
+    session.info.setdefault(_INFO_KEY, set()).update(entidades)
+
+
+def entidades_alteradas(session: Session) -> List[str]:
+    """Tabelas com alterações pendentes de commit nesta sessão"""
+    return sorted(session.info.get(_INFO_KEY, ()))
+
+
+@event.listens_for(Session, "after_flush")
+def _registar_entidades_alteradas(session, flush_context):
+    alteradas = session.info.setdefault(_INFO_KEY, set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        tabela = getattr(obj, "__tablename__", None)
+        if tabela:
+            alteradas.add(tabela)
+
+
+@event.listens_for(Session, "after_commit")
+def _incrementar_versoes(session):
+    alteradas = session.info.pop(_INFO_KEY, None)
+    if alteradas:
+        data_versions.bump(alteradas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_entidades_alteradas(session):
+    session.info.pop(_INFO_KEY, None)
@@ -0,0 +1,231 @@
+"""
+Compressão das respostas HTTP (brotli ou gzip).
+
+O algoritmo é negociado com ``Accept-Encoding`` entre os configurados em
+``COMPRESSION_ALGORITHMS`` (por ordem de preferência; vazio desativa). Só são
+comprimidas respostas de tipos textuais com pelo menos
+``COMPRESSION_MINIMUM_SIZE`` bytes ou de tamanho desconhecido; ficheiros já
+comprimidos (Excel, PDF) seguem como estão. O brotli requer o pacote
+``brotli``; sem ele é usado apenas o gzip.
+
+Um ETag forte identifica uma representação byte a byte, pelo que a versão
+comprimida leva o sufixo da codificação (``"abc"`` -> ``"abc-br"``). O sufixo é
+retirado do ``If-None-Match`` antes de chegar à aplicação, que compara sempre
+com o ETag da representação sem compressão.
+"""
+import logging
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependência opcional
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+TIPOS_COMPRIMIVEIS = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/x-ndjson",
+    "image/svg+xml",
+)
+
+
+class _Gzip:
+    def __init__(self, nivel: int):
+        self._zlib = zlib.compressobj(nivel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def comprimir(self, dados: bytes) -> bytes:
+        return self._zlib.compress(dados)
+
+    def terminar(self) -> bytes:
+        return self._zlib.flush()
+
+
+class _Brotli:
+    def __init__(self, qualidade: int):
+        self._brotli = brotli.Compressor(quality=qualidade)
+
+    def comprimir(self, dados: bytes) -> bytes:
+        return self._brotli.process(dados)
+
+    def terminar(self) -> bytes:
+        return self._brotli.finish()
+
+
+def algoritmos_disponiveis(configurados: Sequence[str]) -> List[str]:
+    """Algoritmos configurados e suportados, pela ordem de preferência"""
+    disponiveis = []
+    for algoritmo in configurados:
+        if algoritmo == "br" and brotli is None:
+            logger.warning("Pacote brotli não instalado; compressão br desativada")
+        elif algoritmo in ("br", "gzip"):
+            disponiveis.append(algoritmo)
+        else:
+            logger.warning("Algoritmo de compressão desconhecido: %s", algoritmo)
+    return disponiveis
+
+
+def negociar(accept_encoding: str, algoritmos: Sequence[str]) -> Optional[str]:
+    """Algoritmo de ``algoritmos`` com maior ``q`` em ``Accept-Encoding`` (empate: ordem de ``algoritmos``)"""
+    aceites: Dict[str, float] = {}
+    for parte in accept_encoding.split(","):
+        nome, _, parametros = parte.strip().partition(";")
+        q = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                q = float(parametros[2:])
+            except ValueError:
+                q = 0.0
+        if nome:
+            aceites[nome.strip().lower()] = q
+
+    escolhido, melhor = None, 0.0
+    for algoritmo in algoritmos:
+        q = aceites.get(algoritmo, aceites.get("*", 0.0))
+        if q > melhor:
+            escolhido, melhor = algoritmo, q
+    return escolhido
+
+
+def _etag_com_sufixo(etag: str, sufixo: str) -> str:
+    if etag.startswith('"') and etag.endswith('"'):
+        return f'{etag[:-1]}-{sufixo}"'
+    return etag
+
+
+def _retirar_sufixos(if_none_match: str) -> Tuple[str, Optional[str]]:
+    """``If-None-Match`` sem os sufixos de codificação e o sufixo encontrado"""
+    encontrado = None
+    etags = []
+    for etag in if_none_match.split(","):
+        etag = etag.strip()
+        for sufixo in ("br", "gzip"):
+            if etag.endswith(f'-{sufixo}"'):
+                etag = etag[:-len(sufixo) - 2] + '"'
+                encontrado = sufixo
+                break
+        etags.append(etag)
+    return ", ".join(etags), encontrado
+
+
+class CompressaoMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        algoritmos: Sequence[str] = ("br", "gzip"),
+        tamanho_minimo: int = 1024,
+        nivel_gzip: int = 6,
+        qualidade_brotli: int = 5
+    ) -> None:
+        self.app = app
+        self.algoritmos = algoritmos_disponiveis(algoritmos)
+        self.tamanho_minimo = tamanho_minimo
+        self.nivel_gzip = nivel_gzip
+        self.qualidade_brotli = qualidade_brotli
+
+    def _compressor(self, algoritmo: str):
+        if algoritmo == "br":
+            return _Brotli(self.qualidade_brotli)
+        return _Gzip(self.nivel_gzip)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.algoritmos:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        algoritmo = negociar(headers.get("accept-encoding", ""), self.algoritmos)
+
+        sufixo_pedido = None
+        if "if-none-match" in headers:
+            if_none_match, sufixo_pedido = _retirar_sufixos(headers["if-none-match"])
+            scope = dict(scope)
+            scope["headers"] = [
+                (nome, if_none_match.encode("latin-1") if nome == b"if-none-match" else valor)
+                for nome, valor in scope["headers"]
+            ]
+
+        responder = _Compressor(self, algoritmo, sufixo_pedido, send)
+        await self.app(scope, receive, responder.enviar)
+
+
+class _Compressor:
+    """Envia uma resposta, comprimida com ``algoritmo`` quando se justifica"""
+
+    def __init__(self, middleware: CompressaoMiddleware, algoritmo: Optional[str], sufixo_pedido: Optional[str], send: Send):
+        self.middleware = middleware
+        self.algoritmo = algoritmo
+        self.sufixo_pedido = sufixo_pedido
+        self.send = send
+        self.inicial: Message = {}
+        self.compressor = None
+        self.iniciado = False
+
+    def _comprimivel(self, headers: Headers) -> bool:
+        tipo = headers.get("content-type", "")
+        return (
+            self.algoritmo is not None
+            and "content-encoding" not in headers
+            and tipo.startswith(TIPOS_COMPRIMIVEIS)
+        )
+
+    async def enviar(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.inicial = message
+            headers = MutableHeaders(raw=message["headers"])
+            if message["status"] == 304 and self.sufixo_pedido and "etag" in headers:
+                # O cliente validou a representação comprimida
+                headers["ETag"] = _etag_com_sufixo(headers["etag"], self.sufixo_pedido)
+            if self._comprimivel(headers):
+                headers.add_vary_header("Accept-Encoding")
+            return
+
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        corpo = message.get("body", b"")
+        mais = message.get("more_body", False)
+
+        if not self.iniciado:
+            self.iniciado = True
+            headers = MutableHeaders(raw=self.inicial["headers"])
+            # O tamanho vem do Content-Length quando existe (os middlewares
+            # http reenviam o corpo em partes mesmo quando é conhecido)
+            tamanho = int(headers["content-length"]) if "content-length" in headers else None
+            if tamanho is None and not mais:
+                tamanho = len(corpo)
+            if not self._comprimivel(headers) or (tamanho is not None and tamanho < self.middleware.tamanho_minimo):
+                await self.send(self.inicial)
+                await self.send(message)
+                return
+
+            self.compressor = self.middleware._compressor(self.algoritmo)
+            headers["Content-Encoding"] = self.algoritmo
+            if "etag" in headers:
+                headers["ETag"] = _etag_com_sufixo(headers["etag"], self.algoritmo)
+            del headers["Content-Length"]
+            corpo = self.compressor.comprimir(corpo)
+            if not mais:
+                corpo += self.compressor.terminar()
+                headers["Content-Length"] = str(len(corpo))
+            await self.send(self.inicial)
+            await self.send({"type": "http.response.body", "body": corpo, "more_body": mais})
+            return
+
+        if self.compressor is None:
+            await self.send(message)
+            return
+
+        corpo = self.compressor.comprimir(corpo)
+        if not mais:
+            corpo += self.compressor.terminar()
+        await self.send({"type": "http.response.body", "body": corpo, "more_body": mais})
@@ -1,17 +1,40 @@
 from pydantic_settings import BaseSettings
 from typing import List
 import os
+import tempfile
 
 
 class Settings(BaseSettings):
     # Database
     database_url: str = os.getenv("DATABASE_URL", "sqlite:///./aquicultura.db")
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    db_pool_timeout: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    db_pool_recycle: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    db_pool_pre_ping: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    # PostgreSQL: limite por statement (0 = sem limite) e nome visível em pg_stat_activity
+    db_statement_timeout_ms: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+    db_application_name: str = os.getenv("DB_APPLICATION_NAME", "aquicultura-api")
+    # Aplica as migrações Alembic pendentes no arranque (desligar com vários workers
+    # e correr ``alembic upgrade head`` no deploy)
+    db_auto_migrate: bool = os.getenv("DB_AUTO_MIGRATE", "true").lower() == "true"
     
     # JWT
     jwt_secret: str = os.getenv("JWT_SECRET", "your-super-secret-jwt-key-change-in-production")
     jwt_algorithm: str = os.getenv("JWT_ALGORITHM", "HS256")
     jwt_access_token_expire_minutes: int = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
     jwt_refresh_token_expire_days: int = int(os.getenv("JWT_REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+    jwt_decode_cache_max_entries: int = int(os.getenv("JWT_DECODE_CACHE_MAX_ENTRIES", "4096"))
+    
+    # Cache do utilizador autenticado por pedido (0 = desligado)
+    auth_principal_cache_ttl_seconds: int = int(os.getenv("AUTH_PRINCIPAL_CACHE_TTL_SECONDS", "30"))
+    auth_principal_cache_max_entries: int = int(os.getenv("AUTH_PRINCIPAL_CACHE_MAX_ENTRIES", "1024"))
+    
+    # Senhas (bcrypt): custo, verificações em paralelo e cache de credenciais verificadas (0 = desligado)
+    bcrypt_rounds: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    password_hash_max_concurrency: int = int(os.getenv("PASSWORD_HASH_MAX_CONCURRENCY", "2"))
+    password_verify_cache_ttl_seconds: int = int(os.getenv("PASSWORD_VERIFY_CACHE_TTL_SECONDS", "300"))
+    password_verify_cache_max_entries: int = int(os.getenv("PASSWORD_VERIFY_CACHE_MAX_ENTRIES", "1024"))
     
     # Admin
     admin_email: str = os.getenv("ADMIN_EMAIL", "admin@aquicultura.ao")
@@ -31,6 +54,9 @@ class Settings(BaseSettings):
     rate_limit_login_attempts: int = int(os.getenv("RATE_LIMIT_LOGIN_ATTEMPTS", "5"))
     rate_limit_login_window_minutes: int = int(os.getenv("RATE_LIMIT_LOGIN_WINDOW_MINUTES", "5"))
     rate_limit_login_block_minutes: int = int(os.getenv("RATE_LIMIT_LOGIN_BLOCK_MINUTES", "15"))
+    # Backend das tentativas de login (local = memória do processo, redis = partilhado entre workers)
+    rate_limit_backend: str = os.getenv("RATE_LIMIT_BACKEND", "local")
+    rate_limit_local_max_entries: int = int(os.getenv("RATE_LIMIT_LOCAL_MAX_ENTRIES", "10000"))
     
     # Application
     app_name: str = os.getenv("APP_NAME", "App de Gestão dos 21 Projectos de Aquicultura")
@@ -40,6 +66,33 @@ class Settings(BaseSettings):
     
     # Redis
     redis_url: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    redis_socket_timeout_seconds: float = float(os.getenv("REDIS_SOCKET_TIMEOUT_SECONDS", "0.5"))
+    
+    # Cache de agregados (local = LRU em processo, redis = LRU + Redis partilhado)
+    cache_backend: str = os.getenv("CACHE_BACKEND", "local")
+    cache_local_max_entries: int = int(os.getenv("CACHE_LOCAL_MAX_ENTRIES", "256"))
+    cache_ttl_seconds: int = int(os.getenv("CACHE_TTL_SECONDS", "300"))
+    
+    # Escrita de auditoria (async = fila com escrita em lote, sync = commit por ação)
+    audit_write_mode: str = os.getenv("AUDIT_WRITE_MODE", "async")
+    audit_batch_size: int = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+    audit_flush_interval_seconds: float = float(os.getenv("AUDIT_FLUSH_INTERVAL_SECONDS", "1.0"))
+    audit_queue_max_size: int = int(os.getenv("AUDIT_QUEUE_MAX_SIZE", "10000"))
+    
+    # Jobs de exportação (gerados num pool de processos e guardados em disco)
+    export_jobs_dir: str = os.getenv("EXPORT_JOBS_DIR", os.path.join(tempfile.gettempdir(), "aquicultura_exports"))
+    export_jobs_ttl_seconds: int = int(os.getenv("EXPORT_JOBS_TTL_SECONDS", "3600"))
+    export_jobs_max_workers: int = int(os.getenv("EXPORT_JOBS_MAX_WORKERS", "2"))
+    
+    # Compressão das respostas (algoritmos por ordem de preferência; vazio desativa)
+    compression_algorithms: str = os.getenv("COMPRESSION_ALGORITHMS", "br,gzip")
+    compression_minimum_size: int = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+    compression_gzip_level: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    compression_brotli_quality: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+    
+    # Classificação dos indicadores nos KPIs do dashboard: JSON categoria -> lista de
+    # expressões regulares (vazio = regras de app.core.kpi_classifier)
+    kpi_regras: str = os.getenv("KPI_REGRAS", "")
     
     # Security
     allowed_hosts: str = os.getenv("ALLOWED_HOSTS", "localhost,127.0.0.1")
@@ -53,6 +106,11 @@ class Settings(BaseSettings):
         """Converte string de origins CORS em lista"""
         return [origin.strip() for origin in self.cors_origins.split(",") if origin.strip()]
     
+    @property
+    def compression_algorithms_list(self) -> List[str]:
+        """Converte string de algoritmos de compressão em lista"""
+        return [a.strip().lower() for a in self.compression_algorithms.split(",") if a.strip()]
+    
     @property
     def allowed_hosts_list(self) -> List[str]:
         """Converte string de hosts permitidos em lista"""
@@ -1,26 +1,57 @@
+import time
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.db.database import get_db, get_async_db
 from app.models.user import User, UserRole
+from app.core.cache import LRUCache, data_versions
+from app.core.config import settings
 from app.core.security import verify_token
 from app.schemas.user import TokenData
 
 security = HTTPBearer()
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Obtém o utilizador atual a partir do token JWT"""
+# Principais autenticados: email -> (expira_em, versão do principal, cópia
+# desligada do utilizador). A versão é própria de cada utilizador e só muda
+# com ``invalidar_principal`` (também noutros workers, com Redis), pelo que
+# uma desativação é vista de imediato sem que o login de outros utilizadores
+# (que grava ``last_login``) esvazie o cache; o TTL limita o resto.
+_principais = LRUCache(max_entries=settings.auth_principal_cache_max_entries)
+
+# Colunas que não são guardadas na cópia em cache (carregadas só se usadas)
+_COLUNAS_FORA_DO_CACHE = {"hashed_password"}
+
+
+def _versao_principal(email: str) -> str:
+    return f"principal:{email}"
+
+
+def invalidar_principal(*emails: str) -> None:
+    """Remove utilizadores do cache de principais deste e dos outros workers (após alterações)"""
+    for email in emails:
+        _principais.delete(email)
+    data_versions.bump(_versao_principal(email) for email in emails)
+
+
+def _copia_desligada(user: User) -> User:
+    copia = User(**{
+        coluna.key: getattr(user, coluna.key)
+        for coluna in User.__table__.columns
+        if coluna.key not in _COLUNAS_FORA_DO_CACHE
+    })
+    make_transient_to_detached(copia)
+    return copia
+
+
+def _obter_utilizador_do_token(db: Session, token: str) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    token = credentials.credentials
     payload = verify_token(token, "access")
     if payload is None:
         raise credentials_exception
@@ -30,20 +61,55 @@ def get_current_user(
         raise credentials_exception
     
     token_data = TokenData(email=email)
+    ttl = settings.auth_principal_cache_ttl_seconds
+    chave_versao = _versao_principal(token_data.email)
+    versao = data_versions.get([chave_versao])[chave_versao] if ttl > 0 else None
+    entrada = _principais.get(token_data.email) if ttl > 0 else None
+    if entrada is not None and entrada[0] > time.monotonic() and entrada[1] == versao:
+        # Liga a cópia à sessão do pedido sem SELECT
+        return db.merge(entrada[2], load=False)
+
     user = db.query(User).filter(User.email == token_data.email).first()
     if user is None:
         raise credentials_exception
     
+    if ttl > 0:
+        _principais.set(token_data.email, (time.monotonic() + ttl, versao, _copia_desligada(user)))
     return user
 
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
-    """Obtém o utilizador ativo atual"""
+def _verificar_ativo(current_user: User) -> User:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """Obtém o utilizador atual a partir do token JWT"""
+    return _obter_utilizador_do_token(db, credentials.credentials)
+
+
+def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+    """Obtém o utilizador ativo atual"""
+    return _verificar_ativo(current_user)
+
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """Obtém o utilizador atual a partir do token JWT (sessão assíncrona)"""
+    return await db.run_sync(_obter_utilizador_do_token, credentials.credentials)
+
+
+async def get_current_active_user_async(current_user: User = Depends(get_current_user_async)) -> User:
+    """Obtém o utilizador ativo atual (sessão assíncrona)"""
+    return _verificar_ativo(current_user)
+
+
 def require_role(required_role: UserRole):
     """Decorator para verificar papel do utilizador"""
     def role_checker(current_user: User = Depends(get_current_active_user)) -> User:
@@ -0,0 +1,150 @@
+"""
+Políticas de cache HTTP e pedidos condicionais (ETag / 304).
+
+Cada rota tem uma política de ``Cache-Control``. Por omissão os ``GET``
+usam ``REVALIDAR``: o browser guarda a resposta mas confirma-a em cada
+utilização com ``If-None-Match``. Os restantes métodos usam
+``SEM_ARMAZENAMENTO``. Uma rota escolhe outra política com a dependência
+``politica_cache``, por exemplo ``SEM_CACHE_ESTRITO`` (o cabeçalho antigo
+contra o cache agressivo do Brave) nas rotas de autenticação.
+
+As respostas ``REVALIDAR`` têm sempre um ETag forte:
+
+- ``ETagPorVersao``: dependência das rotas de leitura, que calcula o ETag a
+  partir das versões de dados das tabelas de que a resposta depende
+  (``app.core.cache.data_versions``) e responde 304 antes de consultar a
+  base e de serializar;
+- nas restantes o middleware usa um hash do corpo JSON, o que poupa a
+  transferência mas não o trabalho do servidor.
+"""
+import hashlib
+import time
+from typing import Dict, Iterable, Mapping, Optional
+
+from fastapi import Depends, HTTPException, Request, Response, status
+
+from app.core.cache import data_versions
+from app.core.config import settings
+from app.core.deps import get_current_active_user_async
+from app.models.user import User
+
+# Políticas (cabeçalhos a aplicar quando a resposta não os define)
+REVALIDAR: Dict[str, str] = {"Cache-Control": "private, no-cache", "Vary": "Authorization"}
+SEM_ARMAZENAMENTO: Dict[str, str] = {"Cache-Control": "no-store"}
+SEM_CACHE_ESTRITO: Dict[str, str] = {
+    "Cache-Control": "no-cache, no-store, must-revalidate",
+    "Pragma": "no-cache",
+    "Expires": "0",
+}
+
+_ESTADO_POLITICA = "politica_cache"
+
+
+def politica_cache(politica: Mapping[str, str]):
+    """Dependência que escolhe a política de cache da rota (ou do router)"""
+    def definir(request: Request) -> None:
+        setattr(request.state, _ESTADO_POLITICA, politica)
+    return definir
+
+
+def corresponde(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparação fraca de ``If-None-Match`` com ``etag`` (RFC 9110, 13.1.2)"""
+    if not if_none_match:
+        return False
+    valor = etag.removeprefix("W/")
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*" or candidato.removeprefix("W/") == valor:
+            return True
+    return False
+
+
+def etag_de(*partes: str) -> str:
+    """ETag forte com o hash das ``partes``"""
+    resumo = hashlib.sha256("\x1f".join(partes).encode()).hexdigest()[:32]
+    return f'"{resumo}"'
+
+
+class ETagPorVersao:
+    """
+    Dependência de rotas de leitura com ETag derivado das versões de dados.
+
+    O ETag combina o caminho, a query string, o papel do utilizador e as
+    versões de ``entidades`` (mais ``entidades_por_papel[papel]``). Se o
+    pedido trouxer um ``If-None-Match`` igual é respondido 304 de imediato.
+
+    Sem Redis as versões são locais a cada processo; o ETag inclui então o
+    intervalo de ``CACHE_TTL_SECONDS`` atual, para que uma escrita feita
+    noutro worker nunca fique por ver mais do que esse tempo.
+    """
+
+    def __init__(self, *entidades: str, entidades_por_papel: Optional[Mapping[str, Iterable[str]]] = None):
+        self.entidades = tuple(entidades)
+        self.entidades_por_papel = {papel: tuple(e) for papel, e in (entidades_por_papel or {}).items()}
+
+    def calcular(self, request: Request, papel: str) -> str:
+        entidades = self.entidades + self.entidades_por_papel.get(papel, ())
+        versoes = data_versions.get(entidades)
+        partes = [
+            settings.app_version,
+            request.url.path,
+            "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items())),
+            papel,
+        ]
+        partes.extend(f"{e}={v}" for e, v in versoes.items())
+        if not data_versions.partilhadas:
+            partes.append(str(int(time.time() // max(settings.cache_ttl_seconds, 1))))
+        return etag_de(*partes)
+
+    def __call__(
+        self,
+        request: Request,
+        response: Response,
+        current_user: User = Depends(get_current_active_user_async)
+    ) -> str:
+        etag = self.calcular(request, current_user.role.value)
+        if corresponde(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, **REVALIDAR})
+        response.headers["ETag"] = etag
+        return etag
+
+
+def _acrescentar_vary(response: Response, valor: str) -> None:
+    atuais = [v.strip() for v in response.headers.get("vary", "").split(",") if v.strip()]
+    if valor.lower() not in (v.lower() for v in atuais):
+        response.headers["Vary"] = ", ".join(atuais + [valor])
+
+
+async def aplicar_politica(request: Request, response: Response) -> Response:
+    """
+    Aplica a política de cache da rota a ``response`` e, nas respostas JSON
+    revalidáveis sem ETag, calcula-o a partir do corpo e responde 304 se o
+    cliente já tiver essa versão.
+    """
+    politica = getattr(request.state, _ESTADO_POLITICA, None)
+    if politica is None:
+        politica = REVALIDAR if request.method in ("GET", "HEAD") else SEM_ARMAZENAMENTO
+    for nome, valor in politica.items():
+        if nome == "Vary":
+            _acrescentar_vary(response, valor)
+        elif nome not in response.headers:
+            response.headers[nome] = valor
+
+    if (
+        politica is not REVALIDAR
+        or request.method != "GET"
+        or response.status_code != status.HTTP_200_OK
+        or "etag" in response.headers
+        or not response.headers.get("content-type", "").startswith("application/json")
+    ):
+        return response
+
+    corpo = b"".join([parte async for parte in response.body_iterator])
+    etag = f'"{hashlib.sha256(corpo).hexdigest()[:32]}"'
+    cabecalhos = dict(response.headers)
+    cabecalhos["ETag"] = etag
+    if corresponde(request.headers.get("if-none-match"), etag):
+        cabecalhos.pop("content-length", None)
+        cabecalhos.pop("content-type", None)
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cabecalhos)
+    return Response(content=corpo, status_code=response.status_code, headers=cabecalhos)
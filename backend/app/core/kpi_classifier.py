@@ -0,0 +1,128 @@
+"""
+Classificação dos indicadores nas categorias de KPI do dashboard.
+
+A categoria é deduzida do nome do indicador por expressões regulares,
+comparadas sem acentos nem maiúsculas ("Famílias" e "familias" são iguais),
+e guardada em ``Indicador.categoria_kpi`` sempre que o indicador é escrito.
+As regras são avaliadas por ordem e ganha a primeira categoria com uma
+expressão que ocorra no nome; sem correspondência fica ``OUTRO``.
+
+As regras por omissão podem ser substituídas pela variável ``KPI_REGRAS``,
+um objeto JSON categoria -> lista de expressões, por exemplo
+``{"EMPREGOS_CRIADOS": ["emprego", "postos? de trabalho"]}``. Depois de
+alterar as regras, os indicadores existentes são reclassificados com
+``python -m app.db.maintenance reclassify-kpis``.
+"""
+import json
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import column, event, inspect, select, table, update
+from sqlalchemy.engine import Connection
+
+from app.core.config import settings
+from app.models.indicador import CategoriaKPI, Indicador
+
+logger = logging.getLogger(__name__)
+
+# Equivalentes às pesquisas ILIKE usadas antes da categoria ser persistida
+REGRAS_PADRAO: Dict[CategoriaKPI, List[str]] = {
+    CategoriaKPI.FAMILIAS_BENEFICIADAS: ["familia", "beneficiar", "pessoa", "habitante"],
+    CategoriaKPI.EMPREGOS_CRIADOS: ["emprego", "trabalho", "funcionario", "colaborador", "posto"],
+}
+
+# Ids atualizados por UPDATE na reclassificação
+TAMANHO_LOTE_RECLASSIFICACAO = 500
+
+
+def normalizar(texto: Optional[str]) -> str:
+    """Texto em minúsculas e sem diacríticos"""
+    decomposto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).casefold()
+
+
+class ClassificadorKPI:
+    def __init__(self, regras: Dict[CategoriaKPI, Sequence[str]]):
+        self.regras: List[Tuple[CategoriaKPI, re.Pattern]] = [
+            (categoria, re.compile("|".join(f"(?:{normalizar(p)})" for p in padroes)))
+            for categoria, padroes in regras.items()
+            if padroes
+        ]
+
+    def classificar(self, nome: Optional[str]) -> CategoriaKPI:
+        texto = normalizar(nome)
+        for categoria, padrao in self.regras:
+            if padrao.search(texto):
+                return categoria
+        return CategoriaKPI.OUTRO
+
+
+def carregar_regras(configuracao: str) -> Dict[CategoriaKPI, List[str]]:
+    """
+    Regras a partir do JSON de ``KPI_REGRAS``; vazio ou inválido usa as
+    regras por omissão (o erro fica registado no log).
+    """
+    if not configuracao.strip():
+        return REGRAS_PADRAO
+    try:
+        dados = json.loads(configuracao)
+        regras = {CategoriaKPI(categoria): [str(p) for p in padroes] for categoria, padroes in dados.items()}
+        for padroes in regras.values():
+            for padrao in padroes:
+                re.compile(normalizar(padrao))
+    except (ValueError, AttributeError, TypeError, re.error) as e:
+        logger.error("KPI_REGRAS inválido (%s); a usar as regras por omissão", e)
+        return REGRAS_PADRAO
+    return regras
+
+
+classificador_kpi = ClassificadorKPI(carregar_regras(settings.kpi_regras))
+
+
+def classificar(nome: Optional[str]) -> CategoriaKPI:
+    """Categoria de KPI de um indicador com este nome"""
+    return classificador_kpi.classificar(nome)
+
+
+def reclassificar(connection: Connection, classificador: Optional[ClassificadorKPI] = None) -> int:
+    """
+    Recalcula a categoria de todos os indicadores e devolve quantos mudaram.
+
+    Lê apenas (id, nome, categoria) e atualiza os que mudaram com um UPDATE
+    por categoria e lote de ids. Usa uma tabela mínima em vez do modelo para
+    poder ser chamada pelas migrações.
+    """
+    classificador = classificador or classificador_kpi
+    indicadores = table("indicadores", column("id"), column("nome"), column("categoria_kpi"))
+
+    por_categoria: Dict[CategoriaKPI, List[int]] = defaultdict(list)
+    for id_, nome, atual in connection.execute(select(indicadores.c.id, indicadores.c.nome, indicadores.c.categoria_kpi)):
+        categoria = classificador.classificar(nome)
+        if atual != categoria.value:
+            por_categoria[categoria].append(id_)
+
+    for categoria, ids in por_categoria.items():
+        for inicio in range(0, len(ids), TAMANHO_LOTE_RECLASSIFICACAO):
+            connection.execute(
+                update(indicadores)
+                .where(indicadores.c.id.in_(ids[inicio:inicio + TAMANHO_LOTE_RECLASSIFICACAO]))
+                .values(categoria_kpi=categoria.value)
+            )
+    return sum(len(ids) for ids in por_categoria.values())
+
+
+# Escritas pelo ORM (serviços, seed). As inserções em lote com ``insert()``
+# não passam por estes eventos e classificam as linhas explicitamente.
+
+@event.listens_for(Indicador, "before_insert")
+def _classificar_ao_inserir(mapper, connection, target):
+    target.categoria_kpi = classificar(target.nome)
+
+
+@event.listens_for(Indicador, "before_update")
+def _reclassificar_ao_renomear(mapper, connection, target):
+    if inspect(target).attrs.nome.history.has_changes():
+        target.categoria_kpi = classificar(target.nome)
@@ -1,14 +1,31 @@
-from typing import Dict, Optional
-from datetime import datetime, timedelta
+"""
+Rate limiting das tentativas de login.
+
+As falhas de login são contadas por IP numa janela deslizante de
+``RATE_LIMIT_LOGIN_WINDOW_MINUTES``; ao atingir ``RATE_LIMIT_LOGIN_ATTEMPTS``
+falhas o IP fica bloqueado durante ``RATE_LIMIT_LOGIN_BLOCK_MINUTES``. Um
+login bem-sucedido limpa o histórico do IP.
+
+Existem dois backends: memória (``RATE_LIMIT_BACKEND=local``), limitado em
+número de IPs e com expiração das entradas, e Redis (``RATE_LIMIT_BACKEND=redis``),
+partilhado entre workers e contentores. Em ambos cada IP guarda no máximo
+``RATE_LIMIT_LOGIN_ATTEMPTS`` instantes de falha.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Optional
+
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from fastapi import Request
 from app.core.config import settings
 
-# Dicionário em memória para armazenar tentativas de login
-# Em produção, usar Redis
-login_attempts: Dict[str, Dict[str, any]] = {}
+logger = logging.getLogger(__name__)
 
 
 def get_limiter():
@@ -17,58 +34,361 @@ def get_limiter():
     return limiter
 
 
+class RateLimiterBackend:
+    """Interface dos backends de rate limiting de login"""
+
+    nome = "base"
+    # Operações com round-trips de rede bloqueantes (fora do event loop nas rotas async)
+    remoto = False
+
+    def __init__(
+        self,
+        max_tentativas: Optional[int] = None,
+        janela_segundos: Optional[float] = None,
+        bloqueio_segundos: Optional[float] = None,
+        relogio: Callable[[], float] = time.time
+    ):
+        self.max_tentativas = max_tentativas or settings.rate_limit_login_attempts
+        self.janela_segundos = janela_segundos or settings.rate_limit_login_window_minutes * 60
+        self.bloqueio_segundos = bloqueio_segundos or settings.rate_limit_login_block_minutes * 60
+        self.relogio = relogio
+
+    def permitido(self, chave: str) -> bool:
+        """Indica se a chave (IP) pode tentar novo login"""
+        raise NotImplementedError
+
+    def registar_falha(self, chave: str) -> None:
+        """Regista uma falha e bloqueia a chave se atingir o limite na janela"""
+        raise NotImplementedError
+
+    def limpar(self, chave: str) -> bool:
+        """Remove o histórico de uma chave; devolve se existia"""
+        raise NotImplementedError
+
+    def limpar_tudo(self) -> int:
+        """Remove o histórico de todas as chaves; devolve quantas foram removidas"""
+        raise NotImplementedError
+
+    def estado(self) -> Dict[str, Dict[str, Any]]:
+        """Tentativas na janela e fim de bloqueio (epoch) de cada chave ativa"""
+        raise NotImplementedError
+
+
+class _Entrada:
+    __slots__ = ("falhas", "bloqueado_ate")
+
+    def __init__(self, max_tentativas: int):
+        self.falhas: Deque[float] = deque(maxlen=max_tentativas)
+        self.bloqueado_ate: Optional[float] = None
+
+
+class MemoryRateLimiter(RateLimiterBackend):
+    """
+    Backend em memória, local ao processo.
+
+    As entradas expiram quando a janela e o bloqueio terminam e o número de
+    IPs é limitado (LRU), pelo que a memória não cresce com o tráfego.
+    """
+
+    nome = "local"
+
+    def __init__(self, max_entradas: Optional[int] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.max_entradas = max_entradas or settings.rate_limit_local_max_entries
+        self._entradas: "OrderedDict[str, _Entrada]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expirada(self, entrada: _Entrada, agora: float) -> bool:
+        if entrada.bloqueado_ate is not None and entrada.bloqueado_ate > agora:
+            return False
+        return not entrada.falhas or entrada.falhas[-1] <= agora - self.janela_segundos
+
+    def _remover_expiradas(self, agora: float) -> None:
+        # As entradas menos recentes estão no início; pára na primeira ativa
+        while self._entradas:
+            chave, entrada = next(iter(self._entradas.items()))
+            if not self._expirada(entrada, agora):
+                break
+            del self._entradas[chave]
+
+    def _obter(self, chave: str, agora: float) -> Optional[_Entrada]:
+        entrada = self._entradas.get(chave)
+        if entrada is not None and self._expirada(entrada, agora):
+            del self._entradas[chave]
+            return None
+        return entrada
+
+    def permitido(self, chave: str) -> bool:
+        agora = self.relogio()
+        with self._lock:
+            entrada = self._obter(chave, agora)
+            return entrada is None or entrada.bloqueado_ate is None or entrada.bloqueado_ate <= agora
+
+    def registar_falha(self, chave: str) -> None:
+        agora = self.relogio()
+        with self._lock:
+            self._remover_expiradas(agora)
+            entrada = self._obter(chave, agora) or _Entrada(self.max_tentativas)
+            entrada.falhas.append(agora)
+            self._entradas[chave] = entrada
+            self._entradas.move_to_end(chave)
+
+            inicio_janela = agora - self.janela_segundos
+            if sum(1 for t in entrada.falhas if t > inicio_janela) >= self.max_tentativas:
+                entrada.bloqueado_ate = agora + self.bloqueio_segundos
+                entrada.falhas.clear()
+
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def limpar(self, chave: str) -> bool:
+        with self._lock:
+            return self._entradas.pop(chave, None) is not None
+
+    def limpar_tudo(self) -> int:
+        with self._lock:
+            total = len(self._entradas)
+            self._entradas.clear()
+            return total
+
+    def estado(self) -> Dict[str, Dict[str, Any]]:
+        agora = self.relogio()
+        inicio_janela = agora - self.janela_segundos
+        with self._lock:
+            self._remover_expiradas(agora)
+            return {
+                chave: {
+                    "attempts": sum(1 for t in entrada.falhas if t > inicio_janela),
+                    "blocked_until": (
+                        entrada.bloqueado_ate
+                        if entrada.bloqueado_ate is not None and entrada.bloqueado_ate > agora
+                        else None
+                    ),
+                }
+                for chave, entrada in self._entradas.items()
+                if not self._expirada(entrada, agora)
+            }
+
+
+# Janela deslizante atómica: remove falhas fora da janela, acrescenta a atual,
+# mantém apenas as últimas ``max_tentativas`` e bloqueia ao atingir o limite.
+_SCRIPT_FALHA = """
+local falhas = KEYS[1]
+local bloqueio = KEYS[2]
+local agora = tonumber(ARGV[1])
+local janela = tonumber(ARGV[2])
+local limite = tonumber(ARGV[3])
+local bloqueio_ms = tonumber(ARGV[4])
+local membro = ARGV[5]
+
+redis.call('ZREMRANGEBYSCORE', falhas, '-inf', agora - janela)
+redis.call('ZADD', falhas, agora, membro)
+redis.call('ZREMRANGEBYRANK', falhas, 0, -(limite + 1))
+if redis.call('ZCARD', falhas) >= limite then
+    redis.call('DEL', falhas)
+    redis.call('SET', bloqueio, agora + bloqueio_ms, 'PX', bloqueio_ms)
+    return 1
+end
+redis.call('PEXPIRE', falhas, janela)
+return 0
+"""
+
+
+class RedisRateLimiter(RateLimiterBackend):
+    """
+    Backend Redis, partilhado entre workers.
+
+    Por IP existe um sorted set com os instantes das falhas (no máximo
+    ``max_tentativas`` membros, expira com a janela) e uma chave de bloqueio
+    com TTL igual à duração do bloqueio.
+    """
+
+    nome = "redis"
+    remoto = True
+    PREFIXO = "aquicultura:login"
+
+    def __init__(self, redis_client, **kwargs):
+        super().__init__(**kwargs)
+        self.redis = redis_client
+        self._registar_falha = redis_client.register_script(_SCRIPT_FALHA)
+        self._sequencia = 0
+        self._sequencia_lock = threading.Lock()
+
+    def _chave_falhas(self, chave: str) -> str:
+        return f"{self.PREFIXO}:falhas:{chave}"
+
+    def _chave_bloqueio(self, chave: str) -> str:
+        return f"{self.PREFIXO}:bloqueio:{chave}"
+
+    def _membro(self, agora_ms: int) -> str:
+        # Falhas no mesmo milissegundo não podem colidir no sorted set
+        with self._sequencia_lock:
+            self._sequencia += 1
+            return f"{agora_ms}:{id(self)}:{self._sequencia}"
+
+    @staticmethod
+    def _texto(valor) -> str:
+        return valor.decode() if isinstance(valor, bytes) else valor
+
+    def permitido(self, chave: str) -> bool:
+        # A chave expira com o bloqueio; o valor guarda o fim do bloqueio no
+        # relógio dos workers, usado para a decisão
+        bloqueado_ate = self.redis.get(self._chave_bloqueio(chave))
+        return bloqueado_ate is None or int(self._texto(bloqueado_ate)) <= self.relogio() * 1000
+
+    def registar_falha(self, chave: str) -> None:
+        agora_ms = int(self.relogio() * 1000)
+        self._registar_falha(
+            keys=[self._chave_falhas(chave), self._chave_bloqueio(chave)],
+            args=[
+                agora_ms,
+                int(self.janela_segundos * 1000),
+                self.max_tentativas,
+                int(self.bloqueio_segundos * 1000),
+                self._membro(agora_ms),
+            ],
+        )
+
+    def limpar(self, chave: str) -> bool:
+        return bool(self.redis.delete(self._chave_falhas(chave), self._chave_bloqueio(chave)))
+
+    def _chaves(self):
+        return self.redis.scan_iter(match=f"{self.PREFIXO}:*", count=500)
+
+    def limpar_tudo(self) -> int:
+        ips = set()
+        pipe = self.redis.pipeline(transaction=False)
+        for chave in self._chaves():
+            ips.add(self._texto(chave).rsplit(":", 1)[-1])
+            pipe.delete(chave)
+        pipe.execute()
+        return len(ips)
+
+    def estado(self) -> Dict[str, Dict[str, Any]]:
+        inicio_janela = self.relogio() * 1000 - self.janela_segundos * 1000
+        chaves = [self._texto(c) for c in self._chaves()]
+        pipe = self.redis.pipeline(transaction=False)
+        for chave in chaves:
+            if ":falhas:" in chave:
+                pipe.zcount(chave, f"({inicio_janela}", "+inf")
+            else:
+                pipe.get(chave)
+
+        resultado: Dict[str, Dict[str, Any]] = {}
+        for chave, valor in zip(chaves, pipe.execute()):
+            tipo, ip = chave[len(self.PREFIXO) + 1:].split(":", 1)
+            entrada = resultado.setdefault(ip, {"attempts": 0, "blocked_until": None})
+            if tipo == "falhas":
+                entrada["attempts"] = int(valor)
+            elif valor is not None:
+                entrada["blocked_until"] = int(self._texto(valor)) / 1000
+        return resultado
+
+
+class _RedisComFallback(RateLimiterBackend):
+    """Usa o Redis e recorre ao backend em memória se o Redis falhar"""
+
+    def __init__(self, redis_backend: RedisRateLimiter, local_backend: MemoryRateLimiter):
+        self.redis_backend = redis_backend
+        self.local_backend = local_backend
+        self.nome = redis_backend.nome
+        self.remoto = redis_backend.remoto
+
+    def _executar(self, operacao: str, *args):
+        try:
+            return getattr(self.redis_backend, operacao)(*args)
+        except Exception as e:
+            logger.warning("Falha no rate limiter Redis (%s), a usar memória local: %s", operacao, e)
+            return getattr(self.local_backend, operacao)(*args)
+
+    def permitido(self, chave: str) -> bool:
+        return self._executar("permitido", chave)
+
+    def registar_falha(self, chave: str) -> None:
+        self._executar("registar_falha", chave)
+
+    def limpar(self, chave: str) -> bool:
+        local = self.local_backend.limpar(chave)
+        return self._executar("limpar", chave) or local
+
+    def limpar_tudo(self) -> int:
+        local = self.local_backend.limpar_tudo()
+        return max(self._executar("limpar_tudo"), local)
+
+    def estado(self) -> Dict[str, Dict[str, Any]]:
+        return {**self.local_backend.estado(), **self._executar("estado")}
+
+
+def criar_rate_limiter() -> RateLimiterBackend:
+    """Cria o backend configurado em ``settings.rate_limit_backend``"""
+    local = MemoryRateLimiter()
+    if settings.rate_limit_backend != "redis":
+        return local
+    try:
+        from app.core.cache import get_redis_client
+
+        client = get_redis_client()
+        client.ping()
+        return _RedisComFallback(RedisRateLimiter(client), local)
+    except Exception as e:
+        logger.warning("Redis indisponível (%s); rate limiting de login apenas local", e)
+        return local
+
+
+rate_limiter = criar_rate_limiter()
+
+
 def check_login_rate_limit(ip: str) -> bool:
     """Verifica se o IP pode tentar fazer login"""
-    now = datetime.utcnow()
-    
-    if ip not in login_attempts:
-        login_attempts[ip] = {
-            "attempts": 0,
-            "first_attempt": now,
-            "blocked_until": None
-        }
-        return True
-    
-    attempt_data = login_attempts[ip]
-    
-    # Verifica se está bloqueado
-    if attempt_data["blocked_until"] and now < attempt_data["blocked_until"]:
-        return False
-    
-    # Reset se passou o período de bloqueio
-    if attempt_data["blocked_until"] and now >= attempt_data["blocked_until"]:
-        attempt_data["attempts"] = 0
-        attempt_data["blocked_until"] = None
-        attempt_data["first_attempt"] = now
-    
-    # Verifica se excedeu o limite de tentativas
-    window_start = now - timedelta(minutes=settings.rate_limit_login_window_minutes)
-    if attempt_data["first_attempt"] < window_start:
-        # Reset se passou a janela de tempo
-        attempt_data["attempts"] = 0
-        attempt_data["first_attempt"] = now
-    
-    if attempt_data["attempts"] >= settings.rate_limit_login_attempts:
-        # Bloqueia por 15 minutos
-        attempt_data["blocked_until"] = now + timedelta(minutes=settings.rate_limit_login_block_minutes)
-        return False
-    
-    return True
+    return rate_limiter.permitido(ip)
 
 
 def record_login_attempt(ip: str, success: bool):
     """Regista tentativa de login"""
-    if ip not in login_attempts:
-        login_attempts[ip] = {
-            "attempts": 0,
-            "first_attempt": datetime.utcnow(),
-            "blocked_until": None
-        }
-    
     if success:
         # Reset em caso de sucesso
-        login_attempts[ip]["attempts"] = 0
-        login_attempts[ip]["blocked_until"] = None
+        rate_limiter.limpar(ip)
     else:
-        # Incrementa tentativas em caso de falha
-        login_attempts[ip]["attempts"] += 1
+        rate_limiter.registar_falha(ip)
+
+
+async def check_login_rate_limit_async(ip: str) -> bool:
+    """``check_login_rate_limit`` para rotas assíncronas (o cliente Redis é bloqueante)"""
+    if rate_limiter.remoto:
+        return await asyncio.to_thread(check_login_rate_limit, ip)
+    return check_login_rate_limit(ip)
+
+
+async def record_login_attempt_async(ip: str, success: bool) -> None:
+    """``record_login_attempt`` para rotas assíncronas (o cliente Redis é bloqueante)"""
+    if rate_limiter.remoto:
+        await asyncio.to_thread(record_login_attempt, ip, success)
+    else:
+        record_login_attempt(ip, success)
+
+
+def rate_limit_status() -> Dict[str, Any]:
+    """Resumo do estado do rate limiting de login (todos os workers com Redis)"""
+    agora = time.time()
+    estado = rate_limiter.estado()
+    detalhes = {
+        ip: {
+            "attempts": entrada["attempts"],
+            "blocked_until": (
+                datetime.utcfromtimestamp(entrada["blocked_until"]).isoformat()
+                if entrada["blocked_until"] else None
+            ),
+        }
+        for ip, entrada in estado.items()
+    }
+    bloqueados = [
+        ip for ip, entrada in estado.items()
+        if entrada["blocked_until"] and entrada["blocked_until"] > agora
+    ]
+    return {
+        "backend": rate_limiter.nome,
+        "total_ips_tracked": len(detalhes),
+        "total_ips_blocked": len(bloqueados),
+        "blocked_ips": bloqueados,
+        "details": detalhes,
+    }
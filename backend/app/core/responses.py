@@ -0,0 +1,31 @@
+"""
+Classe de resposta JSON por omissão da API, serializada com orjson.
+
+O orjson serializa ``datetime``, ``date``, enums, ``UUID`` e dataclasses sem
+conversões em Python; ``Decimal`` (valores em Kz vindos das colunas
+``Numeric``) é convertido em ``float``, o formato que o frontend espera.
+"""
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse as _ORJSONResponse
+from pydantic import BaseModel
+
+
+def _converter(valor: Any) -> Any:
+    """Tipos que o orjson não conhece"""
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, BaseModel):
+        return valor.model_dump(mode="json")
+    raise TypeError(f"Tipo não serializável em JSON: {type(valor).__name__}")
+
+
+def dumps(conteudo: Any) -> bytes:
+    return orjson.dumps(conteudo, default=_converter, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONResponse(_ORJSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
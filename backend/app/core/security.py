@@ -1,20 +1,86 @@
+import asyncio
+import hashlib
+import hmac
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Union
+from typing import Optional, Tuple, Union
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from app.core.cache import LRUCache
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes com um custo diferente de BCRYPT_ROUNDS são marcados como
+# desatualizados e refeitos no próximo login bem-sucedido
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
+
+# O bcrypt é CPU-bound (~100-300 ms): corre num executor com concorrência
+# limitada, para que um pico de logins não ocupe todas as threads/CPUs
+_executor_senhas = ThreadPoolExecutor(
+    max_workers=settings.password_hash_max_concurrency, thread_name_prefix="senhas"
+)
+
+# Credenciais verificadas recentemente: HMAC (chave aleatória do processo) da
+# senha e do hash guardado -> instante de expiração. Mudar a senha muda o
+# hash guardado, pelo que as entradas antigas deixam de coincidir.
+_credenciais_verificadas = LRUCache(max_entries=settings.password_verify_cache_max_entries)
+_chave_credenciais = secrets.token_bytes(32)
+
+
+def _chave_credencial(plain_password: str, hashed_password: str) -> str:
+    mensagem = f"{hashed_password}\0{plain_password}".encode()
+    return hmac.new(_chave_credenciais, mensagem, hashlib.sha256).hexdigest()
+
+
+def _verificada_recentemente(plain_password: str, hashed_password: Optional[str]) -> bool:
+    if hashed_password is None or settings.password_verify_cache_ttl_seconds <= 0:
+        return False
+    expira_em = _credenciais_verificadas.get(_chave_credencial(plain_password, hashed_password))
+    return expira_em is not None and expira_em > time.monotonic()
+
+
+def _verificar_e_atualizar(plain_password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+    if hashed_password is None:
+        # Utilizador inexistente: mesmo custo que uma verificação real
+        pwd_context.dummy_verify()
+        return False, None
+
+    valida, novo_hash = pwd_context.verify_and_update(plain_password, hashed_password)
+    ttl = settings.password_verify_cache_ttl_seconds
+    if valida and novo_hash is None and ttl > 0:
+        _credenciais_verificadas.set(_chave_credencial(plain_password, hashed_password), time.monotonic() + ttl)
+    return valida, novo_hash
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica se a senha está correta"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return verify_and_update_password(plain_password, hashed_password)[0]
+
+
+def verify_and_update_password(plain_password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """
+    Verifica a senha e devolve ``(valida, novo_hash)``; ``novo_hash`` só é
+    preenchido quando o hash guardado usa parâmetros desatualizados.
+    """
+    if _verificada_recentemente(plain_password, hashed_password):
+        return True, None
+    return _executor_senhas.submit(_verificar_e_atualizar, plain_password, hashed_password).result()
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: Optional[str]
+) -> Tuple[bool, Optional[str]]:
+    """Como ``verify_and_update_password``, sem bloquear o event loop"""
+    if _verificada_recentemente(plain_password, hashed_password):
+        return True, None
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor_senhas, _verificar_e_atualizar, plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Gera hash da senha"""
-    return pwd_context.hash(password)
+    return _executor_senhas.submit(pwd_context.hash, password).result()
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -39,12 +105,24 @@ def create_refresh_token(data: dict) -> str:
     return encoded_jwt
 
 
+# Tokens já decodificados: token -> payload. A assinatura é verificada uma
+# vez por token; a expiração é verificada em cada uso.
+_tokens_decodificados = LRUCache(max_entries=settings.jwt_decode_cache_max_entries)
+
+
 def verify_token(token: str, token_type: str = "access") -> Optional[dict]:
     """Verifica e decodifica token JWT"""
-    try:
-        payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
-        if payload.get("type") != token_type:
+    payload = _tokens_decodificados.get(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
+        except JWTError:
             return None
-        return payload
-    except JWTError:
+        _tokens_decodificados.set(token, payload)
+    elif payload.get("exp") is not None and payload["exp"] <= time.time():
+        _tokens_decodificados.delete(token)
+        return None
+
+    if payload.get("type") != token_type:
         return None
+    return payload
@@ -1,11 +1,16 @@
-from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from app.core.config import settings
+from app.db.engine import criar_engine, criar_engine_async
 
-engine = create_engine(settings.database_url)
+engine = criar_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine assíncrono para os endpoints de leitura: a espera pela base de dados
+# não ocupa uma thread da threadpool do FastAPI
+async_engine = criar_engine_async()
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
@@ -15,3 +20,13 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """
+    Sessão assíncrona. Os serviços existentes são síncronos e correm com
+    ``await db.run_sync(...)``; a serialização da resposta deve ser feita
+    dentro do ``run_sync``, pois fora dele não há lazy loading.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
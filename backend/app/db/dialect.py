@@ -0,0 +1,54 @@
+"""
+Construções SQL que dependem do dialeto (SQLite em desenvolvimento,
+PostgreSQL em produção).
+"""
+from typing import Any, Dict, Iterable, List, Sequence, Union
+
+from sqlalchemy import Table
+from sqlalchemy.orm import Session
+
+
+def dialect_insert(db: Session, tabela: Table):
+    """``INSERT`` do dialeto da sessão, com suporte a ``ON CONFLICT``"""
+    nome = db.bind.dialect.name
+    if nome == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif nome == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"ON CONFLICT não suportado no dialeto {nome}")
+    return insert(tabela)
+
+
+def upsert_incrementar(
+    db: Session,
+    tabela: Table,
+    linhas: Iterable[Dict[str, Any]],
+    chaves: List[str],
+    contador: Union[str, Sequence[str]]
+) -> None:
+    """
+    Insere ``linhas`` ou, se a chave já existir, soma ``contador`` (uma
+    coluna ou várias) ao valor atual, num único ``INSERT ... ON CONFLICT DO
+    UPDATE``.
+
+    Linhas com a mesma chave são somadas antes, porque o PostgreSQL não
+    permite que o mesmo comando atualize a mesma linha duas vezes.
+    """
+    contadores = [contador] if isinstance(contador, str) else list(contador)
+    agregadas: Dict[tuple, Dict[str, Any]] = {}
+    for linha in linhas:
+        chave = tuple(linha[c] for c in chaves)
+        if chave in agregadas:
+            for coluna in contadores:
+                agregadas[chave][coluna] += linha[coluna]
+        else:
+            agregadas[chave] = dict(linha)
+    if not agregadas:
+        return
+    stmt = dialect_insert(db, tabela).values(list(agregadas.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=chaves,
+        set_={coluna: tabela.c[coluna] + stmt.excluded[coluna] for coluna in contadores}
+    )
+    db.execute(stmt)
@@ -0,0 +1,223 @@
+"""
+Criação do engine SQLAlchemy a partir das ``Settings``.
+
+PostgreSQL: pool com tamanho, overflow, timeout e reciclagem configuráveis,
+``pool_pre_ping`` e ``statement_timeout``/``application_name`` definidos na
+ligação. SQLite: ``check_same_thread`` desligado (a sessão é usada na
+threadpool do FastAPI) e pragmas ``journal_mode=WAL`` e ``synchronous=NORMAL``,
+que permitem leituras concorrentes com uma escrita em curso.
+
+``criar_engine_async`` cria o equivalente assíncrono (aiosqlite/asyncpg) a
+partir do mesmo URL, usado pelos endpoints de leitura.
+
+O pool regista métricas de checkout (esperas, timeouts, ligações criadas)
+para dimensionar o número de workers face ao limite de ligações da base.
+"""
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+
+
+class MetricasPool:
+    """Contadores de utilização de um pool de ligações"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.conexoes_criadas = 0
+        self.timeouts = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+
+    def registar_checkout(self, espera: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.espera_total += espera
+            self.espera_max = max(self.espera_max, espera)
+
+    def registar_timeout(self, espera: float) -> None:
+        with self._lock:
+            self.timeouts += 1
+            self.espera_total += espera
+            self.espera_max = max(self.espera_max, espera)
+
+    def registar_checkin(self) -> None:
+        with self._lock:
+            self.checkins += 1
+
+    def registar_conexao(self) -> None:
+        with self._lock:
+            self.conexoes_criadas += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            tentativas = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connections_created": self.conexoes_criadas,
+                "timeouts": self.timeouts,
+                "wait_total_ms": round(self.espera_total * 1000, 3),
+                "wait_avg_ms": round(self.espera_total * 1000 / tentativas, 3) if tentativas else 0.0,
+                "wait_max_ms": round(self.espera_max * 1000, 3),
+            }
+
+
+class _MetricasMixin:
+    """Mede o tempo de espera de cada checkout de um ``QueuePool``"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metricas = MetricasPool()
+
+    def recreate(self):
+        # engine.dispose() recria o pool; as métricas acumuladas mantêm-se
+        novo = super().recreate()
+        novo.metricas = self.metricas
+        return novo
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexao = super()._do_get()
+        except PoolTimeoutError:
+            self.metricas.registar_timeout(time.perf_counter() - inicio)
+            raise
+        self.metricas.registar_checkout(time.perf_counter() - inicio)
+        return conexao
+
+    def _do_return_conn(self, record) -> None:
+        self.metricas.registar_checkin()
+        super()._do_return_conn(record)
+
+    def _create_connection(self):
+        self.metricas.registar_conexao()
+        return super()._create_connection()
+
+
+class PoolComMetricas(_MetricasMixin, QueuePool):
+    """``QueuePool`` com métricas (engine síncrono)"""
+
+
+class PoolAsyncComMetricas(_MetricasMixin, AsyncAdaptedQueuePool):
+    """``AsyncAdaptedQueuePool`` com métricas (engine assíncrono)"""
+
+
+def _sqlite_em_memoria(url) -> bool:
+    return url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+
+
+def _ativar_pragmas_sqlite(engine: Engine, wal: bool) -> None:
+    @event.listens_for(engine, "connect")
+    def _pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if wal:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+
+def _opcoes_pool(poolclass, memoria: bool) -> Dict[str, Any]:
+    # SQLite em memória mantém o pool por omissão (uma ligação partilhada)
+    opcoes: Dict[str, Any] = {"pool_pre_ping": settings.db_pool_pre_ping}
+    if not memoria:
+        opcoes.update(
+            poolclass=poolclass,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+        )
+    return opcoes
+
+
+def criar_engine(database_url: Optional[str] = None, application_name: Optional[str] = None, **opcoes) -> Engine:
+    """
+    Cria o engine para ``database_url`` (por omissão ``settings.database_url``).
+
+    ``opcoes`` sobrepõem-se às opções derivadas das settings (ex.:
+    ``pool_size=1`` para processos de curta duração).
+    """
+    url = make_url(database_url or settings.database_url)
+    backend = url.get_backend_name()
+    connect_args: Dict[str, Any] = {}
+    memoria = backend == "sqlite" and _sqlite_em_memoria(url)
+    kwargs = _opcoes_pool(PoolComMetricas, memoria)
+
+    if backend == "sqlite":
+        connect_args["check_same_thread"] = False
+    elif backend == "postgresql" and url.get_driver_name() == "psycopg2":
+        connect_args["application_name"] = application_name or settings.db_application_name
+        if settings.db_statement_timeout_ms:
+            connect_args["options"] = f"-c statement_timeout={settings.db_statement_timeout_ms}"
+
+    kwargs.update(opcoes)
+    engine = create_engine(url, connect_args=connect_args, **kwargs)
+
+    if backend == "sqlite":
+        _ativar_pragmas_sqlite(engine, wal=not memoria)
+    return engine
+
+
+# Driver assíncrono usado para cada backend
+DRIVERS_ASYNC = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+}
+
+
+def criar_engine_async(
+    database_url: Optional[str] = None, application_name: Optional[str] = None, **opcoes
+) -> AsyncEngine:
+    """
+    Cria o engine assíncrono (aiosqlite/asyncpg) para ``database_url``.
+
+    Aceita o mesmo URL do engine síncrono: o driver é trocado pelo
+    equivalente assíncrono e as mesmas settings de pool e ligação aplicam-se.
+    """
+    url = make_url(database_url or settings.database_url)
+    backend = url.get_backend_name()
+    url = url.set(drivername=f"{backend}+{DRIVERS_ASYNC[backend]}")
+    connect_args: Dict[str, Any] = {}
+    memoria = backend == "sqlite" and _sqlite_em_memoria(url)
+    kwargs = _opcoes_pool(PoolAsyncComMetricas, memoria)
+
+    if backend == "postgresql":
+        server_settings = {"application_name": application_name or settings.db_application_name}
+        if settings.db_statement_timeout_ms:
+            server_settings["statement_timeout"] = str(settings.db_statement_timeout_ms)
+        connect_args["server_settings"] = server_settings
+
+    kwargs.update(opcoes)
+    engine = create_async_engine(url, connect_args=connect_args, **kwargs)
+
+    if backend == "sqlite":
+        _ativar_pragmas_sqlite(engine.sync_engine, wal=not memoria)
+    return engine
+
+
+def metricas_pool(engine) -> Dict[str, Any]:
+    """Estado atual e métricas acumuladas do pool do engine (síncrono ou assíncrono)"""
+    pool = engine.pool
+    resultado: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        resultado.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+            timeout_seconds=pool.timeout(),
+        )
+    if isinstance(pool, _MetricasMixin):
+        resultado.update(pool.metricas.snapshot())
+    return resultado
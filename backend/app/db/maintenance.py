@@ -0,0 +1,96 @@
+"""
+Comandos de manutenção da base de dados.
+
+Uso: python -m app.db.maintenance <comando>
+"""
+import argparse
+import sys
+
+from app.db.database import SessionLocal
+
+
+def rebuild_audit_summary():
+    """Recalcula os contadores de auditoria a partir de audit_logs"""
+    from app.services.audit_service import AuditService
+
+    db = SessionLocal()
+    try:
+        total = AuditService(db).rebuild_audit_summary()
+        print(f"✓ Resumo de auditoria reconstruído ({total} contadores)")
+    finally:
+        db.close()
+
+
+def reclassify_kpis():
+    """Recalcula a categoria de KPI dos indicadores (após alterar KPI_REGRAS)"""
+    from app.services.indicador_service import IndicadorService
+
+    db = SessionLocal()
+    try:
+        total = IndicadorService(db).reclassificar_kpis()
+        print(f"✓ Categorias de KPI recalculadas ({total} indicadores alterados)")
+    finally:
+        db.close()
+
+
+def rebuild_rollups():
+    """Recalcula as tabelas de agregados dos gráficos (producao_resumo, projetos_resumo)"""
+    from app.db import rollups
+
+    db = SessionLocal()
+    try:
+        total = rollups.reconstruir(db)
+        db.commit()
+        print(f"✓ Agregados do dashboard reconstruídos ({total} linhas)")
+    finally:
+        db.close()
+
+
+def list_duplicate_indicators():
+    """Lista os indicadores repetidos por (projeto_id, nome, periodo_referencia)"""
+    from app.services.indicador_service import IndicadorService
+
+    db = SessionLocal()
+    try:
+        duplicados = IndicadorService(db).get_indicadores_duplicados()
+        for grupo in duplicados:
+            print(f"projeto {grupo['projeto_id']}, '{grupo['nome']}', {grupo['periodo_referencia']}: ids {grupo['ids']}")
+        print(f"✓ {len(duplicados)} chaves com indicadores repetidos")
+    finally:
+        db.close()
+
+
+def dedupe_indicators():
+    """Remove os indicadores repetidos, mantendo o mais recente (maior id) de cada chave"""
+    from app.services.indicador_service import IndicadorService
+
+    db = SessionLocal()
+    try:
+        removidos = IndicadorService(db).remover_indicadores_duplicados()
+        print(f"✓ Indicadores duplicados removidos ({len(removidos)}): {removidos}")
+    finally:
+        db.close()
+
+
+COMANDOS = {
+    "rebuild-audit-summary": rebuild_audit_summary,
+    "reclassify-kpis": reclassify_kpis,
+    "rebuild-rollups": rebuild_rollups,
+    "list-duplicate-indicators": list_duplicate_indicators,
+    "dedupe-indicators": dedupe_indicators,
+}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Comandos de manutenção da base de dados")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+    for nome, funcao in COMANDOS.items():
+        subparsers.add_parser(nome, help=funcao.__doc__)
+
+    args = parser.parse_args(argv)
+    COMANDOS[args.comando]()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""
+Aplicação das migrações Alembic a partir da aplicação.
+
+Equivalente a ``alembic upgrade head``. Uma base de dados criada antes das
+migrações (tabelas já existentes, sem ``alembic_version``) é primeiro
+marcada com a revisão inicial, que corresponde ao schema que era criado por
+``Base.metadata.create_all``, e só depois atualizada.
+"""
+import logging
+import os
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+DIRETORIO_BACKEND = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+REVISAO_INICIAL = "0001"
+
+
+def alembic_config() -> Config:
+    """Configuração do Alembic com caminhos independentes do diretório atual"""
+    config = Config(os.path.join(DIRETORIO_BACKEND, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(DIRETORIO_BACKEND, "alembic"))
+    return config
+
+
+def aplicar_migracoes(engine: Engine, revisao: str = "head") -> None:
+    """Atualiza o schema da base de ``engine`` até ``revisao``"""
+    config = alembic_config()
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        inspector = inspect(connection)
+        if not inspector.has_table("alembic_version") and inspector.has_table("users"):
+            logger.info("Base de dados sem histórico de migrações; marcada com a revisão %s", REVISAO_INICIAL)
+            command.stamp(config, REVISAO_INICIAL)
+        command.upgrade(config, revisao)
@@ -0,0 +1,137 @@
+"""
+Índices de pesquisa de texto.
+
+PostgreSQL: coluna gerada ``search_vector`` (tsvector) com índice GIN em cada
+tabela pesquisável, construída com a configuração ``portuguese_unaccent``
+(stemming português + ``unaccent``, pelo que "familia" encontra "famílias").
+Requer a extensão ``unaccent`` (pacote contrib, criada pela migração).
+
+SQLite: uma tabela FTS5 de conteúdo externo ``fts_<tabela>`` por tabela
+pesquisável, sincronizada por triggers, com o tokenizer ``unicode61`` sem
+diacríticos.
+
+Os objetos são criados pela migração 0003 e, nas bases criadas com
+``Base.metadata.create_all`` (testes), a seguir às tabelas.
+"""
+from typing import Dict, List, Tuple
+
+from sqlalchemy import event, text
+
+from app.db.database import Base
+
+CONFIG_PT = "portuguese_unaccent"
+
+# Tabela -> colunas pesquisáveis, por ordem de peso (A, B, C, D)
+DOCUMENTOS: Dict[str, Tuple[str, ...]] = {
+    "projetos": ("nome", "responsavel", "descricao"),
+    "indicadores": ("nome", "fonte_dados"),
+    "licenciamentos": ("observacoes",),
+    "audit_logs": ("detalhes", "entidade"),
+}
+PESOS = "ABCD"
+
+# Pesos equivalentes para o bm25() do FTS5
+PESOS_BM25 = (10.0, 4.0, 2.0, 1.0)
+
+
+def tabela_fts(tabela: str) -> str:
+    return f"fts_{tabela}"
+
+
+def _ddl_postgresql() -> List[str]:
+    ddl = [
+        "CREATE EXTENSION IF NOT EXISTS unaccent",
+        f"""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = '{CONFIG_PT}') THEN
+                CREATE TEXT SEARCH CONFIGURATION {CONFIG_PT} (COPY = portuguese);
+                ALTER TEXT SEARCH CONFIGURATION {CONFIG_PT}
+                    ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+            END IF;
+        END
+        $$
+        """,
+    ]
+    for tabela, colunas in DOCUMENTOS.items():
+        vetor = " || ".join(
+            f"setweight(to_tsvector('{CONFIG_PT}', coalesce({coluna}, '')), '{peso}')"
+            for coluna, peso in zip(colunas, PESOS)
+        )
+        ddl.append(
+            f"ALTER TABLE {tabela} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS ({vetor}) STORED"
+        )
+        ddl.append(f"CREATE INDEX IF NOT EXISTS ix_{tabela}_search_vector ON {tabela} USING gin (search_vector)")
+    return ddl
+
+
+def _ddl_sqlite() -> List[str]:
+    ddl = []
+    for tabela, colunas in DOCUMENTOS.items():
+        fts = tabela_fts(tabela)
+        lista = ", ".join(colunas)
+        novos = ", ".join(f"new.{c}" for c in colunas)
+        antigos = ", ".join(f"old.{c}" for c in colunas)
+        ddl += [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{lista}, content='{tabela}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tabela} BEGIN "
+            f"INSERT INTO {fts}(rowid, {lista}) VALUES (new.id, {novos}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tabela} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {lista}) VALUES ('delete', old.id, {antigos}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {lista} ON {tabela} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {lista}) VALUES ('delete', old.id, {antigos}); "
+            f"INSERT INTO {fts}(rowid, {lista}) VALUES (new.id, {novos}); END",
+            # Indexa as linhas já existentes
+            f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+        ]
+    return ddl
+
+
+def instrucoes_criacao(dialeto: str) -> List[str]:
+    """DDL dos índices de pesquisa para ``dialeto`` (vazio noutros dialetos)"""
+    if dialeto == "postgresql":
+        return _ddl_postgresql()
+    if dialeto == "sqlite":
+        return _ddl_sqlite()
+    return []
+
+
+def instrucoes_remocao(dialeto: str) -> List[str]:
+    """DDL que remove os objetos criados por ``instrucoes_criacao``"""
+    ddl = []
+    for tabela in DOCUMENTOS:
+        if dialeto == "postgresql":
+            ddl.append(f"DROP INDEX IF EXISTS ix_{tabela}_search_vector")
+            ddl.append(f"ALTER TABLE {tabela} DROP COLUMN IF EXISTS search_vector")
+        elif dialeto == "sqlite":
+            fts = tabela_fts(tabela)
+            ddl += [f"DROP TRIGGER IF EXISTS {fts}_{sufixo}" for sufixo in ("ai", "ad", "au")]
+            ddl.append(f"DROP TABLE IF EXISTS {fts}")
+    if dialeto == "postgresql":
+        ddl.append(f"DROP TEXT SEARCH CONFIGURATION IF EXISTS {CONFIG_PT}")
+    return ddl
+
+
+def incluir_no_autogenerate(nome, tipo, parent_names) -> bool:
+    """Exclui do ``alembic --autogenerate`` os objetos de pesquisa, que não estão nos modelos"""
+    if tipo == "table" and nome and nome.startswith("fts_"):
+        return False
+    if tipo == "column" and nome == "search_vector":
+        return False
+    if tipo == "index" and nome and nome.endswith("_search_vector"):
+        return False
+    return True
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _criar_com_as_tabelas(target, connection, **kw):
+    for instrucao in instrucoes_criacao(connection.dialect.name):
+        connection.execute(text(instrucao))
+
+
+@event.listens_for(Base.metadata, "before_drop")
+def _remover_com_as_tabelas(target, connection, **kw):
+    for instrucao in instrucoes_remocao(connection.dialect.name):
+        connection.execute(text(instrucao))
@@ -0,0 +1,282 @@
+"""
+Tabelas de agregados dos gráficos do dashboard.
+
+``producao_resumo`` (província, trimestre, categoria de KPI) e
+``projetos_resumo`` (fonte de financiamento, estado) guardam as somas que de
+outra forma seriam calculadas sobre ``indicadores`` e ``projetos`` em cada
+visualização. São mantidas por deltas na mesma transação das escritas:
+
+- escritas pelo ORM: o estado anterior de cada indicador ou projeto
+  alterado ou removido é lido em ``before_flush`` e, em ``after_flush``,
+  subtraído e substituído pelo novo; os indicadores de um projeto que muda
+  de província passam para a nova;
+- inserções em lote com ``insert()``: os importadores chamam
+  ``somar_indicadores`` e ``somar_projetos``;
+- mudanças de estado em lote com ``update()``: ``mudar_estado_projetos``.
+
+Linhas que chegam a zero ficam na tabela e são ignoradas pelas consultas.
+``reconstruir`` recalcula tudo a partir das tabelas base
+(``python -m app.db.maintenance rebuild-rollups``).
+"""
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from app.core.cache import marcar_alteracao
+from app.db.dialect import upsert_incrementar
+from app.models.indicador import CategoriaKPI, Indicador, Trimestre
+from app.models.producao_resumo import ProducaoResumo
+from app.models.projeto import EstadoProjeto, FonteFinanciamento, Projeto
+from app.models.projetos_resumo import ProjetosResumo
+
+CHAVES_PRODUCAO = ["provincia_id", "periodo_referencia", "categoria_kpi"]
+CONTADORES_PRODUCAO = ("total_indicadores", "valor_actual", "meta")
+CHAVES_PROJETOS = ["fonte_financiamento", "estado"]
+CONTADORES_PROJETOS = ("total_projetos", "orcamento_previsto_kz", "orcamento_executado_kz")
+
+# Colunas de que dependem os agregados, pela ordem dos estados comparados
+CAMPOS_INDICADOR = ("projeto_id", "periodo_referencia", "categoria_kpi", "valor_actual", "meta")
+CAMPOS_PROJETO = ("provincia_id", "fonte_financiamento", "estado", "orcamento_previsto_kz", "orcamento_executado_kz")
+
+
+def _decimal(valor) -> Decimal:
+    return Decimal(str(valor)) if valor is not None else Decimal(0)
+
+
+def _linha_producao(provincia_id: int, periodo, categoria, total: int, valor, meta) -> Dict[str, Any]:
+    return {
+        "provincia_id": provincia_id,
+        "periodo_referencia": Trimestre(periodo).value,
+        "categoria_kpi": CategoriaKPI(categoria or CategoriaKPI.OUTRO).value,
+        "total_indicadores": total,
+        "valor_actual": _decimal(valor),
+        "meta": _decimal(meta),
+    }
+
+
+def _linha_projetos(fonte, estado, total: int, previsto, executado) -> Dict[str, Any]:
+    return {
+        "fonte_financiamento": FonteFinanciamento(fonte).value,
+        "estado": EstadoProjeto(estado or EstadoProjeto.PLANEADO).value,
+        "total_projetos": total,
+        "orcamento_previsto_kz": _decimal(previsto),
+        "orcamento_executado_kz": _decimal(executado),
+    }
+
+
+def _aplicar(db: Session, producao: List[Dict[str, Any]], projetos: List[Dict[str, Any]]) -> None:
+    upsert_incrementar(db, ProducaoResumo.__table__, producao, chaves=CHAVES_PRODUCAO, contador=CONTADORES_PRODUCAO)
+    upsert_incrementar(db, ProjetosResumo.__table__, projetos, chaves=CHAVES_PROJETOS, contador=CONTADORES_PROJETOS)
+
+
+def somar_indicadores(db: Session, indicadores: Iterable, provincias: Dict[int, int], sinal: int = 1) -> None:
+    """
+    Soma (``sinal=-1``: subtrai) ``indicadores`` a ``producao_resumo``.
+
+    Cada indicador tem os atributos de ``CAMPOS_INDICADOR`` (objetos ou
+    linhas de ``insert(...).returning``); ``provincias`` mapeia
+    ``projeto_id`` para ``provincia_id``.
+    """
+    linhas = [
+        _linha_producao(
+            provincias[i.projeto_id], i.periodo_referencia, i.categoria_kpi,
+            sinal, sinal * _decimal(i.valor_actual), sinal * _decimal(i.meta)
+        )
+        for i in indicadores
+    ]
+    _aplicar(db, linhas, [])
+
+
+def somar_projetos(db: Session, projetos: Iterable, sinal: int = 1) -> None:
+    """Soma (``sinal=-1``: subtrai) ``projetos`` a ``projetos_resumo``"""
+    linhas = [
+        _linha_projetos(
+            p.fonte_financiamento, p.estado,
+            sinal, sinal * _decimal(p.orcamento_previsto_kz), sinal * _decimal(p.orcamento_executado_kz)
+        )
+        for p in projetos
+    ]
+    _aplicar(db, [], linhas)
+
+
+def mudar_estado_projetos(db: Session, mudancas: Iterable[Tuple[Any, Any]]) -> None:
+    """
+    Passa cada projeto de ``mudancas`` (pares projeto, novo estado) do seu
+    estado atual para o novo em ``projetos_resumo``. Para as alterações em
+    lote com ``update()``, que não passam pelos eventos do ORM.
+    """
+    linhas = []
+    for p, estado in mudancas:
+        previsto, executado = _decimal(p.orcamento_previsto_kz), _decimal(p.orcamento_executado_kz)
+        linhas.append(_linha_projetos(p.fonte_financiamento, p.estado, -1, -previsto, -executado))
+        linhas.append(_linha_projetos(p.fonte_financiamento, estado, 1, previsto, executado))
+    _aplicar(db, [], linhas)
+
+
+def reconstruir(db: Session) -> int:
+    """
+    Recalcula as tabelas de agregados a partir de ``indicadores`` e
+    ``projetos`` e devolve o número de linhas escritas. Não faz commit.
+    """
+    producao = [
+        _linha_producao(linha.provincia_id, linha.periodo_referencia, linha.categoria_kpi,
+                        linha.total, linha.valor_actual, linha.meta)
+        for linha in db.execute(
+            select(
+                Projeto.provincia_id,
+                Indicador.periodo_referencia,
+                Indicador.categoria_kpi,
+                func.count(Indicador.id).label("total"),
+                func.coalesce(func.sum(Indicador.valor_actual), 0).label("valor_actual"),
+                func.coalesce(func.sum(Indicador.meta), 0).label("meta")
+            )
+            .join(Projeto, Projeto.id == Indicador.projeto_id)
+            .group_by(Projeto.provincia_id, Indicador.periodo_referencia, Indicador.categoria_kpi)
+        )
+    ]
+    projetos = [
+        _linha_projetos(linha.fonte_financiamento, linha.estado, linha.total, linha.previsto, linha.executado)
+        for linha in db.execute(
+            select(
+                Projeto.fonte_financiamento,
+                Projeto.estado,
+                func.count(Projeto.id).label("total"),
+                func.coalesce(func.sum(Projeto.orcamento_previsto_kz), 0).label("previsto"),
+                func.coalesce(func.sum(Projeto.orcamento_executado_kz), 0).label("executado")
+            ).group_by(Projeto.fonte_financiamento, Projeto.estado)
+        )
+    ]
+
+    db.execute(delete(ProducaoResumo))
+    db.execute(delete(ProjetosResumo))
+    _aplicar(db, producao, projetos)
+    marcar_alteracao(db, ProducaoResumo.__tablename__, ProjetosResumo.__tablename__)
+    return len(producao) + len(projetos)
+
+
+# --- Deltas das escritas pelo ORM ---------------------------------------------
+
+def _estado(obj, campos: Tuple[str, ...], anterior: bool = False) -> tuple:
+    """Valores de ``campos`` depois do flush ou, com ``anterior``, antes"""
+    if not anterior:
+        return tuple(getattr(obj, campo) for campo in campos)
+    atributos = inspect(obj).attrs
+    valores = []
+    for campo in campos:
+        historia = atributos[campo].history
+        if historia.has_changes():
+            valores.append(historia.deleted[0] if historia.deleted else None)
+        else:
+            valores.append(getattr(obj, campo))
+    return tuple(valores)
+
+
+def _estados_anteriores(session: Session, modelo, campos) -> Dict[Any, tuple]:
+    """Estado antes do flush dos objetos de ``modelo`` alterados ou removidos, por id"""
+    antes: Dict[Any, tuple] = {}
+    for obj in session.dirty:
+        if isinstance(obj, modelo) and session.is_modified(obj):
+            antes[obj.id] = _estado(obj, campos, anterior=True)
+    for obj in session.deleted:
+        if isinstance(obj, modelo):
+            antes[obj.id] = _estado(obj, campos, anterior=True)
+    return antes
+
+
+def _estados_novos(session: Session, modelo, campos, antes: Dict[Any, tuple]) -> Dict[Any, tuple]:
+    """Estado depois do flush dos objetos de ``modelo`` inseridos ou alterados, por id"""
+    depois: Dict[Any, tuple] = {}
+    for obj in session.new:
+        if isinstance(obj, modelo):
+            depois[obj.id] = _estado(obj, campos)
+    for obj in session.dirty:
+        if isinstance(obj, modelo) and obj.id in antes:
+            depois[obj.id] = _estado(obj, campos)
+    # Alterações que não mexem nos agregados
+    for id_ in [id_ for id_ in depois if antes.get(id_) == depois[id_]]:
+        del antes[id_], depois[id_]
+    return depois
+
+
+_INFO_ANTES = "rollups_estados_anteriores"
+
+
+def _manter_valor_anterior(target, value, oldvalue, initiator):
+    pass
+
+
+# Carrega o valor anterior mesmo quando o atributo está expirado (ex.: depois
+# de um commit), para que o histórico tenha sempre o estado a subtrair
+for _modelo, _campos in ((Indicador, CAMPOS_INDICADOR), (Projeto, CAMPOS_PROJETO)):
+    for _campo in _campos:
+        event.listen(getattr(_modelo, _campo), "set", _manter_valor_anterior, active_history=True)
+
+
+@event.listens_for(Session, "before_flush")
+def _guardar_estados_anteriores(session: Session, flush_context, instances) -> None:
+    # Lidos antes do flush: depois dele as linhas removidas já não existem
+    session.info[_INFO_ANTES] = (
+        _estados_anteriores(session, Indicador, CAMPOS_INDICADOR),
+        _estados_anteriores(session, Projeto, CAMPOS_PROJETO),
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _atualizar_agregados(session: Session, flush_context) -> None:
+    ind_antes, proj_antes = session.info.pop(_INFO_ANTES, ({}, {}))
+    ind_depois = _estados_novos(session, Indicador, CAMPOS_INDICADOR, ind_antes)
+    proj_depois = _estados_novos(session, Projeto, CAMPOS_PROJETO, proj_antes)
+    if not (ind_antes or ind_depois or proj_antes or proj_depois):
+        return
+
+    # Província de cada projeto antes e depois do flush
+    prov_antes = {pid: estado[0] for pid, estado in proj_antes.items()}
+    prov_depois = {pid: estado[0] for pid, estado in proj_depois.items()}
+    projeto_ids = {e[0] for e in ind_antes.values()} | {e[0] for e in ind_depois.values()}
+    em_falta = {pid for pid in projeto_ids if pid is not None} - set(prov_antes) - set(prov_depois)
+    if em_falta:
+        for pid, provincia_id in session.execute(select(Projeto.id, Projeto.provincia_id).where(Projeto.id.in_(em_falta))):
+            prov_antes[pid] = prov_depois[pid] = provincia_id
+
+    producao: List[Dict[str, Any]] = []
+    for estados, provincias, sinal in ((ind_antes, prov_antes, -1), (ind_depois, prov_depois, 1)):
+        for projeto_id, periodo, categoria, valor, meta in estados.values():
+            provincia_id = provincias.get(projeto_id, prov_depois.get(projeto_id))
+            if provincia_id is not None:
+                producao.append(_linha_producao(provincia_id, periodo, categoria, sinal,
+                                                sinal * _decimal(valor), sinal * _decimal(meta)))
+
+    # Indicadores não alterados de projetos que mudaram de província
+    movidos: Dict[int, Tuple[int, int]] = {
+        pid: (proj_antes[pid][0], proj_depois[pid][0])
+        for pid in proj_antes.keys() & proj_depois.keys()
+        if proj_antes[pid][0] != proj_depois[pid][0]
+    }
+    if movidos:
+        tocados = list(ind_antes.keys() | ind_depois.keys())
+        linhas = session.execute(
+            select(
+                Indicador.projeto_id,
+                Indicador.periodo_referencia,
+                Indicador.categoria_kpi,
+                func.count(Indicador.id).label("total"),
+                func.coalesce(func.sum(Indicador.valor_actual), 0).label("valor_actual"),
+                func.coalesce(func.sum(Indicador.meta), 0).label("meta")
+            )
+            .where(Indicador.projeto_id.in_(movidos.keys()), Indicador.id.notin_(tocados))
+            .group_by(Indicador.projeto_id, Indicador.periodo_referencia, Indicador.categoria_kpi)
+        )
+        for linha in linhas:
+            origem, destino = movidos[linha.projeto_id]
+            valor, meta = _decimal(linha.valor_actual), _decimal(linha.meta)
+            producao.append(_linha_producao(origem, linha.periodo_referencia, linha.categoria_kpi, -linha.total, -valor, -meta))
+            producao.append(_linha_producao(destino, linha.periodo_referencia, linha.categoria_kpi, linha.total, valor, meta))
+
+    projetos: List[Dict[str, Any]] = []
+    for estados, sinal in ((proj_antes, -1), (proj_depois, 1)):
+        for _, fonte, estado, previsto, executado in estados.values():
+            projetos.append(_linha_projetos(fonte, estado, sinal, sinal * _decimal(previsto), sinal * _decimal(executado)))
+
+    _aplicar(session, producao, projetos)
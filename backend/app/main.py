@@ -5,12 +5,18 @@ from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from app.core.config import settings, get_cors_origins
-from app.db.database import engine
-from app.db.database import Base
-from app.api import auth, users, projetos, indicadores, licenciamentos, eixos_5w2h, auditoria, provincias, dashboard, admin
+from app.core import http_cache
+from app.core.compression import CompressaoMiddleware
+from app.core.responses import ORJSONResponse
+from app.db.database import engine, async_engine
+from app.db.migrations import aplicar_migracoes
+from app.services.audit_writer import audit_writer
+from app.services.export_jobs import export_jobs
+from app.api import auth, users, projetos, indicadores, licenciamentos, eixos_5w2h, auditoria, provincias, dashboard, admin, exports, search
 
-# Cria tabelas no banco de dados
-Base.metadata.create_all(bind=engine)
+# Cria/atualiza as tabelas no banco de dados (alembic upgrade head)
+if settings.db_auto_migrate:
+    aplicar_migracoes(engine)
 
 # Cria aplicação FastAPI
 app = FastAPI(
@@ -18,7 +24,8 @@ app = FastAPI(
     version=settings.app_version,
     description="Sistema de gestão dos 21 projectos de aquicultura em Angola",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # Configura rate limiting
@@ -39,15 +46,20 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
-# Middleware para controlar cache (especialmente para Brave)
+# Política de cache HTTP por rota (ETag/304 nas leituras, no-store nas escritas)
 @app.middleware("http")
 async def add_cache_control_header(request: Request, call_next):
     response = await call_next(request)
-    # Adiciona headers para evitar cache agressivo do Brave
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-    response.headers["Pragma"] = "no-cache"
-    response.headers["Expires"] = "0"
-    return response
+    return await http_cache.aplicar_politica(request, response)
+
+# Compressão (por fora da política de cache, que vê e calcula o ETag do corpo original)
+app.add_middleware(
+    CompressaoMiddleware,
+    algoritmos=settings.compression_algorithms_list,
+    tamanho_minimo=settings.compression_minimum_size,
+    nivel_gzip=settings.compression_gzip_level,
+    qualidade_brotli=settings.compression_brotli_quality
+)
 
 # Configura middleware de segurança
 app.add_middleware(
@@ -56,7 +68,13 @@ app.add_middleware(
 )
 
 # Inclui rotas
-app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
+# Autenticação: nunca guardada pelo browser (inclui o contorno para o Brave)
+app.include_router(
+    auth.router,
+    prefix="/api/auth",
+    tags=["authentication"],
+    dependencies=[Depends(http_cache.politica_cache(http_cache.SEM_CACHE_ESTRITO))]
+)
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(projetos.router, prefix="/api/projetos", tags=["projetos"])
 app.include_router(indicadores.router, prefix="/api/indicadores", tags=["indicadores"])
@@ -66,6 +84,39 @@ app.include_router(auditoria.router, prefix="/api/auditoria", tags=["auditoria"]
 app.include_router(provincias.router, prefix="/api/provincias", tags=["provincias"])
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["dashboard"])
 app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
+app.include_router(exports.router, prefix="/api/exports", tags=["exports"])
+app.include_router(search.router, prefix="/api/search", tags=["search"])
+
+
+@app.on_event("startup")
+def start_audit_writer():
+    """Inicia a escrita de auditoria em lote (AUDIT_WRITE_MODE=async)"""
+    if settings.audit_write_mode == "async":
+        audit_writer.start()
+
+
+@app.on_event("shutdown")
+def stop_audit_writer():
+    """Escreve os logs de auditoria pendentes antes de terminar"""
+    audit_writer.stop()
+
+
+@app.on_event("startup")
+def cleanup_export_jobs():
+    """Remove artefactos de exportação expirados"""
+    export_jobs.limpar_expirados()
+
+
+@app.on_event("shutdown")
+def stop_export_jobs():
+    """Termina o pool de processos de exportação"""
+    export_jobs.shutdown()
+
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    """Fecha as ligações do engine assíncrono"""
+    await async_engine.dispose()
 
 
 @app.get("/")
@@ -5,7 +5,16 @@ from .eixo_5w2h import Eixo5W2H
 from .indicador import Indicador
 from .licenciamento import Licenciamento
 from .audit_log import AuditLog
+from .audit_summary import AuditSummary
+from .producao_resumo import ProducaoResumo
+from .projetos_resumo import ProjetosResumo
 from app.db.database import Base
+# Índices de pesquisa de texto, criados a seguir às tabelas
+from app.db import pesquisa  # noqa: F401
+# Categoria de KPI dos indicadores, atribuída na escrita
+from app.core import kpi_classifier  # noqa: F401
+# Agregados dos gráficos do dashboard, atualizados a cada flush
+from app.db import rollups  # noqa: F401
 
 __all__ = [
     "Base",
@@ -15,5 +24,8 @@ __all__ = [
     "Eixo5W2H",
     "Indicador",
     "Licenciamento",
-    "AuditLog"
+    "AuditLog",
+    "AuditSummary",
+    "ProducaoResumo",
+    "ProjetosResumo"
 ]
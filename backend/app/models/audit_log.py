@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.database import Base
@@ -18,6 +18,14 @@ class AcaoAudit(str, enum.Enum):
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        # Suporta a paginação por cursor (timestamp, id) em ordem decrescente
+        Index("ix_audit_logs_timestamp_id", "timestamp", "id"),
+        # Filtros por utilizador/ação/entidade com a mesma ordenação
+        Index("ix_audit_logs_user_id_timestamp", "user_id", "timestamp", "id"),
+        Index("ix_audit_logs_acao_timestamp", "acao", "timestamp", "id"),
+        Index("ix_audit_logs_entidade_timestamp", "entidade", "timestamp", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Nullable para ações do sistema
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String
+from app.db.database import Base
+
+
+class DimensaoAudit:
+    ACAO = "acao"
+    ENTIDADE = "entidade"
+    USER = "user"
+
+
+class AuditSummary(Base):
+    """
+    Contadores de auditoria mantidos incrementalmente.
+
+    Cada linha é um contador por dimensão (ação, entidade ou utilizador) e
+    chave, atualizado na mesma transação em que o log é escrito. Pode ser
+    reconstruído a partir de ``audit_logs`` com
+    ``python -m app.db.maintenance rebuild-audit-summary``.
+    """
+    __tablename__ = "audit_summary"
+
+    dimensao = Column(String, primary_key=True)
+    chave = Column(String, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
@@ -15,7 +15,7 @@ class Eixo5W2H(Base):
     __tablename__ = "eixos_5w2h"
 
     id = Column(Integer, primary_key=True, index=True)
-    projeto_id = Column(Integer, ForeignKey("projetos.id"), nullable=False)
+    projeto_id = Column(Integer, ForeignKey("projetos.id"), nullable=False, index=True)
     what = Column(Text, nullable=False)  # O que
     why = Column(Text, nullable=False)   # Porquê
     where = Column(Text, nullable=False) # Onde
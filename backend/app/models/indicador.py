@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, Enum, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, Enum, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.database import Base
@@ -12,8 +12,21 @@ class Trimestre(str, enum.Enum):
     T4 = "T4"
 
 
+class CategoriaKPI(str, enum.Enum):
+    """KPI para que o indicador contribui, atribuído pelo classificador na escrita"""
+    FAMILIAS_BENEFICIADAS = "FAMILIAS_BENEFICIADAS"
+    EMPREGOS_CRIADOS = "EMPREGOS_CRIADOS"
+    OUTRO = "OUTRO"
+
+
 class Indicador(Base):
     __tablename__ = "indicadores"
+    __table_args__ = (
+        # Filtro por projeto e período (o prefixo projeto_id serve a FK)
+        Index("ix_indicadores_projeto_id_periodo_referencia", "projeto_id", "periodo_referencia"),
+        # Um valor por indicador e trimestre; chave do upsert em lote
+        Index("uq_indicadores_projeto_id_nome_periodo_referencia", "projeto_id", "nome", "periodo_referencia", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     projeto_id = Column(Integer, ForeignKey("projetos.id"), nullable=False)
@@ -21,8 +34,16 @@ class Indicador(Base):
     unidade = Column(String, nullable=False)  # Ex: toneladas, famílias, empregos, %
     meta = Column(Numeric(15, 2), nullable=False)
     valor_actual = Column(Numeric(15, 2), default=0)
-    periodo_referencia = Column(Enum(Trimestre), nullable=False)
+    periodo_referencia = Column(Enum(Trimestre), nullable=False, index=True)
     fonte_dados = Column(String, nullable=False)
+    # Preenchida a partir do nome por app.core.kpi_classifier
+    categoria_kpi = Column(
+        Enum(CategoriaKPI),
+        nullable=False,
+        default=CategoriaKPI.OUTRO,
+        server_default=CategoriaKPI.OUTRO.value,
+        index=True
+    )
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
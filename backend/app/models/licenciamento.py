@@ -22,9 +22,9 @@ class Licenciamento(Base):
     __tablename__ = "licenciamentos"
 
     id = Column(Integer, primary_key=True, index=True)
-    projeto_id = Column(Integer, ForeignKey("projetos.id"), nullable=False)
-    status = Column(Enum(StatusLicenciamento), nullable=False, default=StatusLicenciamento.PENDENTE)
-    entidade_responsavel = Column(Enum(EntidadeResponsavel), nullable=False)
+    projeto_id = Column(Integer, ForeignKey("projetos.id"), nullable=False, index=True)
+    status = Column(Enum(StatusLicenciamento), nullable=False, default=StatusLicenciamento.PENDENTE, index=True)
+    entidade_responsavel = Column(Enum(EntidadeResponsavel), nullable=False, index=True)
     data_submissao = Column(DateTime(timezone=True), nullable=False)
     data_decisao = Column(DateTime(timezone=True), nullable=True)
     observacoes = Column(Text, nullable=True)
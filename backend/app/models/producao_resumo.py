@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, Numeric
+from app.db.database import Base
+
+
+class ProducaoResumo(Base):
+    """
+    Produção dos indicadores agregada por província, trimestre e categoria de KPI.
+
+    Mantida incrementalmente na mesma transação das escritas de indicadores e
+    projetos (``app.db.rollups``), pelo que os gráficos do dashboard leem
+    algumas centenas de linhas qualquer que seja o número de indicadores.
+    Pode ser reconstruída com ``python -m app.db.maintenance rebuild-rollups``.
+    """
+    __tablename__ = "producao_resumo"
+
+    provincia_id = Column(Integer, primary_key=True)
+    periodo_referencia = Column(String, primary_key=True)
+    categoria_kpi = Column(String, primary_key=True)
+    total_indicadores = Column(Integer, nullable=False, default=0)
+    valor_actual = Column(Numeric(18, 2), nullable=False, default=0)
+    meta = Column(Numeric(18, 2), nullable=False, default=0)
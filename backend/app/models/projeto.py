@@ -29,10 +29,10 @@ class Projeto(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String, nullable=False, index=True)
-    provincia_id = Column(Integer, ForeignKey("provincias.id"), nullable=False)
-    tipo = Column(Enum(TipoProjeto), nullable=False)
-    fonte_financiamento = Column(Enum(FonteFinanciamento), nullable=False)
-    estado = Column(Enum(EstadoProjeto), nullable=False, default=EstadoProjeto.PLANEADO)
+    provincia_id = Column(Integer, ForeignKey("provincias.id"), nullable=False, index=True)
+    tipo = Column(Enum(TipoProjeto), nullable=False, index=True)
+    fonte_financiamento = Column(Enum(FonteFinanciamento), nullable=False, index=True)
+    estado = Column(Enum(EstadoProjeto), nullable=False, default=EstadoProjeto.PLANEADO, index=True)
     responsavel = Column(String, nullable=False)
     orcamento_previsto_kz = Column(Numeric(15, 2), nullable=False)
     orcamento_executado_kz = Column(Numeric(15, 2), default=0)
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Numeric
+from app.db.database import Base
+
+
+class ProjetosResumo(Base):
+    """
+    Projetos e orçamentos agregados por fonte de financiamento e estado.
+
+    Mantido como ``ProducaoResumo`` (``app.db.rollups``) e reconstruído pelo
+    mesmo comando de manutenção.
+    """
+    __tablename__ = "projetos_resumo"
+
+    fonte_financiamento = Column(String, primary_key=True)
+    estado = Column(String, primary_key=True)
+    total_projetos = Column(Integer, nullable=False, default=0)
+    orcamento_previsto_kz = Column(Numeric(18, 2), nullable=False, default=0)
+    orcamento_executado_kz = Column(Numeric(18, 2), nullable=False, default=0)
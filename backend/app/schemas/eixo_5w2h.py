@@ -1,8 +1,11 @@
 from pydantic import BaseModel, validator, Field
-from typing import Optional, List, Dict, Any
+from typing import Any, ClassVar, Dict, List, Optional, Tuple
 from datetime import datetime
 from decimal import Decimal
-from app.models.eixo_5w2h import Periodo5W2H
+from sqlalchemy.orm import joinedload
+from app.models.eixo_5w2h import Eixo5W2H as Eixo5W2HModel, Periodo5W2H
+from app.models.projeto import Projeto as ProjetoModel
+from app.schemas.leitura import ModeloResumo
 
 
 class Eixo5W2HBase(BaseModel):
@@ -83,5 +86,37 @@ class Eixo5W2HResponse(Eixo5W2HBase):
     updated_at: Optional[datetime] = None
     projeto: Optional[ProjetoSimple] = None
 
+    # Carregamento de ``projeto`` usado pelos serviços ao listar
+    opcoes_carregamento: ClassVar[Tuple[Any, ...]] = (
+        joinedload(Eixo5W2HModel.projeto).load_only(ProjetoModel.id, ProjetoModel.nome),
+    )
+
     class Config:
         from_attributes = True
+
+
+class Eixo5W2HResumo(ModeloResumo):
+    """Sem os textos longos (what, why, how) nem os marcos"""
+    id: int
+    projeto_id: int
+    projeto_nome: Optional[str] = None
+    periodo: Periodo5W2H
+    where: str
+    when: str
+    who: str
+    how_much_kz: float
+
+    entidade: ClassVar[Any] = Eixo5W2HModel
+    colunas: ClassVar[Tuple[Any, ...]] = (
+        Eixo5W2HModel.id,
+        Eixo5W2HModel.projeto_id,
+        ProjetoModel.nome.label("projeto_nome"),
+        Eixo5W2HModel.periodo,
+        Eixo5W2HModel.where,
+        Eixo5W2HModel.when,
+        Eixo5W2HModel.who,
+        Eixo5W2HModel.how_much_kz,
+    )
+    juncoes: ClassVar[Tuple[Tuple[Any, Any], ...]] = (
+        (ProjetoModel, Eixo5W2HModel.projeto_id == ProjetoModel.id),
+    )
@@ -0,0 +1,56 @@
+from pydantic import BaseModel
+from typing import Optional, Dict, Any
+from datetime import datetime
+import enum
+from app.models.indicador import Trimestre
+from app.models.audit_log import AcaoAudit
+
+
+class TipoExport(str, enum.Enum):
+    INDICADORES_CSV = "indicadores_csv"
+    INDICADORES_EXCEL = "indicadores_excel"
+    INDICADORES_PDF = "indicadores_pdf"
+    AUDITORIA_CSV = "auditoria_csv"
+    DATABASE_JSON = "database_json"
+
+
+class EstadoExportJob(str, enum.Enum):
+    PENDENTE = "PENDENTE"
+    EM_EXECUCAO = "EM_EXECUCAO"
+    CONCLUIDO = "CONCLUIDO"
+    FALHOU = "FALHOU"
+
+
+class IndicadoresExportParams(BaseModel):
+    projeto_id: Optional[int] = None
+    periodo_referencia: Optional[Trimestre] = None
+
+
+class AuditoriaExportParams(BaseModel):
+    user_id: Optional[int] = None
+    acao: Optional[AcaoAudit] = None
+    entidade: Optional[str] = None
+    data_inicio: Optional[datetime] = None
+    data_fim: Optional[datetime] = None
+    search: Optional[str] = None
+
+
+class DatabaseExportParams(BaseModel):
+    pass
+
+
+class ExportJobCreate(BaseModel):
+    tipo: TipoExport
+    parametros: Dict[str, Any] = {}
+
+
+class ExportJob(BaseModel):
+    id: str
+    tipo: TipoExport
+    parametros: Dict[str, Any]
+    status: EstadoExportJob
+    criado_em: datetime
+    iniciado_em: Optional[datetime] = None
+    concluido_em: Optional[datetime] = None
+    erro: Optional[str] = None
+    download_url: Optional[str] = None
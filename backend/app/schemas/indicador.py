@@ -1,8 +1,11 @@
-from pydantic import BaseModel, field_serializer
-from typing import Optional
+from pydantic import BaseModel, Field, field_serializer
+from typing import Any, ClassVar, List, Optional, Tuple
 from datetime import datetime
 from decimal import Decimal
-from app.models.indicador import Trimestre
+from sqlalchemy.orm import joinedload
+from app.models.indicador import CategoriaKPI, Indicador as IndicadorModel, Trimestre
+from app.models.projeto import Projeto as ProjetoModel
+from app.schemas.leitura import ModeloResumo
 
 
 class IndicadorBase(BaseModel):
@@ -28,8 +31,25 @@ class IndicadorUpdate(BaseModel):
     fonte_dados: Optional[str] = None
 
 
+# Valores por pedido de upsert em lote (um trimestre de vários projetos)
+MAX_VALORES_LOTE = 10000
+
+
+class IndicadorValoresLote(BaseModel):
+    """Valores a criar ou atualizar, identificados por (projeto_id, nome, periodo_referencia)"""
+    valores: List[IndicadorCreate] = Field(..., min_length=1, max_length=MAX_VALORES_LOTE)
+
+
+class ResultadoValoresLote(BaseModel):
+    criados: int
+    atualizados: int
+    inalterados: int
+    erros: List[str] = []
+
+
 class Indicador(IndicadorBase):
     id: int
+    categoria_kpi: CategoriaKPI = CategoriaKPI.OUTRO
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -47,10 +67,16 @@ class ProjetoSimple(BaseModel):
 
 class IndicadorResponse(IndicadorBase):
     id: int
+    categoria_kpi: CategoriaKPI = CategoriaKPI.OUTRO
     created_at: datetime
     updated_at: Optional[datetime] = None
     projeto: Optional[ProjetoSimple] = None
 
+    # Colunas de ``projeto`` lidas no mesmo SELECT dos indicadores
+    opcoes_carregamento: ClassVar[Tuple[Any, ...]] = (
+        joinedload(IndicadorModel.projeto).load_only(ProjetoModel.id, ProjetoModel.nome),
+    )
+
     @field_serializer('meta', 'valor_actual')
     def serialize_decimal_to_float(self, value: Decimal) -> float:
         """Converte Decimal para float para o frontend"""
@@ -58,3 +84,31 @@ class IndicadorResponse(IndicadorBase):
 
     class Config:
         from_attributes = True
+
+
+class IndicadorResumo(ModeloResumo):
+    id: int
+    projeto_id: int
+    projeto_nome: Optional[str] = None
+    nome: str
+    unidade: str
+    meta: float
+    valor_actual: Optional[float] = None
+    periodo_referencia: Trimestre
+    categoria_kpi: CategoriaKPI
+
+    entidade: ClassVar[Any] = IndicadorModel
+    colunas: ClassVar[Tuple[Any, ...]] = (
+        IndicadorModel.id,
+        IndicadorModel.projeto_id,
+        ProjetoModel.nome.label("projeto_nome"),
+        IndicadorModel.nome,
+        IndicadorModel.unidade,
+        IndicadorModel.meta,
+        IndicadorModel.valor_actual,
+        IndicadorModel.periodo_referencia,
+        IndicadorModel.categoria_kpi,
+    )
+    juncoes: ClassVar[Tuple[Tuple[Any, Any], ...]] = (
+        (ProjetoModel, IndicadorModel.projeto_id == ProjetoModel.id),
+    )
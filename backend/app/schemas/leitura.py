@@ -0,0 +1,35 @@
+from pydantic import BaseModel
+from typing import Any, ClassVar, Dict, List, Tuple
+import enum
+from sqlalchemy.orm import Query, Session
+
+
+class VistaListagem(str, enum.Enum):
+    COMPLETA = "completa"
+    RESUMO = "resumo"
+
+
+class ModeloResumo(BaseModel):
+    """
+    Modelo de leitura reduzido para as tabelas do frontend (``view=resumo``).
+
+    ``colunas`` são as expressões selecionadas, cada uma com o nome de um
+    campo do modelo, e ``juncoes`` os outer joins (alvo, condição) de que
+    precisam. As linhas seguem para a resposta como dicionários, sem
+    entidades do ORM nem validação atributo a atributo; os campos do modelo
+    documentam o formato.
+    """
+    entidade: ClassVar[Any]
+    colunas: ClassVar[Tuple[Any, ...]] = ()
+    juncoes: ClassVar[Tuple[Tuple[Any, Any], ...]] = ()
+
+    @classmethod
+    def consulta(cls, db: Session) -> Query:
+        query = db.query(*cls.colunas).select_from(cls.entidade)
+        for alvo, condicao in cls.juncoes:
+            query = query.outerjoin(alvo, condicao)
+        return query
+
+    @classmethod
+    def linhas(cls, query: Query) -> List[Dict[str, Any]]:
+        return [dict(linha._mapping) for linha in query]
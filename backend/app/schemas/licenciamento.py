@@ -1,7 +1,11 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Any, ClassVar, List, Optional, Tuple
 from datetime import datetime
-from app.models.licenciamento import StatusLicenciamento, EntidadeResponsavel
+from sqlalchemy.orm import joinedload
+from app.models.licenciamento import Licenciamento as LicenciamentoModel, StatusLicenciamento, EntidadeResponsavel
+from app.models.projeto import Projeto as ProjetoModel
+from app.schemas.leitura import ModeloResumo
+from app.schemas.lote import MAX_TRANSICOES_LOTE
 
 
 class LicenciamentoBase(BaseModel):
@@ -48,5 +52,44 @@ class LicenciamentoResponse(LicenciamentoBase):
     updated_at: Optional[datetime] = None
     projeto: Optional[ProjetoSimple] = None
 
+    # ``projeto`` carregado com os licenciamentos (apenas id e nome)
+    opcoes_carregamento: ClassVar[Tuple[Any, ...]] = (
+        joinedload(LicenciamentoModel.projeto).load_only(ProjetoModel.id, ProjetoModel.nome),
+    )
+
     class Config:
         from_attributes = True
+
+
+class LicenciamentoResumo(ModeloResumo):
+    id: int
+    projeto_id: int
+    projeto_nome: Optional[str] = None
+    status: StatusLicenciamento
+    entidade_responsavel: EntidadeResponsavel
+    data_submissao: datetime
+    data_decisao: Optional[datetime] = None
+
+    entidade: ClassVar[Any] = LicenciamentoModel
+    colunas: ClassVar[Tuple[Any, ...]] = (
+        LicenciamentoModel.id,
+        LicenciamentoModel.projeto_id,
+        ProjetoModel.nome.label("projeto_nome"),
+        LicenciamentoModel.status,
+        LicenciamentoModel.entidade_responsavel,
+        LicenciamentoModel.data_submissao,
+        LicenciamentoModel.data_decisao,
+    )
+    juncoes: ClassVar[Tuple[Tuple[Any, Any], ...]] = (
+        (ProjetoModel, LicenciamentoModel.projeto_id == ProjetoModel.id),
+    )
+
+
+class LicenciamentoTransicao(BaseModel):
+    id: int
+    status: StatusLicenciamento
+
+
+class LicenciamentoStatusLote(BaseModel):
+    transicoes: List[LicenciamentoTransicao] = Field(..., min_length=1, max_length=MAX_TRANSICOES_LOTE)
+    observacoes: Optional[str] = None
@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from typing import List
+import enum
+
+# Ids por pedido de transição em lote (um único IN por estado de destino)
+MAX_TRANSICOES_LOTE = 1000
+
+
+class ResultadoTransicao(str, enum.Enum):
+    ATUALIZADO = "ATUALIZADO"
+    SEM_ALTERACAO = "SEM_ALTERACAO"
+    NAO_ENCONTRADO = "NAO_ENCONTRADO"
+    DUPLICADO = "DUPLICADO"
+
+
+class ResultadoTransicaoId(BaseModel):
+    id: int
+    resultado: ResultadoTransicao
+
+
+class ResultadoLote(BaseModel):
+    atualizados: int
+    resultados: List[ResultadoTransicaoId]
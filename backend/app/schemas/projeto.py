@@ -1,8 +1,12 @@
-from pydantic import BaseModel, field_serializer
-from typing import Optional, List, Any
+from pydantic import BaseModel, Field, field_serializer
+from typing import Any, ClassVar, List, Optional, Tuple
 from datetime import datetime
 from decimal import Decimal
-from app.models.projeto import TipoProjeto, FonteFinanciamento, EstadoProjeto
+from sqlalchemy.orm import joinedload
+from app.models.projeto import Projeto as ProjetoModel, TipoProjeto, FonteFinanciamento, EstadoProjeto
+from app.models.provincia import Provincia as ProvinciaModel
+from app.schemas.leitura import ModeloResumo
+from app.schemas.lote import MAX_TRANSICOES_LOTE
 
 
 class ProjetoBase(BaseModel):
@@ -71,6 +75,11 @@ class ProjetoResponse(BaseModel):
     updated_at: Optional[datetime] = None
     provincia: Optional[ProvinciaSimple] = None
 
+    # A província (id e nome) vem no JOIN da listagem, sem lazy load por projeto
+    opcoes_carregamento: ClassVar[Tuple[Any, ...]] = (
+        joinedload(ProjetoModel.provincia).load_only(ProvinciaModel.id, ProvinciaModel.nome),
+    )
+
     @field_serializer('orcamento_previsto_kz', 'orcamento_executado_kz')
     def serialize_decimal_to_float(self, value: Decimal) -> float:
         """Converte Decimal para float para o frontend"""
@@ -80,3 +89,47 @@ class ProjetoResponse(BaseModel):
         from_attributes = True
 
 
+
+
+class ProjetoResumo(ModeloResumo):
+    id: int
+    nome: str
+    provincia_id: int
+    provincia_nome: Optional[str] = None
+    tipo: TipoProjeto
+    fonte_financiamento: FonteFinanciamento
+    estado: EstadoProjeto
+    responsavel: str
+    orcamento_previsto_kz: float
+    orcamento_executado_kz: float
+    data_inicio_prevista: datetime
+    data_fim_prevista: datetime
+
+    entidade: ClassVar[Any] = ProjetoModel
+    colunas: ClassVar[Tuple[Any, ...]] = (
+        ProjetoModel.id,
+        ProjetoModel.nome,
+        ProjetoModel.provincia_id,
+        ProvinciaModel.nome.label("provincia_nome"),
+        ProjetoModel.tipo,
+        ProjetoModel.fonte_financiamento,
+        ProjetoModel.estado,
+        ProjetoModel.responsavel,
+        ProjetoModel.orcamento_previsto_kz,
+        ProjetoModel.orcamento_executado_kz,
+        ProjetoModel.data_inicio_prevista,
+        ProjetoModel.data_fim_prevista,
+    )
+    juncoes: ClassVar[Tuple[Tuple[Any, Any], ...]] = (
+        (ProvinciaModel, ProjetoModel.provincia_id == ProvinciaModel.id),
+    )
+
+
+class ProjetoTransicao(BaseModel):
+    id: int
+    estado: EstadoProjeto
+
+
+class ProjetoEstadoLote(BaseModel):
+    transicoes: List[ProjetoTransicao] = Field(..., min_length=1, max_length=MAX_TRANSICOES_LOTE)
+    observacoes: Optional[str] = None
@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from typing import Optional, List
+import enum
+
+
+class EntidadePesquisa(str, enum.Enum):
+    PROJETOS = "projetos"
+    INDICADORES = "indicadores"
+    LICENCIAMENTOS = "licenciamentos"
+    AUDIT_LOGS = "audit_logs"
+
+
+class SearchResult(BaseModel):
+    entidade: EntidadePesquisa
+    id: int
+    titulo: str
+    excerto: Optional[str] = None
+    score: float
+
+
+class SearchResponse(BaseModel):
+    query: str
+    total: int
+    resultados: List[SearchResult]
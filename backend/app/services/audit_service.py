@@ -1,7 +1,32 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import tuple_, func, delete, insert, or_
 from app.models.audit_log import AuditLog, AcaoAudit
-from typing import Optional
+from app.models.audit_summary import AuditSummary, DimensaoAudit
+from app.db.dialect import upsert_incrementar
+from app.core.cache import marcar_alteracao
+from app.core.config import settings
+from app.services.audit_writer import audit_writer
+from app.services.search_service import SearchService
+from typing import Optional, List, Tuple, Dict, Any
 from datetime import datetime
+import base64
+import json
+
+
+def encode_audit_cursor(timestamp: datetime, log_id: int) -> str:
+    """Codifica a posição (timestamp, id) num cursor opaco"""
+    bruto = json.dumps([timestamp.isoformat(), log_id]).encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip("=")
+
+
+def decode_audit_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Descodifica um cursor opaco; levanta ValueError se for inválido"""
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, log_id = json.loads(bruto)
+        return datetime.fromisoformat(timestamp), int(log_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
 
 
 class AuditService:
@@ -16,38 +41,121 @@ class AuditService:
         entity_id: Optional[int] = None,
         ip: Optional[str] = None,
         details: Optional[str] = None
-    ) -> AuditLog:
-        """Regista ação no log de auditoria"""
-        audit_log = AuditLog(
-            user_id=user_id,
-            acao=action,
-            entidade=entity,
-            entidade_id=entity_id,
-            ip=ip,
-            detalhes=details,
-            timestamp=datetime.utcnow()
-        )
+    ) -> Optional[AuditLog]:
+        """
+        Regista ação no log de auditoria.
+        
+        Com o writer em segundo plano ativo a entrada é apenas colocada na
+        fila e é devolvido None; caso contrário é escrita e commitada já.
+        """
+        entrada = self.criar_entrada(user_id, action, entity, entity_id, ip, details)
+        if settings.audit_write_mode == "async" and audit_writer.submit(entrada):
+            return None
+        
+        audit_log = AuditLog(**entrada)
         
         self.db.add(audit_log)
+        self._atualizar_resumo([entrada])
         self.db.commit()
         self.db.refresh(audit_log)
         
         return audit_log
     
-    def get_audit_logs(
+    def log_actions(self, entradas: List[Dict[str, Any]]) -> int:
+        """
+        Regista várias ações com um único INSERT e um único commit.
+        
+        Cada entrada tem as colunas de ``AuditLog`` (``user_id``, ``acao``,
+        ``entidade``, ``entidade_id``, ``ip``, ``detalhes``, ``timestamp``).
+        """
+        if not entradas:
+            return 0
+        
+        # render_nulls: entradas com e sem entidade_id/user_id no mesmo INSERT
+        self.db.execute(insert(AuditLog).execution_options(render_nulls=True), entradas)
+        self._atualizar_resumo(entradas)
+        marcar_alteracao(self.db, AuditLog.__tablename__)
+        self.db.commit()
+        
+        return len(entradas)
+    
+    @staticmethod
+    def criar_entrada(
+        user_id: Optional[int] = None,
+        action: AcaoAudit = AcaoAudit.LOGIN,
+        entity: Optional[str] = None,
+        entity_id: Optional[int] = None,
+        ip: Optional[str] = None,
+        details: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Linha de ``audit_logs`` para uma ação, com o timestamp do momento"""
+        return {
+            "user_id": user_id,
+            "acao": AcaoAudit(action),
+            "entidade": entity,
+            "entidade_id": entity_id,
+            "ip": ip,
+            "detalhes": details,
+            "timestamp": datetime.utcnow()
+        }
+    
+    def _atualizar_resumo(self, entradas: List[Dict[str, Any]]) -> None:
+        """Incrementa os contadores de ``audit_summary`` para as entradas dadas"""
+        linhas = []
+        for entrada in entradas:
+            acao = AcaoAudit(entrada["acao"]).value
+            linhas.append({"dimensao": DimensaoAudit.ACAO, "chave": acao, "total": 1})
+            if entrada.get("entidade"):
+                linhas.append({"dimensao": DimensaoAudit.ENTIDADE, "chave": entrada["entidade"], "total": 1})
+            if entrada.get("user_id") is not None:
+                linhas.append({"dimensao": DimensaoAudit.USER, "chave": str(entrada["user_id"]), "total": 1})
+        
+        upsert_incrementar(
+            self.db,
+            AuditSummary.__table__,
+            linhas,
+            chaves=["dimensao", "chave"],
+            contador="total"
+        )
+    
+    def rebuild_audit_summary(self) -> int:
+        """
+        Recalcula todos os contadores de ``audit_summary`` a partir de
+        ``audit_logs``. Devolve o número de contadores escritos.
+        """
+        agrupamentos = [
+            (DimensaoAudit.ACAO, AuditLog.acao, None),
+            (DimensaoAudit.ENTIDADE, AuditLog.entidade, AuditLog.entidade.isnot(None)),
+            (DimensaoAudit.USER, AuditLog.user_id, AuditLog.user_id.isnot(None)),
+        ]
+        
+        linhas = []
+        for dimensao, coluna, filtro in agrupamentos:
+            query = self.db.query(coluna, func.count(AuditLog.id))
+            if filtro is not None:
+                query = query.filter(filtro)
+            for chave, total in query.group_by(coluna).all():
+                chave = chave.value if isinstance(chave, AcaoAudit) else str(chave)
+                linhas.append({"dimensao": dimensao, "chave": chave, "total": total})
+        
+        self.db.execute(delete(AuditSummary))
+        if linhas:
+            self.db.execute(AuditSummary.__table__.insert(), linhas)
+        self.db.commit()
+        
+        return len(linhas)
+    
+    def _aplicar_filtros(
         self,
+        query,
         user_id: Optional[int] = None,
         acao: Optional[AcaoAudit] = None,
         entidade: Optional[str] = None,
         data_inicio: Optional[datetime] = None,
         data_fim: Optional[datetime] = None,
-        search: Optional[str] = None,
-        skip: int = 0,
-        limit: int = 100
+        search: Optional[str] = None
     ):
-        """Obtém logs de auditoria com filtros"""
-        query = self.db.query(AuditLog)
-        
+        """Aplica os filtros comuns da listagem de auditoria"""
         if user_id:
             query = query.filter(AuditLog.user_id == user_id)
         if acao:
@@ -59,54 +167,87 @@ class AuditService:
         if data_fim:
             query = query.filter(AuditLog.timestamp <= data_fim)
         if search:
-            # Pesquisar em detalhes, entidade e ação
-            search_filter = f"%{search}%"
+            # Pesquisar em detalhes e entidade (índice de texto) e ação
+            acoes = [a for a in AcaoAudit if search.strip().upper() in a.value]
+            predicado = SearchService(self.db).filtro(AuditLog, search)
+            query = query.filter(or_(predicado, AuditLog.acao.in_(acoes)) if acoes else predicado)
+        return query
+    
+    def get_audit_logs(
+        self,
+        user_id: Optional[int] = None,
+        acao: Optional[AcaoAudit] = None,
+        entidade: Optional[str] = None,
+        data_inicio: Optional[datetime] = None,
+        data_fim: Optional[datetime] = None,
+        search: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100
+    ):
+        """Obtém logs de auditoria com filtros"""
+        query = self._aplicar_filtros(
+            self.db.query(AuditLog),
+            user_id=user_id,
+            acao=acao,
+            entidade=entidade,
+            data_inicio=data_inicio,
+            data_fim=data_fim,
+            search=search
+        )
+        
+        return query.order_by(
+            AuditLog.timestamp.desc(), AuditLog.id.desc()
+        ).offset(skip).limit(limit).all()
+    
+    def get_audit_logs_cursor(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        user_id: Optional[int] = None,
+        acao: Optional[AcaoAudit] = None,
+        entidade: Optional[str] = None,
+        data_inicio: Optional[datetime] = None,
+        data_fim: Optional[datetime] = None,
+        search: Optional[str] = None
+    ) -> Tuple[List[AuditLog], Optional[str]]:
+        """
+        Obtém logs de auditoria por paginação keyset.
+        
+        Devolve a página e o cursor opaco da página seguinte (None na última).
+        O custo de cada página é constante, independentemente da profundidade,
+        porque a posição é retomada pelo índice (timestamp, id).
+        """
+        query = self._aplicar_filtros(
+            self.db.query(AuditLog),
+            user_id=user_id,
+            acao=acao,
+            entidade=entidade,
+            data_inicio=data_inicio,
+            data_fim=data_fim,
+            search=search
+        )
+        
+        if cursor:
+            timestamp, log_id = decode_audit_cursor(cursor)
             query = query.filter(
-                (AuditLog.detalhes.ilike(search_filter)) |
-                (AuditLog.entidade.ilike(search_filter)) |
-                (AuditLog.acao.ilike(search_filter))
+                tuple_(AuditLog.timestamp, AuditLog.id) < tuple_(timestamp, log_id)
             )
         
-        return query.order_by(AuditLog.timestamp.desc()).offset(skip).limit(limit).all()
+        logs = query.order_by(
+            AuditLog.timestamp.desc(), AuditLog.id.desc()
+        ).limit(limit + 1).all()
+        
+        next_cursor = None
+        if len(logs) > limit:
+            logs = logs[:limit]
+            next_cursor = encode_audit_cursor(logs[-1].timestamp, logs[-1].id)
+        
+        return logs, next_cursor
     
     def get_audit_stats(self) -> dict:
         """Obtém estatísticas de auditoria para dashboard"""
-        total_logs = self.db.query(AuditLog).count()
-        
-        # Agregação por ação
-        stats_acao = {}
-        for acao in AcaoAudit:
-            count = self.db.query(AuditLog).filter(AuditLog.acao == acao).count()
-            stats_acao[acao.value] = count
-        
-        # Agregação por entidade
-        entidades = self.db.query(AuditLog.entidade).distinct().all()
-        stats_entidade = {}
-        for entidade in entidades:
-            if entidade[0]:  # Verificar se não é None
-                count = self.db.query(AuditLog).filter(AuditLog.entidade == entidade[0]).count()
-                stats_entidade[entidade[0]] = count
-        
-        # Usuários mais ativos
-        from sqlalchemy import func
-        usuarios_ativos = self.db.query(
-            AuditLog.user_id,
-            func.count(AuditLog.id).label('total_acoes')
-        ).filter(
-            AuditLog.user_id.isnot(None)
-        ).group_by(AuditLog.user_id).order_by(
-            func.count(AuditLog.id).desc()
-        ).limit(5).all()
-        
-        return {
-            "total_logs": total_logs,
-            "por_acao": stats_acao,
-            "por_entidade": stats_entidade,
-            "usuarios_mais_ativos": [
-                {"user_id": user.user_id, "total_acoes": user.total_acoes}
-                for user in usuarios_ativos
-            ]
-        }
+        from app.services.dashboard_service import DashboardService
+        return DashboardService(self.db).get_audit_stats()
     
     def export_audit_logs_csv(
         self,
@@ -169,26 +310,14 @@ class AuditService:
         search: Optional[str] = None
     ) -> int:
         """Conta logs de auditoria com filtros"""
-        query = self.db.query(AuditLog)
-        
-        if user_id:
-            query = query.filter(AuditLog.user_id == user_id)
-        
-        if acao:
-            query = query.filter(AuditLog.acao == acao)
-        
-        if entidade:
-            query = query.filter(AuditLog.entidade == entidade)
-        
-        if data_inicio:
-            query = query.filter(AuditLog.timestamp >= data_inicio)
-        
-        if data_fim:
-            query = query.filter(AuditLog.timestamp <= data_fim)
-        
-        if search:
-            query = query.filter(
-                AuditLog.detalhes.ilike(f"%{search}%")
-            )
+        query = self._aplicar_filtros(
+            self.db.query(AuditLog),
+            user_id=user_id,
+            acao=acao,
+            entidade=entidade,
+            data_inicio=data_inicio,
+            data_fim=data_fim,
+            search=search
+        )
         
-        return query.count()
\ No newline at end of file
+        return query.count()
@@ -0,0 +1,140 @@
+"""
+Escrita de auditoria em lote, num worker em segundo plano.
+
+As ações auditadas são colocadas numa fila e escritas por um único thread em
+``INSERT`` de várias linhas, sempre que se acumulam ``batch_size`` entradas
+ou passam ``flush_interval`` segundos. Assim um pedido não paga um commit
+(e um fsync) extra por cada ação registada.
+
+Com ``AUDIT_WRITE_MODE=sync``, ou enquanto o writer não estiver iniciado
+(ex.: nos testes), ``AuditService.log_action`` continua a escrever de forma
+síncrona.
+"""
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_PARAR = object()
+
+
+def escrever_na_base_de_dados(entradas: List[Dict[str, Any]]) -> None:
+    """Destino por omissão: insere as entradas numa sessão própria"""
+    from app.db.database import SessionLocal
+    from app.services.audit_service import AuditService
+
+    db = SessionLocal()
+    try:
+        AuditService(db).log_actions(entradas)
+    finally:
+        db.close()
+
+
+class AuditWriter:
+    """Fila de auditoria com escrita em lote num thread dedicado"""
+
+    def __init__(
+        self,
+        escrever: Callable[[List[Dict[str, Any]]], None] = escrever_na_base_de_dados,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_queue_size: int = 10000
+    ):
+        self.escrever = escrever
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._fila: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ativo(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        with self._lock:
+            if self.ativo:
+                return
+            self._thread = threading.Thread(target=self._executar, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 10.0) -> None:
+        """Escreve todas as entradas pendentes e termina o worker"""
+        with self._lock:
+            if not self.ativo:
+                return
+            self._fila.put(_PARAR)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, entrada: Dict[str, Any]) -> bool:
+        """
+        Coloca uma entrada na fila. Devolve False se o writer não estiver
+        ativo ou a fila estiver cheia; nesse caso cabe ao chamador escrever
+        a entrada de forma síncrona, para que nenhuma ação fique por registar.
+        """
+        if not self.ativo:
+            return False
+        try:
+            self._fila.put_nowait(entrada)
+            return True
+        except queue.Full:
+            logger.warning("Fila de auditoria cheia; a escrever de forma síncrona")
+            return False
+
+    def flush(self, timeout: float = 10.0) -> None:
+        """Espera até que todas as entradas já submetidas estejam escritas"""
+        if not self.ativo:
+            return
+        evento = threading.Event()
+        self._fila.put(evento)
+        evento.wait(timeout)
+
+    def _escrever_lote(self, lote: List[Dict[str, Any]]) -> None:
+        if not lote:
+            return
+        try:
+            self.escrever(lote)
+        except Exception:
+            logger.exception("Falha ao escrever lote de %d logs de auditoria; a tentar um a um", len(lote))
+            for entrada in lote:
+                try:
+                    self.escrever([entrada])
+                except Exception:
+                    logger.exception("Log de auditoria perdido: %s", entrada)
+
+    def _executar(self) -> None:
+        lote: List[Dict[str, Any]] = []
+        limite = time.monotonic() + self.flush_interval
+
+        while True:
+            try:
+                item = self._fila.get(timeout=max(0.0, limite - time.monotonic()))
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, dict):
+                lote.append(item)
+                if len(lote) < self.batch_size and time.monotonic() < limite:
+                    continue
+
+            self._escrever_lote(lote)
+            lote = []
+            limite = time.monotonic() + self.flush_interval
+
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is _PARAR:
+                return
+
+
+audit_writer = AuditWriter(
+    batch_size=settings.audit_batch_size,
+    flush_interval=settings.audit_flush_interval_seconds,
+    max_queue_size=settings.audit_queue_max_size
+)
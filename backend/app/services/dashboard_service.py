@@ -0,0 +1,421 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case, cast, Integer
+from typing import Dict, Any, List, Optional
+from app.models.projeto import Projeto, EstadoProjeto, FonteFinanciamento
+from app.models.indicador import CategoriaKPI, Indicador, Trimestre
+from app.models.licenciamento import Licenciamento, StatusLicenciamento, EntidadeResponsavel
+from app.models.audit_log import AcaoAudit
+from app.models.audit_summary import AuditSummary, DimensaoAudit
+from app.models.producao_resumo import ProducaoResumo
+from app.models.projetos_resumo import ProjetosResumo
+from app.models.provincia import Provincia
+
+
+class DashboardService:
+    """
+    Agregações do dashboard calculadas com um número fixo de queries.
+
+    Cada tabela é lida com um único GROUP BY sobre as colunas de enum, pelo que
+    o número de round-trips por carregamento não depende do número de valores
+    dos enums nem do volume de dados.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._projetos_agrupados = None
+        self._indicadores_stats = None
+        self._indicadores_kpis = None
+        self._licenciamentos_stats = None
+        self._producao_resumo = None
+        self._projetos_resumo = None
+
+    def _get_projetos_agrupados(self) -> List[Any]:
+        """Projetos agrupados por província, estado e fonte (uma query, memorizada)"""
+        if self._projetos_agrupados is None:
+            self._projetos_agrupados = self.db.query(
+                Projeto.provincia_id,
+                Projeto.estado,
+                Projeto.fonte_financiamento,
+                func.count(Projeto.id).label("total"),
+                func.coalesce(func.sum(Projeto.orcamento_previsto_kz), 0).label("previsto"),
+                func.coalesce(func.sum(Projeto.orcamento_executado_kz), 0).label("executado")
+            ).group_by(
+                Projeto.provincia_id,
+                Projeto.estado,
+                Projeto.fonte_financiamento
+            ).all()
+        return self._projetos_agrupados
+
+    def _dias_entre(self, inicio, fim):
+        """Expressão SQL com o número de dias inteiros entre duas datas"""
+        if self.db.bind.dialect.name == "sqlite":
+            return cast(func.julianday(fim) - func.julianday(inicio), Integer)
+        return func.floor(func.extract("epoch", fim - inicio) / 86400)
+
+    def get_projetos_stats(self) -> Dict[str, Any]:
+        """Estatísticas de projetos, indicadores e licenciamentos (formato de ProjetoService)"""
+        projetos_por_estado = {estado.value: 0 for estado in EstadoProjeto}
+        projetos_por_fonte = {fonte.value: 0 for fonte in FonteFinanciamento}
+        total_projetos = 0
+        total_previsto = 0.0
+        total_executado = 0.0
+
+        for linha in self._get_projetos_agrupados():
+            projetos_por_estado[linha.estado.value] += linha.total
+            projetos_por_fonte[linha.fonte_financiamento.value] += linha.total
+            total_projetos += linha.total
+            total_previsto += float(linha.previsto)
+            total_executado += float(linha.executado)
+
+        indicadores = self.get_indicadores_stats()
+        licenciamentos = self.get_licenciamentos_stats()
+
+        execucao_media_percentual = round((total_executado / total_previsto * 100), 2) if total_previsto > 0 else 0
+
+        return {
+            "total_projetos": total_projetos,
+            "total_indicadores": indicadores["total_indicadores"],
+            "total_licenciamentos": licenciamentos["total_licenciamentos"],
+            "execucao_media_percentual": execucao_media_percentual,
+            "projetos_por_estado": projetos_por_estado,
+            "projetos_por_fonte": projetos_por_fonte,
+            "indicadores_por_trimestre": indicadores["por_trimestre"],
+            "licenciamentos_por_status": licenciamentos["por_status"]
+        }
+
+    def get_indicadores_stats(self) -> Dict[str, Any]:
+        """Estatísticas de indicadores (formato de IndicadorService)"""
+        if self._indicadores_stats is not None:
+            return self._indicadores_stats
+
+        por_trimestre = {trimestre.value: 0 for trimestre in Trimestre}
+        total_indicadores = 0
+        total_meta = 0.0
+        total_atual = 0.0
+
+        linhas = self.db.query(
+            Indicador.periodo_referencia,
+            func.count(Indicador.id).label("total"),
+            func.coalesce(func.sum(Indicador.meta), 0).label("meta"),
+            func.coalesce(func.sum(Indicador.valor_actual), 0).label("atual")
+        ).group_by(Indicador.periodo_referencia).all()
+
+        for linha in linhas:
+            por_trimestre[linha.periodo_referencia.value] += linha.total
+            total_indicadores += linha.total
+            total_meta += float(linha.meta)
+            total_atual += float(linha.atual)
+
+        projetos_com_indicadores = self.db.query(
+            func.count(func.distinct(Indicador.projeto_id))
+        ).scalar() or 0
+
+        execucao_media = (total_atual / total_meta) * 100 if total_meta > 0 else 0
+
+        self._indicadores_stats = {
+            "total_indicadores": total_indicadores,
+            "por_trimestre": por_trimestre,
+            "execucao_media_percentual": round(execucao_media, 2),
+            "indicadores_por_projeto": projetos_com_indicadores
+        }
+        return self._indicadores_stats
+
+    def get_indicadores_kpis(self) -> Dict[str, Any]:
+        """KPIs dos indicadores somados por categoria_kpi (uma query, memorizada)"""
+        if self._indicadores_kpis is not None:
+            return self._indicadores_kpis
+
+        por_categoria = {categoria: 0.0 for categoria in CategoriaKPI}
+        meta_total = 0.0
+
+        linhas = self.db.query(
+            Indicador.categoria_kpi,
+            func.coalesce(func.sum(Indicador.valor_actual), 0).label("atual"),
+            func.coalesce(func.sum(Indicador.meta), 0).label("meta")
+        ).group_by(Indicador.categoria_kpi).all()
+
+        for linha in linhas:
+            por_categoria[linha.categoria_kpi] += float(linha.atual)
+            meta_total += float(linha.meta)
+
+        producao_total = sum(por_categoria.values())
+        self._indicadores_kpis = {
+            "producao_total": producao_total,
+            "meta_total": meta_total,
+            "familias_beneficiadas": int(por_categoria[CategoriaKPI.FAMILIAS_BENEFICIADAS]),
+            "empregos_criados": int(por_categoria[CategoriaKPI.EMPREGOS_CRIADOS])
+        }
+        return self._indicadores_kpis
+
+    def get_licenciamentos_stats(self) -> Dict[str, Any]:
+        """Estatísticas de licenciamentos (formato de LicenciamentoService)"""
+        if self._licenciamentos_stats is not None:
+            return self._licenciamentos_stats
+
+        por_status = {status.value: 0 for status in StatusLicenciamento}
+        por_entidade = {entidade.value: 0 for entidade in EntidadeResponsavel}
+        total_licenciamentos = 0
+        total_dias = 0
+        total_decididos = 0
+
+        dias = self._dias_entre(Licenciamento.data_submissao, Licenciamento.data_decisao)
+        linhas = self.db.query(
+            Licenciamento.status,
+            Licenciamento.entidade_responsavel,
+            func.count(Licenciamento.id).label("total"),
+            func.count(Licenciamento.data_decisao).label("decididos"),
+            func.coalesce(func.sum(
+                case((Licenciamento.data_decisao.isnot(None), dias), else_=0)
+            ), 0).label("dias")
+        ).group_by(
+            Licenciamento.status,
+            Licenciamento.entidade_responsavel
+        ).all()
+
+        for linha in linhas:
+            por_status[linha.status.value] += linha.total
+            por_entidade[linha.entidade_responsavel.value] += linha.total
+            total_licenciamentos += linha.total
+            total_decididos += linha.decididos
+            total_dias += int(linha.dias)
+
+        tempo_medio_dias = total_dias / total_decididos if total_decididos else 0
+
+        self._licenciamentos_stats = {
+            "total_licenciamentos": total_licenciamentos,
+            "por_status": por_status,
+            "por_entidade": por_entidade,
+            "tempo_medio_processamento_dias": round(tempo_medio_dias, 1),
+            "taxa_aprovacao": round(
+                (por_status[StatusLicenciamento.APROVADO.value] / total_licenciamentos * 100)
+                if total_licenciamentos > 0 else 0, 2
+            )
+        }
+        return self._licenciamentos_stats
+
+    def get_mapa_provincias(self) -> List[Dict[str, Any]]:
+        """Dados do mapa das províncias (um único LEFT JOIN ... GROUP BY)"""
+        from app.services.provincia_service import ProvinciaService
+        return ProvinciaService(self.db).get_mapa_provincias()
+
+    # --- Gráficos (tabelas de agregados de app.db.rollups) ---------------------
+
+    def _get_producao_resumo(self) -> List[Any]:
+        """Linhas não vazias de producao_resumo com o nome da província (memorizada)"""
+        if self._producao_resumo is None:
+            self._producao_resumo = self.db.query(
+                ProducaoResumo.provincia_id,
+                Provincia.nome,
+                ProducaoResumo.periodo_referencia,
+                ProducaoResumo.categoria_kpi,
+                ProducaoResumo.valor_actual,
+                ProducaoResumo.meta
+            ).join(
+                Provincia, Provincia.id == ProducaoResumo.provincia_id
+            ).filter(ProducaoResumo.total_indicadores > 0).all()
+        return self._producao_resumo
+
+    def _get_projetos_resumo(self) -> List[Any]:
+        """Linhas não vazias de projetos_resumo (memorizada)"""
+        if self._projetos_resumo is None:
+            self._projetos_resumo = self.db.query(ProjetosResumo).filter(
+                ProjetosResumo.total_projetos > 0
+            ).all()
+        return self._projetos_resumo
+
+    @staticmethod
+    def _producao_vazia() -> Dict[str, Any]:
+        return {"producao_total": 0.0, "meta_total": 0.0, "familias_beneficiadas": 0, "empregos_criados": 0}
+
+    @staticmethod
+    def _somar_producao(destino: Dict[str, Any], linha) -> None:
+        valor = float(linha.valor_actual)
+        destino["producao_total"] += valor
+        destino["meta_total"] += float(linha.meta)
+        if linha.categoria_kpi == CategoriaKPI.FAMILIAS_BENEFICIADAS.value:
+            destino["familias_beneficiadas"] += int(valor)
+        elif linha.categoria_kpi == CategoriaKPI.EMPREGOS_CRIADOS.value:
+            destino["empregos_criados"] += int(valor)
+
+    def get_producao_por_provincia(self) -> List[Dict[str, Any]]:
+        """Produção e KPIs de indicadores por província, ordenados pelo nome"""
+        por_provincia: Dict[int, Dict[str, Any]] = {}
+        for linha in self._get_producao_resumo():
+            dados = por_provincia.get(linha.provincia_id)
+            if dados is None:
+                dados = por_provincia[linha.provincia_id] = {
+                    "provincia_id": linha.provincia_id,
+                    "provincia": linha.nome,
+                    **self._producao_vazia()
+                }
+            self._somar_producao(dados, linha)
+        return sorted(por_provincia.values(), key=lambda p: p["provincia"])
+
+    def get_producao_por_trimestre(self) -> Dict[str, Dict[str, Any]]:
+        """Produção e KPIs de indicadores por trimestre"""
+        por_trimestre = {trimestre.value: self._producao_vazia() for trimestre in Trimestre}
+        for linha in self._get_producao_resumo():
+            self._somar_producao(por_trimestre[linha.periodo_referencia], linha)
+        return por_trimestre
+
+    def get_distribuicao_fontes(self) -> Dict[str, Dict[str, Any]]:
+        """Projetos e orçamento por fonte de financiamento"""
+        por_fonte = {
+            fonte.value: {"total_projetos": 0, "orcamento_previsto_kz": 0.0, "orcamento_executado_kz": 0.0}
+            for fonte in FonteFinanciamento
+        }
+        for linha in self._get_projetos_resumo():
+            dados = por_fonte[linha.fonte_financiamento]
+            dados["total_projetos"] += linha.total_projetos
+            dados["orcamento_previsto_kz"] += float(linha.orcamento_previsto_kz)
+            dados["orcamento_executado_kz"] += float(linha.orcamento_executado_kz)
+        return por_fonte
+
+    def get_evolucao_projetos(self) -> Dict[str, Dict[str, Any]]:
+        """Projetos, orçamento e execução orçamental por estado"""
+        por_estado = {
+            estado.value: {"total_projetos": 0, "orcamento_previsto_kz": 0.0, "orcamento_executado_kz": 0.0}
+            for estado in EstadoProjeto
+        }
+        for linha in self._get_projetos_resumo():
+            dados = por_estado[linha.estado]
+            dados["total_projetos"] += linha.total_projetos
+            dados["orcamento_previsto_kz"] += float(linha.orcamento_previsto_kz)
+            dados["orcamento_executado_kz"] += float(linha.orcamento_executado_kz)
+        for dados in por_estado.values():
+            previsto = dados["orcamento_previsto_kz"]
+            dados["execucao_percentual"] = round(dados["orcamento_executado_kz"] / previsto * 100, 2) if previsto > 0 else 0
+        return por_estado
+
+    def get_charts(self) -> Dict[str, Any]:
+        """Payload de /api/dashboard/charts"""
+        return {
+            "producao_por_provincia": self.get_producao_por_provincia(),
+            "producao_por_trimestre": self.get_producao_por_trimestre(),
+            "distribuicao_fontes": self.get_distribuicao_fontes(),
+            "evolucao_projetos": self.get_evolucao_projetos(),
+            "status_licenciamentos": self.get_licenciamentos_stats()["por_status"],
+            "mapa_provincias": self.get_mapa_provincias()
+        }
+
+    def get_audit_stats(self) -> Dict[str, Any]:
+        """
+        Estatísticas de auditoria (formato de AuditService), lidas dos
+        contadores de ``audit_summary`` em vez de varrer ``audit_logs``.
+        """
+        por_acao = {acao.value: 0 for acao in AcaoAudit}
+        por_entidade: Dict[str, int] = {}
+
+        linhas = self.db.query(AuditSummary.dimensao, AuditSummary.chave, AuditSummary.total).filter(
+            AuditSummary.dimensao.in_([DimensaoAudit.ACAO, DimensaoAudit.ENTIDADE])
+        ).all()
+
+        for linha in linhas:
+            if linha.dimensao == DimensaoAudit.ACAO:
+                por_acao[linha.chave] = por_acao.get(linha.chave, 0) + linha.total
+            else:
+                por_entidade[linha.chave] = linha.total
+
+        usuarios_ativos = self.db.query(AuditSummary.chave, AuditSummary.total).filter(
+            AuditSummary.dimensao == DimensaoAudit.USER
+        ).order_by(AuditSummary.total.desc()).limit(5).all()
+
+        return {
+            # Todos os logs têm ação, pelo que a soma por ação é o total
+            "total_logs": sum(por_acao.values()),
+            "por_acao": por_acao,
+            "por_entidade": por_entidade,
+            "usuarios_mais_ativos": [
+                {"user_id": int(user.chave), "total_acoes": user.total}
+                for user in usuarios_ativos
+            ]
+        }
+
+    def get_kpis(self) -> Dict[str, Any]:
+        """KPIs principais de /api/dashboard/kpis"""
+        total = ativos = concluidos = 0
+        orcamento_total = orcamento_executado = 0.0
+        provincias_cobertas = set()
+
+        for linha in self._get_projetos_agrupados():
+            total += linha.total
+            if linha.estado == EstadoProjeto.EM_EXECUCAO:
+                ativos += linha.total
+            elif linha.estado == EstadoProjeto.CONCLUIDO:
+                concluidos += linha.total
+            orcamento_total += float(linha.previsto)
+            orcamento_executado += float(linha.executado)
+            provincias_cobertas.add(linha.provincia_id)
+
+        indicadores = self.get_indicadores_kpis()
+        licenciamentos = self.get_licenciamentos_stats()
+
+        return {
+            "projetos": {
+                "total": total,
+                "ativos": ativos,
+                "concluidos": concluidos,
+                "orcamento_total": orcamento_total,
+                "orcamento_executado": orcamento_executado
+            },
+            "indicadores": {
+                "producao_total": indicadores["producao_total"],
+                "familias_beneficiadas": indicadores["familias_beneficiadas"],
+                "empregos_criados": indicadores["empregos_criados"]
+            },
+            "licenciamentos": {
+                "total": licenciamentos["total_licenciamentos"],
+                "aprovados": licenciamentos["por_status"][StatusLicenciamento.APROVADO.value],
+                "pendentes": licenciamentos["por_status"][StatusLicenciamento.PENDENTE.value],
+                "tempo_medio_aprovacao": licenciamentos["tempo_medio_processamento_dias"]
+            },
+            "cobertura": {
+                "provincias_cobertas": len(provincias_cobertas),
+                "percentual_cobertura": (len(provincias_cobertas) / 21) * 100
+            }
+        }
+
+    def get_dashboard_stats(self, user_role: Optional[str] = None) -> Dict[str, Any]:
+        """Payload completo de /api/dashboard/stats"""
+        projetos_stats = self.get_projetos_stats()
+        indicadores_stats = self.get_indicadores_stats()
+        licenciamentos_stats = self.get_licenciamentos_stats()
+        mapa_data = self.get_mapa_provincias()
+
+        # Estatísticas de auditoria apenas para ROOT
+        audit_stats = None
+        if user_role == "ROOT":
+            audit_stats = self.get_audit_stats()
+
+        return {
+            "projetos": projetos_stats,
+            "indicadores": indicadores_stats,
+            "licenciamentos": licenciamentos_stats,
+            "mapa": mapa_data,
+            "auditoria": audit_stats,
+            "resumo": {
+                "total_projetos": projetos_stats.get("total_projetos", 0),
+                "projetos_ativos": projetos_stats.get("projetos_por_estado", {}).get("EM_EXECUCAO", 0),
+                "total_provincias_cobertas": len([p for p in mapa_data if p.get("total_projetos", 0) > 0]),
+                "total_indicadores": indicadores_stats.get("total_indicadores", 0),
+                "licencas_aprovadas": licenciamentos_stats.get("por_status", {}).get("APROVADO", 0),
+                "licencas_pendentes": licenciamentos_stats.get("por_status", {}).get("PENDENTE", 0),
+            },
+            "kpis_18_meses": {
+                "producao_total_toneladas": 0,  # TODO: Implementar cálculo específico
+                "familias_beneficiadas": 0,     # TODO: Implementar cálculo específico
+                "empregos_criados": 0,          # TODO: Implementar cálculo específico
+                "execucao_orcamental_percentual": indicadores_stats.get("execucao_media_percentual", 0),
+                "licencas_fast_track": licenciamentos_stats.get("total_licenciamentos", 0)
+            },
+            "distribuicao_fontes": projetos_stats.get("por_fonte_financiamento", {}),
+            "distribuicao_tipos": projetos_stats.get("por_tipo", {}),
+            "distribuicao_estados": projetos_stats.get("por_estado", {}),
+            "evolucao_trimestral": indicadores_stats.get("por_trimestre", {}),
+            "meta_data": {
+                "ultima_atualizacao": "2025-01-01T00:00:00Z",
+                "periodo_referencia": "18 meses (2024-2025)",
+                "total_provincias": 21,
+                "user_role": user_role
+            }
+        }
@@ -1,9 +1,10 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import and_, or_
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict, Sequence, Type, Union
 from app.models.eixo_5w2h import Eixo5W2H, Periodo5W2H
 from app.models.audit_log import AcaoAudit
-from app.schemas.eixo_5w2h import Eixo5W2HCreate, Eixo5W2HUpdate
+from app.schemas.eixo_5w2h import Eixo5W2HCreate, Eixo5W2HUpdate, Eixo5W2HResponse
+from app.schemas.leitura import ModeloResumo
 from app.services.audit_service import AuditService
 from datetime import datetime
 
@@ -37,10 +38,20 @@ class Eixo5W2HService:
         limit: int = 100,
         projeto_id: Optional[int] = None,
         periodo: Optional[Periodo5W2H] = None,
-        search: Optional[str] = None
-    ) -> List[Eixo5W2H]:
-        """Lista eixos 5W2H com filtros"""
-        query = self.db.query(Eixo5W2H)
+        search: Optional[str] = None,
+        opcoes: Optional[Sequence[Any]] = None,
+        resumo: Optional[Type[ModeloResumo]] = None
+    ) -> Union[List[Eixo5W2H], List[Dict[str, Any]]]:
+        """
+        Lista eixos 5W2H com filtros.
+
+        ``opcoes`` carregam as relações serializadas (por omissão as de
+        ``Eixo5W2HResponse``); com ``resumo`` devolve dicionários só com as colunas
+        desse modelo de leitura.
+        """
+        if opcoes is None:
+            opcoes = Eixo5W2HResponse.opcoes_carregamento
+        query = resumo.consulta(self.db) if resumo else self.db.query(Eixo5W2H).options(*opcoes)
         
         if projeto_id:
             query = query.filter(Eixo5W2H.projeto_id == projeto_id)
@@ -59,11 +70,12 @@ class Eixo5W2HService:
                 )
             )
         
-        return query.offset(skip).limit(limit).all()
+        resultados = query.offset(skip).limit(limit).all()
+        return resumo.linhas(resultados) if resumo else resultados
 
     def get_eixo_5w2h_by_id(self, eixo_id: int) -> Optional[Eixo5W2H]:
         """Obtém eixo 5W2H por ID"""
-        return self.db.query(Eixo5W2H).filter(Eixo5W2H.id == eixo_id).first()
+        return self.db.query(Eixo5W2H).options(joinedload(Eixo5W2H.projeto)).filter(Eixo5W2H.id == eixo_id).first()
 
     def update_eixo_5w2h(
         self,
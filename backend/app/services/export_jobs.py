@@ -0,0 +1,326 @@
+"""
+Jobs de exportação executados fora dos workers da API.
+
+Um pedido de exportação cria um job e devolve logo o seu id; o relatório é
+gerado num pool de processos e guardado em disco, de onde é descarregado
+quando estiver pronto. O estado de cada job vive num ficheiro JSON ao lado
+do artefacto, pelo que é partilhado por todos os workers da mesma máquina.
+
+O id do job é o hash do tipo, dos parâmetros e das versões dos dados de que
+o relatório depende: pedidos idênticos sobre os mesmos dados reutilizam o
+mesmo job (em curso ou concluído) em vez de gerar outro. Um job concluído só
+é reutilizado com versões partilhadas (Redis); as versões locais recomeçam a
+cada arranque e não veem as escritas dos outros workers, pelo que aí o id
+inclui também um identificador do arranque e só os jobs em curso são
+reutilizados. Jobs e artefactos são apagados ao fim de
+``EXPORT_JOBS_TTL_SECONDS``.
+"""
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.db.engine import criar_engine
+from app.schemas.export_job import (
+    TipoExport, EstadoExportJob, IndicadoresExportParams, AuditoriaExportParams, DatabaseExportParams
+)
+
+logger = logging.getLogger(__name__)
+
+PARAMETROS_POR_TIPO = {
+    TipoExport.INDICADORES_CSV: IndicadoresExportParams,
+    TipoExport.INDICADORES_EXCEL: IndicadoresExportParams,
+    TipoExport.INDICADORES_PDF: IndicadoresExportParams,
+    TipoExport.AUDITORIA_CSV: AuditoriaExportParams,
+    TipoExport.DATABASE_JSON: DatabaseExportParams,
+}
+
+# Tabelas cujas alterações tornam um artefacto já gerado desatualizado
+ENTIDADES_POR_TIPO = {
+    TipoExport.INDICADORES_CSV: ("indicadores", "projetos", "provincias"),
+    TipoExport.INDICADORES_EXCEL: ("indicadores", "projetos", "provincias"),
+    TipoExport.INDICADORES_PDF: ("indicadores", "projetos", "provincias"),
+    TipoExport.AUDITORIA_CSV: ("audit_logs", "users"),
+    TipoExport.DATABASE_JSON: (
+        "users", "provincias", "projetos", "indicadores", "licenciamentos", "eixos_5w2h", "audit_logs"
+    ),
+}
+
+FORMATOS_POR_TIPO = {
+    TipoExport.INDICADORES_CSV: ("csv", "text/csv"),
+    TipoExport.INDICADORES_EXCEL: ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    TipoExport.INDICADORES_PDF: ("pdf", "application/pdf"),
+    TipoExport.AUDITORIA_CSV: ("csv", "text/csv"),
+    TipoExport.DATABASE_JSON: ("json", "application/json"),
+}
+
+
+def validar_parametros(tipo: TipoExport, parametros: Dict[str, Any]) -> Dict[str, Any]:
+    """Valida os parâmetros do tipo de exportação e devolve-os normalizados (JSON)"""
+    return PARAMETROS_POR_TIPO[tipo].model_validate(parametros).model_dump(mode="json", exclude_none=True)
+
+
+# --- Estado dos jobs em disco -------------------------------------------------
+
+# Sufixo dos ficheiros de estado (distinto das extensões dos artefactos, ex.: .json)
+SUFIXO_ESTADO = ".job.json"
+
+
+def _caminho_estado(diretorio: str, job_id: str) -> str:
+    return os.path.join(diretorio, f"{job_id}{SUFIXO_ESTADO}")
+
+
+def caminho_artefacto(diretorio: str, job: Dict[str, Any]) -> str:
+    extensao, _ = FORMATOS_POR_TIPO[TipoExport(job["tipo"])]
+    return os.path.join(diretorio, f"{job['id']}.{extensao}")
+
+
+def ler_estado(diretorio: str, job_id: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_caminho_estado(diretorio, job_id)) as ficheiro:
+            return json.load(ficheiro)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _escrever_estado(diretorio: str, job: Dict[str, Any]) -> None:
+    temporario = f"{_caminho_estado(diretorio, job['id'])}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporario, "w") as ficheiro:
+        json.dump(job, ficheiro)
+    os.replace(temporario, _caminho_estado(diretorio, job["id"]))
+
+
+def _atualizar_estado(diretorio: str, job_id: str, **alteracoes) -> Optional[Dict[str, Any]]:
+    job = ler_estado(diretorio, job_id)
+    if job is None:
+        return None
+    job.update(alteracoes)
+    _escrever_estado(diretorio, job)
+    return job
+
+
+# --- Execução (no processo do pool) ------------------------------------------
+
+def _gerar_artefacto(db, tipo: TipoExport, parametros: Dict[str, Any], destino: str) -> None:
+    from app.services.export_service import ExportService
+    from app.services.audit_service import AuditService
+
+    params = PARAMETROS_POR_TIPO[tipo].model_validate(parametros)
+
+    if tipo == TipoExport.INDICADORES_CSV:
+        with open(destino, "w", encoding="utf-8", newline="") as ficheiro:
+            for parte in ExportService(db).iter_indicadores_csv(params.projeto_id, params.periodo_referencia):
+                ficheiro.write(parte)
+    elif tipo == TipoExport.INDICADORES_EXCEL:
+        ExportService(db).write_indicadores_excel(destino, params.projeto_id, params.periodo_referencia)
+    elif tipo == TipoExport.INDICADORES_PDF:
+        with open(destino, "wb") as ficheiro:
+            ficheiro.write(ExportService(db).export_indicadores_pdf(params.projeto_id, params.periodo_referencia))
+    elif tipo == TipoExport.AUDITORIA_CSV:
+        with open(destino, "w", encoding="utf-8", newline="") as ficheiro:
+            ficheiro.write(AuditService(db).export_audit_logs_csv(**params.model_dump()))
+    elif tipo == TipoExport.DATABASE_JSON:
+        from app.api.admin import export_database_as_json
+        with open(destino, "w") as ficheiro:
+            json.dump(export_database_as_json(db), ficheiro, indent=2, default=str)
+
+
+def executar_export_job(diretorio: str, job_id: str, database_url: str) -> None:
+    """Gera o artefacto de um job; corre num processo do pool"""
+    job = _atualizar_estado(
+        diretorio, job_id, status=EstadoExportJob.EM_EXECUCAO.value, iniciado_em=datetime.utcnow().isoformat()
+    )
+    if job is None:
+        return
+
+    engine = criar_engine(
+        database_url, application_name=f"{settings.db_application_name}-exports", pool_size=1, max_overflow=0
+    )
+    db = sessionmaker(bind=engine)()
+    destino = caminho_artefacto(diretorio, job)
+    temporario = f"{destino}.{os.getpid()}.tmp"
+    try:
+        _gerar_artefacto(db, TipoExport(job["tipo"]), job["parametros"], temporario)
+        os.replace(temporario, destino)
+        _atualizar_estado(
+            diretorio, job_id, status=EstadoExportJob.CONCLUIDO.value, concluido_em=datetime.utcnow().isoformat()
+        )
+    except Exception as e:
+        logger.exception("Falha no job de exportação %s", job_id)
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        _atualizar_estado(
+            diretorio, job_id, status=EstadoExportJob.FALHOU.value,
+            concluido_em=datetime.utcnow().isoformat(), erro=getattr(e, "detail", None) or str(e)
+        )
+    finally:
+        db.close()
+        engine.dispose()
+
+
+# --- Gestão dos jobs (nos workers da API) ------------------------------------
+
+class ExportJobManager:
+    """Submete, deduplica e limpa jobs de exportação"""
+
+    def __init__(
+        self,
+        diretorio: str,
+        ttl_seconds: int = 3600,
+        max_workers: int = 2,
+        database_url: Optional[str] = None,
+        executor: Optional[Executor] = None
+    ):
+        self.diretorio = diretorio
+        self.ttl_seconds = ttl_seconds
+        self.max_workers = max_workers
+        self.database_url = database_url or settings.database_url
+        self._executor = executor
+        self._lock = threading.Lock()
+        # Distingue os jobs deste arranque quando as versões dos dados são locais
+        self._arranque = uuid.uuid4().hex
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: o processo filho não herda ligações nem threads do worker
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _job_id(self, tipo: TipoExport, parametros: Dict[str, Any], partilhadas: bool) -> str:
+        from app.core.cache import data_versions
+
+        chave = {
+            "tipo": tipo.value,
+            "parametros": parametros,
+            "versoes": data_versions.get(ENTIDADES_POR_TIPO[tipo]),
+            "database": self.database_url
+        }
+        if not partilhadas:
+            chave["arranque"] = self._arranque
+        return hashlib.sha256(json.dumps(chave, sort_keys=True).encode()).hexdigest()[:32]
+
+    def _reutilizavel(self, job: Dict[str, Any], partilhadas: bool) -> bool:
+        if self._expirado(job):
+            return False
+        if job["status"] == EstadoExportJob.CONCLUIDO.value:
+            return partilhadas
+        return job["status"] != EstadoExportJob.FALHOU.value
+
+    def _expirado(self, job: Dict[str, Any]) -> bool:
+        criado_em = datetime.fromisoformat(job["criado_em"])
+        return datetime.utcnow() - criado_em > timedelta(seconds=self.ttl_seconds)
+
+    def submit(self, tipo: TipoExport, parametros: Dict[str, Any], user_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Cria o job (ou devolve o job idêntico já existente) e agenda-o.
+
+        ``parametros`` devem já estar normalizados por ``validar_parametros``.
+        """
+        from app.core.cache import data_versions
+
+        os.makedirs(self.diretorio, exist_ok=True)
+        self.limpar_expirados()
+        partilhadas = data_versions.partilhadas
+        job_id = self._job_id(tipo, parametros, partilhadas)
+
+        while True:
+            existente = ler_estado(self.diretorio, job_id)
+            if existente is not None:
+                if self._reutilizavel(existente, partilhadas):
+                    return existente
+                self._remover(existente)
+
+            job = {
+                "id": job_id,
+                "tipo": tipo.value,
+                "parametros": parametros,
+                "status": EstadoExportJob.PENDENTE.value,
+                "criado_em": datetime.utcnow().isoformat(),
+                "iniciado_em": None,
+                "concluido_em": None,
+                "erro": None,
+                "user_id": user_id
+            }
+            # O_EXCL garante que só um worker cria (e agenda) cada job
+            try:
+                fd = os.open(_caminho_estado(self.diretorio, job_id), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                continue
+            with os.fdopen(fd, "w") as ficheiro:
+                json.dump(job, ficheiro)
+            break
+
+        try:
+            futuro = self._get_executor().submit(executar_export_job, self.diretorio, job_id, self.database_url)
+        except Exception as e:
+            return _atualizar_estado(self.diretorio, job_id, status=EstadoExportJob.FALHOU.value, erro=str(e))
+
+        futuro.add_done_callback(lambda f: self._verificar_falha(job_id, f))
+        return job
+
+    def _verificar_falha(self, job_id: str, futuro) -> None:
+        """Marca como falhado um job cujo processo terminou sem atualizar o estado"""
+        # futuro.exception() levanta CancelledError para jobs cancelados (shutdown)
+        erro = "Job cancelado" if futuro.cancelled() else futuro.exception()
+        if erro is None:
+            return
+        job = ler_estado(self.diretorio, job_id)
+        if job and job["status"] in (EstadoExportJob.PENDENTE.value, EstadoExportJob.EM_EXECUCAO.value):
+            _atualizar_estado(self.diretorio, job_id, status=EstadoExportJob.FALHOU.value, erro=str(erro))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if not job_id.isalnum():
+            return None
+        job = ler_estado(self.diretorio, job_id)
+        if job is None or self._expirado(job):
+            return None
+        return job
+
+    def caminho_artefacto(self, job: Dict[str, Any]) -> str:
+        return caminho_artefacto(self.diretorio, job)
+
+    def _remover(self, job: Dict[str, Any]) -> None:
+        for caminho in (caminho_artefacto(self.diretorio, job), _caminho_estado(self.diretorio, job["id"])):
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+
+    def limpar_expirados(self) -> int:
+        """Apaga jobs e artefactos com mais de ``ttl_seconds``; devolve quantos"""
+        if not os.path.isdir(self.diretorio):
+            return 0
+        removidos = 0
+        for nome in os.listdir(self.diretorio):
+            if not nome.endswith(SUFIXO_ESTADO):
+                continue
+            job = ler_estado(self.diretorio, nome[:-len(SUFIXO_ESTADO)])
+            if job is not None and self._expirado(job):
+                self._remover(job)
+                removidos += 1
+        return removidos
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+export_jobs = ExportJobManager(
+    diretorio=settings.export_jobs_dir,
+    ttl_seconds=settings.export_jobs_ttl_seconds,
+    max_workers=settings.export_jobs_max_workers
+)
@@ -1,19 +1,131 @@
-import pandas as pd
+import csv
 import io
-from typing import List, Optional, Dict, Any
+import os
+import tempfile
+from typing import Iterator, List, Optional, Dict, Any
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from app.models.indicador import Indicador, Trimestre
 from app.models.projeto import Projeto
 from app.models.provincia import Provincia
 from datetime import datetime
-import json
+
+COLUNAS_EXPORT_INDICADORES = [
+    'ID',
+    'Nome do Indicador',
+    'Projeto',
+    'Província',
+    'Trimestre',
+    'Meta',
+    'Valor Atual',
+    'Unidade',
+    'Progresso (%)',
+    'Fonte de Dados',
+    'Data de Criação',
+    'Última Atualização'
+]
+
+# Linhas lidas da base de dados (e escritas no CSV) de cada vez
+EXPORT_YIELD_PER = 1000
 
 
 class ExportService:
     def __init__(self, db: Session):
         self.db = db
 
+    def _query_indicadores(
+        self,
+        projeto_id: Optional[int] = None,
+        periodo_referencia: Optional[Trimestre] = None
+    ):
+        """Query de exportação: só as colunas necessárias, com projeto e província no mesmo SELECT"""
+        query = select(
+            Indicador.id,
+            Indicador.nome,
+            Projeto.nome.label('projeto_nome'),
+            Provincia.nome.label('provincia_nome'),
+            Indicador.periodo_referencia,
+            Indicador.meta,
+            Indicador.valor_actual,
+            Indicador.unidade,
+            Indicador.fonte_dados,
+            Indicador.created_at,
+            Indicador.updated_at
+        ).join(Projeto, Indicador.projeto_id == Projeto.id).join(Provincia, Projeto.provincia_id == Provincia.id)
+
+        if projeto_id:
+            query = query.where(Indicador.projeto_id == projeto_id)
+        if periodo_referencia:
+            query = query.where(Indicador.periodo_referencia == periodo_referencia)
+
+        return query.order_by(Indicador.id)
+
+    def _iter_linhas_indicadores(
+        self,
+        projeto_id: Optional[int] = None,
+        periodo_referencia: Optional[Trimestre] = None
+    ) -> Iterator[List[Any]]:
+        """
+        Linhas de exportação (na ordem de ``COLUNAS_EXPORT_INDICADORES``) lidas
+        com cursor do servidor, ``EXPORT_YIELD_PER`` de cada vez.
+        """
+        query = self._query_indicadores(projeto_id, periodo_referencia)
+        resultado = self.db.execute(query.execution_options(yield_per=EXPORT_YIELD_PER))
+        for row in resultado:
+            meta = float(row.meta)
+            valor_actual = float(row.valor_actual or 0)
+            progresso = (valor_actual / meta * 100) if meta > 0 else 0
+
+            yield [
+                row.id,
+                row.nome,
+                row.projeto_nome,
+                row.provincia_nome,
+                row.periodo_referencia.value,
+                meta,
+                valor_actual,
+                row.unidade,
+                round(progresso, 2),
+                row.fonte_dados,
+                row.created_at.strftime('%d/%m/%Y %H:%M') if row.created_at else '',
+                row.updated_at.strftime('%d/%m/%Y %H:%M') if row.updated_at else ''
+            ]
+
+    def _existem_indicadores(
+        self,
+        projeto_id: Optional[int] = None,
+        periodo_referencia: Optional[Trimestre] = None
+    ) -> bool:
+        query = self._query_indicadores(projeto_id, periodo_referencia).limit(1)
+        return self.db.execute(query).first() is not None
+
+    def iter_indicadores_csv(
+        self,
+        projeto_id: Optional[int] = None,
+        periodo_referencia: Optional[Trimestre] = None
+    ) -> Iterator[str]:
+        """
+        Gera o CSV de indicadores por partes, para ``StreamingResponse``.
+        
+        Cada parte tem até ``EXPORT_YIELD_PER`` linhas, pelo que a memória
+        usada não depende do número de indicadores.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=';', lineterminator='\n')
+
+        buffer.write('\ufeff')
+        writer.writerow(COLUNAS_EXPORT_INDICADORES)
+
+        for numero, linha in enumerate(self._iter_linhas_indicadores(projeto_id, periodo_referencia), start=1):
+            writer.writerow(linha)
+            if numero % EXPORT_YIELD_PER == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        yield buffer.getvalue()
+
     def export_indicadores_csv(
         self, 
         projeto_id: Optional[int] = None, 
@@ -21,47 +133,10 @@ class ExportService:
     ) -> str:
         """Exporta indicadores para CSV"""
         try:
-            # Query indicadores com joins
-            query = self.db.query(Indicador).join(Projeto).join(Provincia)
-            
-            if projeto_id:
-                query = query.filter(Indicador.projeto_id == projeto_id)
-            if periodo_referencia:
-                query = query.filter(Indicador.periodo_referencia == periodo_referencia)
-            
-            indicadores = query.all()
-            
-            if not indicadores:
+            if not self._existem_indicadores(projeto_id, periodo_referencia):
                 return "Nenhum indicador encontrado para exportação"
             
-            # Preparar dados para DataFrame
-            data = []
-            for indicador in indicadores:
-                progresso = (indicador.valor_actual / indicador.meta * 100) if indicador.meta > 0 else 0
-                
-                data.append({
-                    'ID': indicador.id,
-                    'Nome do Indicador': indicador.nome,
-                    'Projeto': indicador.projeto.nome,
-                    'Província': indicador.projeto.provincia.nome,
-                    'Trimestre': indicador.periodo_referencia,
-                    'Meta': float(indicador.meta),
-                    'Valor Atual': float(indicador.valor_actual),
-                    'Unidade': indicador.unidade,
-                    'Progresso (%)': round(progresso, 2),
-                    'Fonte de Dados': indicador.fonte_dados,
-                    'Data de Criação': indicador.created_at.strftime('%d/%m/%Y %H:%M') if indicador.created_at else '',
-                    'Última Atualização': indicador.updated_at.strftime('%d/%m/%Y %H:%M') if indicador.updated_at else ''
-                })
-            
-            # Criar DataFrame
-            df = pd.DataFrame(data)
-            
-            # Converter para CSV
-            csv_buffer = io.StringIO()
-            df.to_csv(csv_buffer, index=False, encoding='utf-8-sig', sep=';')
-            
-            return csv_buffer.getvalue()
+            return "".join(self.iter_indicadores_csv(projeto_id, periodo_referencia))
             
         except Exception as e:
             raise HTTPException(
@@ -69,70 +144,61 @@ class ExportService:
                 detail=f"Erro ao exportar indicadores para CSV: {str(e)}"
             )
 
+    def write_indicadores_excel(
+        self,
+        destino: str,
+        projeto_id: Optional[int] = None,
+        periodo_referencia: Optional[Trimestre] = None
+    ) -> int:
+        """
+        Escreve o Excel de indicadores em ``destino`` e devolve o número de linhas.
+        
+        Usa um workbook ``write_only`` do openpyxl, que escreve as linhas em
+        disco à medida que são produzidas; o resumo e as estatísticas por
+        província são agregados durante a mesma passagem.
+        """
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        folha = workbook.create_sheet('Indicadores')
+        folha.append(COLUNAS_EXPORT_INDICADORES)
+
+        resumo = _ResumoIndicadores()
+        for linha in self._iter_linhas_indicadores(projeto_id, periodo_referencia):
+            folha.append(linha)
+            resumo.adicionar(linha)
+
+        if resumo.total:
+            self._create_summary_sheet(workbook, resumo)
+            self._create_province_stats_sheet(workbook, resumo)
+
+        workbook.save(destino)
+        return resumo.total
+
     def export_indicadores_excel(
         self, 
         projeto_id: Optional[int] = None, 
         periodo_referencia: Optional[Trimestre] = None
     ) -> bytes:
         """Exporta indicadores para Excel"""
+        fd, caminho = tempfile.mkstemp(suffix='.xlsx')
+        os.close(fd)
         try:
-            # Query indicadores com joins
-            query = self.db.query(Indicador).join(Projeto).join(Provincia)
-            
-            if projeto_id:
-                query = query.filter(Indicador.projeto_id == projeto_id)
-            if periodo_referencia:
-                query = query.filter(Indicador.periodo_referencia == periodo_referencia)
-            
-            indicadores = query.all()
-            
-            if not indicadores:
+            if not self.write_indicadores_excel(caminho, projeto_id, periodo_referencia):
                 raise HTTPException(status_code=404, detail="Nenhum indicador encontrado para exportação")
             
-            # Preparar dados para DataFrame
-            data = []
-            for indicador in indicadores:
-                progresso = (indicador.valor_actual / indicador.meta * 100) if indicador.meta > 0 else 0
-                
-                data.append({
-                    'ID': indicador.id,
-                    'Nome do Indicador': indicador.nome,
-                    'Projeto': indicador.projeto.nome,
-                    'Província': indicador.projeto.provincia.nome,
-                    'Trimestre': indicador.periodo_referencia,
-                    'Meta': float(indicador.meta),
-                    'Valor Atual': float(indicador.valor_actual),
-                    'Unidade': indicador.unidade,
-                    'Progresso (%)': round(progresso, 2),
-                    'Fonte de Dados': indicador.fonte_dados,
-                    'Data de Criação': indicador.created_at.strftime('%d/%m/%Y %H:%M') if indicador.created_at else '',
-                    'Última Atualização': indicador.updated_at.strftime('%d/%m/%Y %H:%M') if indicador.updated_at else ''
-                })
-            
-            # Criar DataFrame
-            df = pd.DataFrame(data)
-            
-            # Criar arquivo Excel em memória
-            excel_buffer = io.BytesIO()
-            
-            with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-                # Aba principal com dados
-                df.to_excel(writer, sheet_name='Indicadores', index=False)
-                
-                # Aba de resumo
-                self._create_summary_sheet(writer, df, indicadores)
-                
-                # Aba de estatísticas por província
-                self._create_province_stats_sheet(writer, df)
-            
-            excel_buffer.seek(0)
-            return excel_buffer.getvalue()
+            with open(caminho, 'rb') as ficheiro:
+                return ficheiro.read()
             
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=500, 
                 detail=f"Erro ao exportar indicadores para Excel: {str(e)}"
             )
+        finally:
+            os.remove(caminho)
 
     def export_indicadores_pdf(
         self, 
@@ -147,15 +213,8 @@ class ExportService:
             from reportlab.lib import colors
             from reportlab.lib.units import inch
             
-            # Query indicadores com joins
-            query = self.db.query(Indicador).join(Projeto).join(Provincia)
-            
-            if projeto_id:
-                query = query.filter(Indicador.projeto_id == projeto_id)
-            if periodo_referencia:
-                query = query.filter(Indicador.periodo_referencia == periodo_referencia)
-            
-            indicadores = query.all()
+            # Indicadores com projeto e província numa só query
+            indicadores = list(self._iter_linhas_indicadores(projeto_id, periodo_referencia))
             
             if not indicadores:
                 raise HTTPException(status_code=404, detail="Nenhum indicador encontrado para exportação")
@@ -207,17 +266,15 @@ class ExportService:
             # Tabela de indicadores
             table_data = [['ID', 'Indicador', 'Projeto', 'Província', 'Trimestre', 'Meta', 'Atual', 'Progresso']]
             
-            for indicador in indicadores:
-                progresso = (indicador.valor_actual / indicador.meta * 100) if indicador.meta > 0 else 0
-                
+            for id_, nome, projeto, provincia, trimestre, meta, valor_actual, _, progresso, *_ in indicadores:
                 table_data.append([
-                    str(indicador.id),
-                    indicador.nome[:30] + '...' if len(indicador.nome) > 30 else indicador.nome,
-                    indicador.projeto.nome[:20] + '...' if len(indicador.projeto.nome) > 20 else indicador.projeto.nome,
-                    indicador.projeto.provincia.nome,
-                    indicador.periodo_referencia,
-                    f"{float(indicador.meta):,.0f}",
-                    f"{float(indicador.valor_actual):,.0f}",
+                    str(id_),
+                    nome[:30] + '...' if len(nome) > 30 else nome,
+                    projeto[:20] + '...' if len(projeto) > 20 else projeto,
+                    provincia,
+                    trimestre,
+                    f"{meta:,.0f}",
+                    f"{valor_actual:,.0f}",
                     f"{progresso:.1f}%"
                 ])
             
@@ -244,50 +301,68 @@ class ExportService:
             
             return pdf_buffer.getvalue()
             
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=500, 
                 detail=f"Erro ao exportar indicadores para PDF: {str(e)}"
             )
 
-    def _create_summary_sheet(self, writer, df: pd.DataFrame, indicadores: List[Indicador]):
+    def _create_summary_sheet(self, workbook, resumo: "_ResumoIndicadores"):
         """Cria aba de resumo no Excel"""
-        summary_data = {
-            'Métrica': [
-                'Total de Indicadores',
-                'Meta Total',
-                'Valor Total Atual',
-                'Progresso Médio (%)',
-                'Indicadores Acima da Meta',
-                'Indicadores Abaixo da Meta',
-                'Projetos com Indicadores',
-                'Províncias Cobertas'
-            ],
-            'Valor': [
-                len(indicadores),
-                f"{df['Meta'].sum():,.0f}",
-                f"{df['Valor Atual'].sum():,.0f}",
-                f"{df['Progresso (%)'].mean():.1f}",
-                len(df[df['Progresso (%)'] >= 100]),
-                len(df[df['Progresso (%)'] < 100]),
-                df['Projeto'].nunique(),
-                df['Província'].nunique()
-            ]
-        }
-        
-        summary_df = pd.DataFrame(summary_data)
-        summary_df.to_excel(writer, sheet_name='Resumo', index=False)
+        folha = workbook.create_sheet('Resumo')
+        folha.append(['Métrica', 'Valor'])
+        for metrica, valor in [
+            ('Total de Indicadores', resumo.total),
+            ('Meta Total', f"{resumo.meta_total:,.0f}"),
+            ('Valor Total Atual', f"{resumo.valor_total:,.0f}"),
+            ('Progresso Médio (%)', f"{resumo.progresso_total / resumo.total:.1f}"),
+            ('Indicadores Acima da Meta', resumo.acima_da_meta),
+            ('Indicadores Abaixo da Meta', resumo.total - resumo.acima_da_meta),
+            ('Projetos com Indicadores', len(resumo.projetos)),
+            ('Províncias Cobertas', len(resumo.por_provincia))
+        ]:
+            folha.append([metrica, valor])
 
-    def _create_province_stats_sheet(self, writer, df: pd.DataFrame):
+    def _create_province_stats_sheet(self, workbook, resumo: "_ResumoIndicadores"):
         """Cria aba de estatísticas por província"""
-        province_stats = df.groupby('Província').agg({
-            'ID': 'count',
-            'Meta': 'sum',
-            'Valor Atual': 'sum',
-            'Progresso (%)': 'mean'
-        }).round(2)
-        
-        province_stats.columns = ['Total Indicadores', 'Meta Total', 'Valor Total', 'Progresso Médio (%)']
-        province_stats = province_stats.sort_values('Progresso Médio (%)', ascending=False)
-        
-        province_stats.to_excel(writer, sheet_name='Por Província')
+        folha = workbook.create_sheet('Por Província')
+        folha.append(['Província', 'Total Indicadores', 'Meta Total', 'Valor Total', 'Progresso Médio (%)'])
+
+        linhas = [
+            [provincia, total, round(meta, 2), round(valor, 2), round(progresso / total, 2)]
+            for provincia, (total, meta, valor, progresso) in resumo.por_provincia.items()
+        ]
+        for linha in sorted(linhas, key=lambda linha: linha[4], reverse=True):
+            folha.append(linha)
+
+
+class _ResumoIndicadores:
+    """Agregados do resumo do Excel, acumulados linha a linha"""
+
+    def __init__(self):
+        self.total = 0
+        self.meta_total = 0.0
+        self.valor_total = 0.0
+        self.progresso_total = 0.0
+        self.acima_da_meta = 0
+        self.projetos = set()
+        # província -> [total, meta, valor, soma do progresso]
+        self.por_provincia: Dict[str, List[float]] = {}
+
+    def adicionar(self, linha: List[Any]):
+        _, _, projeto, provincia, _, meta, valor_actual, _, progresso, *_ = linha
+        self.total += 1
+        self.meta_total += meta
+        self.valor_total += valor_actual
+        self.progresso_total += progresso
+        if progresso >= 100:
+            self.acima_da_meta += 1
+        self.projetos.add(projeto)
+
+        estatisticas = self.por_provincia.setdefault(provincia, [0, 0.0, 0.0, 0.0])
+        estatisticas[0] += 1
+        estatisticas[1] += meta
+        estatisticas[2] += valor_actual
+        estatisticas[3] += progresso
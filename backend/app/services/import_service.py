@@ -0,0 +1,98 @@
+"""
+Motor de importação em lote.
+
+As linhas já validadas são inseridas em blocos com um único ``INSERT`` de
+várias linhas (``executemany`` com ``RETURNING``), cada bloco dentro de um
+savepoint. Se um bloco falhar (ex.: violação de restrição), o savepoint é
+revertido e apenas esse bloco é repetido linha a linha, para identificar as
+linhas com erro sem perder as restantes.
+"""
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+from sqlalchemy import Row, insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.cache import marcar_alteracao
+
+logger = logging.getLogger(__name__)
+
+# Linha a importar: (número da linha no ficheiro/payload, valores das colunas)
+LinhaImportacao = Tuple[int, Dict[str, Any]]
+
+
+def formatar_erro_linha(numero_linha: int, erro: Any) -> str:
+    """Mensagem de erro no formato usado nos relatórios de importação"""
+    return f"Linha {numero_linha}: {erro}"
+
+
+class ImportadorEmLote:
+    """
+    Insere linhas de um modelo em blocos, com savepoint por bloco.
+
+    ``retorno`` indica as colunas devolvidas por cada linha inserida (por
+    omissão apenas o ``id``). A ordem das linhas devolvidas não é garantida,
+    por isso devem incluir o que for preciso para as identificar.
+    """
+
+    def __init__(self, db: Session, modelo: Type, chunk_size: int = 1000, retorno: Sequence = ()):
+        self.db = db
+        self.modelo = modelo
+        self.chunk_size = chunk_size
+        self.retorno = tuple(retorno) or (modelo.id,)
+
+    def inserir(self, linhas: Iterable[LinhaImportacao]) -> Tuple[List[Row], List[Tuple[int, str]]]:
+        """
+        Insere as linhas e devolve ``(inseridas, erros)``, em que ``inseridas``
+        são as colunas de ``retorno`` de cada linha inserida e ``erros`` uma
+        lista de ``(numero_linha, mensagem)``.
+
+        Não faz commit: cabe ao chamador terminar a transação.
+        """
+        inseridas: List[Row] = []
+        erros: List[Tuple[int, str]] = []
+
+        bloco: List[LinhaImportacao] = []
+        for linha in linhas:
+            bloco.append(linha)
+            if len(bloco) >= self.chunk_size:
+                self._inserir_bloco(bloco, inseridas, erros)
+                bloco = []
+        self._inserir_bloco(bloco, inseridas, erros)
+
+        if inseridas:
+            marcar_alteracao(self.db, self.modelo.__tablename__)
+        return inseridas, erros
+
+    def _statement(self):
+        return insert(self.modelo).returning(*self.retorno)
+
+    def _inserir_bloco(self, bloco: List[LinhaImportacao], inseridas: List, erros: List) -> None:
+        if not bloco:
+            return
+        try:
+            with self.db.begin_nested():
+                resultado = self.db.execute(self._statement(), [valores for _, valores in bloco]).all()
+        except SQLAlchemyError as e:
+            logger.info("Bloco de %d linhas falhou (%s); a repetir linha a linha", len(bloco), e.__class__.__name__)
+            self._inserir_linha_a_linha(bloco, inseridas, erros)
+            return
+
+        inseridas.extend(resultado)
+
+    def _inserir_linha_a_linha(self, bloco: List[LinhaImportacao], inseridas: List, erros: List) -> None:
+        for numero_linha, valores in bloco:
+            try:
+                with self.db.begin_nested():
+                    inserida = self.db.execute(self._statement(), [valores]).one()
+            except SQLAlchemyError as e:
+                erros.append((numero_linha, _mensagem_erro(e)))
+                continue
+            inseridas.append(inserida)
+
+
+def _mensagem_erro(erro: SQLAlchemyError) -> str:
+    """Mensagem curta do erro da base de dados, sem o SQL completo"""
+    original: Optional[BaseException] = getattr(erro, "orig", None)
+    return str(original) if original is not None else str(erro).split("\n")[0]
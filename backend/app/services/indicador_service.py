@@ -1,26 +1,77 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from typing import List, Optional
-from app.models.indicador import Indicador, Trimestre
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import and_, func, select
+from sqlalchemy.exc import IntegrityError
+from fastapi import HTTPException, status
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Type, Union
+from app.core import kpi_classifier
+from app.core.cache import marcar_alteracao
+from app.db import rollups
+from app.db.dialect import dialect_insert
+from app.models.indicador import CategoriaKPI, Indicador, Trimestre
+from app.models.projeto import Projeto
 from app.models.audit_log import AcaoAudit
-from app.schemas.indicador import IndicadorCreate, IndicadorUpdate
+from app.schemas.indicador import IndicadorCreate, IndicadorUpdate, IndicadorResponse, IndicadorValoresLote, ResultadoValoresLote
+from app.schemas.leitura import ModeloResumo
 from app.services.audit_service import AuditService
+from app.services.import_service import ImportadorEmLote, formatar_erro_linha
+from app.services.search_service import SearchService
 from datetime import datetime
 import csv
 import io
+import logging
 from decimal import Decimal
 
+logger = logging.getLogger(__name__)
+
+CAMPOS_OBRIGATORIOS_CSV = ['projeto_id', 'nome', 'unidade', 'meta', 'periodo_referencia', 'fonte_dados']
+
+# Limite de mensagens de erro devolvidas; as restantes são apenas contadas
+MAX_ERROS_IMPORTACAO = 1000
+
+# Chave única de um valor de indicador e colunas que o upsert em lote substitui
+CHAVE_VALOR = ("projeto_id", "nome", "periodo_referencia")
+CAMPOS_VALOR = ("unidade", "meta", "valor_actual", "fonte_dados", "categoria_kpi")
+
+# Linhas por INSERT ... ON CONFLICT do upsert em lote
+TAMANHO_BLOCO_UPSERT = 1000
+
 
 class IndicadorService:
     def __init__(self, db: Session):
         self.db = db
         self.audit_service = AuditService(db)
 
+    def _commit_valor_unico(self, projeto_id: int, nome: str, periodo_referencia: Trimestre) -> None:
+        """
+        Faz commit de um indicador criado ou alterado; se já existir outro com
+        a mesma chave (projeto_id, nome, periodo_referencia) responde 409.
+        """
+        try:
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            existente = self.db.execute(
+                select(Indicador.id).where(
+                    Indicador.projeto_id == projeto_id,
+                    Indicador.nome == nome,
+                    Indicador.periodo_referencia == periodo_referencia
+                )
+            ).first()
+            if existente is None:
+                raise
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=(
+                    f"Já existe o indicador '{nome}' no projeto {projeto_id} para o período "
+                    f"{Trimestre(periodo_referencia).value} (id {existente.id})"
+                )
+            )
+
     def create_indicador(self, indicador_data: IndicadorCreate, user_id: int) -> Indicador:
         """Cria novo indicador"""
         indicador = Indicador(**indicador_data.dict())
         self.db.add(indicador)
-        self.db.commit()
+        self._commit_valor_unico(indicador.projeto_id, indicador.nome, indicador.periodo_referencia)
         self.db.refresh(indicador)
         
         # Regista auditoria
@@ -40,10 +91,20 @@ class IndicadorService:
         limit: int = 100,
         projeto_id: Optional[int] = None,
         periodo_referencia: Optional[Trimestre] = None,
-        search: Optional[str] = None
-    ) -> List[Indicador]:
-        """Lista indicadores com filtros"""
-        query = self.db.query(Indicador)
+        search: Optional[str] = None,
+        opcoes: Optional[Sequence[Any]] = None,
+        resumo: Optional[Type[ModeloResumo]] = None
+    ) -> Union[List[Indicador], List[Dict[str, Any]]]:
+        """
+        Lista indicadores com filtros.
+
+        ``opcoes`` carregam as relações serializadas (por omissão as de
+        ``IndicadorResponse``); com ``resumo`` devolve dicionários só com as colunas
+        desse modelo de leitura.
+        """
+        if opcoes is None:
+            opcoes = IndicadorResponse.opcoes_carregamento
+        query = resumo.consulta(self.db) if resumo else self.db.query(Indicador).options(*opcoes)
         
         if projeto_id:
             query = query.filter(Indicador.projeto_id == projeto_id)
@@ -52,22 +113,23 @@ class IndicadorService:
             query = query.filter(Indicador.periodo_referencia == periodo_referencia)
         
         if search:
-            query = query.filter(
-                or_(
-                    Indicador.nome.ilike(f"%{search}%"),
-                    Indicador.fonte_dados.ilike(f"%{search}%")
-                )
-            )
+            query = query.filter(SearchService(self.db).filtro(Indicador, search))
         
         # Se limit for muito alto, não aplicar limite para obter todos os registos
         if limit >= 10000:
-            return query.all()
+            return resumo.linhas(query.all()) if resumo else query.all()
         
-        return query.offset(skip).limit(limit).all()
+        resultados = query.offset(skip).limit(limit).all()
+        return resumo.linhas(resultados) if resumo else resultados
 
     def get_indicador_by_id(self, indicador_id: int) -> Optional[Indicador]:
         """Obtém indicador por ID"""
-        return self.db.query(Indicador).filter(Indicador.id == indicador_id).first()
+        return (
+            self.db.query(Indicador)
+            .options(joinedload(Indicador.projeto))
+            .filter(Indicador.id == indicador_id)
+            .first()
+        )
 
     def update_indicador(
         self,
@@ -84,7 +146,7 @@ class IndicadorService:
         for field, value in update_data.items():
             setattr(indicador, field, value)
         
-        self.db.commit()
+        self._commit_valor_unico(indicador.projeto_id, indicador.nome, indicador.periodo_referencia)
         self.db.refresh(indicador)
         
         # Regista auditoria
@@ -117,94 +179,231 @@ class IndicadorService:
         self.db.commit()
         return True
 
+    def upsert_indicadores_lote(self, lote: IndicadorValoresLote, user_id: int) -> ResultadoValoresLote:
+        """
+        Cria ou atualiza os valores de ``lote`` pela chave (projeto_id, nome,
+        periodo_referencia).
+        
+        Os registos atuais são lidos numa só query e os valores iguais ficam
+        de fora; os restantes seguem em blocos de ``INSERT ... ON CONFLICT DO
+        UPDATE``. Nos agregados os valores antigos dos atualizados são
+        subtraídos e os novos somados; a auditoria vai num único INSERT com o
+        commit. Se a mesma chave vier repetida prevalece o último valor.
+        """
+        valores: Dict[tuple, tuple] = {}
+        for numero, valor in enumerate(lote.valores, start=1):
+            linha = valor.model_dump()
+            linha["categoria_kpi"] = kpi_classifier.classificar(valor.nome)
+            valores[tuple(linha[c] for c in CHAVE_VALOR)] = (numero, linha)
+        
+        provincias = dict(self.db.execute(
+            select(Projeto.id, Projeto.provincia_id).where(Projeto.id.in_({chave[0] for chave in valores}))
+        ).all())
+        erros = []
+        for chave, (numero, linha) in list(valores.items()):
+            if linha["projeto_id"] not in provincias:
+                erros.append(formatar_erro_linha(numero, f"Projeto {linha['projeto_id']} não existe"))
+                del valores[chave]
+        
+        atuais = {}
+        if valores:
+            for atual in self.db.execute(
+                select(Indicador.id, *(getattr(Indicador, c) for c in CHAVE_VALOR + CAMPOS_VALOR))
+                .where(
+                    Indicador.projeto_id.in_({chave[0] for chave in valores}),
+                    Indicador.periodo_referencia.in_({chave[2] for chave in valores})
+                )
+            ):
+                chave = tuple(getattr(atual, c) for c in CHAVE_VALOR)
+                if chave in valores:
+                    atuais[chave] = atual
+        
+        escrever, substituidos = [], []
+        for chave, (_, linha) in valores.items():
+            atual = atuais.get(chave)
+            if atual is None:
+                escrever.append(linha)
+            elif any(getattr(atual, c) != linha[c] for c in CAMPOS_VALOR):
+                escrever.append(linha)
+                substituidos.append(atual)
+        
+        stmt = dialect_insert(self.db, Indicador.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(CHAVE_VALOR),
+            set_={**{c: stmt.excluded[c] for c in CAMPOS_VALOR}, "updated_at": func.now()}
+        ).returning(Indicador.id, *(getattr(Indicador, c) for c in CHAVE_VALOR + CAMPOS_VALOR))
+        escritos = []
+        for inicio in range(0, len(escrever), TAMANHO_BLOCO_UPSERT):
+            escritos.extend(self.db.execute(stmt, escrever[inicio:inicio + TAMANHO_BLOCO_UPSERT]).all())
+        
+        entradas = []
+        if escritos:
+            # O upsert não passa pelos eventos do ORM que mantêm os agregados
+            rollups.somar_indicadores(self.db, substituidos, provincias, sinal=-1)
+            rollups.somar_indicadores(self.db, escritos, provincias)
+            marcar_alteracao(self.db, Indicador.__tablename__)
+            for indicador in escritos:
+                if tuple(getattr(indicador, c) for c in CHAVE_VALOR) in atuais:
+                    action, details = AcaoAudit.UPDATE, f"Indicador '{indicador.nome}' atualizado"
+                else:
+                    action, details = AcaoAudit.CREATE, f"Indicador '{indicador.nome}' criado para projeto {indicador.projeto_id}"
+                entradas.append(self.audit_service.criar_entrada(
+                    user_id=user_id, action=action, entity="Indicador", entity_id=indicador.id, details=details
+                ))
+        # Faz o commit do upsert, dos agregados e da auditoria
+        self.audit_service.log_actions(entradas)
+        
+        return ResultadoValoresLote(
+            criados=len(escrever) - len(substituidos),
+            atualizados=len(substituidos),
+            inalterados=len(valores) - len(escrever),
+            erros=erros[:MAX_ERROS_IMPORTACAO]
+        )
+
     def get_indicadores_stats(self) -> dict:
         """Obtém estatísticas de indicadores para o dashboard"""
-        total_indicadores = self.db.query(Indicador).count()
-        
-        # Agregação por trimestre
-        stats_trimestre = {}
-        for trimestre in Trimestre:
-            count = self.db.query(Indicador).filter(
-                Indicador.periodo_referencia == trimestre
-            ).count()
-            stats_trimestre[trimestre.value] = count
-        
-        # Agregação por projeto
-        stats_projeto = self.db.query(
-            Indicador.projeto_id,
-            Indicador.nome,
-            Indicador.meta,
-            Indicador.valor_actual
-        ).all()
-        
-        # Cálculo de execução média
-        execucao_media = 0
-        if total_indicadores > 0:
-            total_meta = sum(float(item.meta) for item in stats_projeto)
-            total_atual = sum(float(item.valor_actual) for item in stats_projeto)
-            if total_meta > 0:
-                execucao_media = (total_atual / total_meta) * 100
-        
-        return {
-            "total_indicadores": total_indicadores,
-            "por_trimestre": stats_trimestre,
-            "execucao_media_percentual": round(execucao_media, 2),
-            "indicadores_por_projeto": len(set(item.projeto_id for item in stats_projeto))
-        }
+        from app.services.dashboard_service import DashboardService
+        return DashboardService(self.db).get_indicadores_stats()
 
     def import_indicadores_csv(self, file_content: str, user_id: int) -> dict:
         """Importa indicadores via CSV"""
         try:
-            csv_reader = csv.DictReader(io.StringIO(file_content))
-            imported_count = 0
-            errors = []
-            
+            return self.import_indicadores_stream(io.StringIO(file_content), user_id)
+        except Exception as e:
+            self.db.rollback()
+            return {
+                "imported_count": 0,
+                "errors": [f"Erro geral: {str(e)}"],
+                "success": False
+            }
+
+    def import_indicadores_stream(
+        self,
+        linhas: Iterable[str],
+        user_id: int,
+        chunk_size: int = 1000,
+        progresso: Optional[Callable[[int, int, int], None]] = None
+    ) -> dict:
+        """
+        Importa indicadores de um CSV lido linha a linha.
+        
+        ``linhas`` é qualquer iterável de linhas de texto (ficheiro aberto,
+        ``UploadFile`` envolvido em ``io.TextIOWrapper``...). As linhas são
+        validadas contra o conjunto de projetos existentes, carregado numa só
+        query, e inseridas em blocos de ``chunk_size`` com um commit por bloco,
+        pelo que a memória usada não depende do tamanho do ficheiro.
+        
+        ``progresso(linhas_processadas, importados, erros)`` é chamado após
+        cada bloco.
+        
+        Se a leitura ou um bloco falhar depois de outros blocos terem sido
+        gravados, o bloco em curso é revertido e o resultado indica os
+        indicadores já importados, com o erro geral na lista de erros. Sem
+        nenhum bloco gravado a exceção é propagada.
+        """
+        # Projeto -> província, para validar as linhas e atualizar os agregados
+        provincias = dict(self.db.execute(select(Projeto.id, Projeto.provincia_id)).all())
+        importador = ImportadorEmLote(self.db, Indicador, chunk_size, retorno=(
+            Indicador.id, Indicador.nome, Indicador.projeto_id, Indicador.periodo_referencia,
+            Indicador.categoria_kpi, Indicador.valor_actual, Indicador.meta
+        ))
+        
+        processados = 0
+        imported_count = 0
+        errors: List[str] = []
+        error_count = 0
+        bloco = []
+        
+        def registar_erro(row_num: int, mensagem: str):
+            nonlocal error_count
+            error_count += 1
+            if len(errors) < MAX_ERROS_IMPORTACAO:
+                errors.append(formatar_erro_linha(row_num, mensagem))
+        
+        def inserir_bloco():
+            nonlocal imported_count
+            inseridos, erros_bloco = importador.inserir(bloco)
+            for row_num, mensagem in erros_bloco:
+                registar_erro(row_num, mensagem)
+            rollups.somar_indicadores(self.db, inseridos, provincias)
+            # Auditoria do bloco e commit num único round-trip de escrita
+            self.audit_service.log_actions([
+                self.audit_service.criar_entrada(
+                    user_id=user_id,
+                    action=AcaoAudit.CREATE,
+                    entity="Indicador",
+                    entity_id=indicador.id,
+                    details=f"Indicador '{indicador.nome}' criado para projeto {indicador.projeto_id}"
+                )
+                for indicador in inseridos
+            ])
+            imported_count += len(inseridos)
+            bloco.clear()
+            if progresso:
+                progresso(processados, imported_count, error_count)
+            logger.info("Importação de indicadores: %d linhas processadas, %d importadas, %d erros",
+                        processados, imported_count, error_count)
+        
+        try:
+            csv_reader = csv.DictReader(linhas)
             for row_num, row in enumerate(csv_reader, start=2):  # Start at 2 because of header
+                processados += 1
+                
+                # Valida dados obrigatórios
+                em_falta = [field for field in CAMPOS_OBRIGATORIOS_CSV if not row.get(field)]
+                if em_falta:
+                    registar_erro(row_num, ", ".join(f"Campo '{field}' é obrigatório" for field in em_falta))
+                    continue
+                
                 try:
-                    # Valida dados obrigatórios
-                    required_fields = ['projeto_id', 'nome', 'unidade', 'meta', 'periodo_referencia', 'fonte_dados']
-                    for field in required_fields:
-                        if not row.get(field):
-                            errors.append(f"Linha {row_num}: Campo '{field}' é obrigatório")
-                            continue
-                    
-                    # Cria indicador
                     indicador_data = IndicadorCreate(
                         projeto_id=int(row['projeto_id']),
                         nome=row['nome'],
                         unidade=row['unidade'],
                         meta=Decimal(row['meta']),
-                        valor_actual=Decimal(row.get('valor_actual', '0')),
+                        valor_actual=Decimal(row.get('valor_actual') or '0'),
                         periodo_referencia=Trimestre(row['periodo_referencia']),
                         fonte_dados=row['fonte_dados']
                     )
-                    
-                    self.create_indicador(indicador_data, user_id)
-                    imported_count += 1
-                    
-                except Exception as e:
-                    errors.append(f"Linha {row_num}: {str(e)}")
-            
-            # Regista auditoria
-            self.audit_service.log_action(
-                user_id=user_id,
-                action=AcaoAudit.IMPORT,
-                entidade="Indicador",
-                details=f"Importação CSV: {imported_count} indicadores importados, {len(errors)} erros"
-            )
-            
-            return {
-                "imported_count": imported_count,
-                "errors": errors,
-                "success": len(errors) == 0
-            }
-            
+                except (ValueError, ArithmeticError) as e:
+                    registar_erro(row_num, str(e))
+                    continue
+                
+                if indicador_data.projeto_id not in provincias:
+                    registar_erro(row_num, f"Projeto {indicador_data.projeto_id} não existe")
+                    continue
+                
+                # insert() não passa pelos eventos do ORM: classifica aqui
+                linha = indicador_data.model_dump()
+                linha["categoria_kpi"] = kpi_classifier.classificar(indicador_data.nome)
+                bloco.append((row_num, linha))
+                if len(bloco) >= chunk_size:
+                    inserir_bloco()
+                
+            inserir_bloco()
         except Exception as e:
-            return {
-                "imported_count": 0,
-                "errors": [f"Erro geral: {str(e)}"],
-                "success": False
-            }
+            self.db.rollback()
+            if imported_count == 0:
+                raise
+            logger.exception("Importação de indicadores interrompida após %d indicadores importados", imported_count)
+            error_count += 1
+            errors.append(f"Erro geral: {str(e)}")
+        
+        # Regista auditoria
+        self.audit_service.log_action(
+            user_id=user_id,
+            action=AcaoAudit.IMPORT,
+            entity="Indicador",
+            details=f"Importação CSV: {imported_count} indicadores importados, {error_count} erros"
+        )
+        
+        return {
+            "imported_count": imported_count,
+            "processed_count": processados,
+            "error_count": error_count,
+            "errors": errors,
+            "success": error_count == 0
+        }
 
     def export_indicadores_csv(
         self,
@@ -243,46 +442,86 @@ class IndicadorService:
         
         return output.getvalue()
 
+    def _somar(self, coluna, categoria: Optional[CategoriaKPI] = None):
+        query = self.db.query(func.coalesce(func.sum(coluna), 0))
+        if categoria is not None:
+            query = query.filter(Indicador.categoria_kpi == categoria)
+        return query.scalar()
+
     def get_producao_total(self) -> float:
         """Obtém produção total (soma dos valores atuais dos indicadores)"""
-        result = self.db.query(Indicador.valor_actual).all()
-        return sum(float(item.valor_actual) for item in result if item.valor_actual)
+        return float(self._somar(Indicador.valor_actual))
 
     def get_familias_beneficiadas(self) -> int:
-        """Obtém número de famílias beneficiadas"""
-        result = self.db.query(Indicador).filter(
-            or_(
-                Indicador.nome.ilike('%família%'),
-                Indicador.nome.ilike('%familia%'),
-                Indicador.nome.ilike('%beneficiar%'),
-                Indicador.nome.ilike('%pessoa%'),
-                Indicador.nome.ilike('%habitante%')
-            )
-        ).all()
-        
-        # Soma os valores atuais desses indicadores
-        return sum(int(float(item.valor_actual)) for item in result if item.valor_actual)
+        """Obtém número de famílias beneficiadas (indicadores da categoria FAMILIAS_BENEFICIADAS)"""
+        return int(self._somar(Indicador.valor_actual, CategoriaKPI.FAMILIAS_BENEFICIADAS))
 
     def get_empregos_criados(self) -> int:
-        """Obtém número de empregos criados"""
-        result = self.db.query(Indicador).filter(
-            or_(
-                Indicador.nome.ilike('%emprego%'),
-                Indicador.nome.ilike('%trabalho%'),
-                Indicador.nome.ilike('%funcionário%'),
-                Indicador.nome.ilike('%funcionario%'),
-                Indicador.nome.ilike('%colaborador%'),
-                Indicador.nome.ilike('%posto%')
-            )
-        ).all()
-        
-        # Soma os valores atuais desses indicadores
-        return sum(int(float(item.valor_actual)) for item in result if item.valor_actual)
+        """Obtém número de empregos criados (indicadores da categoria EMPREGOS_CRIADOS)"""
+        return int(self._somar(Indicador.valor_actual, CategoriaKPI.EMPREGOS_CRIADOS))
 
     def get_meta_total(self) -> float:
         """Obtém meta total (soma das metas dos indicadores)"""
-        result = self.db.query(Indicador.meta).all()
-        return sum(float(item.meta) for item in result if item.meta)
+        return float(self._somar(Indicador.meta))
+
+    def get_indicadores_duplicados(self) -> List[Dict[str, Any]]:
+        """
+        Chaves (projeto_id, nome, periodo_referencia) com mais de um
+        indicador e os ids de cada uma, por ordem crescente.
+        """
+        chaves = [getattr(Indicador, c) for c in CHAVE_VALOR]
+        grupos = select(*chaves).group_by(*chaves).having(func.count(Indicador.id) > 1).subquery()
+        duplicados: Dict[tuple, List[int]] = {}
+        for linha in self.db.execute(
+            select(Indicador.id, *chaves)
+            .join(grupos, and_(*(coluna == grupos.c[coluna.key] for coluna in chaves)))
+            .order_by(*chaves, Indicador.id)
+        ):
+            duplicados.setdefault(tuple(getattr(linha, c) for c in CHAVE_VALOR), []).append(linha.id)
+        return [
+            {"projeto_id": projeto_id, "nome": nome, "periodo_referencia": periodo.value, "ids": ids}
+            for (projeto_id, nome, periodo), ids in duplicados.items()
+        ]
+
+    def remover_indicadores_duplicados(self, user_id: Optional[int] = None) -> List[int]:
+        """
+        Remove os indicadores repetidos, mantendo o mais recente (maior id)
+        de cada chave, e devolve os ids removidos. As remoções passam pelo
+        ORM, pelo que os agregados e a auditoria ficam atualizados.
+        """
+        remover = [id_ for grupo in self.get_indicadores_duplicados() for id_ in grupo["ids"][:-1]]
+        entradas = []
+        for indicador in self.db.query(Indicador).filter(Indicador.id.in_(remover)):
+            entradas.append(self.audit_service.criar_entrada(
+                user_id=user_id,
+                action=AcaoAudit.DELETE,
+                entity="Indicador",
+                entity_id=indicador.id,
+                details=f"Indicador '{indicador.nome}' eliminado (duplicado no período {indicador.periodo_referencia.value})"
+            ))
+            self.db.delete(indicador)
+        self.db.flush()
+        # Faz o commit das remoções e da auditoria
+        self.audit_service.log_actions(entradas)
+        logger.info("Indicadores duplicados removidos: %d", len(remover))
+        return remover
+
+    def reclassificar_kpis(self) -> int:
+        """
+        Recalcula a categoria de KPI de todos os indicadores (por exemplo
+        depois de alterar ``KPI_REGRAS``) e devolve quantos mudaram.
+
+        O UPDATE em lote não passa pelos eventos do ORM, pelo que
+        ``producao_resumo`` (agrupada por categoria) é reconstruída na mesma
+        transação.
+        """
+        alterados = kpi_classifier.reclassificar(self.db.connection())
+        if alterados:
+            marcar_alteracao(self.db, Indicador.__tablename__)
+            rollups.reconstruir(self.db)
+        self.db.commit()
+        logger.info("Reclassificação de KPIs: %d indicadores alterados", alterados)
+        return alterados
 
     def get_execucao_media_percentual(self) -> float:
         """Obtém execução média percentual"""
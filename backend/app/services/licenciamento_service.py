@@ -1,13 +1,22 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from typing import List, Optional
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import and_, or_, select, update
+from typing import Any, Dict, List, Optional, Sequence, Type, Union
 from app.models.licenciamento import Licenciamento, StatusLicenciamento, EntidadeResponsavel
 from app.models.audit_log import AcaoAudit
-from app.schemas.licenciamento import LicenciamentoCreate, LicenciamentoUpdate
+from app.core.cache import marcar_alteracao
+from app.schemas.licenciamento import LicenciamentoCreate, LicenciamentoUpdate, LicenciamentoResponse, LicenciamentoStatusLote
+from app.schemas.leitura import ModeloResumo
+from app.schemas.lote import ResultadoLote
 from app.services.audit_service import AuditService
+from app.services.search_service import SearchService
+from app.services import transicoes
 from datetime import datetime
 
 
+# Status que fecham o processo e definem a data de decisão
+STATUS_DECISAO = (StatusLicenciamento.APROVADO, StatusLicenciamento.NEGADO)
+
+
 class LicenciamentoService:
     def __init__(self, db: Session):
         self.db = db
@@ -38,10 +47,20 @@ class LicenciamentoService:
         projeto_id: Optional[int] = None,
         status: Optional[StatusLicenciamento] = None,
         entidade_responsavel: Optional[EntidadeResponsavel] = None,
-        search: Optional[str] = None
-    ) -> List[Licenciamento]:
-        """Lista licenciamentos com filtros"""
-        query = self.db.query(Licenciamento)
+        search: Optional[str] = None,
+        opcoes: Optional[Sequence[Any]] = None,
+        resumo: Optional[Type[ModeloResumo]] = None
+    ) -> Union[List[Licenciamento], List[Dict[str, Any]]]:
+        """
+        Lista licenciamentos com filtros.
+
+        ``opcoes`` carregam as relações serializadas (por omissão as de
+        ``LicenciamentoResponse``); com ``resumo`` devolve dicionários só com as colunas
+        desse modelo de leitura.
+        """
+        if opcoes is None:
+            opcoes = LicenciamentoResponse.opcoes_carregamento
+        query = resumo.consulta(self.db) if resumo else self.db.query(Licenciamento).options(*opcoes)
         
         if projeto_id:
             query = query.filter(Licenciamento.projeto_id == projeto_id)
@@ -53,17 +72,19 @@ class LicenciamentoService:
             query = query.filter(Licenciamento.entidade_responsavel == entidade_responsavel)
         
         if search:
-            query = query.filter(
-                or_(
-                    Licenciamento.observacoes.ilike(f"%{search}%")
-                )
-            )
+            query = query.filter(SearchService(self.db).filtro(Licenciamento, search))
         
-        return query.offset(skip).limit(limit).all()
+        resultados = query.offset(skip).limit(limit).all()
+        return resumo.linhas(resultados) if resumo else resultados
 
     def get_licenciamento_by_id(self, licenciamento_id: int) -> Optional[Licenciamento]:
         """Obtém licenciamento por ID"""
-        return self.db.query(Licenciamento).filter(Licenciamento.id == licenciamento_id).first()
+        return (
+            self.db.query(Licenciamento)
+            .options(joinedload(Licenciamento.projeto))
+            .filter(Licenciamento.id == licenciamento_id)
+            .first()
+        )
 
     def update_licenciamento(
         self,
@@ -132,7 +153,7 @@ class LicenciamentoService:
             licenciamento.observacoes = observacoes
         
         # Se aprovado ou negado, define data de decisão
-        if status in [StatusLicenciamento.APROVADO, StatusLicenciamento.NEGADO]:
+        if status in STATUS_DECISAO:
             licenciamento.data_decisao = datetime.utcnow()
         
         self.db.commit()
@@ -148,46 +169,59 @@ class LicenciamentoService:
         
         return True
 
+    def update_licenciamentos_status_lote(
+        self,
+        lote: LicenciamentoStatusLote,
+        user_id: Optional[int] = None
+    ) -> ResultadoLote:
+        """
+        Aplica várias transições de status de uma vez.
+
+        Um UPDATE por status de destino, a auditoria num único INSERT e um só
+        commit. Todas as decisões do lote recebem a mesma data de decisão, em
+        UTC como na transição individual (``now()`` no PostgreSQL seguiria o
+        fuso horário da sessão).
+        """
+        pedidos = [(t.id, t.status) for t in lote.transicoes]
+        atuais = dict(self.db.execute(
+            select(Licenciamento.id, Licenciamento.status)
+            .where(Licenciamento.id.in_({id_ for id_, _ in pedidos}))
+        ).all())
+        por_status, resultados = transicoes.planear(pedidos, atuais)
+
+        decidido_em = datetime.utcnow()
+        entradas = []
+        for status, ids in por_status.items():
+            valores = {"status": status}
+            if status in STATUS_DECISAO:
+                valores["data_decisao"] = decidido_em
+            if lote.observacoes:
+                valores["observacoes"] = lote.observacoes
+            self.db.execute(
+                update(Licenciamento)
+                .where(Licenciamento.id.in_(ids))
+                .values(**valores)
+                .execution_options(synchronize_session=False)
+            )
+            entradas.extend(
+                self.audit_service.criar_entrada(
+                    user_id=user_id,
+                    action=AcaoAudit.STATUS_CHANGE,
+                    entity="Licenciamento",
+                    entity_id=id_,
+                    details=f"Status alterado de {atuais[id_].value} para {status.value}"
+                )
+                for id_ in ids
+            )
+
+        if entradas:
+            marcar_alteracao(self.db, Licenciamento.__tablename__)
+            # Faz o commit das alterações e da auditoria
+            self.audit_service.log_actions(entradas)
+
+        return transicoes.resultado_lote(resultados)
+
     def get_licenciamentos_stats(self) -> dict:
         """Obtém estatísticas de licenciamentos para dashboard"""
-        total_licenciamentos = self.db.query(Licenciamento).count()
-        
-        # Agregação por status
-        stats_status = {}
-        for status in StatusLicenciamento:
-            count = self.db.query(Licenciamento).filter(
-                Licenciamento.status == status
-            ).count()
-            stats_status[status.value] = count
-        
-        # Agregação por entidade responsável
-        stats_entidade = {}
-        for entidade in EntidadeResponsavel:
-            count = self.db.query(Licenciamento).filter(
-                Licenciamento.entidade_responsavel == entidade
-            ).count()
-            stats_entidade[entidade.value] = count
-        
-        # Tempo médio de processamento
-        licenciamentos_com_decissao = self.db.query(Licenciamento).filter(
-            Licenciamento.data_decisao.isnot(None)
-        ).all()
-        
-        tempo_medio_dias = 0
-        if licenciamentos_com_decissao:
-            total_dias = 0
-            for lic in licenciamentos_com_decissao:
-                dias = (lic.data_decisao - lic.data_submissao).days
-                total_dias += dias
-            tempo_medio_dias = total_dias / len(licenciamentos_com_decissao)
-        
-        return {
-            "total_licenciamentos": total_licenciamentos,
-            "por_status": stats_status,
-            "por_entidade": stats_entidade,
-            "tempo_medio_processamento_dias": round(tempo_medio_dias, 1),
-            "taxa_aprovacao": round(
-                (stats_status.get(StatusLicenciamento.APROVADO.value, 0) / total_licenciamentos * 100) 
-                if total_licenciamentos > 0 else 0, 2
-            )
-        }
+        from app.services.dashboard_service import DashboardService
+        return DashboardService(self.db).get_licenciamentos_stats()
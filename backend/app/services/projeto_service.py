@@ -1,8 +1,19 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session, joinedload
+from pydantic import ValidationError
 from app.models.projeto import Projeto, TipoProjeto, FonteFinanciamento, EstadoProjeto
-from app.schemas.projeto import ProjetoCreate, ProjetoUpdate
+from app.models.provincia import Provincia
+from app.models.audit_log import AcaoAudit
+from app.core.cache import marcar_alteracao
+from app.db import rollups
+from app.schemas.projeto import ProjetoCreate, ProjetoUpdate, ProjetoResponse, ProjetoEstadoLote
+from app.schemas.leitura import ModeloResumo
+from app.schemas.lote import ResultadoLote
 from app.services.audit_service import AuditService
-from typing import Optional, List, Dict, Any
+from app.services.import_service import ImportadorEmLote, formatar_erro_linha
+from app.services.search_service import SearchService
+from app.services import transicoes
+from typing import Optional, List, Dict, Any, Sequence, Type, Union
 from fastapi import HTTPException, status
 from datetime import datetime
 
@@ -33,7 +44,7 @@ class ProjetoService:
     
     def get_projeto_by_id(self, projeto_id: int) -> Optional[Projeto]:
         """Obtém projeto por ID"""
-        return self.db.query(Projeto).filter(Projeto.id == projeto_id).first()
+        return self.db.query(Projeto).options(joinedload(Projeto.provincia)).filter(Projeto.id == projeto_id).first()
     
     def get_projetos(
         self,
@@ -43,10 +54,20 @@ class ProjetoService:
         tipo: Optional[TipoProjeto] = None,
         fonte_financiamento: Optional[FonteFinanciamento] = None,
         estado: Optional[EstadoProjeto] = None,
-        search: Optional[str] = None
-    ) -> List[Projeto]:
-        """Lista projetos com filtros"""
-        query = self.db.query(Projeto)
+        search: Optional[str] = None,
+        opcoes: Optional[Sequence[Any]] = None,
+        resumo: Optional[Type[ModeloResumo]] = None
+    ) -> Union[List[Projeto], List[Dict[str, Any]]]:
+        """
+        Lista projetos com filtros.
+
+        ``opcoes`` são as opções de carregamento das relações que a resposta
+        serializa (por omissão as de ``ProjetoResponse``); com ``resumo``
+        devolve dicionários só com as colunas desse modelo de leitura.
+        """
+        if opcoes is None:
+            opcoes = ProjetoResponse.opcoes_carregamento
+        query = resumo.consulta(self.db) if resumo else self.db.query(Projeto).options(*opcoes)
         
         if provincia_id:
             query = query.filter(Projeto.provincia_id == provincia_id)
@@ -57,13 +78,10 @@ class ProjetoService:
         if estado:
             query = query.filter(Projeto.estado == estado)
         if search:
-            query = query.filter(
-                Projeto.nome.ilike(f"%{search}%") |
-                Projeto.responsavel.ilike(f"%{search}%") |
-                Projeto.descricao.ilike(f"%{search}%")
-            )
+            query = query.filter(SearchService(self.db).filtro(Projeto, search))
         
-        return query.offset(skip).limit(limit).all()
+        resultados = query.offset(skip).limit(limit).all()
+        return resumo.linhas(resultados) if resumo else resultados
     
     def update_projeto(self, projeto_id: int, projeto_data: ProjetoUpdate, updated_by_user_id: Optional[int] = None) -> Optional[Projeto]:
         """Atualiza projeto"""
@@ -169,6 +187,54 @@ class ProjetoService:
         
         return db_projeto
     
+    def update_projetos_estado_lote(self, lote: ProjetoEstadoLote, updated_by_user_id: Optional[int] = None) -> ResultadoLote:
+        """
+        Aplica várias mudanças de estado de uma vez: um UPDATE por estado de
+        destino, os agregados por deltas, a auditoria num único INSERT e um
+        só commit.
+        """
+        pedidos = [(t.id, t.estado) for t in lote.transicoes]
+        projetos = {
+            linha.id: linha
+            for linha in self.db.execute(
+                select(
+                    Projeto.id, Projeto.estado, Projeto.fonte_financiamento,
+                    Projeto.orcamento_previsto_kz, Projeto.orcamento_executado_kz
+                ).where(Projeto.id.in_({id_ for id_, _ in pedidos}))
+            )
+        }
+        por_estado, resultados = transicoes.planear(pedidos, {id_: p.estado for id_, p in projetos.items()})
+        
+        entradas = []
+        for estado, ids in por_estado.items():
+            self.db.execute(
+                update(Projeto)
+                .where(Projeto.id.in_(ids))
+                .values(estado=estado)
+                .execution_options(synchronize_session=False)
+            )
+            for id_ in ids:
+                details = f"Project status changed from {projetos[id_].estado.value} to {estado.value}"
+                if lote.observacoes:
+                    details += f" - Observations: {lote.observacoes}"
+                entradas.append(self.audit_service.criar_entrada(
+                    user_id=updated_by_user_id,
+                    action=AcaoAudit.STATUS_CHANGE,
+                    entity="Projeto",
+                    entity_id=id_,
+                    details=details
+                ))
+        
+        if entradas:
+            # O UPDATE em lote não passa pelos eventos do ORM que mantêm os agregados
+            rollups.mudar_estado_projetos(
+                self.db, [(projetos[id_], estado) for estado, ids in por_estado.items() for id_ in ids]
+            )
+            marcar_alteracao(self.db, Projeto.__tablename__)
+            self.audit_service.log_actions(entradas)
+        
+        return transicoes.resultado_lote(resultados)
+    
     def update_orcamento_executado(self, projeto_id: int, novo_orcamento: float, updated_by_user_id: Optional[int] = None, observacoes: Optional[str] = None) -> Optional[Projeto]:
         """Atualiza orçamento executado com auditoria específica"""
         db_projeto = self.get_projeto_by_id(projeto_id)
@@ -196,50 +262,77 @@ class ProjetoService:
         
         return db_projeto
     
-    def import_projetos(self, projetos_data: List[Dict], imported_by_user_id: Optional[int] = None) -> Dict[str, Any]:
-        """Importa projetos em lote com auditoria"""
-        sucessos = 0
+    def import_projetos(
+        self,
+        projetos_data: List[Dict],
+        imported_by_user_id: Optional[int] = None,
+        linha_inicial: int = 1,
+        chunk_size: int = 1000
+    ) -> Dict[str, Any]:
+        """
+        Importa projetos em lote com auditoria.
+        
+        Todo o payload é validado antes de qualquer escrita e as províncias
+        são resolvidas numa única query (por ``provincia_id`` ou pelo nome em
+        ``provincia``). As linhas válidas são inseridas em blocos, com um
+        savepoint por bloco, e os erros são devolvidos com o número da linha.
+        """
+        provincias = dict(self.db.query(Provincia.id, Provincia.nome).all())
+        provincias_por_nome = {nome.strip().lower(): id_ for id_, nome in provincias.items()}
+        
+        validas = []
         erros = []
-        
-        for projeto_data in projetos_data:
+        for numero_linha, projeto_data in enumerate(projetos_data, start=linha_inicial):
+            projeto_data = dict(projeto_data)
+            nome_provincia = projeto_data.pop("provincia", None)
+            if not projeto_data.get("provincia_id") and isinstance(nome_provincia, str):
+                projeto_data["provincia_id"] = provincias_por_nome.get(nome_provincia.strip().lower())
+            
             try:
-                # Validar dados básicos
-                if not projeto_data.get('nome') or not projeto_data.get('provincia_id'):
-                    erros.append(f"Projeto inválido: {projeto_data.get('nome', 'Sem nome')}")
-                    continue
-                
-                # Criar projeto
-                db_projeto = Projeto(**projeto_data)
-                self.db.add(db_projeto)
-                self.db.commit()
-                self.db.refresh(db_projeto)
-                
-                # Regista auditoria
-                self.audit_service.log_action(
-                    user_id=imported_by_user_id,
-                    action="IMPORT",
-                    entity="Projeto",
-                    entity_id=db_projeto.id,
-                    details=f"Imported project {db_projeto.nome}"
+                projeto = ProjetoCreate.model_validate(projeto_data)
+            except ValidationError as e:
+                campos = ", ".join(
+                    f"{'.'.join(str(p) for p in erro['loc'])}: {erro['msg']}" for erro in e.errors()
                 )
-                
-                sucessos += 1
-                
-            except Exception as e:
-                erros.append(f"Erro ao importar {projeto_data.get('nome', 'projeto')}: {str(e)}")
-                self.db.rollback()
-        
-        # Regista auditoria do processo de importação
-        self.audit_service.log_action(
+                erros.append((numero_linha, f"Projeto inválido ({campos})"))
+                continue
+            
+            if projeto.provincia_id not in provincias:
+                referencia = nome_provincia or projeto.provincia_id
+                erros.append((numero_linha, f"Província não encontrada: {referencia}"))
+                continue
+            
+            validas.append((numero_linha, projeto.model_dump()))
+        
+        importador = ImportadorEmLote(self.db, Projeto, chunk_size, retorno=(
+            Projeto.id, Projeto.nome, Projeto.fonte_financiamento, Projeto.estado,
+            Projeto.orcamento_previsto_kz, Projeto.orcamento_executado_kz
+        ))
+        inseridos, erros_insercao = importador.inserir(validas)
+        rollups.somar_projetos(self.db, inseridos)
+        erros = [formatar_erro_linha(numero, mensagem) for numero, mensagem in sorted(erros + erros_insercao)]
+        
+        # Regista auditoria de cada projeto e do processo de importação num só INSERT
+        entradas = [
+            self.audit_service.criar_entrada(
+                user_id=imported_by_user_id,
+                action=AcaoAudit.IMPORT,
+                entity="Projeto",
+                entity_id=projeto.id,
+                details=f"Imported project {projeto.nome}"
+            )
+            for projeto in inseridos
+        ]
+        entradas.append(self.audit_service.criar_entrada(
             user_id=imported_by_user_id,
-            action="IMPORT",
+            action=AcaoAudit.IMPORT,
             entity="Projeto",
-            entity_id=None,
-            details=f"Bulk import completed: {sucessos} successful, {len(erros)} errors"
-        )
+            details=f"Bulk import completed: {len(inseridos)} successful, {len(erros)} errors"
+        ))
+        self.audit_service.log_actions(entradas)
         
         return {
-            "sucessos": sucessos,
+            "sucessos": len(inseridos),
             "erros": erros,
             "total_processados": len(projetos_data)
         }
@@ -263,58 +356,5 @@ class ProjetoService:
     
     def get_dashboard_stats(self) -> Dict[str, Any]:
         """Obtém estatísticas para dashboard"""
-        from app.models.indicador import Indicador
-        from app.models.licenciamento import Licenciamento
-        from app.models.indicador import Trimestre
-        from app.models.licenciamento import StatusLicenciamento
-        
-        total_projetos = self.db.query(Projeto).count()
-        
-        # Projetos por estado
-        projetos_por_estado = {}
-        for estado in EstadoProjeto:
-            count = self.db.query(Projeto).filter(Projeto.estado == estado).count()
-            projetos_por_estado[estado.value] = count
-        
-        # Projetos por fonte de financiamento
-        projetos_por_fonte = {}
-        for fonte in FonteFinanciamento:
-            count = self.db.query(Projeto).filter(Projeto.fonte_financiamento == fonte).count()
-            projetos_por_fonte[fonte.value] = count
-        
-        # Estatísticas de indicadores
-        total_indicadores = self.db.query(Indicador).count()
-        indicadores_por_trimestre = {}
-        for trimestre in ['T1', 'T2', 'T3', 'T4']:
-            count = self.db.query(Indicador).filter(Indicador.periodo_referencia == trimestre).count()
-            indicadores_por_trimestre[trimestre] = count
-        
-        # Estatísticas de licenciamentos
-        total_licenciamentos = self.db.query(Licenciamento).count()
-        licenciamentos_por_status = {}
-        for status in StatusLicenciamento:
-            count = self.db.query(Licenciamento).filter(Licenciamento.status == status).count()
-            licenciamentos_por_status[status.value] = count
-        
-        # Orçamento total previsto e executado
-        orcamento_previsto = self.db.query(Projeto).with_entities(
-            Projeto.orcamento_previsto_kz
-        ).all()
-        orcamento_executado = self.db.query(Projeto).with_entities(
-            Projeto.orcamento_executado_kz
-        ).all()
-        
-        total_previsto = sum([float(p[0]) for p in orcamento_previsto if p[0]])
-        total_executado = sum([float(e[0]) for e in orcamento_executado if e[0]])
-        execucao_media_percentual = round((total_executado / total_previsto * 100), 2) if total_previsto > 0 else 0
-        
-        return {
-            "total_projetos": total_projetos,
-            "total_indicadores": total_indicadores,
-            "total_licenciamentos": total_licenciamentos,
-            "execucao_media_percentual": execucao_media_percentual,
-            "projetos_por_estado": projetos_por_estado,
-            "projetos_por_fonte": projetos_por_fonte,
-            "indicadores_por_trimestre": indicadores_por_trimestre,
-            "licenciamentos_por_status": licenciamentos_por_status
-        }
+        from app.services.dashboard_service import DashboardService
+        return DashboardService(self.db).get_projetos_stats()
@@ -1,103 +1,137 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import func
 from typing import List, Optional
 from app.models.provincia import Provincia
 from app.models.projeto import Projeto, EstadoProjeto
 from app.schemas.provincia import ProvinciaResponse
 
 
+# Coordenadas aproximadas do centro de cada província para o mapa (Angola)
+COORDENADAS_PROVINCIAS = {
+    "Bengo": {"lat": -8.5, "lng": 13.5},
+    "Benguela": {"lat": -12.5, "lng": 13.4},
+    "Bié": {"lat": -12.8, "lng": 17.4},
+    "Cabinda": {"lat": -5.6, "lng": 12.2},
+    "Cuando Cubango": {"lat": -16.0, "lng": 18.0},
+    "Cuanza Norte": {"lat": -9.0, "lng": 14.5},
+    "Cuanza Sul": {"lat": -10.0, "lng": 15.0},
+    "Cunene": {"lat": -16.0, "lng": 15.0},
+    "Huambo": {"lat": -12.8, "lng": 15.7},
+    "Huíla": {"lat": -14.9, "lng": 14.9},
+    "Icolo e Bengo": {"lat": -8.5, "lng": 13.5},
+    "Luanda": {"lat": -8.8, "lng": 13.2},
+    "Lunda Norte": {"lat": -8.0, "lng": 20.0},
+    "Lunda Sul": {"lat": -10.0, "lng": 20.0},
+    "Malanje": {"lat": -9.5, "lng": 16.0},
+    "Moxico": {"lat": -11.0, "lng": 20.0},
+    "Moxico Leste": {"lat": -11.0, "lng": 22.0},
+    "Namibe": {"lat": -15.2, "lng": 12.2},
+    "Uíge": {"lat": -7.6, "lng": 15.0},
+    "Zaire": {"lat": -6.0, "lng": 12.0},
+    "Zaire Sul": {"lat": -6.5, "lng": 12.5}
+}
+
+COORDENADAS_PADRAO = {"lat": -12.0, "lng": 17.0}
+
+
 class ProvinciaService:
     def __init__(self, db: Session):
         self.db = db
 
     def get_provincias(self) -> List[Provincia]:
         """Lista todas as províncias"""
-        return self.db.query(Provincia).order_by(Provincia.nome).all()
+        return self.db.query(Provincia).options(selectinload(Provincia.projetos)).order_by(Provincia.nome).all()
 
     def get_provincia_by_id(self, provincia_id: int) -> Optional[Provincia]:
         """Obtém província por ID"""
-        return self.db.query(Provincia).filter(Provincia.id == provincia_id).first()
+        return (
+            self.db.query(Provincia)
+            .options(selectinload(Provincia.projetos))
+            .filter(Provincia.id == provincia_id)
+            .first()
+        )
 
     def get_mapa_provincias(self) -> List[dict]:
         """Obtém dados para mapa das províncias com distribuição de projetos"""
-        provincias = self.get_provincias()
-        resultado = []
+        # Uma única query: províncias sem projetos aparecem com estado NULL
+        linhas = self.db.query(
+            Provincia.id,
+            Provincia.nome,
+            Projeto.estado,
+            func.count(Projeto.id).label("total"),
+            func.coalesce(func.sum(Projeto.orcamento_previsto_kz), 0).label("previsto"),
+            func.coalesce(func.sum(Projeto.orcamento_executado_kz), 0).label("executado")
+        ).outerjoin(
+            Projeto, Projeto.provincia_id == Provincia.id
+        ).group_by(
+            Provincia.id,
+            Provincia.nome,
+            Projeto.estado
+        ).order_by(Provincia.nome).all()
         
-        for provincia in provincias:
-            # Conta projetos por estado
-            projetos = self.db.query(Projeto).filter(Projeto.provincia_id == provincia.id).all()
-            
-            stats = {
-                "planeado": 0,
-                "em_execucao": 0,
-                "concluido": 0,
-                "suspenso": 0
-            }
-            
-            orcamento_total = 0
-            orcamento_executado = 0
-            
-            for projeto in projetos:
-                estado_key = projeto.estado.value.lower().replace("_", " ")
-                if estado_key in stats:
-                    stats[estado_key] += 1
-                
-                orcamento_total += float(projeto.orcamento_previsto_kz)
-                orcamento_executado += float(projeto.orcamento_executado_kz)
-            
-            # Calcula percentagem de execução
-            execucao_percentual = 0
-            if orcamento_total > 0:
-                execucao_percentual = (orcamento_executado / orcamento_total) * 100
-            
-            # Define cor baseada no estado predominante
-            cor = "gray"  # Default
-            if stats["em_execucao"] > 0:
-                cor = "blue"
-            elif stats["concluido"] > 0:
-                cor = "green"
-            elif stats["suspenso"] > 0:
-                cor = "red"
-            elif stats["planeado"] > 0:
-                cor = "yellow"
-            
-            resultado.append({
-                "id": provincia.id,
-                "nome": provincia.nome,
-                "total_projetos": len(projetos),
-                "estatisticas": stats,
-                "orcamento_total_kz": orcamento_total,
-                "orcamento_executado_kz": orcamento_executado,
-                "execucao_percentual": round(execucao_percentual, 2),
-                "cor": cor,
-                "coordenadas": self._get_coordenadas_provincia(provincia.nome)
-            })
+        por_provincia = {}
+        for linha in linhas:
+            dados = por_provincia.get(linha.id)
+            if dados is None:
+                dados = por_provincia[linha.id] = {
+                    "nome": linha.nome,
+                    "stats": {estado.value.lower(): 0 for estado in EstadoProjeto},
+                    "previsto": 0.0,
+                    "executado": 0.0
+                }
+            if linha.estado is not None:
+                dados["stats"][linha.estado.value.lower()] += linha.total
+            dados["previsto"] += float(linha.previsto)
+            dados["executado"] += float(linha.executado)
         
-        return resultado
+        return [
+            self.montar_entrada_mapa(
+                provincia_id,
+                dados["nome"],
+                dados["stats"],
+                dados["previsto"],
+                dados["executado"]
+            )
+            for provincia_id, dados in por_provincia.items()
+        ]
+
+    def montar_entrada_mapa(
+        self,
+        provincia_id: int,
+        nome: str,
+        stats: dict,
+        orcamento_total: float,
+        orcamento_executado: float
+    ) -> dict:
+        """Monta a entrada do mapa de uma província a partir dos totais agregados"""
+        # Calcula percentagem de execução
+        execucao_percentual = 0
+        if orcamento_total > 0:
+            execucao_percentual = (orcamento_executado / orcamento_total) * 100
+        
+        # Define cor baseada no estado predominante
+        cor = "gray"  # Default
+        if stats["em_execucao"] > 0:
+            cor = "blue"
+        elif stats["concluido"] > 0:
+            cor = "green"
+        elif stats["suspenso"] > 0:
+            cor = "red"
+        elif stats["planeado"] > 0:
+            cor = "yellow"
+        
+        return {
+            "id": provincia_id,
+            "nome": nome,
+            "total_projetos": sum(stats.values()),
+            "estatisticas": stats,
+            "orcamento_total_kz": orcamento_total,
+            "orcamento_executado_kz": orcamento_executado,
+            "execucao_percentual": round(execucao_percentual, 2),
+            "cor": cor,
+            "coordenadas": self._get_coordenadas_provincia(nome)
+        }
 
     def _get_coordenadas_provincia(self, nome_provincia: str) -> dict:
         """Retorna coordenadas aproximadas para o mapa (Angola)"""
-        coordenadas = {
-            "Bengo": {"lat": -8.5, "lng": 13.5},
-            "Benguela": {"lat": -12.5, "lng": 13.4},
-            "Bié": {"lat": -12.8, "lng": 17.4},
-            "Cabinda": {"lat": -5.6, "lng": 12.2},
-            "Cuando Cubango": {"lat": -16.0, "lng": 18.0},
-            "Cuanza Norte": {"lat": -9.0, "lng": 14.5},
-            "Cuanza Sul": {"lat": -10.0, "lng": 15.0},
-            "Cunene": {"lat": -16.0, "lng": 15.0},
-            "Huambo": {"lat": -12.8, "lng": 15.7},
-            "Huíla": {"lat": -14.9, "lng": 14.9},
-            "Icolo e Bengo": {"lat": -8.5, "lng": 13.5},
-            "Luanda": {"lat": -8.8, "lng": 13.2},
-            "Lunda Norte": {"lat": -8.0, "lng": 20.0},
-            "Lunda Sul": {"lat": -10.0, "lng": 20.0},
-            "Malanje": {"lat": -9.5, "lng": 16.0},
-            "Moxico": {"lat": -11.0, "lng": 20.0},
-            "Moxico Leste": {"lat": -11.0, "lng": 22.0},
-            "Namibe": {"lat": -15.2, "lng": 12.2},
-            "Uíge": {"lat": -7.6, "lng": 15.0},
-            "Zaire": {"lat": -6.0, "lng": 12.0},
-            "Zaire Sul": {"lat": -6.5, "lng": 12.5}
-        }
-        
-        return coordenadas.get(nome_provincia, {"lat": -12.0, "lng": 17.0})
+        return COORDENADAS_PROVINCIAS.get(nome_provincia, COORDENADAS_PADRAO)
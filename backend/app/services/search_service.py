@@ -0,0 +1,137 @@
+"""
+Pesquisa de texto sobre projetos, indicadores, licenciamentos e auditoria.
+
+Usa os índices de ``app.db.pesquisa``: ``tsvector`` + GIN no PostgreSQL e
+FTS5 no SQLite. Cada palavra do termo é pesquisada como prefixo e todas
+têm de ocorrer ("famil aquic" encontra "Famílias de aquicultores").
+"""
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import false, func, literal_column, or_, select, table
+from sqlalchemy.orm import Session
+
+from app.db.pesquisa import CONFIG_PT, DOCUMENTOS, PESOS_BM25, tabela_fts
+from app.models.audit_log import AuditLog
+from app.models.indicador import Indicador
+from app.models.licenciamento import Licenciamento
+from app.models.projeto import Projeto
+
+# Entidade da pesquisa unificada -> modelo
+MODELOS = {
+    "projetos": Projeto,
+    "indicadores": Indicador,
+    "licenciamentos": Licenciamento,
+    "audit_logs": AuditLog,
+}
+
+
+def _palavras(termo: Optional[str]) -> List[str]:
+    return re.findall(r"\w+", termo or "")
+
+
+def _titulo(entidade: str, linha) -> str:
+    if entidade in ("projetos", "indicadores"):
+        return linha.nome
+    if entidade == "licenciamentos":
+        return f"Licenciamento #{linha.id} ({linha.entidade_responsavel.value})"
+    return f"{linha.acao.value} {linha.entidade or ''}".strip()
+
+
+class SearchService:
+    def __init__(self, db: Session):
+        self.db = db
+        self.dialeto = db.get_bind().dialect.name
+
+    # --- Expressões por dialeto ----------------------------------------------
+
+    def _tsquery(self, palavras: List[str]):
+        return func.to_tsquery(CONFIG_PT, " & ".join(f"{p}:*" for p in palavras))
+
+    def _fts_match(self, tabela: str, palavras: List[str]):
+        # Cada palavra entre aspas (sem operadores do FTS5) e como prefixo
+        consulta = " ".join(f'"{p}"*' for p in palavras)
+        return literal_column(tabela_fts(tabela)).op("MATCH")(consulta)
+
+    def filtro(self, modelo, termo: Optional[str]):
+        """
+        Predicado de pesquisa de ``termo`` para usar em ``query.filter`` sobre
+        ``modelo``. Noutros dialetos recorre a ``ilike`` nas mesmas colunas.
+        """
+        palavras = _palavras(termo)
+        if not palavras:
+            return false()
+
+        tabela = modelo.__tablename__
+        if self.dialeto == "postgresql":
+            return literal_column(f"{tabela}.search_vector").op("@@")(self._tsquery(palavras))
+        if self.dialeto == "sqlite":
+            fts = tabela_fts(tabela)
+            correspondencias = (
+                select(literal_column("rowid"))
+                .select_from(table(fts))
+                .where(self._fts_match(tabela, palavras))
+            )
+            return modelo.id.in_(correspondencias)
+        return or_(*(getattr(modelo, coluna).ilike(f"%{termo}%") for coluna in DOCUMENTOS[tabela]))
+
+    # --- Pesquisa unificada ----------------------------------------------------
+
+    def _pesquisar_entidade(self, entidade: str, palavras: List[str], limit: int) -> List[Dict[str, Any]]:
+        modelo = MODELOS[entidade]
+        colunas = DOCUMENTOS[entidade]
+
+        if self.dialeto == "postgresql":
+            consulta = self._tsquery(palavras)
+            vetor = literal_column(f"{entidade}.search_vector")
+            texto = func.concat_ws(" ", *(getattr(modelo, c) for c in colunas))
+            score = func.ts_rank_cd(vetor, consulta)
+            excerto = func.ts_headline(CONFIG_PT, texto, consulta, "MaxFragments=1, MaxWords=20, MinWords=5")
+            query = self.db.query(modelo, score.label("score"), excerto.label("excerto")).filter(vetor.op("@@")(consulta))
+        elif self.dialeto == "sqlite":
+            fts = tabela_fts(entidade)
+            pesos = ", ".join(str(p) for p in PESOS_BM25[:len(colunas)])
+            # bm25() é negativo e menor para os melhores resultados
+            score = -literal_column(f"bm25({fts}, {pesos})")
+            excerto = literal_column(f"snippet({fts}, -1, '<b>', '</b>', '…', 16)")
+            query = (
+                self.db.query(modelo, score.label("score"), excerto.label("excerto"))
+                .select_from(table(fts))
+                .join(modelo, modelo.id == literal_column(f"{fts}.rowid"))
+                .filter(self._fts_match(entidade, palavras))
+            )
+        else:
+            query = self.db.query(modelo, literal_column("1.0").label("score"), literal_column("NULL").label("excerto"))
+            query = query.filter(self.filtro(modelo, " ".join(palavras)))
+
+        linhas = query.order_by(literal_column("score").desc(), modelo.id).limit(limit).all()
+        return [
+            {
+                "entidade": entidade,
+                "id": linha.id,
+                "titulo": _titulo(entidade, linha),
+                "excerto": excerto,
+                "score": float(score),
+            }
+            for linha, score, excerto in linhas
+        ]
+
+    def pesquisar(
+        self,
+        termo: str,
+        entidades: Optional[Iterable[str]] = None,
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """
+        Pesquisa ``termo`` nas entidades indicadas (todas por omissão) e
+        devolve os ``limit`` melhores resultados ordenados por relevância.
+        """
+        palavras = _palavras(termo)
+        if not palavras:
+            return []
+
+        resultados: List[Dict[str, Any]] = []
+        for entidade in entidades or MODELOS:
+            resultados.extend(self._pesquisar_entidade(entidade, palavras, limit))
+        resultados.sort(key=lambda r: (-r["score"], r["entidade"], r["id"]))
+        return resultados[:limit]
@@ -0,0 +1,47 @@
+"""
+Transições de estado em lote (licenciamentos e projetos).
+
+``planear`` compara os pedidos com o estado atual e agrupa os ids a alterar
+por estado de destino, para que cada grupo seja aplicado com um único
+``UPDATE ... WHERE id IN``.
+"""
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Sequence, Tuple
+
+from app.schemas.lote import ResultadoLote, ResultadoTransicao, ResultadoTransicaoId
+
+
+def planear(
+    pedidos: Sequence[Tuple[int, Any]],
+    atuais: Dict[int, Any]
+) -> Tuple[Dict[Any, List[int]], Dict[int, ResultadoTransicao]]:
+    """
+    Ids a alterar por estado de destino e o resultado de cada id pedido.
+
+    ``atuais`` tem o estado atual dos ids que existem. Um id pedido mais do
+    que uma vez fica ``DUPLICADO`` e não é alterado.
+    """
+    repeticoes = Counter(id_ for id_, _ in pedidos)
+    por_destino: Dict[Any, List[int]] = defaultdict(list)
+    resultados: Dict[int, ResultadoTransicao] = {}
+    for id_, destino in pedidos:
+        if id_ in resultados:
+            continue
+        if repeticoes[id_] > 1:
+            resultados[id_] = ResultadoTransicao.DUPLICADO
+        elif id_ not in atuais:
+            resultados[id_] = ResultadoTransicao.NAO_ENCONTRADO
+        elif atuais[id_] == destino:
+            resultados[id_] = ResultadoTransicao.SEM_ALTERACAO
+        else:
+            resultados[id_] = ResultadoTransicao.ATUALIZADO
+            por_destino[destino].append(id_)
+    return dict(por_destino), resultados
+
+
+def resultado_lote(resultados: Dict[int, ResultadoTransicao]) -> ResultadoLote:
+    """Resposta com o resultado por id, pela ordem do pedido"""
+    return ResultadoLote(
+        atualizados=sum(1 for r in resultados.values() if r == ResultadoTransicao.ATUALIZADO),
+        resultados=[ResultadoTransicaoId(id=id_, resultado=r) for id_, r in resultados.items()]
+    )
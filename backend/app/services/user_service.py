@@ -1,10 +1,13 @@
 from sqlalchemy.orm import Session
 from app.models.user import User, UserRole
 from app.schemas.user import UserCreate, UserUpdate
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash, verify_password, verify_and_update_password
+from app.core.deps import invalidar_principal
 from app.services.audit_service import AuditService
+from app.models.audit_log import AcaoAudit
 from typing import Optional, List
 from fastapi import HTTPException, status
+from datetime import datetime
 
 
 class UserService:
@@ -64,6 +67,7 @@ class UserService:
         db_user = self.get_user_by_id(user_id)
         if not db_user:
             return None
+        email_anterior = db_user.email
         
         # Atualiza campos fornecidos
         update_data = user_data.dict(exclude_unset=True)
@@ -75,6 +79,7 @@ class UserService:
         
         self.db.commit()
         self.db.refresh(db_user)
+        invalidar_principal(email_anterior, db_user.email)
         
         # Regista auditoria
         self.audit_service.log_action(
@@ -96,6 +101,7 @@ class UserService:
         # Soft delete - desativa utilizador
         db_user.is_active = False
         self.db.commit()
+        invalidar_principal(db_user.email)
         
         # Regista auditoria
         self.audit_service.log_action(
@@ -109,13 +115,31 @@ class UserService:
         return True
     
     def authenticate_user(self, email: str, password: str) -> Optional[User]:
-        """Autentica utilizador"""
+        """Autentica utilizador, refazendo o hash se usar um custo desatualizado"""
         user = self.get_user_by_email(email)
-        if not user:
-            return None
-        if not verify_password(password, user.hashed_password):
+        valida, novo_hash = verify_and_update_password(password, user.hashed_password if user else None)
+        if not valida:
             return None
+        if novo_hash:
+            user.hashed_password = novo_hash
+            self.db.commit()
         return user
+
+    def registar_login(self, user: User, ip: Optional[str] = None, novo_hash: Optional[str] = None) -> None:
+        """Atualiza o último login (e o hash da senha, se desatualizado) e regista auditoria"""
+        user.last_login = datetime.utcnow()
+        if novo_hash:
+            user.hashed_password = novo_hash
+        # Sem invalidar o principal em cache: a cópia não guarda o hash e um
+        # last_login desatualizado não afeta a autenticação (o TTL limita-o)
+        self.db.commit()
+
+        self.audit_service.log_action(
+            user_id=user.id,
+            action=AcaoAudit.LOGIN,
+            ip=ip,
+            details=f"User {user.email} logged in"
+        )
     
     def change_password(self, user_id: int, old_password: str, new_password: str, changed_by_user_id: Optional[int] = None) -> bool:
         """Altera senha do utilizador"""
@@ -131,6 +155,7 @@ class UserService:
         
         db_user.hashed_password = get_password_hash(new_password)
         self.db.commit()
+        invalidar_principal(db_user.email)
         
         # Regista auditoria
         self.audit_service.log_action(
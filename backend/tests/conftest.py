@@ -1,17 +1,38 @@
 """
 Configuração de fixtures para testes
 """
+import os
+
+# Auditoria síncrona nos testes, para que cada log fique na transação do teste
+os.environ.setdefault("AUDIT_WRITE_MODE", "sync")
+
 import pytest
+from contextlib import contextmanager
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from app.main import app
-from app.db.database import get_db, Base
+from app.db.database import get_db, get_async_db, Base
 from app.core.config import settings
 
 # Database de teste em memória
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+
+
+# O pysqlite gere as transações por conta própria e não suporta SAVEPOINT
+# corretamente; desativamos esse comportamento para que cada teste corra
+# dentro de uma transação revertida no fim, mesmo que os serviços façam commit.
+@event.listens_for(engine, "connect")
+def _desativar_transacao_pysqlite(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(engine, "begin")
+def _iniciar_transacao_sqlite(conn):
+    conn.exec_driver_sql("BEGIN")
+
+
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 @pytest.fixture(scope="session")
@@ -26,12 +47,25 @@ def db_session(db_engine):
     """Cria sessão de banco de dados para cada teste"""
     connection = db_engine.connect()
     transaction = connection.begin()
-    session = TestingSessionLocal(bind=connection)
+    session = TestingSessionLocal(bind=connection, join_transaction_mode="create_savepoint")
     yield session
     session.close()
     transaction.rollback()
     connection.close()
 
+class _SessaoAsyncDeTeste:
+    """
+    Expõe a sessão do teste com a interface ``run_sync`` da AsyncSession,
+    para que os endpoints assíncronos vejam os dados da transação do teste.
+    """
+
+    def __init__(self, sessao):
+        self.sync_session = sessao
+
+    async def run_sync(self, funcao, *args, **kwargs):
+        return funcao(self.sync_session, *args, **kwargs)
+
+
 @pytest.fixture(scope="function")
 def client(db_session):
     """Cria cliente de teste FastAPI"""
@@ -40,8 +74,12 @@ def client(db_session):
             yield db_session
         finally:
             db_session.close()
+
+    async def override_get_async_db():
+        yield _SessaoAsyncDeTeste(db_session)
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
@@ -72,3 +110,23 @@ def test_projeto_data():
         "data_fim_prevista": "2024-12-31",
         "descricao": "Projeto de teste"
     }
+
+
+@pytest.fixture
+def query_counter(db_engine):
+    """Conta as instruções SQL executadas dentro do bloco"""
+    @contextmanager
+    def contar():
+        statements = []
+
+        def registar(conn, cursor, statement, parameters, context, executemany):
+            if not statement.lstrip().upper().startswith(("SAVEPOINT", "RELEASE", "ROLLBACK")):
+                statements.append(statement)
+
+        event.listen(db_engine, "before_cursor_execute", registar)
+        try:
+            yield statements
+        finally:
+            event.remove(db_engine, "before_cursor_execute", registar)
+
+    return contar
@@ -233,3 +233,559 @@ class TestDashboardAPI:
         assert "indicadores" in data
         assert "licenciamentos" in data
         assert "mapa" in data
+
+
+class TestDashboardConcorrencia:
+    """Testes para pedidos concorrentes ao dashboard com a sessão assíncrona real (aiosqlite)"""
+
+    def test_pedidos_sem_cache_em_simultaneo(self, tmp_path, test_user_data):
+        """Testa que dois pedidos sem cache para a mesma chave terminam e calculam uma só vez"""
+        import asyncio
+        import threading
+        import httpx
+        from sqlalchemy import create_engine
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+        from app.core.cache import dashboard_cache
+        from app.core.deps import get_current_active_user_async
+        from app.db.database import Base, get_async_db
+        from app.db.engine import criar_engine_async
+        from app.main import app
+        from app.models.user import UserRole
+        from app.services import dashboard_service
+
+        url = f"sqlite:///{tmp_path / 'dashboard.db'}"
+        engine = create_engine(url)
+        Base.metadata.create_all(bind=engine)
+        engine.dispose()
+        async_engine = criar_engine_async(url)
+        SessaoAsync = async_sessionmaker(async_engine, expire_on_commit=False)
+
+        async def sessao_async():
+            async with SessaoAsync() as sessao:
+                yield sessao
+
+        user_data = {k: v for k, v in test_user_data.items() if k != "password"}
+        user = User(**{**user_data, "id": 1, "role": UserRole.VISUALIZACAO, "is_active": True})
+        app.dependency_overrides[get_async_db] = sessao_async
+        app.dependency_overrides[get_current_active_user_async] = lambda: user
+
+        calculos = []
+        get_kpis = dashboard_service.DashboardService.get_kpis
+
+        def contar_kpis(servico):
+            calculos.append(1)
+            return get_kpis(servico)
+
+        async def pedidos():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://localhost") as cliente:
+                return await asyncio.gather(*(cliente.get("/api/dashboard/kpis") for _ in range(2)))
+
+        # Num thread à parte: se o event loop bloquear, o teste falha em vez de ficar pendurado
+        respostas = []
+        executor = threading.Thread(target=lambda: respostas.extend(asyncio.run(pedidos())), daemon=True)
+        dashboard_cache.clear()
+        dashboard_service.DashboardService.get_kpis = contar_kpis
+        try:
+            executor.start()
+            executor.join(timeout=15)
+        finally:
+            dashboard_service.DashboardService.get_kpis = get_kpis
+            app.dependency_overrides.clear()
+            asyncio.run(async_engine.dispose())
+
+        assert not executor.is_alive(), "pedidos concorrentes bloquearam o event loop"
+        assert [r.status_code for r in respostas] == [200, 200]
+        assert respostas[0].json() == respostas[1].json()
+        assert len(calculos) == 1
+
+
+class TestSessaoAsyncReal:
+    """Testes das rotas de leitura com a AsyncSession real (aiosqlite), sem a sessão de teste"""
+
+    def test_dashboard_e_listagem(self, tmp_path, test_user_data, test_projeto_data, monkeypatch):
+        """Testa o dashboard e a listagem de projetos através de get_async_db e run_sync"""
+        import asyncio
+        import httpx
+        from datetime import datetime
+        from sqlalchemy import create_engine
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.core.cache import dashboard_cache
+        from app.core.deps import get_current_active_user_async
+        from app.db import database
+        from app.main import app
+        from app.models.projeto import Projeto
+        from app.models.user import UserRole
+
+        caminho = tmp_path / "async.db"
+        engine = create_engine(f"sqlite:///{caminho}")
+        database.Base.metadata.create_all(bind=engine)
+        with sessionmaker(bind=engine)() as db:
+            provincia = Provincia(nome="Namibe")
+            db.add(provincia)
+            db.flush()
+            db.add(Projeto(**{
+                **test_projeto_data,
+                "provincia_id": provincia.id,
+                "data_inicio_prevista": datetime(2024, 1, 1),
+                "data_fim_prevista": datetime(2024, 12, 31),
+            }))
+            db.commit()
+        engine.dispose()
+
+        user_data = {k: v for k, v in test_user_data.items() if k != "password"}
+        user = User(**{**user_data, "id": 1, "role": UserRole.VISUALIZACAO, "is_active": True})
+
+        async def pedidos():
+            async_engine = create_async_engine(f"sqlite+aiosqlite:///{caminho}")
+            # O get_async_db real, com a sessão configurada como em produção
+            monkeypatch.setattr(
+                database, "AsyncSessionLocal",
+                async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+            )
+            try:
+                async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://localhost") as cliente:
+                    return await cliente.get("/api/dashboard/stats"), await cliente.get("/api/projetos/")
+            finally:
+                await async_engine.dispose()
+
+        app.dependency_overrides[get_current_active_user_async] = lambda: user
+        dashboard_cache.clear()
+        try:
+            stats, projetos = asyncio.run(pedidos())
+        finally:
+            app.dependency_overrides.clear()
+
+        assert stats.status_code == 200
+        assert stats.json()["resumo"]["total_projetos"] == 1
+        assert [p["nome"] for p in stats.json()["mapa"]] == ["Namibe"]
+        assert projetos.status_code == 200
+        assert [p["nome"] for p in projetos.json()] == [test_projeto_data["nome"]]
+
+
+class TestCacheHTTP:
+    """Testes para ETag/304 e as políticas de Cache-Control por rota"""
+
+    # O TrustedHostMiddleware só aceita os hosts configurados
+    BASE = "http://localhost"
+
+    @pytest.fixture
+    def api(self, client: TestClient, db_session, test_user_data):
+        from app.core.deps import get_current_active_user, get_current_active_user_async
+        from app.main import app
+
+        user_data = test_user_data.copy()
+        user_data["hashed_password"] = get_password_hash(user_data.pop("password"))
+        user = User(**user_data)
+        db_session.add(user)
+        db_session.commit()
+        app.dependency_overrides[get_current_active_user] = lambda: user
+        app.dependency_overrides[get_current_active_user_async] = lambda: user
+        return client
+
+    def test_get_com_etag_e_revalidacao(self, api: TestClient):
+        """Testa que as leituras têm ETag e Cache-Control de revalidação"""
+        response = api.get(f"{self.BASE}/api/dashboard/kpis")
+
+        assert response.status_code == 200
+        assert response.headers["etag"].startswith('"')
+        assert response.headers["cache-control"] == "private, no-cache"
+        assert "Authorization" in response.headers["vary"]
+
+    def test_if_none_match_responde_304_sem_consultas(self, api: TestClient, query_counter):
+        """Testa que um pedido condicional com o ETag atual não consulta a base"""
+        etag = api.get(f"{self.BASE}/api/dashboard/stats").headers["etag"]
+
+        with query_counter() as queries:
+            response = api.get(f"{self.BASE}/api/dashboard/stats", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        assert queries == []
+
+    def test_etag_muda_com_os_dados(self, api: TestClient, db_session):
+        """Testa que um commit numa tabela de que a rota depende muda o ETag"""
+        etag = api.get(f"{self.BASE}/api/provincias/").headers["etag"]
+
+        db_session.add(Provincia(nome="Nova"))
+        db_session.commit()
+        response = api.get(f"{self.BASE}/api/provincias/", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert any(p["nome"] == "Nova" for p in response.json())
+
+    def test_etag_separado_por_query(self, api: TestClient):
+        """Testa que filtros diferentes têm ETags diferentes"""
+        primeira = api.get(f"{self.BASE}/api/projetos/?limit=5").headers["etag"]
+        segunda = api.get(f"{self.BASE}/api/projetos/?limit=10").headers["etag"]
+
+        assert primeira != segunda
+
+    def test_etag_do_corpo_nas_restantes_rotas(self, api: TestClient):
+        """Testa o ETag calculado do corpo JSON nas rotas sem versão de dados"""
+        response = api.get(f"{self.BASE}/api/dashboard/health")
+        etag = response.headers["etag"]
+
+        repetido = api.get(f"{self.BASE}/api/dashboard/health", headers={"If-None-Match": etag})
+
+        assert repetido.status_code == 304
+        assert repetido.content == b""
+
+    def test_autenticacao_sem_cache(self, api: TestClient):
+        """Testa que as rotas de autenticação mantêm os cabeçalhos contra o cache do Brave"""
+        response = api.post(f"{self.BASE}/api/auth/login", json={"email": "x@example.com", "password": "errada"})
+
+        assert response.headers["cache-control"] == "no-cache, no-store, must-revalidate"
+        assert response.headers["pragma"] == "no-cache"
+        assert "etag" not in response.headers
+
+    def test_escritas_sem_armazenamento(self, api: TestClient):
+        """Testa que os métodos que não são de leitura usam no-store"""
+        response = api.post(f"{self.BASE}/api/projetos/", json={})
+
+        assert response.headers["cache-control"] == "no-store"
+        assert "etag" not in response.headers
+
+
+class TestCompressao:
+    """Testes para a compressão das respostas e a resposta JSON com orjson"""
+
+    BASE = "http://localhost"
+
+    @pytest.fixture
+    def api(self, client: TestClient, db_session, test_user_data):
+        from app.core.deps import get_current_active_user_async
+        from app.main import app
+
+        user_data = test_user_data.copy()
+        user_data["hashed_password"] = get_password_hash(user_data.pop("password"))
+        user = User(**user_data)
+        db_session.add(user)
+        db_session.add_all([Provincia(nome=f"Província Compressão {i}") for i in range(80)])
+        db_session.commit()
+        app.dependency_overrides[get_current_active_user_async] = lambda: user
+        return client
+
+    def test_gzip_com_etag_da_codificacao(self, api: TestClient):
+        """Testa a resposta gzip com Vary e ETag próprio da representação comprimida"""
+        response = api.get(f"{self.BASE}/api/provincias/", headers={"Accept-Encoding": "gzip"})
+
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert response.headers["etag"].endswith('-gzip"')
+        assert response.num_bytes_downloaded < len(response.content)
+        assert len(response.json()) >= 80
+
+    def test_304_com_etag_comprimido(self, api: TestClient):
+        """Testa que o ETag da versão comprimida é aceite no pedido condicional"""
+        etag = api.get(f"{self.BASE}/api/provincias/", headers={"Accept-Encoding": "gzip"}).headers["etag"]
+
+        response = api.get(
+            f"{self.BASE}/api/provincias/",
+            headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+        )
+
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+
+    def test_sem_compressao_sem_accept_encoding(self, api: TestClient):
+        """Testa que sem Accept-Encoding a resposta segue sem compressão e com o ETag original"""
+        response = api.get(f"{self.BASE}/api/provincias/", headers={"Accept-Encoding": "identity"})
+
+        assert "content-encoding" not in response.headers
+        assert not response.headers["etag"].endswith('-gzip"')
+
+    def test_respostas_pequenas_nao_comprimidas(self, api: TestClient):
+        """Testa o tamanho mínimo para comprimir"""
+        response = api.get(f"{self.BASE}/api/dashboard/kpis", headers={"Accept-Encoding": "gzip"})
+
+        assert len(response.content) < 1024
+        assert "content-encoding" not in response.headers
+
+    def test_negociacao(self):
+        """Testa a escolha do algoritmo a partir de Accept-Encoding"""
+        from app.core.compression import negociar
+
+        assert negociar("gzip, deflate, br", ["br", "gzip"]) == "br"
+        assert negociar("gzip, deflate, br", ["gzip", "br"]) == "gzip"
+        assert negociar("br;q=0.5, gzip", ["br", "gzip"]) == "gzip"
+        assert negociar("gzip;q=0", ["gzip"]) is None
+        assert negociar("*", ["gzip"]) == "gzip"
+        assert negociar("", ["br", "gzip"]) is None
+
+    def test_orjson_serializa_tipos_do_dominio(self):
+        """Testa Decimal, datetime e enums na resposta JSON"""
+        import json
+        from datetime import datetime
+        from decimal import Decimal
+        from app.core.responses import ORJSONResponse
+        from app.models.projeto import EstadoProjeto
+
+        corpo = ORJSONResponse({
+            "orcamento": Decimal("1250000.50"),
+            "data": datetime(2024, 3, 1, 12, 30),
+            "estado": EstadoProjeto.PLANEADO,
+            1: "chave inteira"
+        }).body
+
+        assert json.loads(corpo) == {
+            "orcamento": 1250000.5,
+            "data": "2024-03-01T12:30:00",
+            "estado": "PLANEADO",
+            "1": "chave inteira"
+        }
+
+
+class TestConsultasPorEndpoint:
+    """Número de queries SQL das listagens, que não pode depender do tamanho da página"""
+
+    BASE = "http://localhost"
+    TOTAL = 12
+
+    LISTAGENS = [
+        "/api/projetos/",
+        "/api/indicadores/",
+        "/api/licenciamentos/",
+        "/api/eixos-5w2h/",
+    ]
+
+    @pytest.fixture
+    def api(self, client: TestClient, db_session, test_user_data, test_projeto_data):
+        from datetime import datetime
+        from app.core.deps import get_current_active_user_async
+        from app.main import app
+        from app.models.eixo_5w2h import Eixo5W2H
+        from app.models.indicador import Indicador
+        from app.models.licenciamento import Licenciamento
+        from app.models.projeto import Projeto
+
+        user_data = test_user_data.copy()
+        user_data["hashed_password"] = get_password_hash(user_data.pop("password"))
+        user = User(**user_data)
+        db_session.add(user)
+
+        # Cada projeto numa província diferente: um lazy load por linha seria uma query por linha
+        for i in range(self.TOTAL):
+            provincia = Provincia(nome=f"Província Consultas {i}")
+            db_session.add(provincia)
+            db_session.flush()
+            dados = {
+                **test_projeto_data,
+                "nome": f"Projeto Consultas {i}",
+                "provincia_id": provincia.id,
+                "data_inicio_prevista": datetime(2024, 1, 1),
+                "data_fim_prevista": datetime(2024, 12, 31),
+            }
+            projeto = Projeto(**dados)
+            db_session.add(projeto)
+            db_session.flush()
+            db_session.add_all([
+                Indicador(
+                    projeto_id=projeto.id, nome="Produção", unidade="toneladas", meta=100,
+                    periodo_referencia="T1", fonte_dados="Relatório"
+                ),
+                Licenciamento(projeto_id=projeto.id, entidade_responsavel="IPA", data_submissao=datetime(2024, 1, 1)),
+                Eixo5W2H(
+                    projeto_id=projeto.id, what="O quê", why="Porquê", where="Onde", when="Quando",
+                    who="Quem", how="Como", how_much_kz=1000, periodo="0-6"
+                ),
+            ])
+        db_session.commit()
+        db_session.expire_all()
+
+        app.dependency_overrides[get_current_active_user_async] = lambda: user
+        return client
+
+    def _contar(self, api: TestClient, query_counter, url: str):
+        with query_counter() as queries:
+            response = api.get(f"{self.BASE}{url}")
+        assert response.status_code == 200, response.text
+        return len(queries), response.json()
+
+    @pytest.mark.parametrize("view", ["completa", "resumo"])
+    @pytest.mark.parametrize("listagem", LISTAGENS)
+    def test_queries_independentes_do_tamanho_da_pagina(self, api: TestClient, query_counter, db_session, listagem, view):
+        """Testa que a listagem faz as mesmas queries com 2 ou com todas as linhas"""
+        pequena, linhas = self._contar(api, query_counter, f"{listagem}?view={view}&limit=2")
+        db_session.expire_all()
+        grande, todas = self._contar(api, query_counter, f"{listagem}?view={view}&limit={self.TOTAL * 2}")
+
+        assert len(linhas) == 2
+        assert len(todas) >= self.TOTAL
+        assert grande == pequena
+
+    def test_relacoes_serializadas(self, api: TestClient):
+        """Testa que as relações aninhadas continuam presentes nas respostas"""
+        projeto = api.get(f"{self.BASE}/api/projetos/?limit=1").json()[0]
+        indicador = api.get(f"{self.BASE}/api/indicadores/?limit=1").json()[0]
+
+        assert projeto["provincia"]["nome"].startswith("Província Consultas")
+        assert indicador["projeto"]["nome"].startswith("Projeto Consultas")
+
+
+class TestVistaResumo:
+    """Testes para os modelos de leitura reduzidos (``view=resumo``)"""
+
+    BASE = "http://localhost"
+
+    @pytest.fixture
+    def api(self, client: TestClient, db_session, test_user_data, test_projeto_data):
+        from datetime import datetime
+        from app.core.deps import get_current_active_user_async
+        from app.main import app
+        from app.models.eixo_5w2h import Eixo5W2H
+        from app.models.indicador import Indicador
+        from app.models.licenciamento import Licenciamento
+        from app.models.projeto import Projeto
+
+        user_data = test_user_data.copy()
+        user_data["hashed_password"] = get_password_hash(user_data.pop("password"))
+        user = User(**user_data)
+        provincia = Provincia(nome="Província Resumo")
+        db_session.add_all([user, provincia])
+        db_session.flush()
+        projeto = Projeto(**{
+            **test_projeto_data,
+            "nome": "Projeto Resumo",
+            "provincia_id": provincia.id,
+            "descricao": "Descrição longa " * 200,
+            "data_inicio_prevista": datetime(2024, 1, 1),
+            "data_fim_prevista": datetime(2024, 12, 31),
+        })
+        db_session.add(projeto)
+        db_session.flush()
+        db_session.add_all([
+            Indicador(
+                projeto_id=projeto.id, nome="Famílias beneficiadas", unidade="famílias", meta=100,
+                valor_actual=40, periodo_referencia="T1", fonte_dados="Relatório"
+            ),
+            Licenciamento(
+                projeto_id=projeto.id, entidade_responsavel="IPA", data_submissao=datetime(2024, 1, 1),
+                observacoes="Observações longas " * 200
+            ),
+            Eixo5W2H(
+                projeto_id=projeto.id, what="O quê " * 200, why="Porquê", where="Onde", when="Quando",
+                who="Quem", how="Como", how_much_kz=1000, periodo="0-6"
+            ),
+        ])
+        db_session.commit()
+
+        app.dependency_overrides[get_current_active_user_async] = lambda: user
+        return client
+
+    @pytest.mark.parametrize("listagem,modelo", [
+        ("/api/projetos/", "app.schemas.projeto.ProjetoResumo"),
+        ("/api/indicadores/", "app.schemas.indicador.IndicadorResumo"),
+        ("/api/licenciamentos/", "app.schemas.licenciamento.LicenciamentoResumo"),
+        ("/api/eixos-5w2h/", "app.schemas.eixo_5w2h.Eixo5W2HResumo"),
+    ])
+    def test_campos_do_modelo_resumo(self, api: TestClient, listagem, modelo):
+        """Testa que o resumo traz exatamente os campos do modelo de leitura"""
+        import importlib
+
+        modulo, nome = modelo.rsplit(".", 1)
+        classe = getattr(importlib.import_module(modulo), nome)
+        response = api.get(f"{self.BASE}{listagem}?view=resumo")
+
+        assert response.status_code == 200
+        linhas = response.json()
+        assert len(linhas) == 1
+        assert set(linhas[0]) == set(classe.model_fields)
+        classe.model_validate(linhas[0])
+
+    def test_resumo_nao_le_colunas_longas(self, api: TestClient, query_counter):
+        """Testa que a query do resumo não seleciona os textos longos"""
+        with query_counter() as queries:
+            response = api.get(f"{self.BASE}/api/projetos/?view=resumo")
+
+        projeto = response.json()[0]
+        assert projeto["provincia_nome"] == "Província Resumo"
+        assert isinstance(projeto["orcamento_previsto_kz"], float)
+        assert "descricao" not in projeto
+        assert not any("descricao" in query for query in queries)
+
+    def test_resumo_com_filtros_e_etag(self, api: TestClient):
+        """Testa os filtros da listagem e o ETag próprio da vista"""
+        completa = api.get(f"{self.BASE}/api/indicadores/")
+        resumo = api.get(f"{self.BASE}/api/indicadores/?view=resumo&periodo_referencia=T1")
+        vazio = api.get(f"{self.BASE}/api/indicadores/?view=resumo&periodo_referencia=T2")
+
+        assert resumo.json()[0]["categoria_kpi"] == "FAMILIAS_BENEFICIADAS"
+        assert vazio.json() == []
+        assert resumo.headers["etag"] != completa.headers["etag"]
+
+
+class TestIndicadoresLoteAPI:
+    """Testes para a chave única e o upsert em lote dos valores dos indicadores"""
+
+    BASE = "http://localhost"
+
+    @pytest.fixture
+    def api(self, client: TestClient, db_session, test_user_data, test_projeto_data):
+        from datetime import datetime
+        from app.core.deps import get_current_active_user_async, require_root_or_gestao
+        from app.main import app
+        from app.models.projeto import Projeto
+
+        user_data = test_user_data.copy()
+        user_data["hashed_password"] = get_password_hash(user_data.pop("password"))
+        user = User(**user_data)
+        provincia = Provincia(nome="Província Lote")
+        db_session.add_all([user, provincia])
+        db_session.flush()
+        projeto = Projeto(**{
+            **test_projeto_data,
+            "provincia_id": provincia.id,
+            "data_inicio_prevista": datetime(2024, 1, 1),
+            "data_fim_prevista": datetime(2024, 12, 31),
+        })
+        db_session.add(projeto)
+        db_session.commit()
+        # O pedido de escrita fecha a sessão; o utilizador fica com os atributos carregados
+        db_session.refresh(user)
+        db_session.expunge(user)
+
+        app.dependency_overrides[get_current_active_user_async] = lambda: user
+        app.dependency_overrides[require_root_or_gestao] = lambda: user
+        client.projeto_id = projeto.id
+        return client
+
+    def test_upsert_e_invalidacao_do_etag(self, api: TestClient):
+        """Testa as contagens devolvidas e que a listagem deixa de responder 304"""
+        valor = {
+            "projeto_id": api.projeto_id, "nome": "Produção de tilápia", "unidade": "toneladas",
+            "meta": 20, "valor_actual": 5, "periodo_referencia": "T2", "fonte_dados": "Relatório"
+        }
+        primeiro = api.post(f"{self.BASE}/api/indicadores/lote", json={"valores": [valor]})
+        assert primeiro.status_code == 200
+        assert primeiro.json() == {"criados": 1, "atualizados": 0, "inalterados": 0, "erros": []}
+
+        etag = api.get(f"{self.BASE}/api/indicadores/").headers["etag"]
+        segundo = api.post(f"{self.BASE}/api/indicadores/lote", json={"valores": [dict(valor, valor_actual=9)]})
+        assert segundo.json()["atualizados"] == 1
+
+        listagem = api.get(f"{self.BASE}/api/indicadores/", headers={"If-None-Match": etag})
+        assert listagem.status_code == 200
+        assert [i["valor_actual"] for i in listagem.json()] == [9.0]
+
+    def test_lote_vazio_rejeitado(self, api: TestClient):
+        """Testa que um lote sem valores é rejeitado na validação"""
+        assert api.post(f"{self.BASE}/api/indicadores/lote", json={"valores": []}).status_code == 422
+
+    def test_duplicado_responde_409(self, api: TestClient):
+        """Testa o 409 ao criar um indicador repetido e ao renomear outro para a mesma chave"""
+        valor = {
+            "projeto_id": api.projeto_id, "nome": "Produção de tilápia", "unidade": "toneladas",
+            "meta": 20, "valor_actual": 5, "periodo_referencia": "T2", "fonte_dados": "Relatório"
+        }
+        assert api.post(f"{self.BASE}/api/indicadores/", json=valor).status_code == 200
+        duplicado = api.post(f"{self.BASE}/api/indicadores/", json=valor)
+        assert duplicado.status_code == 409
+        assert "Já existe o indicador" in duplicado.json()["detail"]
+
+        outro = api.post(f"{self.BASE}/api/indicadores/", json=dict(valor, nome="Produção de bagre")).json()
+        renomeado = api.put(f"{self.BASE}/api/indicadores/{outro['id']}", json={"nome": "Produção de tilápia"})
+        assert renomeado.status_code == 409
@@ -0,0 +1,464 @@
+"""
+Benchmarks de desempenho (marcados como slow)
+
+Executar com: pytest tests/test_benchmarks.py -m slow -s
+"""
+import time
+import pytest
+from datetime import datetime
+from sqlalchemy import event, insert, text
+from sqlalchemy.orm import Session, sessionmaker
+from app.models.provincia import Provincia
+from app.models.projeto import Projeto, EstadoProjeto, FonteFinanciamento, TipoProjeto
+
+
+def _cronometrar(funcao, repeticoes: int = 3):
+    """Devolve o melhor tempo (segundos) e o resultado da função"""
+    melhor = None
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        duracao = time.perf_counter() - inicio
+        melhor = duracao if melhor is None else min(melhor, duracao)
+    return melhor, resultado
+
+
+def _criar_provincias(db_session: Session, total: int = 21):
+    provincias = [Provincia(nome=f"Província Bench {i}") for i in range(total)]
+    db_session.add_all(provincias)
+    db_session.flush()
+    return [p.id for p in provincias]
+
+
+def _criar_projetos_em_massa(db_session: Session, provincia_ids, total: int):
+    estados = list(EstadoProjeto)
+    fontes = list(FonteFinanciamento)
+    linhas = [
+        {
+            "nome": f"Projeto Bench {i}",
+            "provincia_id": provincia_ids[i % len(provincia_ids)],
+            "tipo": TipoProjeto.COMUNITARIO,
+            "fonte_financiamento": fontes[i % len(fontes)],
+            "estado": estados[i % len(estados)],
+            "responsavel": "Responsável",
+            "orcamento_previsto_kz": 1000000,
+            "orcamento_executado_kz": 250000,
+            "data_inicio_prevista": datetime(2024, 1, 1),
+            "data_fim_prevista": datetime(2025, 6, 30),
+            "descricao": "Projeto gerado para benchmark"
+        }
+        for i in range(total)
+    ]
+    db_session.execute(insert(Projeto), linhas)
+    db_session.flush()
+
+
+def _mapa_provincias_n_mais_1(db_session: Session):
+    """Implementação anterior: uma query por província e hidratação de todos os projetos"""
+    resultado = {}
+    for provincia in db_session.query(Provincia).order_by(Provincia.nome).all():
+        projetos = db_session.query(Projeto).filter(Projeto.provincia_id == provincia.id).all()
+        resultado[provincia.id] = (
+            len(projetos),
+            sum(float(p.orcamento_previsto_kz) for p in projetos),
+            sum(float(p.orcamento_executado_kz) for p in projetos)
+        )
+    return resultado
+
+
+@pytest.mark.slow
+class TestBenchmarkMapaProvincias:
+    """Benchmark do mapa de províncias com 10k projetos"""
+
+    def test_mapa_agrupado_vs_n_mais_1(self, db_session: Session):
+        from app.services.provincia_service import ProvinciaService
+
+        provincia_ids = _criar_provincias(db_session)
+        _criar_projetos_em_massa(db_session, provincia_ids, 10000)
+        db_session.expire_all()
+
+        service = ProvinciaService(db_session)
+        tempo_antigo, antigo = _cronometrar(lambda: _mapa_provincias_n_mais_1(db_session))
+        tempo_novo, novo = _cronometrar(service.get_mapa_provincias)
+
+        print(f"\nMapa de províncias (10k projetos): N+1 {tempo_antigo * 1000:.1f} ms, "
+              f"agrupado {tempo_novo * 1000:.1f} ms ({tempo_antigo / tempo_novo:.1f}x)")
+
+        por_id = {p["id"]: p for p in novo}
+        for provincia_id, (total, previsto, executado) in antigo.items():
+            assert por_id[provincia_id]["total_projetos"] == total
+            assert por_id[provincia_id]["orcamento_total_kz"] == pytest.approx(previsto)
+            assert por_id[provincia_id]["orcamento_executado_kz"] == pytest.approx(executado)
+
+        assert tempo_novo < tempo_antigo
+
+
+def _importar_linha_a_linha(db_session: Session, projetos_data):
+    """Implementação anterior: um commit e um refresh por projeto"""
+    for projeto_data in projetos_data:
+        db_projeto = Projeto(**projeto_data)
+        db_session.add(db_projeto)
+        db_session.commit()
+        db_session.refresh(db_projeto)
+
+
+@pytest.mark.slow
+class TestBenchmarkImportacaoProjetos:
+    """Benchmark da importação de 50k projetos"""
+
+    def test_importacao_em_lote_50k(self, db_session: Session):
+        from app.schemas.projeto import ProjetoCreate
+        from app.services.projeto_service import ProjetoService
+
+        provincia_ids = _criar_provincias(db_session)
+        projetos = [
+            {
+                "nome": f"Projeto Importado {i}",
+                "provincia_id": provincia_ids[i % len(provincia_ids)],
+                "tipo": TipoProjeto.EMPRESARIAL,
+                "fonte_financiamento": FonteFinanciamento.PRIVADO,
+                "responsavel": "Responsável",
+                "orcamento_previsto_kz": 1000000,
+                "data_inicio_prevista": datetime(2024, 1, 1),
+                "data_fim_prevista": datetime(2025, 6, 30)
+            }
+            for i in range(50000)
+        ]
+
+        amostra = [ProjetoCreate.model_validate(p).model_dump() for p in projetos[:1000]]
+        tempo_antigo, _ = _cronometrar(lambda: _importar_linha_a_linha(db_session, amostra), repeticoes=1)
+
+        tempo_novo, resultado = _cronometrar(
+            lambda: ProjetoService(db_session).import_projetos(projetos, imported_by_user_id=1),
+            repeticoes=1
+        )
+
+        por_linha_antigo = tempo_antigo / len(amostra)
+        por_linha_novo = tempo_novo / len(projetos)
+        print(f"\nImportação de projetos: linha a linha {por_linha_antigo * 1e6:.0f} µs/linha, "
+              f"em lote {por_linha_novo * 1e6:.0f} µs/linha ({tempo_novo:.1f} s para 50k, "
+              f"{por_linha_antigo / por_linha_novo:.1f}x)")
+
+        assert resultado["sucessos"] == 50000
+        assert resultado["erros"] == []
+        assert por_linha_novo < por_linha_antigo
+
+
+def _linhas_csv_indicadores(projeto_ids, total: int, prefixo: str = "Indicador"):
+    """Gera um CSV de indicadores linha a linha, sem o materializar"""
+    yield "projeto_id,nome,unidade,meta,valor_actual,periodo_referencia,fonte_dados\n"
+    for i in range(total):
+        yield f"{projeto_ids[i % len(projeto_ids)]},{prefixo} {i},toneladas,100,50,T{i % 4 + 1},Relatório\n"
+
+
+def _importar_indicadores_linha_a_linha(service, conteudo: str):
+    """Implementação anterior: create_indicador (commit + auditoria) por linha"""
+    import csv
+    import io
+    from decimal import Decimal
+    from app.models.indicador import Trimestre
+    from app.schemas.indicador import IndicadorCreate
+
+    for row in csv.DictReader(io.StringIO(conteudo)):
+        service.create_indicador(IndicadorCreate(
+            projeto_id=int(row['projeto_id']),
+            nome=row['nome'],
+            unidade=row['unidade'],
+            meta=Decimal(row['meta']),
+            valor_actual=Decimal(row.get('valor_actual', '0')),
+            periodo_referencia=Trimestre(row['periodo_referencia']),
+            fonte_dados=row['fonte_dados']
+        ), 1)
+
+
+@pytest.mark.slow
+class TestBenchmarkImportacaoIndicadores:
+    """Benchmark da importação de indicadores em streaming"""
+
+    def test_importacao_stream_vs_linha_a_linha(self, db_session: Session):
+        from app.services.indicador_service import IndicadorService
+
+        provincia_ids = _criar_provincias(db_session, 1)
+        _criar_projetos_em_massa(db_session, provincia_ids, 50)
+        projeto_ids = [p.id for p in db_session.query(Projeto.id).all()]
+        service = IndicadorService(db_session)
+
+        amostra = "".join(_linhas_csv_indicadores(projeto_ids, 500))
+        tempo_antigo, _ = _cronometrar(lambda: _importar_indicadores_linha_a_linha(service, amostra), repeticoes=1)
+
+        total = 50000
+        # Nomes distintos dos da amostra (chave única por projeto, nome e período)
+        tempo_novo, resultado = _cronometrar(
+            lambda: service.import_indicadores_stream(
+                _linhas_csv_indicadores(projeto_ids, total, "Indicador stream"), user_id=1
+            ),
+            repeticoes=1
+        )
+
+        por_linha_antigo = tempo_antigo / 500
+        por_linha_novo = tempo_novo / total
+        print(f"\nImportação de indicadores: linha a linha {por_linha_antigo * 1e6:.0f} µs/linha, "
+              f"streaming {por_linha_novo * 1e6:.0f} µs/linha ({por_linha_antigo / por_linha_novo:.1f}x)")
+
+        assert resultado["imported_count"] == total
+        assert por_linha_novo * 10 < por_linha_antigo
+
+    def test_memoria_nao_cresce_com_o_ficheiro(self, db_session: Session):
+        import tracemalloc
+        from app.services.indicador_service import IndicadorService
+
+        provincia_ids = _criar_provincias(db_session, 1)
+        _criar_projetos_em_massa(db_session, provincia_ids, 50)
+        projeto_ids = [p.id for p in db_session.query(Projeto.id).all()]
+        service = IndicadorService(db_session)
+
+        picos = {}
+        for total in (10000, 50000):
+            tracemalloc.start()
+            # Nomes distintos por importação (chave única por projeto, nome e período)
+            service.import_indicadores_stream(_linhas_csv_indicadores(projeto_ids, total, f"Indicador {total}"), user_id=1)
+            picos[total] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        print(f"\nPico de memória: 10k linhas {picos[10000] / 1e6:.1f} MB, 50k linhas {picos[50000] / 1e6:.1f} MB")
+        assert picos[50000] < picos[10000] * 1.5
+
+
+
+@pytest.mark.slow
+class TestBenchmarkUpsertIndicadores:
+    """Benchmark do carregamento trimestral: upsert em lote vs um PUT por indicador"""
+
+    def test_upsert_em_lote_vs_update_por_indicador(self, db_session: Session):
+        from app.schemas.indicador import IndicadorUpdate, IndicadorValoresLote
+        from app.services.indicador_service import IndicadorService
+
+        provincia_ids = _criar_provincias(db_session, 1)
+        _criar_projetos_em_massa(db_session, provincia_ids, 50)
+        projeto_ids = [p.id for p in db_session.query(Projeto.id).all()]
+        service = IndicadorService(db_session)
+
+        total = 5000
+        service.import_indicadores_stream(_linhas_csv_indicadores(projeto_ids, total), user_id=1)
+        ids = [id_ for id_, in db_session.execute(text("SELECT id FROM indicadores ORDER BY id LIMIT 200"))]
+        tempo_antigo, _ = _cronometrar(
+            lambda: [service.update_indicador(id_, IndicadorUpdate(valor_actual=60), 1) for id_ in ids],
+            repeticoes=1
+        )
+
+        lote = IndicadorValoresLote(valores=[
+            {"projeto_id": projeto_ids[i % len(projeto_ids)], "nome": f"Indicador {i}", "unidade": "toneladas",
+             "meta": 100, "valor_actual": 75, "periodo_referencia": f"T{i % 4 + 1}", "fonte_dados": "Relatório"}
+            for i in range(total)
+        ])
+        tempo_novo, resultado = _cronometrar(lambda: service.upsert_indicadores_lote(lote, user_id=1), repeticoes=1)
+
+        por_valor_antigo = tempo_antigo / len(ids)
+        por_valor_novo = tempo_novo / total
+        print(f"\nValores trimestrais: update por indicador {por_valor_antigo * 1e6:.0f} µs/valor, "
+              f"upsert em lote {por_valor_novo * 1e6:.0f} µs/valor ({por_valor_antigo / por_valor_novo:.1f}x)")
+
+        assert resultado.atualizados == total
+        assert por_valor_novo * 10 < por_valor_antigo
+
+
+@pytest.mark.slow
+class TestBenchmarkExportacaoIndicadores:
+    """Memória da exportação de indicadores em streaming"""
+
+    def _pico_memoria(self, funcao) -> int:
+        import tracemalloc
+
+        tracemalloc.start()
+        try:
+            funcao()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_memoria_nao_cresce_com_o_numero_de_linhas(self, db_session: Session, tmp_path):
+        import openpyxl  # noqa: F401  (importado antes de medir)
+        from app.services.export_service import ExportService
+        from app.services.indicador_service import IndicadorService
+
+        provincia_ids = _criar_provincias(db_session, 3)
+        _criar_projetos_em_massa(db_session, provincia_ids, 30)
+        projeto_ids = [p.id for p in db_session.query(Projeto.id).all()]
+        service = ExportService(db_session)
+
+        picos_csv, picos_excel = {}, {}
+        total_importado = 0
+        for total in (5000, 25000):
+            IndicadorService(db_session).import_indicadores_stream(
+                _linhas_csv_indicadores(projeto_ids, total - total_importado), user_id=1
+            )
+            total_importado = total
+
+            picos_csv[total] = self._pico_memoria(
+                lambda: sum(len(parte) for parte in service.iter_indicadores_csv())
+            )
+            picos_excel[total] = self._pico_memoria(
+                lambda: service.write_indicadores_excel(str(tmp_path / f"indicadores_{total}.xlsx"))
+            )
+
+        print(f"\nPico de memória CSV: 5k {picos_csv[5000] / 1e6:.1f} MB, 25k {picos_csv[25000] / 1e6:.1f} MB; "
+              f"Excel: 5k {picos_excel[5000] / 1e6:.1f} MB, 25k {picos_excel[25000] / 1e6:.1f} MB")
+
+        assert picos_csv[25000] < picos_csv[5000] * 1.5
+        assert picos_excel[25000] < picos_excel[5000] * 1.5
+
+
+@pytest.mark.slow
+class TestBenchmarkSessaoAsync:
+    """
+    Carga concorrente: endpoint síncrono (threadpool) vs assíncrono (run_sync).
+
+    A latência de rede da base de dados é simulada com uma função SQLite que
+    dorme dentro do driver: no caminho síncrono ocupa uma thread da
+    threadpool, no assíncrono apenas a ligação (a thread do aiosqlite).
+    """
+
+    LATENCIA_MS = 100
+    PEDIDOS = 120
+    THREADS = 8
+    LIGACOES = 40
+
+    def _preparar_engines(self, tmp_path):
+        from app.db.database import Base
+        from app.db.engine import criar_engine, criar_engine_async
+
+        database_url = f"sqlite:///{tmp_path / 'carga.db'}"
+        opcoes = {"pool_size": self.LIGACOES, "max_overflow": 0}
+        engine = criar_engine(database_url, **opcoes)
+        async_engine = criar_engine_async(database_url, **opcoes)
+
+        def registar_latencia(dbapi_connection, connection_record):
+            dbapi_connection.create_function("latencia", 1, lambda ms: time.sleep(ms / 1000) or ms)
+
+        event.listen(engine, "connect", registar_latencia)
+        event.listen(async_engine.sync_engine, "connect", registar_latencia)
+
+        Base.metadata.create_all(bind=engine)
+        with sessionmaker(bind=engine)() as db:
+            provincia_ids = _criar_provincias(db, 3)
+            _criar_projetos_em_massa(db, provincia_ids, 50)
+            db.commit()
+        return engine, async_engine
+
+    def _app(self, engine, async_engine):
+        from fastapi import FastAPI
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+        from app.schemas.projeto import ProjetoResponse
+        from app.services.projeto_service import ProjetoService
+
+        SessaoSync = sessionmaker(bind=engine)
+        SessaoAsync = async_sessionmaker(async_engine, expire_on_commit=False)
+
+        def listar(sessao):
+            sessao.execute(text("SELECT latencia(:ms)"), {"ms": self.LATENCIA_MS})
+            return [ProjetoResponse.model_validate(p) for p in ProjetoService(sessao).get_projetos(limit=10)]
+
+        app = FastAPI()
+
+        @app.get("/sync")
+        def listar_sync():
+            with SessaoSync() as sessao:
+                return listar(sessao)
+
+        @app.get("/async")
+        async def listar_async():
+            async with SessaoAsync() as sessao:
+                return await sessao.run_sync(listar)
+
+        return app
+
+    async def _carga(self, app, caminho: str) -> float:
+        import anyio.to_thread
+        import asyncio
+        import httpx
+
+        anyio.to_thread.current_default_thread_limiter().total_tokens = self.THREADS
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as cliente:
+            await cliente.get(caminho)
+            inicio = time.perf_counter()
+            respostas = await asyncio.gather(*(cliente.get(caminho) for _ in range(self.PEDIDOS)))
+            duracao = time.perf_counter() - inicio
+        assert all(r.status_code == 200 and len(r.json()) == 10 for r in respostas)
+        return duracao
+
+    def test_async_escala_com_ligacoes_e_nao_com_threads(self, tmp_path):
+        import asyncio
+        from app.db.engine import metricas_pool
+
+        engine, async_engine = self._preparar_engines(tmp_path)
+        app = self._app(engine, async_engine)
+        try:
+            tempo_sync = asyncio.run(self._carga(app, "/sync"))
+            tempo_async = asyncio.run(self._carga(app, "/async"))
+            pool_async = metricas_pool(async_engine)
+        finally:
+            engine.dispose()
+            asyncio.run(async_engine.dispose())
+
+        print(f"\n{self.PEDIDOS} pedidos concorrentes ({self.THREADS} threads, {self.LIGACOES} ligações, "
+              f"{self.LATENCIA_MS} ms de latência): sync {self.PEDIDOS / tempo_sync:.0f} req/s, "
+              f"async {self.PEDIDOS / tempo_async:.0f} req/s; "
+              f"espera máxima por ligação async {pool_async['wait_max_ms']:.1f} ms")
+
+        assert tempo_async < tempo_sync * 0.8
+
+
+@pytest.mark.slow
+class TestBenchmarkRespostaProjetos:
+    """Serialização e bytes transferidos de /api/projetos/?limit=1000"""
+
+    URL = "http://localhost/api/projetos/?limit=1000"
+
+    def test_orjson_e_compressao(self, client, db_session: Session):
+        from typing import List
+        from fastapi.encoders import jsonable_encoder
+        from fastapi.responses import JSONResponse
+        from pydantic import TypeAdapter
+        from app.core.compression import brotli
+        from app.core.deps import get_current_active_user_async
+        from app.core.responses import ORJSONResponse
+        from app.main import app
+        from app.models.user import User, UserRole
+        from app.schemas.projeto import ProjetoResponse
+        from app.services.projeto_service import ProjetoService
+
+        provincia_ids = _criar_provincias(db_session)
+        _criar_projetos_em_massa(db_session, provincia_ids, 1000)
+        user = User(email="bench@example.com", full_name="Bench", hashed_password="x", role=UserRole.VISUALIZACAO)
+        db_session.add(user)
+        db_session.commit()
+        app.dependency_overrides[get_current_active_user_async] = lambda: user
+
+        projetos = [ProjetoResponse.model_validate(p) for p in ProjetoService(db_session).get_projetos(limit=1000)]
+        # O que o FastAPI entrega à classe de resposta com response_model
+        conteudo = TypeAdapter(List[ProjetoResponse]).dump_python(projetos, mode="json")
+        # Rotas sem response_model (dicionários com Decimal e datetime)
+        dicionarios = [p.model_dump() for p in projetos]
+
+        tempo_json, corpo_json = _cronometrar(lambda: JSONResponse(conteudo).body, repeticoes=5)
+        tempo_orjson, corpo_orjson = _cronometrar(lambda: ORJSONResponse(conteudo).body, repeticoes=5)
+        tempo_encoder, _ = _cronometrar(lambda: JSONResponse(jsonable_encoder(dicionarios)).body, repeticoes=5)
+        tempo_direto, _ = _cronometrar(lambda: ORJSONResponse(dicionarios).body, repeticoes=5)
+
+        tamanhos = {}
+        codificacoes = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+        for codificacao in codificacoes:
+            response = client.get(self.URL, headers={"Accept-Encoding": codificacao})
+            assert response.status_code == 200
+            assert len(response.json()) == 1000
+            tamanhos[codificacao] = response.num_bytes_downloaded
+
+        print(f"\nSerialização de 1000 projetos: json {tempo_json * 1000:.1f} ms, orjson {tempo_orjson * 1000:.1f} ms; "
+              f"jsonable_encoder+json {tempo_encoder * 1000:.1f} ms, orjson direto {tempo_direto * 1000:.1f} ms")
+        print("Bytes transferidos: " + ", ".join(f"{c} {t / 1024:.0f} KiB" for c, t in tamanhos.items()))
+
+        assert len(corpo_orjson) <= len(corpo_json)
+        assert tempo_orjson < tempo_json
+        assert tempo_direto * 5 < tempo_encoder
+        assert tamanhos["gzip"] * 5 < tamanhos["identity"]
@@ -2,6 +2,7 @@
 Testes para os serviços
 """
 import pytest
+from datetime import datetime
 from sqlalchemy.orm import Session
 from app.services.user_service import UserService
 from app.services.projeto_service import ProjetoService
@@ -13,7 +14,7 @@ from app.models.projeto import Projeto
 from app.models.provincia import Provincia
 from app.models.indicador import Indicador
 from app.models.licenciamento import Licenciamento
-from app.models.audit_log import AuditLog
+from app.models.audit_log import AuditLog, AcaoAudit
 
 class TestUserService:
     """Testes para UserService"""
@@ -119,6 +120,78 @@ class TestProjetoService:
         projetos_luanda = projeto_service.get_projetos(provincia_id=provincia.id)
         assert len(projetos_luanda) == 2
 
+    _DATAS = {"data_inicio_prevista": datetime(2024, 1, 1), "data_fim_prevista": datetime(2024, 12, 31)}
+
+    def test_import_projetos_relatorio_por_linha(self, db_session: Session, test_projeto_data):
+        """Testa que a importação insere as linhas válidas e reporta as inválidas com o número da linha"""
+        provincia = Provincia(nome="Luanda")
+        db_session.add(provincia)
+        db_session.commit()
+
+        valido = dict(test_projeto_data, provincia_id=provincia.id, **self._DATAS)
+        sem_nome = {k: v for k, v in valido.items() if k != "nome"}
+        por_nome = dict({k: v for k, v in valido.items() if k != "provincia_id"}, provincia="luanda", nome="Projeto por nome")
+        provincia_inexistente = dict(valido, provincia_id=provincia.id + 1000)
+
+        resultado = ProjetoService(db_session).import_projetos(
+            [valido, sem_nome, por_nome, provincia_inexistente], imported_by_user_id=1
+        )
+
+        assert resultado["sucessos"] == 2
+        assert resultado["total_processados"] == 4
+        assert len(resultado["erros"]) == 2
+        assert resultado["erros"][0].startswith("Linha 2: Projeto inválido (nome")
+        assert resultado["erros"][1] == f"Linha 4: Província não encontrada: {provincia.id + 1000}"
+
+        nomes = {p.nome for p in db_session.query(Projeto).filter(Projeto.provincia_id == provincia.id)}
+        assert nomes == {"Projeto Teste", "Projeto por nome"}
+        assert db_session.query(AuditLog).filter(AuditLog.entidade == "Projeto").count() == 3
+
+    def test_import_projetos_numero_de_queries_constante(self, db_session: Session, test_projeto_data, query_counter):
+        """Testa que o número de queries depende do número de blocos e não do número de linhas"""
+        provincia = Provincia(nome="Luanda")
+        db_session.add(provincia)
+        db_session.commit()
+
+        projetos = [
+            dict(test_projeto_data, provincia_id=provincia.id, nome=f"Projeto {i}", **self._DATAS)
+            for i in range(300)
+        ]
+
+        with query_counter() as queries:
+            resultado = ProjetoService(db_session).import_projetos(projetos, chunk_size=100)
+
+        assert resultado["sucessos"] == 300
+        assert resultado["erros"] == []
+        # províncias + 3 blocos + logs de auditoria + contadores de auditoria
+        assert len(queries) <= 7
+
+    def test_importador_repete_bloco_com_erro_linha_a_linha(self, db_session: Session, test_projeto_data):
+        """Testa que uma linha rejeitada pela base de dados não invalida o resto do bloco"""
+        from app.services.import_service import ImportadorEmLote
+        from app.schemas.projeto import ProjetoCreate
+
+        provincia = Provincia(nome="Luanda")
+        db_session.add(provincia)
+        db_session.flush()
+
+        valores = ProjetoCreate.model_validate(
+            dict(test_projeto_data, provincia_id=provincia.id, **self._DATAS)
+        ).model_dump()
+        linhas = [
+            (10, dict(valores, nome="A")),
+            (11, dict(valores, nome=None)),
+            (12, dict(valores, nome="C")),
+        ]
+
+        importador = ImportadorEmLote(db_session, Projeto, chunk_size=10, retorno=(Projeto.id, Projeto.nome))
+        inseridas, erros = importador.inserir(linhas)
+
+        assert sorted(linha.nome for linha in inseridas) == ["A", "C"]
+        assert [numero for numero, _ in erros] == [11]
+        assert "NOT NULL" in erros[0][1]
+        assert db_session.query(Projeto).filter(Projeto.provincia_id == provincia.id).count() == 2
+
 class TestIndicadorService:
     """Testes para IndicadorService"""
     
@@ -155,6 +228,338 @@ class TestIndicadorService:
         assert indicador.meta == indicador_data["meta"]
         assert indicador.projeto_id == projeto.id
 
+    def _criar_projeto(self, db_session: Session, test_projeto_data) -> Projeto:
+        provincia = Provincia(nome="Luanda")
+        db_session.add(provincia)
+        db_session.flush()
+        projeto = Projeto(**dict(
+            test_projeto_data,
+            provincia_id=provincia.id,
+            data_inicio_prevista=datetime(2024, 1, 1),
+            data_fim_prevista=datetime(2024, 12, 31)
+        ))
+        db_session.add(projeto)
+        db_session.commit()
+        return projeto
+
+    def test_import_indicadores_stream(self, db_session: Session, test_projeto_data):
+        """Testa a importação em streaming com erros por linha e progresso por bloco"""
+        import io
+
+        projeto = self._criar_projeto(db_session, test_projeto_data)
+        linhas = ["projeto_id,nome,unidade,meta,valor_actual,periodo_referencia,fonte_dados"]
+        linhas += [f"{projeto.id},Produção {i},toneladas,100,50,T1,Relatório" for i in range(5)]
+        linhas += [
+            f"{projeto.id},Sem unidade,,100,50,T1,Relatório",
+            f"{projeto.id + 1000},Projeto inexistente,toneladas,100,50,T1,Relatório",
+            f"{projeto.id},Trimestre inválido,toneladas,100,50,T9,Relatório",
+            f"{projeto.id},Meta inválida,toneladas,abc,50,T1,Relatório",
+        ]
+        progresso = []
+
+        resultado = IndicadorService(db_session).import_indicadores_stream(
+            io.StringIO("\n".join(linhas)), user_id=1, chunk_size=2,
+            progresso=lambda *args: progresso.append(args)
+        )
+
+        assert resultado["imported_count"] == 5
+        assert resultado["processed_count"] == 9
+        assert resultado["error_count"] == 4
+        assert resultado["success"] is False
+        assert resultado["errors"][0] == "Linha 7: Campo 'unidade' é obrigatório"
+        assert resultado["errors"][1] == f"Linha 8: Projeto {projeto.id + 1000} não existe"
+        assert [e.split(":")[0] for e in resultado["errors"][2:]] == ["Linha 9", "Linha 10"]
+        assert progresso[0] == (2, 2, 0)
+        assert progresso[-1] == (9, 5, 4)
+        assert db_session.query(Indicador).filter(Indicador.projeto_id == projeto.id).count() == 5
+        assert db_session.query(AuditLog).filter(AuditLog.entidade == "Indicador").count() == 6
+
+    def test_import_interrompido_indica_blocos_gravados(self, db_session: Session, test_projeto_data):
+        """Testa que uma falha a meio devolve os indicadores já gravados em vez de 0"""
+        projeto = self._criar_projeto(db_session, test_projeto_data)
+
+        def linhas():
+            yield "projeto_id,nome,unidade,meta,valor_actual,periodo_referencia,fonte_dados"
+            for i in range(5):
+                yield f"{projeto.id},Produção {i},toneladas,100,50,T1,Relatório"
+            raise OSError("ligação interrompida")
+
+        resultado = IndicadorService(db_session).import_indicadores_stream(linhas(), user_id=1, chunk_size=2)
+
+        assert resultado["imported_count"] == 4
+        assert resultado["success"] is False
+        assert resultado["errors"] == ["Erro geral: ligação interrompida"]
+        assert db_session.query(Indicador).filter(Indicador.projeto_id == projeto.id).count() == 4
+
+    def test_import_indicadores_csv_texto(self, db_session: Session, test_projeto_data):
+        """Testa que a importação a partir de texto continua a funcionar"""
+        projeto = self._criar_projeto(db_session, test_projeto_data)
+        conteudo = (
+            "projeto_id,nome,unidade,meta,periodo_referencia,fonte_dados\n"
+            f"{projeto.id},Famílias,famílias,20,T2,Inquérito\n"
+        )
+
+        resultado = IndicadorService(db_session).import_indicadores_csv(conteudo, user_id=1)
+
+        assert resultado["imported_count"] == 1
+        assert resultado["success"] is True
+        indicador = db_session.query(Indicador).filter(Indicador.projeto_id == projeto.id).one()
+        assert indicador.valor_actual == 0
+
+class TestExportService:
+    """Testes para ExportService"""
+
+    def _criar_indicadores(self, db_session: Session, test_projeto_data, total: int):
+        from sqlalchemy import insert
+
+        provincias = [Provincia(nome="Luanda"), Provincia(nome="Benguela")]
+        db_session.add_all(provincias)
+        db_session.flush()
+        projetos = []
+        for i, provincia in enumerate(provincias):
+            projeto = Projeto(**dict(
+                test_projeto_data,
+                nome=f"Projeto {provincia.nome}",
+                provincia_id=provincia.id,
+                data_inicio_prevista=datetime(2024, 1, 1),
+                data_fim_prevista=datetime(2024, 12, 31)
+            ))
+            db_session.add(projeto)
+            projetos.append(projeto)
+        db_session.flush()
+
+        db_session.execute(insert(Indicador), [
+            {
+                "projeto_id": projetos[i % 2].id,
+                "nome": f"Indicador {i}",
+                "unidade": "toneladas",
+                "meta": 100,
+                "valor_actual": 150 if i % 2 else 50,
+                "periodo_referencia": "T1",
+                "fonte_dados": "Relatório"
+            }
+            for i in range(total)
+        ])
+        db_session.flush()
+        return projetos
+
+    def test_csv_em_partes_com_uma_query(self, db_session: Session, test_projeto_data, query_counter, monkeypatch):
+        """Testa que o CSV é gerado por partes com uma única query, sem carregar projeto/província por linha"""
+        import csv
+        from app.services import export_service
+        from app.services.export_service import ExportService
+
+        monkeypatch.setattr(export_service, "EXPORT_YIELD_PER", 10)
+        projetos = self._criar_indicadores(db_session, test_projeto_data, 25)
+
+        with query_counter() as queries:
+            partes = list(ExportService(db_session).iter_indicadores_csv(projeto_id=None))
+
+        assert len(queries) == 1
+        assert len(partes) == 3
+        linhas = list(csv.reader("".join(partes).lstrip("\ufeff").splitlines(), delimiter=";"))
+        assert linhas[0] == export_service.COLUNAS_EXPORT_INDICADORES
+        assert len(linhas) == 26
+        assert linhas[1][2:5] == [projetos[0].nome, "Luanda", "T1"]
+        assert linhas[2][3] == "Benguela"
+        assert linhas[2][8] == "150.0"
+
+    def test_excel_write_only_com_resumo(self, db_session: Session, test_projeto_data, tmp_path):
+        """Testa o Excel gerado em modo write_only, com resumo e estatísticas por província"""
+        from openpyxl import load_workbook
+        from app.services.export_service import ExportService
+
+        self._criar_indicadores(db_session, test_projeto_data, 10)
+        destino = tmp_path / "indicadores.xlsx"
+
+        total = ExportService(db_session).write_indicadores_excel(str(destino))
+
+        assert total == 10
+        workbook = load_workbook(destino)
+        assert workbook.sheetnames == ["Indicadores", "Resumo", "Por Província"]
+        assert workbook["Indicadores"].max_row == 11
+        resumo = {linha[0]: linha[1] for linha in workbook["Resumo"].iter_rows(min_row=2, values_only=True)}
+        assert resumo["Total de Indicadores"] == 10
+        assert resumo["Meta Total"] == "1,000"
+        assert resumo["Progresso Médio (%)"] == "100.0"
+        assert resumo["Indicadores Acima da Meta"] == 5
+        assert resumo["Províncias Cobertas"] == 2
+        por_provincia = list(workbook["Por Província"].iter_rows(min_row=2, values_only=True))
+        assert por_provincia == [("Benguela", 5, 500, 750, 150), ("Luanda", 5, 500, 250, 50)]
+
+class TestExportJobs:
+    """Testes para os jobs de exportação em segundo plano"""
+
+    def _manager(self, tmp_path, test_projeto_data, **kwargs):
+        from concurrent.futures import ThreadPoolExecutor
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.db.database import Base
+        from app.services.export_jobs import ExportJobManager
+
+        database_url = f"sqlite:///{tmp_path / 'exports.db'}"
+        engine = create_engine(database_url)
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        provincia = Provincia(nome="Luanda")
+        db.add(provincia)
+        db.flush()
+        projeto = Projeto(**dict(
+            test_projeto_data,
+            provincia_id=provincia.id,
+            data_inicio_prevista=datetime(2024, 1, 1),
+            data_fim_prevista=datetime(2024, 12, 31)
+        ))
+        db.add(projeto)
+        db.flush()
+        db.add(Indicador(
+            projeto_id=projeto.id, nome="Produção", unidade="toneladas", meta=100, valor_actual=50,
+            periodo_referencia="T1", fonte_dados="Relatório"
+        ))
+        db.commit()
+        db.close()
+        engine.dispose()
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        parametros = {"diretorio": str(tmp_path / "jobs"), "database_url": database_url, "executor": executor}
+        parametros.update(kwargs)
+        return ExportJobManager(**parametros), executor
+
+    def _aguardar(self, manager, executor, job_id):
+        executor.shutdown(wait=True)
+        return manager.get(job_id)
+
+    def test_job_gera_artefacto(self, tmp_path, test_projeto_data):
+        """Testa que o job passa de PENDENTE a CONCLUIDO e deixa o artefacto em disco"""
+        import os
+        from app.schemas.export_job import TipoExport, EstadoExportJob
+
+        manager, executor = self._manager(tmp_path, test_projeto_data)
+        job = manager.submit(TipoExport.INDICADORES_CSV, {})
+        assert job["status"] == EstadoExportJob.PENDENTE.value
+
+        job = self._aguardar(manager, executor, job["id"])
+
+        assert job["status"] == EstadoExportJob.CONCLUIDO.value
+        assert job["iniciado_em"] and job["concluido_em"]
+        with open(manager.caminho_artefacto(job), encoding="utf-8") as ficheiro:
+            linhas = ficheiro.read().lstrip("\ufeff").splitlines()
+        assert len(linhas) == 2
+        assert "Produção" in linhas[1]
+
+    def test_database_json_nao_sobrepoe_estado(self, tmp_path, test_projeto_data):
+        """Testa que um artefacto .json não substitui o ficheiro de estado do job"""
+        import json
+        from app.schemas.export_job import TipoExport, EstadoExportJob
+
+        manager, executor = self._manager(tmp_path, test_projeto_data)
+        job = self._aguardar(manager, executor, manager.submit(TipoExport.DATABASE_JSON, {})["id"])
+
+        assert job["status"] == EstadoExportJob.CONCLUIDO.value
+        with open(manager.caminho_artefacto(job)) as ficheiro:
+            assert json.load(ficheiro)["data"]["indicadores"]["records"][0]["nome"] == "Produção"
+
+    def test_pedidos_identicos_reutilizam_job(self, tmp_path, test_projeto_data):
+        """Testa a deduplicação por tipo, parâmetros e versões dos dados"""
+        from app.core.cache import data_versions
+        from app.schemas.export_job import TipoExport
+
+        manager, executor = self._manager(tmp_path, test_projeto_data)
+        primeiro = manager.submit(TipoExport.INDICADORES_CSV, {"periodo_referencia": "T1"})
+
+        assert manager.submit(TipoExport.INDICADORES_CSV, {"periodo_referencia": "T1"})["id"] == primeiro["id"]
+        assert manager.submit(TipoExport.INDICADORES_CSV, {"periodo_referencia": "T2"})["id"] != primeiro["id"]
+        assert manager.submit(TipoExport.INDICADORES_EXCEL, {"periodo_referencia": "T1"})["id"] != primeiro["id"]
+
+        data_versions.bump(["indicadores"])
+        assert manager.submit(TipoExport.INDICADORES_CSV, {"periodo_referencia": "T1"})["id"] != primeiro["id"]
+        executor.shutdown(wait=True)
+
+    def test_job_concluido_so_reutilizado_com_versoes_partilhadas(self, tmp_path, test_projeto_data, monkeypatch):
+        """Testa que, com versões locais, um job concluído é gerado de novo e não passa a outro arranque"""
+        from concurrent.futures import ThreadPoolExecutor
+        from app.core.cache import data_versions
+        from app.schemas.export_job import TipoExport, EstadoExportJob
+        from app.services.export_jobs import ExportJobManager
+
+        manager, executor = self._manager(tmp_path, test_projeto_data)
+        job = self._aguardar(manager, executor, manager.submit(TipoExport.INDICADORES_CSV, {})["id"])
+        assert job["status"] == EstadoExportJob.CONCLUIDO.value
+
+        manager._executor = executor = ThreadPoolExecutor(max_workers=1)
+        novo = manager.submit(TipoExport.INDICADORES_CSV, {})
+        assert novo["id"] == job["id"]
+        assert novo["status"] == EstadoExportJob.PENDENTE.value
+        executor.shutdown(wait=True)
+
+        reiniciado = ExportJobManager(manager.diretorio, database_url=manager.database_url, executor=executor)
+        assert reiniciado._job_id(TipoExport.INDICADORES_CSV, {}, False) != job["id"]
+
+        fakeredis = pytest.importorskip("fakeredis")
+        monkeypatch.setattr(data_versions, "redis", fakeredis.FakeRedis())
+        (tmp_path / "partilhadas").mkdir()
+        manager, executor = self._manager(tmp_path / "partilhadas", test_projeto_data)
+        job = self._aguardar(manager, executor, manager.submit(TipoExport.INDICADORES_CSV, {})["id"])
+        assert manager.submit(TipoExport.INDICADORES_CSV, {}) == job
+
+    def test_job_cancelado_marcado_como_falhado(self, tmp_path, test_projeto_data):
+        """Testa que um job cancelado antes de correr não fica PENDENTE"""
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        from app.schemas.export_job import TipoExport, EstadoExportJob
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        libertar = threading.Event()
+        executor.submit(libertar.wait)
+        manager, _ = self._manager(tmp_path, test_projeto_data, executor=executor)
+        job = manager.submit(TipoExport.INDICADORES_CSV, {})
+        executor.shutdown(wait=False, cancel_futures=True)
+        libertar.set()
+
+        job = manager.get(job["id"])
+        assert job["status"] == EstadoExportJob.FALHOU.value
+        assert job["erro"] == "Job cancelado"
+
+    def test_falha_registada(self, tmp_path, test_projeto_data, monkeypatch):
+        """Testa que um erro na geração marca o job como FALHOU e permite nova submissão"""
+        import os
+        from app.services import export_jobs
+        from app.schemas.export_job import TipoExport, EstadoExportJob
+
+        def falhar(db, tipo, parametros, destino):
+            open(destino, "w").close()
+            raise RuntimeError("sem espaço em disco")
+
+        monkeypatch.setattr(export_jobs, "_gerar_artefacto", falhar)
+        manager, executor = self._manager(tmp_path, test_projeto_data)
+        job = self._aguardar(manager, executor, manager.submit(TipoExport.INDICADORES_CSV, {})["id"])
+
+        assert job["status"] == EstadoExportJob.FALHOU.value
+        assert job["erro"] == "sem espaço em disco"
+        assert not os.path.exists(manager.caminho_artefacto(job))
+        assert sorted(os.listdir(manager.diretorio)) == [f"{job['id']}{export_jobs.SUFIXO_ESTADO}"]
+
+    def test_limpeza_de_expirados(self, tmp_path, test_projeto_data):
+        """Testa que jobs e artefactos expirados são apagados"""
+        import os
+        from app.schemas.export_job import TipoExport
+
+        manager, executor = self._manager(tmp_path, test_projeto_data)
+        job = self._aguardar(manager, executor, manager.submit(TipoExport.INDICADORES_CSV, {})["id"])
+        assert len(os.listdir(manager.diretorio)) == 2
+
+        manager.ttl_seconds = 0
+        assert manager.get(job["id"]) is None
+        assert manager.limpar_expirados() == 1
+        assert os.listdir(manager.diretorio) == []
+
+    def test_id_invalido(self, tmp_path, test_projeto_data):
+        """Testa que ids com caracteres de caminho são rejeitados"""
+        manager, executor = self._manager(tmp_path, test_projeto_data)
+        executor.shutdown()
+        assert manager.get("../exports") is None
+        assert manager.get("inexistente") is None
+
 class TestLicenciamentoService:
     """Testes para LicenciamentoService"""
     
@@ -252,3 +657,1924 @@ class TestAuditService:
         # Testar filtro por utilizador
         user_logs = audit_service.get_audit_logs(user_id=user.id)
         assert len(user_logs) == 2
+
+    def test_resumo_incremental_igual_a_recontagem(self, db_session: Session):
+        """Testa que os contadores mantidos por log_action coincidem com uma recontagem completa"""
+        from app.services.dashboard_service import DashboardService
+
+        audit_service = AuditService(db_session)
+        acoes = [
+            (1, AcaoAudit.LOGIN, None),
+            (1, AcaoAudit.LOGOUT, None),
+            (1, AcaoAudit.CREATE, "projetos"),
+            (2, AcaoAudit.UPDATE, "projetos"),
+            (2, AcaoAudit.UPDATE, "indicadores"),
+            (None, AcaoAudit.IMPORT, "projetos"),
+            (3, AcaoAudit.DELETE, "licenciamentos"),
+        ]
+        for user_id, acao, entidade in acoes:
+            audit_service.log_action(user_id=user_id, action=acao, entity=entidade)
+
+        incremental = DashboardService(db_session).get_audit_stats()
+        audit_service.rebuild_audit_summary()
+        recontagem = DashboardService(db_session).get_audit_stats()
+
+        assert incremental == recontagem
+        assert incremental["total_logs"] == len(acoes)
+        assert incremental["por_acao"]["UPDATE"] == 2
+        assert incremental["por_entidade"] == {"projetos": 3, "indicadores": 1, "licenciamentos": 1}
+        assert incremental["usuarios_mais_ativos"][:2] == [
+            {"user_id": 1, "total_acoes": 3}, {"user_id": 2, "total_acoes": 2}
+        ]
+
+    def test_rebuild_resumo_inclui_logs_escritos_diretamente(self, db_session: Session):
+        """Testa que o rebuild recupera logs inseridos sem passar por log_action"""
+        from app.services.dashboard_service import DashboardService
+
+        self._criar_logs_em_massa(db_session, 12)
+        assert DashboardService(db_session).get_audit_stats()["total_logs"] == 0
+
+        AuditService(db_session).rebuild_audit_summary()
+        stats = DashboardService(db_session).get_audit_stats()
+
+        assert stats["total_logs"] == 12
+        assert stats["por_acao"]["UPDATE"] == 12
+        assert stats["por_entidade"] == {"projetos": 12}
+
+    def _criar_logs_em_massa(self, db_session: Session, total: int):
+        from sqlalchemy import insert
+
+        # Timestamps repetidos em blocos de 3 para exercitar o desempate por id
+        linhas = [
+            {
+                "acao": AcaoAudit.UPDATE,
+                "entidade": "projetos",
+                "entidade_id": i,
+                "timestamp": datetime(2024, 1, 1, 12, i // 3 % 60, i // 180)
+            }
+            for i in range(total)
+        ]
+        db_session.execute(insert(AuditLog), linhas)
+        db_session.flush()
+
+    def test_paginacao_cursor_equivale_a_paginacao_por_pagina(self, db_session: Session):
+        """Testa que percorrer todos os cursores devolve os mesmos logs que offset/limit"""
+        self._criar_logs_em_massa(db_session, 250)
+        audit_service = AuditService(db_session)
+
+        por_pagina = [log.id for log in audit_service.get_audit_logs(skip=0, limit=1000)]
+
+        por_cursor = []
+        cursor = None
+        paginas = 0
+        while True:
+            logs, cursor = audit_service.get_audit_logs_cursor(cursor=cursor, limit=40)
+            por_cursor.extend(log.id for log in logs)
+            paginas += 1
+            if cursor is None:
+                break
+
+        assert paginas == 7
+        assert por_cursor == por_pagina
+        assert len(set(por_cursor)) == 250
+
+    def test_paginacao_cursor_com_filtros(self, db_session: Session):
+        """Testa que os filtros se aplicam também à paginação por cursor"""
+        self._criar_logs_em_massa(db_session, 30)
+        db_session.add(AuditLog(acao=AcaoAudit.LOGIN, entidade="users", timestamp=datetime(2024, 1, 1, 12, 0, 0)))
+        db_session.flush()
+
+        logs, cursor = AuditService(db_session).get_audit_logs_cursor(acao=AcaoAudit.LOGIN, limit=10)
+
+        assert [log.acao for log in logs] == [AcaoAudit.LOGIN]
+        assert cursor is None
+
+    def test_cursor_invalido(self, db_session: Session):
+        """Testa que um cursor malformado é rejeitado"""
+        with pytest.raises(ValueError):
+            AuditService(db_session).get_audit_logs_cursor(cursor="nao-e-um-cursor")
+
+    def test_paginacao_cursor_usa_indice(self, db_session: Session):
+        """Testa que a query keyset é resolvida pelo índice (timestamp, id)"""
+        from sqlalchemy import text
+        from app.services.audit_service import encode_audit_cursor
+
+        if db_session.bind.dialect.name != "sqlite":
+            pytest.skip("EXPLAIN QUERY PLAN é específico do SQLite")
+
+        self._criar_logs_em_massa(db_session, 10)
+        timestamp, log_id = datetime(2024, 1, 1, 12, 1, 0), 5
+        AuditService(db_session).get_audit_logs_cursor(cursor=encode_audit_cursor(timestamp, log_id))
+
+        plano = db_session.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM audit_logs "
+            "WHERE (timestamp, id) < (:ts, :id) ORDER BY timestamp DESC, id DESC LIMIT 101"
+        ), {"ts": timestamp, "id": log_id}).all()
+        detalhes = " ".join(str(linha[-1]) for linha in plano)
+
+        assert "ix_audit_logs_timestamp_id" in detalhes
+        assert "TEMP B-TREE" not in detalhes
+
+class TestAuditWriter:
+    """Testes para a escrita de auditoria em lote"""
+
+    def _writer(self, lotes, **kwargs):
+        from app.services.audit_writer import AuditWriter
+
+        parametros = {"batch_size": 3, "flush_interval": 60}
+        parametros.update(kwargs)
+        return AuditWriter(escrever=lambda lote: lotes.append(list(lote)), **parametros)
+
+    def test_escreve_em_lotes_por_tamanho(self):
+        """Testa que as entradas são agrupadas em lotes de batch_size"""
+        lotes = []
+        writer = self._writer(lotes)
+        writer.start()
+        try:
+            for i in range(7):
+                assert writer.submit({"acao": AcaoAudit.LOGIN, "entidade_id": i})
+            writer.flush()
+        finally:
+            writer.stop()
+
+        assert [len(lote) for lote in lotes] == [3, 3, 1]
+        assert [e["entidade_id"] for lote in lotes for e in lote] == list(range(7))
+
+    def test_escreve_por_intervalo(self):
+        """Testa que um lote incompleto é escrito ao fim de flush_interval"""
+        import time
+
+        lotes = []
+        writer = self._writer(lotes, batch_size=100, flush_interval=0.05)
+        writer.start()
+        try:
+            writer.submit({"acao": AcaoAudit.LOGIN})
+            time.sleep(0.3)
+            assert lotes == [[{"acao": AcaoAudit.LOGIN}]]
+        finally:
+            writer.stop()
+
+    def test_stop_escreve_pendentes(self):
+        """Testa que parar o writer escreve as entradas ainda na fila"""
+        lotes = []
+        writer = self._writer(lotes, batch_size=100)
+        writer.start()
+        writer.submit({"acao": AcaoAudit.LOGOUT})
+        writer.stop()
+
+        assert lotes == [[{"acao": AcaoAudit.LOGOUT}]]
+        assert not writer.ativo
+        assert writer.submit({"acao": AcaoAudit.LOGIN}) is False
+
+    def test_lote_com_falha_escreve_um_a_um(self):
+        """Testa que uma falha no lote não perde as restantes entradas"""
+        from app.services.audit_writer import AuditWriter
+
+        escritas = []
+
+        def escrever(lote):
+            if len(lote) > 1 or lote[0].get("invalida"):
+                raise RuntimeError("falha")
+            escritas.extend(lote)
+
+        writer = AuditWriter(escrever=escrever, batch_size=3, flush_interval=60)
+        writer.start()
+        for entrada in ({"n": 1}, {"n": 2, "invalida": True}, {"n": 3}):
+            writer.submit(entrada)
+        writer.stop()
+
+        assert escritas == [{"n": 1}, {"n": 3}]
+
+    def test_log_actions_insere_em_lote(self, db_session: Session, query_counter):
+        """Testa que log_actions escreve logs e contadores com um número fixo de queries"""
+        from app.services.dashboard_service import DashboardService
+
+        audit_service = AuditService(db_session)
+        entradas = [
+            audit_service.criar_entrada(user_id=1, action=AcaoAudit.IMPORT, entity="projetos", entity_id=i)
+            for i in range(50)
+        ]
+
+        with query_counter() as queries:
+            assert audit_service.log_actions(entradas) == 50
+
+        assert len(queries) <= 3
+        assert db_session.query(AuditLog).filter(AuditLog.acao == AcaoAudit.IMPORT).count() == 50
+        stats = DashboardService(db_session).get_audit_stats()
+        assert stats["por_acao"]["IMPORT"] == 50
+        assert stats["por_entidade"] == {"projetos": 50}
+
+class TestDashboardService:
+    """Testes para DashboardService"""
+
+    def _criar_dados(self, db_session: Session, test_projeto_data, sufixo: str):
+        """Cria um projeto por estado/fonte com indicadores, licenciamentos e logs"""
+        from datetime import datetime, timedelta
+        from app.models.projeto import EstadoProjeto, FonteFinanciamento
+        from app.models.indicador import Trimestre
+        from app.models.licenciamento import StatusLicenciamento, EntidadeResponsavel
+        from app.models.audit_log import AcaoAudit
+
+        provincia = Provincia(nome=f"Província {sufixo}")
+        db_session.add(provincia)
+        db_session.flush()
+
+        for estado, fonte in zip(EstadoProjeto, FonteFinanciamento):
+            projeto_data = test_projeto_data.copy()
+            projeto_data.update({
+                "nome": f"Projeto {estado.value} {sufixo}",
+                "provincia_id": provincia.id,
+                "estado": estado,
+                "fonte_financiamento": fonte,
+                "orcamento_executado_kz": 500000,
+                "data_inicio_prevista": datetime(2024, 1, 1),
+                "data_fim_prevista": datetime(2024, 12, 31)
+            })
+            projeto = Projeto(**projeto_data)
+            db_session.add(projeto)
+            db_session.flush()
+
+            for trimestre in Trimestre:
+                db_session.add(Indicador(
+                    projeto_id=projeto.id,
+                    nome=f"Produção {trimestre.value}",
+                    unidade="toneladas",
+                    meta=100,
+                    valor_actual=50,
+                    periodo_referencia=trimestre,
+                    fonte_dados="Relatório"
+                ))
+
+            for status, entidade in zip(StatusLicenciamento, list(EntidadeResponsavel) * 2):
+                decidido = status in (StatusLicenciamento.APROVADO, StatusLicenciamento.NEGADO)
+                db_session.add(Licenciamento(
+                    projeto_id=projeto.id,
+                    status=status,
+                    entidade_responsavel=entidade,
+                    data_submissao=datetime(2024, 1, 1),
+                    data_decisao=datetime(2024, 1, 11) if decidido else None
+                ))
+
+        db_session.commit()
+
+        audit_service = AuditService(db_session)
+        for acao in AcaoAudit:
+            audit_service.log_action(user_id=1, action=acao, entity=f"Entidade {sufixo}")
+
+    def test_dashboard_stats_valores(self, db_session: Session, test_projeto_data):
+        """Testa que as agregações agrupadas devolvem os totais corretos"""
+        from app.services.dashboard_service import DashboardService
+
+        self._criar_dados(db_session, test_projeto_data, "A")
+
+        stats = DashboardService(db_session).get_dashboard_stats("ROOT")
+
+        assert stats["projetos"]["total_projetos"] == 4
+        assert stats["projetos"]["projetos_por_estado"] == {
+            "PLANEADO": 1, "EM_EXECUCAO": 1, "CONCLUIDO": 1, "SUSPENSO": 1
+        }
+        assert stats["projetos"]["projetos_por_fonte"]["AFAP-2"] == 1
+        assert stats["projetos"]["execucao_media_percentual"] == 50.0
+        assert stats["indicadores"]["total_indicadores"] == 16
+        assert stats["indicadores"]["por_trimestre"]["T3"] == 4
+        assert stats["indicadores"]["execucao_media_percentual"] == 50.0
+        assert stats["indicadores"]["indicadores_por_projeto"] == 4
+        assert stats["licenciamentos"]["total_licenciamentos"] == 16
+        assert stats["licenciamentos"]["por_status"]["APROVADO"] == 4
+        assert stats["licenciamentos"]["tempo_medio_processamento_dias"] == 10.0
+        assert stats["licenciamentos"]["taxa_aprovacao"] == 25.0
+        assert stats["auditoria"]["total_logs"] == len(stats["auditoria"]["por_acao"])
+        assert stats["auditoria"]["por_entidade"] == {"Entidade A": 8}
+
+        mapa = {p["nome"]: p for p in stats["mapa"]}
+        assert mapa["Província A"]["total_projetos"] == 4
+        assert mapa["Província A"]["estatisticas"]["em_execucao"] == 1
+        assert mapa["Província A"]["cor"] == "blue"
+        assert stats["resumo"]["total_provincias_cobertas"] == 1
+
+    def test_dashboard_stats_numero_de_queries_constante(self, db_session: Session, test_projeto_data, query_counter):
+        """Regressão: o número de queries não pode depender dos enums nem dos dados"""
+        from app.services.dashboard_service import DashboardService
+
+        self._criar_dados(db_session, test_projeto_data, "A")
+        with query_counter() as queries_iniciais:
+            DashboardService(db_session).get_dashboard_stats("ROOT")
+
+        self._criar_dados(db_session, test_projeto_data, "B")
+        self._criar_dados(db_session, test_projeto_data, "C")
+        with query_counter() as queries_finais:
+            DashboardService(db_session).get_dashboard_stats("ROOT")
+
+        with query_counter() as queries_sem_auditoria:
+            DashboardService(db_session).get_dashboard_stats("VISUALIZACAO")
+
+        assert len(queries_finais) == len(queries_iniciais)
+        assert len(queries_finais) <= 7
+        assert len(queries_sem_auditoria) <= 5
+
+class TestVersionedCache:
+    """Testes para o cache versionado de agregados"""
+
+    def _novo_cache(self):
+        from app.core.cache import VersionedCache, data_versions
+        return VersionedCache("teste", data_versions, max_entries=8)
+
+    def test_nao_recalcula_sem_escritas(self):
+        """Testa que o agregado só é calculado uma vez enquanto os dados não mudam"""
+        cache = self._novo_cache()
+        chamadas = []
+
+        def calcular():
+            chamadas.append(1)
+            return {"total": len(chamadas)}
+
+        assert cache.obter("stats", ["projetos"], calcular) == {"total": 1}
+        assert cache.obter("stats", ["projetos"], calcular) == {"total": 1}
+        assert len(chamadas) == 1
+
+    def test_commit_invalida_entidade_alterada(self, db_session: Session):
+        """Testa que um commit numa tabela invalida apenas os agregados que dependem dela"""
+        cache = self._novo_cache()
+        chamadas = {"projetos": 0, "licenciamentos": 0}
+
+        def calcular(nome):
+            def _calcular():
+                chamadas[nome] += 1
+                return chamadas[nome]
+            return _calcular
+
+        cache.obter("p", ["provincias"], calcular("projetos"))
+        cache.obter("l", ["licenciamentos"], calcular("licenciamentos"))
+
+        db_session.add(Provincia(nome="Cache"))
+        db_session.commit()
+
+        assert cache.obter("p", ["provincias"], calcular("projetos")) == 2
+        assert cache.obter("l", ["licenciamentos"], calcular("licenciamentos")) == 1
+
+    def test_rollback_nao_invalida(self, db_session: Session):
+        """Testa que alterações revertidas não incrementam versões"""
+        from app.core.cache import data_versions
+
+        antes = data_versions.get(["provincias"])
+        db_session.add(Provincia(nome="Revertida"))
+        db_session.flush()
+        db_session.rollback()
+
+        assert data_versions.get(["provincias"]) == antes
+
+    def test_escopo_por_papel(self):
+        """Testa que payloads de papéis diferentes não se misturam"""
+        cache = self._novo_cache()
+
+        root = cache.obter("stats", ["projetos"], lambda: {"auditoria": {}}, escopo="ROOT")
+        outro = cache.obter("stats", ["projetos"], lambda: {"auditoria": None}, escopo="VISUALIZACAO")
+
+        assert root["auditoria"] == {}
+        assert outro["auditoria"] is None
+
+    def test_obter_async_pedidos_concorrentes(self):
+        """Testa que pedidos assíncronos concorrentes esperam pelo primeiro cálculo sem bloquear o loop"""
+        import asyncio
+
+        cache = self._novo_cache()
+        chamadas = []
+
+        async def calcular():
+            chamadas.append(1)
+            await asyncio.sleep(0.05)
+            return {"total": len(chamadas)}
+
+        async def cenario():
+            return await asyncio.wait_for(
+                asyncio.gather(*(cache.obter_async("kpis", ["projetos"], calcular) for _ in range(3))),
+                timeout=5
+            )
+
+        assert asyncio.run(cenario()) == [{"total": 1}] * 3
+        assert len(chamadas) == 1
+
+    def test_obter_async_erro_nao_fica_em_cache(self):
+        """Testa que um cálculo falhado é propagado e repetido no pedido seguinte"""
+        import asyncio
+
+        cache = self._novo_cache()
+
+        async def falhar():
+            raise RuntimeError("base indisponível")
+
+        async def calcular():
+            return 42
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(cache.obter_async("kpis", ["projetos"], falhar))
+        assert asyncio.run(cache.obter_async("kpis", ["projetos"], calcular)) == 42
+
+    def test_entradas_locais_expiram(self, monkeypatch):
+        """Testa que o nível local respeita o TTL (escritas noutros workers sem Redis)"""
+        from app.core import cache as modulo_cache
+
+        agora = [1000.0]
+        monkeypatch.setattr(modulo_cache.time, "monotonic", lambda: agora[0])
+        cache = modulo_cache.VersionedCache("teste", modulo_cache.data_versions, max_entries=8, ttl_seconds=60)
+        chamadas = []
+
+        def calcular():
+            chamadas.append(1)
+            return len(chamadas)
+
+        assert cache.obter("stats", ["projetos"], calcular) == 1
+        agora[0] += 59
+        assert cache.obter("stats", ["projetos"], calcular) == 1
+        agora[0] += 2
+        assert cache.obter("stats", ["projetos"], calcular) == 2
+
+    def test_obter_async_le_versoes_partilhadas_numa_thread(self):
+        """Testa que as versões no Redis não são lidas no event loop"""
+        import asyncio
+        import threading
+        from app.core.cache import DataVersions, VersionedCache
+
+        fakeredis = pytest.importorskip("fakeredis")
+        threads = []
+
+        class VersoesRegistadas(DataVersions):
+            def get(self, entidades):
+                threads.append(threading.current_thread())
+                return super().get(entidades)
+
+        cache = VersionedCache("teste", VersoesRegistadas(fakeredis.FakeRedis()), max_entries=8)
+
+        async def calcular():
+            return 1
+
+        assert asyncio.run(cache.obter_async("kpis", ["projetos"], calcular)) == 1
+        assert threads and threading.main_thread() not in threads
+
+    def test_lru_limitado(self):
+        """Testa que o nível local respeita o número máximo de entradas"""
+        from app.core.cache import LRUCache
+
+        lru = LRUCache(max_entries=2)
+        lru.set("a", 1)
+        lru.set("b", 2)
+        lru.get("a")
+        lru.set("c", 3)
+
+        assert lru.get("b") is None
+        assert lru.get("a") == 1
+        assert len(lru) == 2
+
+class TestProvinciaService:
+    """Testes para ProvinciaService"""
+
+    def test_mapa_provincias_uma_query(self, db_session: Session, test_projeto_data, query_counter):
+        """Testa que o mapa é calculado com uma única query, incluindo províncias sem projetos"""
+        from app.services.provincia_service import ProvinciaService, COORDENADAS_PROVINCIAS
+
+        luanda = Provincia(nome="Luanda")
+        vazia = Provincia(nome="Província Sem Projetos")
+        db_session.add_all([luanda, vazia])
+        db_session.flush()
+
+        for estado in ("EM_EXECUCAO", "CONCLUIDO", "CONCLUIDO"):
+            projeto_data = test_projeto_data.copy()
+            projeto_data.update({
+                "provincia_id": luanda.id,
+                "estado": estado,
+                "orcamento_executado_kz": 250000,
+                "data_inicio_prevista": datetime(2024, 1, 1),
+                "data_fim_prevista": datetime(2024, 12, 31)
+            })
+            db_session.add(Projeto(**projeto_data))
+        db_session.commit()
+
+        with query_counter() as queries:
+            mapa = ProvinciaService(db_session).get_mapa_provincias()
+
+        assert len(queries) == 1
+        por_nome = {p["nome"]: p for p in mapa}
+        assert por_nome["Luanda"]["total_projetos"] == 3
+        assert por_nome["Luanda"]["estatisticas"] == {
+            "planeado": 0, "em_execucao": 1, "concluido": 2, "suspenso": 0
+        }
+        assert por_nome["Luanda"]["execucao_percentual"] == 25.0
+        assert por_nome["Luanda"]["coordenadas"] == COORDENADAS_PROVINCIAS["Luanda"]
+        assert por_nome["Província Sem Projetos"]["total_projetos"] == 0
+        assert por_nome["Província Sem Projetos"]["cor"] == "gray"
+
+class TestSenhas:
+    """Testes para a verificação de senhas fora do event loop"""
+
+    def _criar_utilizador(self, db_session: Session, hashed_password: str) -> User:
+        from app.models.user import UserRole
+
+        user = User(
+            email="senhas@example.com",
+            full_name="Utilizador Senhas",
+            hashed_password=hashed_password,
+            role=UserRole.VISUALIZACAO
+        )
+        db_session.add(user)
+        db_session.commit()
+        return user
+
+    def test_rehash_de_custo_antigo_no_login(self, db_session: Session):
+        """Testa que um hash com custo desatualizado é refeito no login bem-sucedido"""
+        from app.core.config import settings
+        from app.core.security import pwd_context, verify_password
+
+        antigo = pwd_context.hash("senha-antiga-123", rounds=4)
+        user = self._criar_utilizador(db_session, antigo)
+
+        assert UserService(db_session).authenticate_user(user.email, "errada") is None
+        assert user.hashed_password == antigo
+
+        assert UserService(db_session).authenticate_user(user.email, "senha-antiga-123") is not None
+        db_session.refresh(user)
+        assert user.hashed_password.startswith(f"$2b${settings.bcrypt_rounds:02d}$")
+        assert verify_password("senha-antiga-123", user.hashed_password)
+
+    def test_credencial_verificada_recentemente_nao_repete_bcrypt(self, monkeypatch):
+        """Testa o atalho para credenciais já verificadas e a sua invalidação"""
+        from app.core import security
+
+        hash_a = security.pwd_context.hash("segredo-123", rounds=4)
+        hash_b = security.pwd_context.hash("segredo-123", rounds=4)
+        chamadas = []
+
+        def verificar(plain_password, hashed_password):
+            chamadas.append(hashed_password)
+            return security.pwd_context.verify(plain_password, hashed_password), None
+
+        monkeypatch.setattr(security.pwd_context, "verify_and_update", verificar)
+        security._credenciais_verificadas.clear()
+
+        assert security.verify_password("segredo-123", hash_a)
+        assert security.verify_password("segredo-123", hash_a)
+        assert len(chamadas) == 1
+
+        # Senha errada e hash diferente (senha alterada) voltam a passar pelo bcrypt
+        assert not security.verify_password("outra", hash_a)
+        assert security.verify_password("segredo-123", hash_b)
+        assert len(chamadas) == 3
+
+    def test_concorrencia_limitada_e_event_loop_livre(self, monkeypatch):
+        """Testa que as verificações respeitam o limite do executor sem bloquear o event loop"""
+        import asyncio
+        import threading
+        import time
+        from app.core import security
+        from app.core.config import settings
+
+        ativas, maximo = [0], [0]
+        lock = threading.Lock()
+
+        def verificar_lento(plain_password, hashed_password):
+            with lock:
+                ativas[0] += 1
+                maximo[0] = max(maximo[0], ativas[0])
+            time.sleep(0.05)
+            with lock:
+                ativas[0] -= 1
+            return True, None
+
+        monkeypatch.setattr(security.pwd_context, "verify_and_update", verificar_lento)
+        monkeypatch.setattr(security.settings, "password_verify_cache_ttl_seconds", 0)
+
+        async def cenario():
+            ticks = 0
+
+            async def relogio():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            tarefa = asyncio.create_task(relogio())
+            resultados = await asyncio.gather(*(
+                security.verify_and_update_password_async(f"senha-{i}", "$2b$04$hash") for i in range(6)
+            ))
+            tarefa.cancel()
+            return resultados, ticks
+
+        resultados, ticks = asyncio.run(cenario())
+
+        assert all(valida for valida, _ in resultados)
+        assert maximo[0] == settings.password_hash_max_concurrency
+        assert ticks >= 5
+
+class TestEngine:
+    """Testes para a criação do engine e métricas do pool"""
+
+    def test_sqlite_wal_e_synchronous_normal(self, tmp_path):
+        """Testa os pragmas aplicados a cada ligação SQLite"""
+        from sqlalchemy import text
+        from app.db.engine import criar_engine
+
+        engine = criar_engine(f"sqlite:///{tmp_path / 'wal.db'}")
+        try:
+            with engine.connect() as conn:
+                assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+                assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+        finally:
+            engine.dispose()
+
+    def test_postgresql_statement_timeout_e_application_name(self, monkeypatch):
+        """Testa as opções de ligação e de pool derivadas das settings"""
+        from app.core.config import settings
+        from app.db import engine as engine_module
+
+        capturado = {}
+        monkeypatch.setattr(engine_module, "create_engine", lambda url, **kwargs: capturado.update(kwargs))
+        monkeypatch.setattr(settings, "db_statement_timeout_ms", 5000)
+        monkeypatch.setattr(settings, "db_pool_size", 7)
+
+        engine_module.criar_engine("postgresql://user:pass@db:5432/aquicultura_db")
+
+        assert capturado["connect_args"] == {
+            "application_name": settings.db_application_name,
+            "options": "-c statement_timeout=5000"
+        }
+        assert capturado["pool_size"] == 7
+        assert capturado["pool_pre_ping"] is True
+        assert capturado["poolclass"] is engine_module.PoolComMetricas
+
+    def test_metricas_pool(self, tmp_path):
+        """Testa a contagem de checkouts, ligações criadas e timeouts por pool esgotado"""
+        import pytest
+        from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+        from app.db.engine import criar_engine, metricas_pool
+
+        engine = criar_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}", pool_size=1, max_overflow=0, pool_timeout=0.05
+        )
+        try:
+            for _ in range(3):
+                with engine.connect():
+                    pass
+            ocupada = engine.connect()
+            with pytest.raises(PoolTimeoutError):
+                engine.connect()
+            estado = metricas_pool(engine)
+            ocupada.close()
+        finally:
+            engine.dispose()
+
+        assert estado["pool_class"] == "PoolComMetricas"
+        assert estado["size"] == 1
+        assert estado["checked_out"] == 1
+        assert estado["checkouts"] == 4
+        assert estado["checkins"] == 3
+        assert estado["connections_created"] == 1
+        assert estado["timeouts"] == 1
+        assert estado["wait_max_ms"] >= 50
+
+    def test_engine_async_mesmo_url_com_driver_assincrono(self, tmp_path, monkeypatch):
+        """Testa o engine assíncrono: driver aiosqlite/asyncpg, pragmas e métricas"""
+        import asyncio
+        from sqlalchemy import text
+        from app.core.config import settings
+        from app.db import engine as engine_module
+
+        engine = engine_module.criar_engine_async(f"sqlite:///{tmp_path / 'async.db'}")
+
+        async def consultar():
+            async with engine.connect() as conn:
+                return (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+
+        try:
+            assert asyncio.run(consultar()) == "wal"
+            assert engine.url.drivername == "sqlite+aiosqlite"
+            assert engine_module.metricas_pool(engine)["checkouts"] == 1
+        finally:
+            asyncio.run(engine.dispose())
+
+        capturado = {}
+        monkeypatch.setattr(engine_module, "create_async_engine", lambda url, **kwargs: capturado.update(url=url, **kwargs))
+        monkeypatch.setattr(settings, "db_statement_timeout_ms", 5000)
+        engine_module.criar_engine_async("postgresql://user:pass@db:5432/aquicultura_db")
+
+        assert capturado["url"].drivername == "postgresql+asyncpg"
+        assert capturado["connect_args"] == {
+            "server_settings": {"application_name": settings.db_application_name, "statement_timeout": "5000"}
+        }
+        assert capturado["poolclass"] is engine_module.PoolAsyncComMetricas
+
+
+class TestPrincipalCache:
+    """Testes para o cache de utilizadores autenticados e de tokens decodificados"""
+
+    def _criar_utilizador(self, db_session: Session, email: str = "principal@example.com") -> User:
+        from app.models.user import UserRole
+
+        user = User(
+            email=email,
+            full_name="Utilizador Principal",
+            hashed_password="hash-de-teste",
+            role=UserRole.GESTAO_DADOS
+        )
+        db_session.add(user)
+        db_session.commit()
+        return user
+
+    def _token(self, user: User) -> str:
+        from app.core.security import create_access_token
+
+        return create_access_token(data={"sub": user.email, "user_id": user.id, "role": user.role.value})
+
+    def test_segundo_pedido_sem_queries(self, db_session: Session, query_counter):
+        """Testa que o principal em cache é ligado à sessão sem SELECT"""
+        from app.core.deps import _obter_utilizador_do_token
+
+        user = self._criar_utilizador(db_session)
+        token = self._token(user)
+        db_session.expunge_all()
+
+        primeiro = _obter_utilizador_do_token(db_session, token)
+        db_session.expunge_all()
+        with query_counter() as queries:
+            segundo = _obter_utilizador_do_token(db_session, token)
+            assert (segundo.id, segundo.email, segundo.role) == (primeiro.id, primeiro.email, primeiro.role)
+        assert queries == []
+        assert segundo in db_session
+
+        # A senha não é guardada no cache: é carregada da base apenas se usada
+        with query_counter() as queries:
+            assert segundo.hashed_password == "hash-de-teste"
+        assert len(queries) == 1
+
+    def test_desativacao_invalida_o_cache(self, db_session: Session):
+        """Testa que um utilizador desativado deixa de ser servido pelo cache"""
+        from app.core.deps import _obter_utilizador_do_token
+
+        admin = self._criar_utilizador(db_session, "admin-principal@example.com")
+        user = self._criar_utilizador(db_session)
+        token = self._token(user)
+        assert _obter_utilizador_do_token(db_session, token).is_active is True
+
+        UserService(db_session).delete_user(user.id, admin.id)
+        db_session.expunge_all()
+        assert _obter_utilizador_do_token(db_session, token).is_active is False
+
+    def test_alteracao_de_email_invalida_o_cache(self, db_session: Session):
+        """Testa que o email antigo deixa de autenticar após a alteração"""
+        from fastapi import HTTPException
+        from app.core.deps import _obter_utilizador_do_token, _principais
+        from app.schemas.user import UserUpdate
+
+        admin = self._criar_utilizador(db_session, "admin-principal@example.com")
+        user = self._criar_utilizador(db_session)
+        token = self._token(user)
+        _obter_utilizador_do_token(db_session, token)
+
+        UserService(db_session).update_user(user.id, UserUpdate(email="novo-principal@example.com"), admin.id)
+        assert _principais.get("principal@example.com") is None
+        with pytest.raises(HTTPException):
+            _obter_utilizador_do_token(db_session, token)
+
+    def test_alteracao_noutro_processo_invalida_o_cache(self, db_session: Session, query_counter):
+        """Testa que a mudança da versão do principal (invalidação noutro worker) força nova leitura"""
+        from app.core.cache import data_versions
+        from app.core.deps import _obter_utilizador_do_token, _versao_principal
+
+        user = self._criar_utilizador(db_session)
+        token = self._token(user)
+        _obter_utilizador_do_token(db_session, token)
+
+        data_versions.bump([_versao_principal(user.email)])
+        with query_counter() as queries:
+            _obter_utilizador_do_token(db_session, token)
+        assert len(queries) == 1
+
+    def test_login_de_outro_utilizador_mantem_o_cache(self, db_session: Session, query_counter):
+        """Testa que o last_login gravado no login de outro utilizador não invalida os principais em cache"""
+        from app.core.deps import _obter_utilizador_do_token
+
+        user = self._criar_utilizador(db_session)
+        outro = self._criar_utilizador(db_session, "turno@example.com")
+        email = user.email
+        token = self._token(user)
+        _obter_utilizador_do_token(db_session, token)
+
+        UserService(db_session).registar_login(outro, "10.0.0.7")
+        UserService(db_session).registar_login(user, "10.0.0.8")
+        db_session.expunge_all()
+        with query_counter() as queries:
+            assert _obter_utilizador_do_token(db_session, token).email == email
+        assert queries == []
+
+    def test_token_decodificado_uma_vez_e_expiracao_verificada(self, monkeypatch):
+        """Testa a memoização da decodificação e a rejeição de tokens expirados"""
+        import time
+        from datetime import timedelta
+        from app.core import security
+
+        chamadas = []
+        decode_original = security.jwt.decode
+        monkeypatch.setattr(security.jwt, "decode", lambda *a, **k: chamadas.append(1) or decode_original(*a, **k))
+
+        token = security.create_access_token(data={"sub": "jwt@example.com"})
+        assert security.verify_token(token)["sub"] == "jwt@example.com"
+        assert security.verify_token(token)["sub"] == "jwt@example.com"
+        assert security.verify_token(token, "refresh") is None
+        assert len(chamadas) == 1
+
+        # Um token memoizado que entretanto expirou é rejeitado sem nova decodificação
+        expirado = security.create_access_token(data={"sub": "jwt@example.com"}, expires_delta=timedelta(minutes=1))
+        payload = security.verify_token(expirado)
+        security._tokens_decodificados.set(expirado, {**payload, "exp": int(time.time()) - 1})
+        assert security.verify_token(expirado) is None
+        assert len(chamadas) == 2
+
+
+class TestRateLimiter:
+    """Testes para os backends de rate limiting de login (memória e Redis)"""
+
+    class Relogio:
+        def __init__(self):
+            self.agora = 1_700_000_000.0
+
+        def __call__(self):
+            return self.agora
+
+    @pytest.fixture
+    def redis_server(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        return fakeredis.FakeServer()
+
+    @pytest.fixture(params=["local", "redis"])
+    def criar_backend(self, request):
+        from app.core.rate_limiter import MemoryRateLimiter, RedisRateLimiter
+
+        def criar(relogio, **kwargs):
+            opcoes = dict(max_tentativas=3, janela_segundos=60, bloqueio_segundos=300, relogio=relogio, **kwargs)
+            if request.param == "local":
+                return MemoryRateLimiter(**opcoes)
+            fakeredis = pytest.importorskip("fakeredis")
+            return RedisRateLimiter(fakeredis.FakeRedis(server=fakeredis.FakeServer()), **opcoes)
+
+        return criar
+
+    def test_bloqueio_ao_atingir_limite_e_desbloqueio(self, criar_backend):
+        """Testa o bloqueio após N falhas na janela e o fim do bloqueio"""
+        relogio = self.Relogio()
+        limiter = criar_backend(relogio)
+
+        for _ in range(2):
+            limiter.registar_falha("10.0.0.1")
+        assert limiter.permitido("10.0.0.1")
+        limiter.registar_falha("10.0.0.1")
+        assert not limiter.permitido("10.0.0.1")
+        assert limiter.permitido("10.0.0.2")
+
+        estado = limiter.estado()
+        assert estado["10.0.0.1"]["blocked_until"] == pytest.approx(relogio.agora + 300)
+
+        relogio.agora += 301
+        assert limiter.permitido("10.0.0.1")
+
+    def test_janela_deslizante(self, criar_backend):
+        """Testa que falhas fora da janela deixam de contar"""
+        relogio = self.Relogio()
+        limiter = criar_backend(relogio)
+
+        limiter.registar_falha("10.0.0.1")
+        limiter.registar_falha("10.0.0.1")
+        relogio.agora += 45
+        limiter.registar_falha("10.0.0.1")
+        assert not limiter.permitido("10.0.0.1")
+
+        limiter.limpar("10.0.0.1")
+        limiter.registar_falha("10.0.0.1")
+        limiter.registar_falha("10.0.0.1")
+        relogio.agora += 61
+        limiter.registar_falha("10.0.0.1")
+        assert limiter.permitido("10.0.0.1")
+        assert limiter.estado()["10.0.0.1"]["attempts"] == 1
+
+    def test_sucesso_limpa_historico(self, criar_backend):
+        """Testa que limpar um IP remove falhas e bloqueio"""
+        limiter = criar_backend(self.Relogio())
+        for _ in range(3):
+            limiter.registar_falha("10.0.0.1")
+        limiter.registar_falha("10.0.0.2")
+
+        assert limiter.limpar("10.0.0.1") is True
+        assert limiter.permitido("10.0.0.1")
+        assert "10.0.0.1" not in limiter.estado()
+        assert limiter.limpar_tudo() == 1
+        assert limiter.estado() == {}
+
+    def test_memoria_limitada_e_expiracao(self):
+        """Testa que o backend em memória expira e limita o número de IPs"""
+        from app.core.rate_limiter import MemoryRateLimiter
+
+        relogio = self.Relogio()
+        limiter = MemoryRateLimiter(
+            max_entradas=100, max_tentativas=3, janela_segundos=60, bloqueio_segundos=300, relogio=relogio
+        )
+        for i in range(500):
+            limiter.registar_falha(f"10.0.{i // 256}.{i % 256}")
+        assert len(limiter._entradas) == 100
+
+        relogio.agora += 61
+        limiter.registar_falha("10.9.9.9")
+        assert list(limiter._entradas) == ["10.9.9.9"]
+
+        # Cada IP guarda no máximo ``max_tentativas`` instantes de falha
+        assert limiter._entradas["10.9.9.9"].falhas.maxlen == 3
+
+    def test_redis_partilhado_entre_workers(self, redis_server):
+        """Testa que falhas registadas num worker bloqueiam o IP nos restantes"""
+        import fakeredis
+        from app.core.rate_limiter import RedisRateLimiter
+
+        relogio = self.Relogio()
+        opcoes = dict(max_tentativas=3, janela_segundos=60, bloqueio_segundos=300, relogio=relogio)
+        worker_a = RedisRateLimiter(fakeredis.FakeRedis(server=redis_server), **opcoes)
+        worker_b = RedisRateLimiter(fakeredis.FakeRedis(server=redis_server), **opcoes)
+
+        worker_a.registar_falha("10.0.0.1")
+        worker_b.registar_falha("10.0.0.1")
+        worker_a.registar_falha("10.0.0.1")
+        assert not worker_b.permitido("10.0.0.1")
+        assert worker_b.estado()["10.0.0.1"]["blocked_until"] is not None
+
+        # Falhas no mesmo instante em workers diferentes contam todas
+        worker_b.limpar_tudo()
+        for _ in range(2):
+            worker_a.registar_falha("10.0.0.2")
+        worker_b.registar_falha("10.0.0.2")
+        assert not worker_a.permitido("10.0.0.2")
+
+        # O sorted set de falhas é limitado e expira com a janela
+        cliente = fakeredis.FakeRedis(server=redis_server)
+        worker_a.registar_falha("10.0.0.3")
+        chave = worker_a._chave_falhas("10.0.0.3")
+        assert cliente.zcard(chave) == 1
+        assert 0 < cliente.pttl(chave) <= 60_000
+
+    def test_redis_indisponivel_recorre_a_memoria(self, monkeypatch):
+        """Testa o recurso ao backend em memória quando o Redis falha"""
+        from app.core.rate_limiter import MemoryRateLimiter, RedisRateLimiter, _RedisComFallback
+
+        class RedisEmBaixo:
+            def register_script(self, script):
+                def executar(**kwargs):
+                    raise ConnectionError("Redis em baixo")
+                return executar
+
+            def get(self, chave):
+                raise ConnectionError("Redis em baixo")
+
+        opcoes = dict(max_tentativas=2, janela_segundos=60, bloqueio_segundos=300)
+        limiter = _RedisComFallback(RedisRateLimiter(RedisEmBaixo(), **opcoes), MemoryRateLimiter(**opcoes))
+        limiter.registar_falha("10.0.0.1")
+        limiter.registar_falha("10.0.0.1")
+        assert not limiter.permitido("10.0.0.1")
+
+    def test_endpoints_admin(self, db_session, monkeypatch):
+        """Testa o estado e a limpeza dos rate limits pelos endpoints de administração"""
+        import fakeredis
+        from app.core import rate_limiter as rate_limiter_module
+        from app.api import admin
+
+        limiter = rate_limiter_module.RedisRateLimiter(
+            fakeredis.FakeRedis(), max_tentativas=2, janela_segundos=60, bloqueio_segundos=300
+        )
+        monkeypatch.setattr(rate_limiter_module, "rate_limiter", limiter)
+        monkeypatch.setattr(admin, "rate_limiter", limiter)
+
+        rate_limiter_module.record_login_attempt("10.0.0.1", False)
+        rate_limiter_module.record_login_attempt("10.0.0.1", False)
+        rate_limiter_module.record_login_attempt("10.0.0.2", False)
+
+        estado = admin.get_rate_limit_status(current_user=None, db=db_session)
+        assert estado["backend"] == "redis"
+        assert estado["blocked_ips"] == ["10.0.0.1"]
+        assert estado["details"]["10.0.0.2"] == {"attempts": 1, "blocked_until": None}
+
+        assert admin.clear_rate_limits(ip="10.0.0.1", current_user=None, db=db_session)["total_cleared"] == 1
+        assert rate_limiter_module.check_login_rate_limit("10.0.0.1")
+
+        assert admin.clear_rate_limits(ip=None, current_user=None, db=db_session)["total_cleared"] == 1
+        assert admin.get_rate_limit_status(current_user=None, db=db_session)["total_ips_tracked"] == 0
+
+    def test_login_async_nao_bloqueia_event_loop_com_redis(self, monkeypatch):
+        """Testa que, com um backend remoto, as chamadas do login assíncrono correm fora do event loop"""
+        import asyncio
+        import threading
+        from app.core import rate_limiter as rate_limiter_module
+
+        threads = []
+
+        class Registo(rate_limiter_module.MemoryRateLimiter):
+            def permitido(self, chave):
+                threads.append(threading.get_ident())
+                return super().permitido(chave)
+
+            def registar_falha(self, chave):
+                threads.append(threading.get_ident())
+                super().registar_falha(chave)
+
+        async def cenario():
+            await rate_limiter_module.record_login_attempt_async("10.0.0.1", False)
+            permitido = await rate_limiter_module.check_login_rate_limit_async("10.0.0.1")
+            return threading.get_ident(), permitido
+
+        for remoto in (True, False):
+            threads.clear()
+            limiter = Registo(max_tentativas=2, janela_segundos=60, bloqueio_segundos=300)
+            limiter.remoto = remoto
+            monkeypatch.setattr(rate_limiter_module, "rate_limiter", limiter)
+
+            thread_loop, permitido = asyncio.run(cenario())
+            assert permitido
+            assert len(threads) == 2
+            # Backend em memória: sem custo de rede, fica no event loop
+            assert all((t != thread_loop) == remoto for t in threads)
+
+
+class TestIndicesEMigracoes:
+    """Testes para os índices dos filtros das listagens e as migrações Alembic"""
+
+    def _plano(self, db_session: Session, executar) -> str:
+        """Executa ``executar`` e devolve o EXPLAIN QUERY PLAN da primeira consulta"""
+        from sqlalchemy import event
+
+        capturadas = []
+
+        def registar(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                capturadas.append((statement, parameters))
+
+        engine = db_session.get_bind()
+        event.listen(engine, "before_cursor_execute", registar)
+        try:
+            executar()
+        finally:
+            event.remove(engine, "before_cursor_execute", registar)
+
+        statement, parameters = capturadas[0]
+        cursor = db_session.connection().connection.cursor()
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return " | ".join(linha[-1] for linha in cursor.fetchall())
+
+    @pytest.mark.parametrize("filtro, indice", [
+        ({"provincia_id": 1}, "ix_projetos_provincia_id"),
+        ({"tipo": "EMPRESARIAL"}, "ix_projetos_tipo"),
+        ({"fonte_financiamento": "FADEPA"}, "ix_projetos_fonte_financiamento"),
+        ({"estado": "CONCLUIDO"}, "ix_projetos_estado"),
+    ])
+    def test_filtros_de_projetos_usam_indice(self, db_session: Session, filtro, indice):
+        """Testa que cada filtro de projetos usa o respetivo índice"""
+        from app.models.projeto import TipoProjeto, FonteFinanciamento, EstadoProjeto
+
+        tipos = {"tipo": TipoProjeto, "fonte_financiamento": FonteFinanciamento, "estado": EstadoProjeto}
+        filtro = {k: tipos[k](v) if k in tipos else v for k, v in filtro.items()}
+        plano = self._plano(db_session, lambda: ProjetoService(db_session).get_projetos(**filtro))
+        assert f"INDEX {indice}" in plano
+
+    @pytest.mark.parametrize("filtro, indice", [
+        ({"projeto_id": 1}, "ix_indicadores_projeto_id_periodo_referencia"),
+        ({"periodo_referencia": "T2"}, "ix_indicadores_periodo_referencia"),
+        ({"projeto_id": 1, "periodo_referencia": "T2"}, "ix_indicadores_projeto_id_periodo_referencia"),
+    ])
+    def test_filtros_de_indicadores_usam_indice(self, db_session: Session, filtro, indice):
+        """Testa que cada filtro de indicadores usa o respetivo índice"""
+        from app.models.indicador import Trimestre
+
+        if "periodo_referencia" in filtro:
+            filtro = {**filtro, "periodo_referencia": Trimestre(filtro["periodo_referencia"])}
+        plano = self._plano(db_session, lambda: IndicadorService(db_session).get_indicadores(**filtro))
+        assert f"INDEX {indice}" in plano
+
+    @pytest.mark.parametrize("filtro, indice", [
+        ({"projeto_id": 1}, "ix_licenciamentos_projeto_id"),
+        ({"status": "APROVADO"}, "ix_licenciamentos_status"),
+        ({"entidade_responsavel": "DNA"}, "ix_licenciamentos_entidade_responsavel"),
+    ])
+    def test_filtros_de_licenciamentos_usam_indice(self, db_session: Session, filtro, indice):
+        """Testa que cada filtro de licenciamentos usa o respetivo índice"""
+        from app.models.licenciamento import StatusLicenciamento, EntidadeResponsavel
+
+        tipos = {"status": StatusLicenciamento, "entidade_responsavel": EntidadeResponsavel}
+        filtro = {k: tipos[k](v) if k in tipos else v for k, v in filtro.items()}
+        plano = self._plano(db_session, lambda: LicenciamentoService(db_session).get_licenciamentos(**filtro))
+        assert f"INDEX {indice}" in plano
+
+    @pytest.mark.parametrize("filtro, indice", [
+        ({"user_id": 1}, "ix_audit_logs_user_id_timestamp"),
+        ({"acao": AcaoAudit.LOGIN}, "ix_audit_logs_acao_timestamp"),
+        ({"entidade": "Projeto"}, "ix_audit_logs_entidade_timestamp"),
+        ({"data_inicio": datetime(2024, 1, 1)}, "ix_audit_logs_timestamp_id"),
+    ])
+    def test_filtros_de_auditoria_usam_indice(self, db_session: Session, filtro, indice):
+        """Testa que cada filtro da auditoria usa o respetivo índice"""
+        plano = self._plano(db_session, lambda: AuditService(db_session).get_audit_logs(**filtro))
+        assert f"INDEX {indice}" in plano
+
+    def test_migracoes_correspondem_aos_modelos(self, tmp_path):
+        """Testa que ``upgrade head`` produz o schema dos modelos e que o downgrade é reversível"""
+        from alembic import command
+        from alembic.autogenerate import compare_metadata
+        from alembic.migration import MigrationContext
+        from sqlalchemy import create_engine, inspect
+        from app.db.migrations import aplicar_migracoes, alembic_config
+        from app.db.pesquisa import incluir_no_autogenerate
+        from app.models import Base
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'migracoes.db'}")
+        try:
+            aplicar_migracoes(engine)
+            with engine.connect() as conn:
+                contexto = MigrationContext.configure(conn, opts={"include_name": incluir_no_autogenerate})
+                assert compare_metadata(contexto, Base.metadata) == []
+
+            config = alembic_config()
+            with engine.begin() as conn:
+                config.attributes["connection"] = conn
+                command.downgrade(config, "base")
+            assert inspect(engine).get_table_names() == ["alembic_version"]
+        finally:
+            engine.dispose()
+
+    def test_base_existente_e_marcada_e_atualizada(self, tmp_path):
+        """Testa que uma base criada antes das migrações recebe os novos índices"""
+        from alembic.script import ScriptDirectory
+        from sqlalchemy import create_engine, inspect, text
+        from app.db.migrations import aplicar_migracoes, alembic_config
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'legado.db'}")
+        try:
+            # Schema anterior às migrações (revisão inicial), sem registo do Alembic
+            aplicar_migracoes(engine, "0001")
+            with engine.begin() as conn:
+                conn.execute(text("DROP TABLE alembic_version"))
+            assert "ix_projetos_estado" not in {i["name"] for i in inspect(engine).get_indexes("projetos")}
+
+            aplicar_migracoes(engine)
+            assert "ix_projetos_estado" in {i["name"] for i in inspect(engine).get_indexes("projetos")}
+            head = ScriptDirectory.from_config(alembic_config()).get_current_head()
+            with engine.connect() as conn:
+                assert conn.execute(text("SELECT version_num FROM alembic_version")).scalar() == head
+        finally:
+            engine.dispose()
+
+    def test_base_existente_recebe_o_resumo_da_auditoria(self, tmp_path):
+        """Testa que uma base com o schema de create_all grava auditoria depois de atualizada"""
+        from sqlalchemy import create_engine, inspect, text
+        from sqlalchemy.orm import sessionmaker
+        from app.db.migrations import aplicar_migracoes
+        from app.models.audit_summary import AuditSummary, DimensaoAudit
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'legado.db'}")
+        try:
+            aplicar_migracoes(engine, "0001")
+            with engine.begin() as conn:
+                conn.execute(text("DROP TABLE alembic_version"))
+                conn.execute(text(
+                    "INSERT INTO audit_logs (acao, entidade, entidade_id) VALUES ('CREATE', 'Projeto', 1)"
+                ))
+            assert not inspect(engine).has_table("audit_summary")
+
+            aplicar_migracoes(engine)
+            with sessionmaker(bind=engine)() as db:
+                AuditService(db).log_action(action=AcaoAudit.CREATE, entity="Projeto", entity_id=2)
+                totais = {
+                    (r.dimensao, r.chave): r.total for r in db.query(AuditSummary).all()
+                }
+            assert totais == {(DimensaoAudit.ACAO, "CREATE"): 2, (DimensaoAudit.ENTIDADE, "Projeto"): 2}
+            assert "ix_audit_logs_timestamp_id" in {i["name"] for i in inspect(engine).get_indexes("audit_logs")}
+        finally:
+            engine.dispose()
+
+    def test_indice_unico_de_indicadores_nao_apaga_duplicados(self, tmp_path, test_projeto_data):
+        """Testa que a migração 0007 para com a lista de repetidos e que a manutenção os resolve"""
+        from sqlalchemy import create_engine, inspect, text
+        from sqlalchemy.orm import sessionmaker
+        from app.db.migrations import aplicar_migracoes
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'duplicados.db'}")
+        try:
+            aplicar_migracoes(engine, "0006")
+            with sessionmaker(bind=engine)() as db:
+                provincia = Provincia(nome="Cuanza Sul")
+                db.add(provincia)
+                db.flush()
+                projeto = Projeto(**{
+                    **test_projeto_data,
+                    "provincia_id": provincia.id,
+                    "data_inicio_prevista": datetime(2024, 1, 1),
+                    "data_fim_prevista": datetime(2024, 12, 31),
+                })
+                db.add(projeto)
+                db.flush()
+                db.add_all([
+                    Indicador(projeto_id=projeto.id, nome="Alevinos", unidade="un", meta=10,
+                              valor_actual=valor, periodo_referencia="T1", fonte_dados="Relatório")
+                    for valor in (1, 2, 3)
+                ])
+                projeto_id = projeto.id
+                db.commit()
+
+            with pytest.raises(RuntimeError) as erro:
+                aplicar_migracoes(engine)
+            assert f"projeto {projeto_id}, 'Alevinos', T1: 3 indicadores" in str(erro.value)
+            assert "dedupe-indicators" in str(erro.value)
+            with engine.connect() as conn:
+                assert conn.execute(text("SELECT COUNT(*) FROM indicadores")).scalar() == 3
+
+            with sessionmaker(bind=engine)() as db:
+                service = IndicadorService(db)
+                assert [g["ids"] for g in service.get_indicadores_duplicados()] == [[1, 2, 3]]
+                assert service.remover_indicadores_duplicados() == [1, 2]
+                assert float(db.get(Indicador, 3).valor_actual) == 3
+
+            aplicar_migracoes(engine)
+            indices = {i["name"]: i["unique"] for i in inspect(engine).get_indexes("indicadores")}
+            assert indices["uq_indicadores_projeto_id_nome_periodo_referencia"]
+        finally:
+            engine.dispose()
+
+
+class TestPesquisa:
+    """Testes para a pesquisa de texto (FTS5 no SQLite)"""
+
+    def _criar_projeto(self, db_session: Session, test_projeto_data, **campos) -> Projeto:
+        from app.schemas.projeto import ProjetoCreate
+
+        provincia = db_session.query(Provincia).first() or Provincia(nome="Luanda")
+        db_session.add(provincia)
+        db_session.flush()
+        dados = {
+            **test_projeto_data,
+            "provincia_id": provincia.id,
+            "data_inicio_prevista": datetime(2024, 1, 1),
+            "data_fim_prevista": datetime(2024, 12, 31),
+            **campos,
+        }
+        return ProjetoService(db_session).create_projeto(ProjetoCreate(**dados))
+
+    def test_pesquisa_ignora_acentos_e_usa_prefixos(self, db_session: Session, test_projeto_data):
+        """Testa que "familia" e prefixos encontram "Famílias" através do índice FTS"""
+        projeto = self._criar_projeto(
+            db_session, test_projeto_data, nome="Tanques Comunitários", descricao="Apoio a famílias piscicultoras"
+        )
+        self._criar_projeto(db_session, test_projeto_data, nome="Outro Projeto", descricao="Sem relação")
+
+        service = ProjetoService(db_session)
+        assert [p.id for p in service.get_projetos(search="familia")] == [projeto.id]
+        assert [p.id for p in service.get_projetos(search="comunit famil")] == [projeto.id]
+        assert service.get_projetos(search="familia inexistente") == []
+        assert service.get_projetos(search="%%") == []
+
+    def test_filtro_usa_fts(self, db_session: Session, test_projeto_data, query_counter):
+        """Testa que o parâmetro ``search`` dos serviços passa pelo índice de texto"""
+        with query_counter() as queries:
+            IndicadorService(db_session).get_indicadores(search="famílias")
+            LicenciamentoService(db_session).get_licenciamentos(search="licença")
+            AuditService(db_session).get_audit_logs(search="login")
+        assert "fts_indicadores MATCH" in queries[0]
+        assert "fts_licenciamentos MATCH" in queries[1]
+        assert "fts_audit_logs MATCH" in queries[2]
+        assert all("LIKE" not in q.upper() for q in queries)
+
+    def test_triggers_mantem_indice_sincronizado(self, db_session: Session, test_projeto_data):
+        """Testa que alterações e remoções se refletem na pesquisa"""
+        from app.schemas.projeto import ProjetoUpdate
+
+        projeto = self._criar_projeto(db_session, test_projeto_data, nome="Viveiro de Tilápia")
+        service = ProjetoService(db_session)
+        assert [p.id for p in service.get_projetos(search="tilapia")] == [projeto.id]
+
+        service.update_projeto(projeto.id, ProjetoUpdate(nome="Viveiro de Bagre"))
+        assert service.get_projetos(search="tilapia") == []
+        assert [p.id for p in service.get_projetos(search="bagre")] == [projeto.id]
+
+        db_session.delete(projeto)
+        db_session.flush()
+        assert service.get_projetos(search="bagre") == []
+
+    def test_auditoria_pesquisa_detalhes_e_acao(self, db_session: Session):
+        """Testa a pesquisa de auditoria por texto dos detalhes e pelo nome da ação"""
+        db_session.add_all([
+            AuditLog(acao=AcaoAudit.LOGIN, entidade="User", detalhes="Sessão iniciada"),
+            AuditLog(acao=AcaoAudit.EXPORT, entidade="Indicador", detalhes="Exportação de relatório"),
+        ])
+        db_session.flush()
+
+        service = AuditService(db_session)
+        assert [l.acao for l in service.get_audit_logs(search="exportacao")] == [AcaoAudit.EXPORT]
+        assert [l.acao for l in service.get_audit_logs(search="login")] == [AcaoAudit.LOGIN]
+
+    def test_pesquisa_unificada_ordena_por_relevancia(self, db_session: Session, test_projeto_data):
+        """Testa a pesquisa entre entidades, ordenada por relevância e com excerto"""
+        from app.services.search_service import SearchService
+
+        projeto = self._criar_projeto(
+            db_session, test_projeto_data, nome="Tilápia do Cuanza", descricao="Produção em gaiolas"
+        )
+        indicador = Indicador(
+            projeto_id=projeto.id, nome="Produção anual", unidade="toneladas", meta=10,
+            periodo_referencia="T1", fonte_dados="Relatório sobre tilápia"
+        )
+        db_session.add_all([
+            indicador,
+            Licenciamento(
+                projeto_id=projeto.id, entidade_responsavel="IPA", data_submissao=datetime(2024, 1, 1),
+                observacoes="Sem referência ao peixe"
+            ),
+        ])
+        db_session.flush()
+
+        resultados = SearchService(db_session).pesquisar("tilapia", ["projetos", "indicadores", "licenciamentos"])
+        assert [(r["entidade"], r["id"]) for r in resultados] == [
+            ("projetos", projeto.id), ("indicadores", indicador.id)
+        ]
+        assert resultados[0]["titulo"] == "Tilápia do Cuanza"
+        assert "<b>Tilápia</b>" in resultados[0]["excerto"]
+        assert resultados[0]["score"] > resultados[1]["score"]
+
+        assert SearchService(db_session).pesquisar("tilapia", ["indicadores"])[0]["id"] == indicador.id
+        assert SearchService(db_session).pesquisar("  ") == []
+
+
+class TestKPIClassificacao:
+    """Testes para a categoria de KPI dos indicadores"""
+
+    def _criar_projeto(self, db_session: Session, test_projeto_data) -> Projeto:
+        provincia = Provincia(nome="Luanda")
+        db_session.add(provincia)
+        db_session.flush()
+        projeto = Projeto(**{
+            **test_projeto_data,
+            "provincia_id": provincia.id,
+            "fonte_financiamento": "FADEPA",
+            "data_inicio_prevista": datetime(2024, 1, 1),
+            "data_fim_prevista": datetime(2024, 12, 31),
+        })
+        db_session.add(projeto)
+        db_session.flush()
+        return projeto
+
+    def _criar_indicador(self, db_session: Session, projeto: Projeto, nome: str, valor: int, meta: int = 100) -> Indicador:
+        from app.schemas.indicador import IndicadorCreate
+
+        return IndicadorService(db_session).create_indicador(IndicadorCreate(
+            projeto_id=projeto.id, nome=nome, unidade="un", meta=meta, valor_actual=valor,
+            periodo_referencia="T1", fonte_dados="Relatório"
+        ), user_id=None)
+
+    def test_classificador_ignora_acentos_e_maiusculas(self):
+        """Testa as regras por omissão e a prioridade da primeira categoria"""
+        from app.core.kpi_classifier import classificar
+        from app.models.indicador import CategoriaKPI
+
+        assert classificar("Famílias Beneficiadas") == CategoriaKPI.FAMILIAS_BENEFICIADAS
+        assert classificar("FAMILIAS apoiadas") == CategoriaKPI.FAMILIAS_BENEFICIADAS
+        assert classificar("Postos de trabalho") == CategoriaKPI.EMPREGOS_CRIADOS
+        assert classificar("Funcionários contratados") == CategoriaKPI.EMPREGOS_CRIADOS
+        assert classificar("Produção de Peixe") == CategoriaKPI.OUTRO
+        assert classificar(None) == CategoriaKPI.OUTRO
+
+    def test_regras_configuraveis(self):
+        """Testa regras de KPI_REGRAS e o recurso às regras por omissão se inválidas"""
+        from app.core.kpi_classifier import ClassificadorKPI, REGRAS_PADRAO, carregar_regras
+        from app.models.indicador import CategoriaKPI
+
+        regras = carregar_regras('{"EMPREGOS_CRIADOS": ["postos? de trabalho", "m[aã]o de obra"]}')
+        classificador = ClassificadorKPI(regras)
+        assert classificador.classificar("Mão de obra local") == CategoriaKPI.EMPREGOS_CRIADOS
+        assert classificador.classificar("Famílias Beneficiadas") == CategoriaKPI.OUTRO
+
+        assert carregar_regras("") is REGRAS_PADRAO
+        assert carregar_regras('{"INEXISTENTE": ["x"]}') is REGRAS_PADRAO
+        assert carregar_regras('{"OUTRO": ["("]}') is REGRAS_PADRAO
+
+    def test_categoria_atribuida_na_escrita(self, db_session: Session, test_projeto_data):
+        """Testa a classificação na criação, na alteração do nome e na importação CSV"""
+        from app.models.indicador import CategoriaKPI
+        from app.schemas.indicador import IndicadorUpdate
+
+        projeto = self._criar_projeto(db_session, test_projeto_data)
+        indicador = self._criar_indicador(db_session, projeto, "Famílias Beneficiadas", 10)
+        assert indicador.categoria_kpi == CategoriaKPI.FAMILIAS_BENEFICIADAS
+
+        service = IndicadorService(db_session)
+        service.update_indicador(indicador.id, IndicadorUpdate(valor_actual=20), user_id=None)
+        assert indicador.categoria_kpi == CategoriaKPI.FAMILIAS_BENEFICIADAS
+        service.update_indicador(indicador.id, IndicadorUpdate(nome="Empregos diretos"), user_id=None)
+        assert indicador.categoria_kpi == CategoriaKPI.EMPREGOS_CRIADOS
+
+        csv_content = (
+            "projeto_id,nome,unidade,meta,valor_actual,periodo_referencia,fonte_dados\n"
+            f"{projeto.id},Colaboradores locais,pessoas,10,5,T2,Relatório\n"
+        )
+        assert service.import_indicadores_csv(csv_content, user_id=None)["imported_count"] == 1
+        importado = db_session.query(Indicador).filter(Indicador.nome == "Colaboradores locais").one()
+        assert importado.categoria_kpi == CategoriaKPI.EMPREGOS_CRIADOS
+
+    def test_reclassificar_kpis(self, db_session: Session, test_projeto_data, monkeypatch):
+        """Testa a reclassificação dos indicadores existentes após mudar as regras"""
+        from app.core import kpi_classifier
+        from app.models.indicador import CategoriaKPI
+
+        projeto = self._criar_projeto(db_session, test_projeto_data)
+        indicador = self._criar_indicador(db_session, projeto, "Mão de obra local", 7)
+        outro = self._criar_indicador(db_session, projeto, "Produção de Peixe", 3)
+        assert indicador.categoria_kpi == CategoriaKPI.OUTRO
+
+        service = IndicadorService(db_session)
+        assert service.reclassificar_kpis() == 0
+
+        classificador = kpi_classifier.ClassificadorKPI({CategoriaKPI.EMPREGOS_CRIADOS: ["mao de obra"]})
+        monkeypatch.setattr(kpi_classifier, "classificador_kpi", classificador)
+        assert service.reclassificar_kpis() == 1
+        db_session.expire_all()
+        assert indicador.categoria_kpi == CategoriaKPI.EMPREGOS_CRIADOS
+        assert outro.categoria_kpi == CategoriaKPI.OUTRO
+        assert service.get_empregos_criados() == 7
+
+    def test_kpis_numa_query_agrupada(self, db_session: Session, test_projeto_data, query_counter):
+        """Testa que os KPIs de indicadores vêm de um único SUM ... GROUP BY categoria_kpi"""
+        from app.services.dashboard_service import DashboardService
+
+        projeto = self._criar_projeto(db_session, test_projeto_data)
+        self._criar_indicador(db_session, projeto, "Famílias Beneficiadas", 40, meta=50)
+        self._criar_indicador(db_session, projeto, "Habitantes abrangidos", 2, meta=5)
+        self._criar_indicador(db_session, projeto, "Empregos Criados", 15, meta=20)
+        self._criar_indicador(db_session, projeto, "Produção de Peixe", 100, meta=200)
+
+        with query_counter() as queries:
+            kpis = DashboardService(db_session).get_indicadores_kpis()
+        assert len(queries) == 1
+        assert "GROUP BY indicadores.categoria_kpi" in queries[0]
+        assert kpis == {
+            "producao_total": 157.0,
+            "meta_total": 275.0,
+            "familias_beneficiadas": 42,
+            "empregos_criados": 15,
+        }
+
+        service = IndicadorService(db_session)
+        assert service.get_familias_beneficiadas() == 42
+        assert service.get_empregos_criados() == 15
+        assert service.get_producao_total() == 157.0
+        assert service.get_execucao_media_percentual() == round(157 / 275 * 100, 2)
+        assert DashboardService(db_session).get_kpis()["indicadores"] == {
+            "producao_total": 157.0,
+            "familias_beneficiadas": 42,
+            "empregos_criados": 15,
+        }
+
+
+class TestAgregadosDashboard:
+    """Testes para as tabelas de agregados dos gráficos (app.db.rollups)"""
+
+    def _agregados(self, db_session: Session):
+        from app.models.producao_resumo import ProducaoResumo
+        from app.models.projetos_resumo import ProjetosResumo
+
+        producao = sorted(
+            (r.provincia_id, r.periodo_referencia, r.categoria_kpi, r.total_indicadores,
+             round(float(r.valor_actual), 2), round(float(r.meta), 2))
+            for r in db_session.query(ProducaoResumo).filter(ProducaoResumo.total_indicadores != 0)
+        )
+        projetos = sorted(
+            (r.fonte_financiamento, r.estado, r.total_projetos,
+             round(float(r.orcamento_previsto_kz), 2), round(float(r.orcamento_executado_kz), 2))
+            for r in db_session.query(ProjetosResumo).filter(ProjetosResumo.total_projetos != 0)
+        )
+        return producao, projetos
+
+    def _confirmar_igual_a_reconstrucao(self, db_session: Session):
+        """Os agregados incrementais coincidem com os recalculados de raiz"""
+        from app.db import rollups
+
+        db_session.expire_all()
+        incrementais = self._agregados(db_session)
+        rollups.reconstruir(db_session)
+        assert incrementais == self._agregados(db_session)
+        return incrementais
+
+    def _criar_dados(self, db_session: Session, test_projeto_data):
+        from app.schemas.indicador import IndicadorCreate
+
+        luanda, benguela = Provincia(nome="Luanda"), Provincia(nome="Benguela")
+        db_session.add_all([luanda, benguela])
+        db_session.flush()
+        projeto = Projeto(**{
+            **test_projeto_data,
+            "provincia_id": luanda.id,
+            "data_inicio_prevista": datetime(2024, 1, 1),
+            "data_fim_prevista": datetime(2024, 12, 31),
+        })
+        db_session.add(projeto)
+        db_session.commit()
+
+        service = IndicadorService(db_session)
+        indicadores = [
+            service.create_indicador(IndicadorCreate(
+                projeto_id=projeto.id, nome=nome, unidade="un", meta=meta, valor_actual=valor,
+                periodo_referencia=periodo, fonte_dados="Relatório"
+            ), user_id=None)
+            for nome, valor, meta, periodo in (
+                ("Produção de Peixe", 12.5, 20, "T1"),
+                ("Famílias Beneficiadas", 30, 40, "T1"),
+                ("Empregos Criados", 8, 10, "T2"),
+            )
+        ]
+        return luanda, benguela, projeto, indicadores
+
+    def test_escritas_orm_atualizam_agregados(self, db_session: Session, test_projeto_data):
+        """Testa criação, alteração e remoção de indicadores e projetos"""
+        from app.schemas.indicador import IndicadorUpdate
+        from app.schemas.projeto import ProjetoUpdate
+
+        luanda, benguela, projeto, (producao, familias, empregos) = self._criar_dados(db_session, test_projeto_data)
+        agregados, projetos = self._confirmar_igual_a_reconstrucao(db_session)
+        assert (luanda.id, "T1", "FAMILIAS_BENEFICIADAS", 1, 30.0, 40.0) in agregados
+        assert projetos == [("AFAP-2", "PLANEADO", 1, 1000000.0, 0.0)]
+
+        service = IndicadorService(db_session)
+        service.update_indicador(producao.id, IndicadorUpdate(valor_actual=15, periodo_referencia="T3"), user_id=None)
+        service.update_indicador(familias.id, IndicadorUpdate(nome="Postos de trabalho"), user_id=None)
+        service.delete_indicador(empregos.id, user_id=None)
+        agregados, _ = self._confirmar_igual_a_reconstrucao(db_session)
+        assert agregados == [
+            (luanda.id, "T1", "EMPREGOS_CRIADOS", 1, 30.0, 40.0),
+            (luanda.id, "T3", "OUTRO", 1, 15.0, 20.0),
+        ]
+
+        ProjetoService(db_session).update_projeto(
+            projeto.id, ProjetoUpdate(provincia_id=benguela.id, estado="EM_EXECUCAO", orcamento_executado_kz=250000)
+        )
+        agregados, projetos = self._confirmar_igual_a_reconstrucao(db_session)
+        assert {linha[0] for linha in agregados} == {benguela.id}
+        assert projetos == [("AFAP-2", "EM_EXECUCAO", 1, 1000000.0, 250000.0)]
+
+    def test_indicador_e_projeto_alterados_no_mesmo_flush(self, db_session: Session, test_projeto_data):
+        """Testa a mudança de província com um indicador do projeto também alterado"""
+        luanda, benguela, projeto, (producao, familias, _) = self._criar_dados(db_session, test_projeto_data)
+
+        projeto.provincia_id = benguela.id
+        producao.valor_actual = 50
+        db_session.delete(familias)
+        db_session.commit()
+
+        agregados, _ = self._confirmar_igual_a_reconstrucao(db_session)
+        assert agregados == [
+            (benguela.id, "T1", "OUTRO", 1, 50.0, 20.0),
+            (benguela.id, "T2", "EMPREGOS_CRIADOS", 1, 8.0, 10.0),
+        ]
+
+    def test_importacoes_atualizam_agregados(self, db_session: Session, test_projeto_data):
+        """Testa que as importações em lote (insert() sem ORM) atualizam os agregados"""
+        luanda, _, projeto, _ = self._criar_dados(db_session, test_projeto_data)
+
+        csv_content = (
+            "projeto_id,nome,unidade,meta,valor_actual,periodo_referencia,fonte_dados\n"
+            f"{projeto.id},Famílias apoiadas,famílias,10,4,T1,Relatório\n"
+            f"{projeto.id},Produção de Peixe,toneladas,5,1.5,T4,Relatório\n"
+        )
+        assert IndicadorService(db_session).import_indicadores_csv(csv_content, user_id=None)["imported_count"] == 2
+        resultado = ProjetoService(db_session).import_projetos([
+            dict(test_projeto_data, provincia_id=luanda.id, nome="Importado", estado="CONCLUIDO",
+                 orcamento_executado_kz=500, data_inicio_prevista=datetime(2024, 1, 1),
+                 data_fim_prevista=datetime(2024, 12, 31))
+        ])
+        assert resultado["sucessos"] == 1
+
+        agregados, projetos = self._confirmar_igual_a_reconstrucao(db_session)
+        assert (luanda.id, "T1", "FAMILIAS_BENEFICIADAS", 2, 34.0, 50.0) in agregados
+        assert (luanda.id, "T4", "OUTRO", 1, 1.5, 5.0) in agregados
+        assert ("AFAP-2", "CONCLUIDO", 1, 1000000.0, 500.0) in projetos
+
+    def test_estados_em_lote_atualizam_agregados(self, db_session: Session, test_projeto_data):
+        """Testa que a mudança de estado em lote (update() sem ORM) atualiza os agregados"""
+        from app.schemas.projeto import ProjetoEstadoLote
+
+        luanda, _, projeto, _ = self._criar_dados(db_session, test_projeto_data)
+        outro = Projeto(**{
+            **test_projeto_data,
+            "nome": "Segundo projeto",
+            "provincia_id": luanda.id,
+            "orcamento_executado_kz": 100000,
+            "data_inicio_prevista": datetime(2024, 1, 1),
+            "data_fim_prevista": datetime(2024, 12, 31),
+        })
+        db_session.add(outro)
+        db_session.commit()
+
+        resultado = ProjetoService(db_session).update_projetos_estado_lote(ProjetoEstadoLote(transicoes=[
+            {"id": projeto.id, "estado": "EM_EXECUCAO"},
+            {"id": outro.id, "estado": "CONCLUIDO"},
+        ]))
+        assert resultado.atualizados == 2
+
+        _, projetos = self._confirmar_igual_a_reconstrucao(db_session)
+        assert projetos == [
+            ("AFAP-2", "CONCLUIDO", 1, 1000000.0, 100000.0),
+            ("AFAP-2", "EM_EXECUCAO", 1, 1000000.0, 0.0),
+        ]
+
+    def test_upsert_em_lote_atualiza_agregados(self, db_session: Session, test_projeto_data):
+        """Testa que o upsert de valores em lote subtrai os valores antigos e soma os novos"""
+        from app.schemas.indicador import IndicadorValoresLote
+
+        luanda, _, projeto, _ = self._criar_dados(db_session, test_projeto_data)
+        base = {"projeto_id": projeto.id, "unidade": "un", "fonte_dados": "Relatório"}
+        resultado = IndicadorService(db_session).upsert_indicadores_lote(IndicadorValoresLote(valores=[
+            dict(base, nome="Famílias Beneficiadas", meta=40, valor_actual=35, periodo_referencia="T1"),
+            dict(base, nome="Empregos Criados", meta=10, valor_actual=8, periodo_referencia="T2"),
+            dict(base, nome="Empregos Criados", meta=12, valor_actual=3, periodo_referencia="T3"),
+        ]), user_id=None)
+        assert (resultado.criados, resultado.atualizados, resultado.inalterados) == (1, 1, 1)
+
+        agregados, _ = self._confirmar_igual_a_reconstrucao(db_session)
+        assert (luanda.id, "T1", "FAMILIAS_BENEFICIADAS", 1, 35.0, 40.0) in agregados
+        assert (luanda.id, "T2", "EMPREGOS_CRIADOS", 1, 8.0, 10.0) in agregados
+        assert (luanda.id, "T3", "EMPREGOS_CRIADOS", 1, 3.0, 12.0) in agregados
+
+    def test_reclassificacao_atualiza_graficos(self, db_session: Session, test_projeto_data, monkeypatch):
+        """Testa que os gráficos acompanham a reclassificação dos KPIs (UPDATE sem ORM)"""
+        from app.core import kpi_classifier
+        from app.models.indicador import CategoriaKPI
+        from app.services.dashboard_service import DashboardService
+
+        luanda, _, _, _ = self._criar_dados(db_session, test_projeto_data)
+        antes = DashboardService(db_session).get_charts()["producao_por_provincia"][0]
+        assert (antes["familias_beneficiadas"], antes["empregos_criados"]) == (30, 8)
+
+        classificador = kpi_classifier.ClassificadorKPI({CategoriaKPI.EMPREGOS_CRIADOS: ["peixe", "emprego"]})
+        monkeypatch.setattr(kpi_classifier, "classificador_kpi", classificador)
+        assert IndicadorService(db_session).reclassificar_kpis() == 2
+
+        service = DashboardService(db_session)
+        depois = service.get_charts()["producao_por_provincia"][0]
+        assert (depois["familias_beneficiadas"], depois["empregos_criados"]) == (0, 20)
+        assert depois["empregos_criados"] == service.get_kpis()["indicadores"]["empregos_criados"]
+        agregados, _ = self._confirmar_igual_a_reconstrucao(db_session)
+        assert (luanda.id, "T1", "EMPREGOS_CRIADOS", 1, 12.5, 20.0) in agregados
+        assert (luanda.id, "T1", "OUTRO", 1, 30.0, 40.0) in agregados
+
+    def test_graficos_leem_apenas_agregados(self, db_session: Session, test_projeto_data, query_counter):
+        """Testa que os gráficos não percorrem indicadores nem projetos"""
+        from app.services.dashboard_service import DashboardService
+
+        luanda, _, _, _ = self._criar_dados(db_session, test_projeto_data)
+
+        service = DashboardService(db_session)
+        with query_counter() as queries:
+            producao = service.get_producao_por_provincia()
+            trimestres = service.get_producao_por_trimestre()
+            fontes = service.get_distribuicao_fontes()
+            estados = service.get_evolucao_projetos()
+        assert len(queries) == 2
+        assert all("FROM indicadores" not in q and "FROM projetos " not in q for q in queries)
+
+        assert producao == [{
+            "provincia_id": luanda.id,
+            "provincia": "Luanda",
+            "producao_total": 50.5,
+            "meta_total": 70.0,
+            "familias_beneficiadas": 30,
+            "empregos_criados": 8,
+        }]
+        assert trimestres["T1"]["producao_total"] == 42.5
+        assert trimestres["T2"]["empregos_criados"] == 8
+        assert trimestres["T4"] == {"producao_total": 0.0, "meta_total": 0.0, "familias_beneficiadas": 0, "empregos_criados": 0}
+        assert fontes["AFAP-2"]["total_projetos"] == 1
+        assert fontes["FADEPA"]["total_projetos"] == 0
+        assert estados["PLANEADO"] == {
+            "total_projetos": 1,
+            "orcamento_previsto_kz": 1000000.0,
+            "orcamento_executado_kz": 0.0,
+            "execucao_percentual": 0.0,
+        }
+
+        charts = DashboardService(db_session).get_charts()
+        assert set(charts) == {
+            "producao_por_provincia", "producao_por_trimestre", "distribuicao_fontes",
+            "evolucao_projetos", "status_licenciamentos", "mapa_provincias"
+        }
+
+
+class TestTransicoesEmLote:
+    """Testes para as transições de status em lote"""
+
+    def _criar_licenciamentos(self, db_session: Session, test_projeto_data, quantidade: int):
+        provincia = Provincia(nome="Namibe")
+        db_session.add(provincia)
+        db_session.flush()
+        projeto = Projeto(**{
+            **test_projeto_data,
+            "provincia_id": provincia.id,
+            "data_inicio_prevista": datetime(2024, 1, 1),
+            "data_fim_prevista": datetime(2024, 12, 31),
+        })
+        db_session.add(projeto)
+        db_session.flush()
+        licenciamentos = [
+            Licenciamento(projeto_id=projeto.id, entidade_responsavel="IPA", data_submissao=datetime(2024, 1, 1))
+            for _ in range(quantidade)
+        ]
+        db_session.add_all(licenciamentos)
+        db_session.commit()
+        return [l.id for l in licenciamentos]
+
+    def test_aprovacao_em_lote(self, db_session: Session, test_projeto_data, query_counter):
+        """Testa um UPDATE por status de destino, a data de decisão e a auditoria"""
+        from app.models.licenciamento import StatusLicenciamento
+        from app.schemas.licenciamento import LicenciamentoStatusLote
+
+        ids = self._criar_licenciamentos(db_session, test_projeto_data, 4)
+        lote = LicenciamentoStatusLote(
+            transicoes=[{"id": id_, "status": "APROVADO"} for id_ in ids[:3]]
+            + [{"id": ids[3], "status": "EM_ANALISE"}],
+            observacoes="Decisão da comissão"
+        )
+        antes = datetime.utcnow()
+        with query_counter() as queries:
+            resultado = LicenciamentoService(db_session).update_licenciamentos_status_lote(lote, user_id=None)
+        depois = datetime.utcnow()
+
+        assert resultado.atualizados == 4
+        assert len([q for q in queries if q.lstrip().upper().startswith("UPDATE LICENCIAMENTOS")]) == 2
+        assert len([q for q in queries if q.lstrip().upper().startswith("INSERT INTO AUDIT_LOGS")]) == 1
+
+        db_session.expire_all()
+        licenciamentos = {l.id: l for l in db_session.query(Licenciamento).filter(Licenciamento.id.in_(ids))}
+        for id_ in ids[:3]:
+            assert licenciamentos[id_].status == StatusLicenciamento.APROVADO
+            # UTC, como em update_licenciamento_status
+            assert antes <= licenciamentos[id_].data_decisao.replace(tzinfo=None) <= depois
+            assert licenciamentos[id_].data_decisao == licenciamentos[ids[0]].data_decisao
+            assert licenciamentos[id_].observacoes == "Decisão da comissão"
+        assert licenciamentos[ids[3]].status == StatusLicenciamento.EM_ANALISE
+        assert licenciamentos[ids[3]].data_decisao is None
+
+        detalhes = [
+            a.detalhes for a in db_session.query(AuditLog).filter(
+                AuditLog.acao == AcaoAudit.STATUS_CHANGE, AuditLog.entidade == "Licenciamento"
+            )
+        ]
+        assert len(detalhes) == 4
+        assert "Status alterado de PENDENTE para APROVADO" in detalhes
+
+    def test_resultado_por_id(self, db_session: Session, test_projeto_data):
+        """Testa os ids inexistentes, repetidos e já no status pedido"""
+        from app.models.licenciamento import StatusLicenciamento
+        from app.schemas.licenciamento import LicenciamentoStatusLote
+        from app.schemas.lote import ResultadoTransicao
+
+        pendente, repetido, negado = self._criar_licenciamentos(db_session, test_projeto_data, 3)
+        db_session.get(Licenciamento, negado).status = StatusLicenciamento.NEGADO
+        db_session.commit()
+
+        resultado = LicenciamentoService(db_session).update_licenciamentos_status_lote(LicenciamentoStatusLote(transicoes=[
+            {"id": pendente, "status": "NEGADO"},
+            {"id": repetido, "status": "APROVADO"},
+            {"id": 999999, "status": "APROVADO"},
+            {"id": negado, "status": "NEGADO"},
+            {"id": repetido, "status": "NEGADO"},
+        ]))
+
+        assert resultado.atualizados == 1
+        assert [(r.id, r.resultado) for r in resultado.resultados] == [
+            (pendente, ResultadoTransicao.ATUALIZADO),
+            (repetido, ResultadoTransicao.DUPLICADO),
+            (999999, ResultadoTransicao.NAO_ENCONTRADO),
+            (negado, ResultadoTransicao.SEM_ALTERACAO),
+        ]
+        db_session.expire_all()
+        assert db_session.get(Licenciamento, repetido).status == StatusLicenciamento.PENDENTE
+
+    def test_lote_sem_alteracoes_nao_escreve(self, db_session: Session, test_projeto_data, query_counter):
+        """Testa que um lote sem transições válidas fica pela consulta inicial"""
+        from app.schemas.licenciamento import LicenciamentoStatusLote
+
+        ids = self._criar_licenciamentos(db_session, test_projeto_data, 2)
+        with query_counter() as queries:
+            resultado = LicenciamentoService(db_session).update_licenciamentos_status_lote(
+                LicenciamentoStatusLote(transicoes=[{"id": id_, "status": "PENDENTE"} for id_ in ids])
+            )
+        assert resultado.atualizados == 0
+        assert len(queries) == 1
+
+
+class TestUpsertIndicadores:
+    """Testes para o upsert em lote dos valores trimestrais dos indicadores"""
+
+    def _criar_projeto(self, db_session: Session, test_projeto_data) -> Projeto:
+        provincia = Provincia(nome="Huíla")
+        db_session.add(provincia)
+        db_session.flush()
+        projeto = Projeto(**{
+            **test_projeto_data,
+            "provincia_id": provincia.id,
+            "data_inicio_prevista": datetime(2024, 1, 1),
+            "data_fim_prevista": datetime(2024, 12, 31),
+        })
+        db_session.add(projeto)
+        db_session.commit()
+        return projeto
+
+    def _valores(self, projeto_id: int, periodo: str, quantidade: int, valor: float = 1):
+        return [
+            {"projeto_id": projeto_id, "nome": f"Indicador {n}", "unidade": "un", "meta": 10,
+             "valor_actual": valor, "periodo_referencia": periodo, "fonte_dados": "Relatório"}
+            for n in range(quantidade)
+        ]
+
+    def test_contagens_e_auditoria(self, db_session: Session, test_projeto_data):
+        """Testa criados, atualizados, inalterados, erros e a auditoria de cada escrita"""
+        from app.schemas.indicador import IndicadorValoresLote
+
+        projeto = self._criar_projeto(db_session, test_projeto_data)
+        service = IndicadorService(db_session)
+        primeiro = service.upsert_indicadores_lote(
+            IndicadorValoresLote(valores=self._valores(projeto.id, "T1", 3)), user_id=None
+        )
+        assert (primeiro.criados, primeiro.atualizados, primeiro.inalterados) == (3, 0, 0)
+
+        valores = self._valores(projeto.id, "T1", 3)
+        valores[0]["valor_actual"] = 7
+        valores.append(dict(valores[1], projeto_id=999999))
+        valores.append(dict(valores[2], periodo_referencia="T2"))
+        segundo = service.upsert_indicadores_lote(IndicadorValoresLote(valores=valores), user_id=None)
+        assert (segundo.criados, segundo.atualizados, segundo.inalterados) == (1, 1, 2)
+        assert segundo.erros == ["Linha 4: Projeto 999999 não existe"]
+
+        db_session.expire_all()
+        indicadores = {
+            (i.nome, i.periodo_referencia.value): i
+            for i in db_session.query(Indicador).filter(Indicador.projeto_id == projeto.id)
+        }
+        assert len(indicadores) == 4
+        assert float(indicadores[("Indicador 0", "T1")].valor_actual) == 7
+        assert indicadores[("Indicador 0", "T1")].updated_at is not None
+
+        acoes = [
+            a.acao for a in db_session.query(AuditLog).filter(AuditLog.entidade == "Indicador").order_by(AuditLog.id)
+        ]
+        assert acoes[:3] == [AcaoAudit.CREATE] * 3
+        assert sorted(acoes[3:]) == [AcaoAudit.CREATE, AcaoAudit.UPDATE]
+
+    def test_chave_unica(self, db_session: Session, test_projeto_data):
+        """Testa que não podem existir dois valores do mesmo indicador no mesmo período"""
+        from sqlalchemy.exc import IntegrityError
+
+        projeto = self._criar_projeto(db_session, test_projeto_data)
+        db_session.add_all([Indicador(**valor) for valor in self._valores(projeto.id, "T1", 1) * 2])
+        with pytest.raises(IntegrityError):
+            db_session.flush()
+        db_session.rollback()
+
+    def test_criar_ou_mover_para_chave_existente_responde_409(self, db_session: Session, test_projeto_data):
+        """Testa o 409 ao criar um duplicado ou ao renomear/mover um indicador para uma chave ocupada"""
+        from fastapi import HTTPException
+        from app.schemas.indicador import IndicadorCreate, IndicadorUpdate
+
+        projeto = self._criar_projeto(db_session, test_projeto_data)
+        service = IndicadorService(db_session)
+        primeiro, segundo = (
+            service.create_indicador(IndicadorCreate(**valor), user_id=None)
+            for valor in self._valores(projeto.id, "T1", 2)
+        )
+
+        with pytest.raises(HTTPException) as erro:
+            service.create_indicador(IndicadorCreate(**self._valores(projeto.id, "T1", 1)[0]), user_id=None)
+        assert erro.value.status_code == 409
+        assert "Já existe o indicador 'Indicador 0'" in erro.value.detail
+
+        with pytest.raises(HTTPException) as erro:
+            service.update_indicador(segundo.id, IndicadorUpdate(nome="Indicador 0"), user_id=None)
+        assert erro.value.status_code == 409
+
+        # A sessão continua utilizável e o indicador mantém os valores anteriores
+        assert service.get_indicador_by_id(segundo.id).nome == "Indicador 1"
+        movido = service.update_indicador(segundo.id, IndicadorUpdate(periodo_referencia="T2"), user_id=None)
+        assert movido.periodo_referencia.value == "T2"
+        assert db_session.query(Indicador).filter(Indicador.projeto_id == projeto.id).count() == 2
+
+    def test_consultas_constantes(self, db_session: Session, test_projeto_data, query_counter):
+        """Testa que o número de instruções não depende do número de valores"""
+        from app.schemas.indicador import IndicadorValoresLote
+
+        projeto_id = self._criar_projeto(db_session, test_projeto_data).id
+        service = IndicadorService(db_session)
+        service.upsert_indicadores_lote(IndicadorValoresLote(valores=self._valores(projeto_id, "T3", 5)), user_id=None)
+
+        # 5 atualizados; depois 5 atualizados e 495 criados
+        contagens = []
+        for quantidade in (5, 500):
+            with query_counter() as queries:
+                service.upsert_indicadores_lote(
+                    IndicadorValoresLote(valores=self._valores(projeto_id, "T3", quantidade, valor=quantidade)),
+                    user_id=None
+                )
+            contagens.append(len(queries))
+        assert contagens[0] == contagens[1]